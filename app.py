@@ -45,7 +45,7 @@ builtins.print = safe_print
 
 from fastapi import FastAPI, Request, HTTPException, Form
 from fastapi.responses import HTMLResponse
-from telegram import Update, Bot
+from telegram import Update
 from datetime import datetime, timezone
 from telegram.ext import (
     Application,
@@ -61,9 +61,30 @@ from db import init_game_state, get_async_session
 from models import GameState, PrizeWinner
 from helpers import get_or_create_user
 from utils.signer import verify_signed_token
+from utils.questions_loader import load_question_bank
+from content_store import get_content_store
+from send_scheduler import PRIORITY_HIGH, get_send_scheduler
+from rate_limit_store import already_seen, forget, get_window_store, is_rate_limited
+from state_persistence import get_state_persistence
+from http_clients import get_http_clients
+from update_queue import SUBMIT_DUPLICATE, SUBMIT_QUEUED, get_update_queue
+from update_router import StateGatedHandler, compile_update_routes, process_with_fresh_state
+from bot_instance import bot as shared_bot
+from services.timer_wheel import get_timer_wheel
+from services.deadline_service import rebuild_timer_wheel
+from services.practice_repository import practice_writer_stats, stop_practice_writers
+from services.live_exam_engine import live_exam_stats
+from services.exam_results import exam_results_stats
+from services.bank_directory import get_bank_directory
+from question_refs import question_refs_stats
+from services.payment_verification import get_payment_verifier
 from webhook import router as webhook_router
 from routes.payments_router import router as payments_router
-from services.airtime_service import handle_claim_airtime_button, handle_airtime_claim_phone
+from services.airtime_service import (
+    airtime_phone_gate,
+    handle_airtime_claim_phone,
+    handle_claim_airtime_button,
+)
 from handlers.support import support_conv, admin_reply
 from handlers.challenge import register_handlers as register_challenge_handlers
 from tasks import start_background_tasks, stop_background_tasks
@@ -76,20 +97,13 @@ from handlers.finance import register_handlers as register_finance_handlers
 logging.getLogger("httpx").setLevel(logging.WARNING)
 
 # ------------------------------------
-# Simple anti-spam for webhook calls
+# Webhook dedupe / flood limits (rate_limit_store)
 # ------------------------------------
-_rate_limit_cache = {}
-RATE_LIMIT_SECONDS = 10
-
-
-def is_rate_limited(key: str, seconds: int = 30) -> bool:
-    import time
-    now = time.time()
-    last_call = _rate_limit_cache.get(key)
-    if last_call and now - last_call < seconds:
-        return True
-    _rate_limit_cache[key] = now
-    return False
+# Telegram re-delivers an update until it gets a 200; drop repeats.
+TG_UPDATE_DEDUPE_SECONDS = int(os.getenv("TG_UPDATE_DEDUPE_SECONDS", "600"))
+# Per-user flood limit: updates beyond this in the window are dropped.
+TG_USER_FLOOD_LIMIT = int(os.getenv("TG_USER_FLOOD_LIMIT", "30"))
+TG_USER_FLOOD_WINDOW_SECONDS = int(os.getenv("TG_USER_FLOOD_WINDOW_SECONDS", "10"))
 
 
 # ------------------------------------------------
@@ -162,6 +176,66 @@ async def root():
     }
 
 
+# -------------------------------------------------
+# Handler registration
+# -------------------------------------------------
+def register_all_handlers(application: Application, *, compile_routes: bool = True) -> None:
+    # -------------------------------------------------
+    # High Priority Handlers FIRST
+    # -------------------------------------------------
+    application.add_handler(
+        CallbackQueryHandler(
+            handle_claim_airtime_button,
+            pattern=r"^claim_airtime:"
+        ),
+        group=-10,
+    )
+
+    application.add_handler(
+        StateGatedHandler(
+            MessageHandler(
+                filters.TEXT & ~filters.COMMAND,
+                handle_airtime_claim_phone,
+            ),
+            airtime_phone_gate,
+        ),
+        group=-9,
+    )
+
+    application.add_handler(support_conv, group=-8)
+
+    # Admin reply command
+    application.add_handler(CommandHandler("reply", admin_reply), group=-7)
+
+    # -------------------------------------------------
+    # Register All Other Handlers
+    # -------------------------------------------------
+    core.register_handlers(application)
+    playtrivia.register_handlers(application)
+    jambpractice.register_handlers(application)
+    register_waec_handlers(application)
+    register_mockjamb_handlers(application)
+    register_mockwaec_handlers(application)
+    register_university_handlers(application)
+    battle.register_handlers(application)
+    register_challenge_handlers(application)
+    free.register_handlers(application)
+    payments.register_handlers(application)
+    admin.register_handlers(application)
+    register_finance_handlers(application)
+
+    # -------------------------------------------------
+    # Global Error Handler
+    # -------------------------------------------------
+    application.add_error_handler(tg_error_handler)
+
+    # -------------------------------------------------
+    # Prefix-routed callbacks, state-gated text handlers
+    # -------------------------------------------------
+    if compile_routes:
+        compile_update_routes(application)
+
+
 # -------------------------------------------------
 # Startup event
 # -------------------------------------------------
@@ -181,55 +255,33 @@ async def on_startup():
         await ensure_game_state_exists()
 
         # -------------------------------------------------
-        # Build Telegram Application
+        # Warm in-memory question bank (questions.json)
         # -------------------------------------------------
-        application = Application.builder().token(BOT_TOKEN).build()
+        bank = load_question_bank()
+        logger.info("📚 Question bank loaded | questions=%s", len(bank))
 
         # -------------------------------------------------
-        # High Priority Handlers FIRST
+        # Warm JAMB / WAEC / University content store (data/)
         # -------------------------------------------------
-        application.add_handler(
-            CallbackQueryHandler(
-                handle_claim_airtime_button,
-                pattern=r"^claim_airtime:"
-            ),
-            group=-10,
-        )
+        get_content_store().preload()
 
-        application.add_handler(
-            MessageHandler(
-                filters.TEXT & ~filters.COMMAND,
-                handle_airtime_claim_phone,
-            ),
-            group=-9,
+        # -------------------------------------------------
+        # Build Telegram Application
+        # -------------------------------------------------
+        builder = (
+            Application.builder()
+            .token(BOT_TOKEN)
+            .rate_limiter(get_send_scheduler())
         )
 
-        application.add_handler(support_conv, group=-8)
+        # context.user_data survives restarts and is shared by workers
+        state_persistence = get_state_persistence()
+        if state_persistence is not None:
+            builder = builder.persistence(state_persistence)
 
-        # Admin reply command
-        application.add_handler(CommandHandler("reply", admin_reply), group=-7)
+        application = builder.build()
 
-        # -------------------------------------------------
-        # Register All Other Handlers
-        # -------------------------------------------------
-        core.register_handlers(application)
-        playtrivia.register_handlers(application)
-        jambpractice.register_handlers(application)
-        register_waec_handlers(application)
-        register_mockjamb_handlers(application)
-        register_mockwaec_handlers(application)
-        register_university_handlers(application)
-        battle.register_handlers(application)
-        register_challenge_handlers(application)
-        free.register_handlers(application)
-        payments.register_handlers(application)
-        admin.register_handlers(application)
-        register_finance_handlers(application)
-
-        # -------------------------------------------------
-        # Global Error Handler
-        # -------------------------------------------------
-        application.add_error_handler(tg_error_handler)
+        register_all_handlers(application)
 
         # -------------------------------------------------
         # Initialize Application
@@ -254,9 +306,26 @@ async def on_startup():
         await application.start()
         logger.info("🚀 Telegram bot via Webhook is LIVE")
 
+        # Webhook acks at once; consumers run the handlers (update_queue)
+        get_update_queue().start(process_with_fresh_state(application))
+
         BOT_READY = True
         logger.info("✅ BOT_READY=True (safe to process updates)")
 
+        # -------------------------------------------------
+        # Timer wheel (trivia deadlines, mock exam timers)
+        # -------------------------------------------------
+        get_timer_wheel().start()
+        try:
+            await rebuild_timer_wheel()
+        except Exception:
+            logger.exception("⚠️ Could not rebuild timer wheel from DB")
+
+        # -------------------------------------------------
+        # Provider HTTP pools (Flutterwave, ClubKonnect)
+        # -------------------------------------------------
+        await get_http_clients().start()
+
         # -------------------------------------------------
         # Background Tasks
         # -------------------------------------------------
@@ -285,6 +354,12 @@ async def on_shutdown():
     BOT_READY = False
     logger.info("🔻 BOT_READY=False (shutting down)")
 
+    # Finish the updates already acknowledged to Telegram
+    try:
+        await get_update_queue().stop()
+    except Exception:
+        logger.warning("⚠️ Error draining update queue", exc_info=True)
+
     # Stop background tasks first
     try:
         await stop_background_tasks()
@@ -296,6 +371,22 @@ async def on_shutdown():
         )
         logger.warning("⚠️ Error stopping background tasks:\n%s", clean_trace)
 
+    try:
+        await get_timer_wheel().stop()
+    except Exception:
+        logger.warning("⚠️ Error stopping timer wheel", exc_info=True)
+
+    # Write any buffered practice answers (PRACTICE_WRITE_BEHIND)
+    try:
+        await stop_practice_writers()
+    except Exception:
+        logger.warning("⚠️ Error flushing practice answers", exc_info=True)
+
+    try:
+        await get_http_clients().close()
+    except Exception:
+        logger.warning("⚠️ Error closing provider HTTP clients", exc_info=True)
+
     # Then stop Telegram app
     if not application:
         return
@@ -339,14 +430,41 @@ async def telegram_webhook(secret: str, request: Request):
 
     payload = await request.json()
 
+    update_id = payload.get("update_id")
+    if update_id is not None and await already_seen(
+        f"tg:update:{update_id}", ttl_seconds=TG_UPDATE_DEDUPE_SECONDS
+    ):
+        return {"ok": True, "status": "duplicate"}
+
     try:
         update = Update.de_json(payload, application.bot)
-        await application.process_update(update)
+
+        user = update.effective_user if update else None
+        if user and await is_rate_limited(
+            f"tg:user:{user.id}",
+            limit=TG_USER_FLOOD_LIMIT,
+            window_seconds=TG_USER_FLOOD_WINDOW_SECONDS,
+        ):
+            logger.warning("🚦 Update dropped (flood limit) | user_id=%s | update_id=%s", user.id, update_id)
+            return {"ok": True, "status": "rate_limited"}
+
+        queued = await get_update_queue().submit(update, update_id=update_id)
     except Exception:
         clean_trace = re.sub(
             r"\b\d{9,10}:[A-Za-z0-9_-]{35,}\b", "[SECRET]", traceback.format_exc()
         )
-        logger.error(f"❌ Error while processing update:\n{clean_trace}")
+        logger.error(f"❌ Error while queueing update:\n{clean_trace}")
+        return {"ok": True}
+
+    if queued == SUBMIT_DUPLICATE:
+        return {"ok": True, "status": "duplicate"}
+
+    if queued != SUBMIT_QUEUED:
+        # Queue full (or shutting down): make Telegram deliver it again later
+        if update_id is not None:
+            await forget(f"tg:update:{update_id}")
+        logger.warning("🚦 Update deferred (%s) | update_id=%s", queued, update_id)
+        raise HTTPException(status_code=503, detail="Update queue busy")
 
     return {"ok": True}
 
@@ -357,7 +475,23 @@ async def telegram_webhook(secret: str, request: Request):
 @app.get("/health")
 @app.head("/health")
 async def health_check():
-    return {"status": "ok", "bot_initialized": application is not None}
+    state_persistence = get_state_persistence()
+    return {
+        "status": "ok",
+        "bot_initialized": application is not None,
+        "update_queue": get_update_queue().stats(),
+        "send_queue": get_send_scheduler().stats(),
+        "timers": get_timer_wheel().stats(),
+        "rate_limits": get_window_store().stats(),
+        "practice_writes": practice_writer_stats(),
+        "live_exams": live_exam_stats(),
+        "question_refs": question_refs_stats(),
+        "exam_results": exam_results_stats(),
+        "http": get_http_clients().stats(),
+        "payment_verify": get_payment_verifier().stats(),
+        "bank_directory": get_bank_directory().stats(),
+        "user_state": state_persistence.stats() if state_persistence else None,
+    }
 
 
 # --------------------------------------------------------------
@@ -470,7 +604,6 @@ async def save_winner(
 
     try:
         if ADMIN_USER_ID and BOT_TOKEN:
-            bot = Bot(token=BOT_TOKEN)
             msg = (
                 f"📢 <b>NEW WINNER ALERT!</b>\n\n"
                 f"👤 <b>Name:</b> {full_name}\n"
@@ -481,7 +614,12 @@ async def save_winner(
                 f"🆔 <b>Record ID:</b> <code>{pw.id}</code>\n"
                 f"🕒 <i>Submitted via Winner Form</i>"
             )
-            await bot.send_message(chat_id=ADMIN_USER_ID, text=msg, parse_mode="HTML")
+            await shared_bot.send_message(
+                chat_id=ADMIN_USER_ID,
+                text=msg,
+                parse_mode="HTML",
+                rate_limit_args={"priority": PRIORITY_HIGH},
+            )
     except Exception:
         logger.exception("❌ Failed to notify admin", exc_info=True)
 
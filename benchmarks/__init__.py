@@ -0,0 +1,2 @@
+# Offline benchmarks. Run from the repo root, e.g.:
+#   python -m benchmarks.bench_question_bank
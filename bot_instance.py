@@ -2,7 +2,9 @@
 # bot_instance.py
 # ==================================================
 import os
-from telegram import Bot
+from telegram.ext import ExtBot
+
+from send_scheduler import get_send_scheduler
 
 BOT_TOKEN = os.getenv("BOT_TOKEN")
 if not BOT_TOKEN:
@@ -10,5 +12,6 @@ if not BOT_TOKEN:
 
 BOT_USERNAME = os.getenv("BOT_USERNAME", "NaijaPrizeGateBot")
 
-bot = Bot(token=BOT_TOKEN)
+# Background tasks and web routes share the application's send scheduler
+bot = ExtBot(token=BOT_TOKEN, rate_limiter=get_send_scheduler())
 
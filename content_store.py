@@ -0,0 +1,268 @@
+# ====================================================================
+# content_store.py
+# Process-wide cache for the static exam content under data/
+# (data/jamb, data/waec, data/university).
+#
+# - Each JSON file is parsed once and re-parsed only when its
+#   mtime/size changes (hot reload without a restart).
+# - Derived indexes (subject by code, question by id, passage groups...)
+#   are memoized and rebuilt only when a file they were built from changes.
+# - File stats are re-checked at most every CONTENT_RECHECK_SECONDS,
+#   so the hot path is a dict lookup.
+# ====================================================================
+
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple, TypeVar
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).resolve().parent
+DATA_DIR = BASE_DIR / "data"
+
+CONTENT_ROOTS = (
+    DATA_DIR / "jamb",
+    DATA_DIR / "waec",
+    DATA_DIR / "university",
+)
+
+CONTENT_RECHECK_SECONDS = float(os.getenv("CONTENT_RECHECK_SECONDS", "2"))
+
+T = TypeVar("T")
+
+# (mtime_ns, size) of a path, or None when the path does not exist
+Signature = Optional[Tuple[int, int]]
+
+
+def _signature(path: Path) -> Signature:
+    try:
+        st = path.stat()
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+class _Entry:
+    __slots__ = ("value", "error", "deps", "checked_at")
+
+    def __init__(self, value: Any, error: Optional[BaseException], deps: Dict[Path, Signature]):
+        self.value = value
+        self.error = error
+        self.deps = deps
+        self.checked_at = time.monotonic()
+
+
+class ContentStore:
+    """
+    Cached JSON + derived-index store.
+
+    load_json(path)           -> parsed JSON, cached per file
+    list_dirs(path)           -> sorted sub-directory names, cached per directory
+    memo(key, builder)        -> builder() result, cached until any file the
+                                 builder read (directly or via nested memo)
+                                 changes on disk
+    """
+
+    def __init__(self, recheck_seconds: float = CONTENT_RECHECK_SECONDS):
+        self.recheck_seconds = recheck_seconds
+        self._files: Dict[Path, _Entry] = {}
+        self._dirs: Dict[Path, _Entry] = {}
+        self._memos: Dict[Any, _Entry] = {}
+        self._lock = threading.RLock()
+        self._local = threading.local()
+
+    # ------------------------------------------------------------
+    # Dependency tracking for memo()
+    # ------------------------------------------------------------
+    def _tracking(self) -> List[Dict[Path, Signature]]:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = []
+            self._local.stack = stack
+        return stack
+
+    def _track(self, deps: Dict[Path, Signature]) -> None:
+        for frame in self._tracking():
+            frame.update(deps)
+
+    def _is_fresh(self, entry: _Entry) -> bool:
+        now = time.monotonic()
+        if now - entry.checked_at < self.recheck_seconds:
+            return True
+
+        for path, sig in entry.deps.items():
+            if _signature(path) != sig:
+                return False
+
+        entry.checked_at = now
+        return True
+
+    # ------------------------------------------------------------
+    # Files
+    # ------------------------------------------------------------
+    def load_json(self, path: Path, *, missing_ok: bool = False) -> Any:
+        """
+        Parsed JSON for `path`.
+
+        Missing file -> FileNotFoundError (or None when missing_ok=True).
+        Broken JSON  -> the original decode error, cached until the file changes.
+        The returned object is shared: callers must copy before mutating.
+        """
+        path = Path(path)
+
+        with self._lock:
+            entry = self._files.get(path)
+            if entry is None or not self._is_fresh(entry):
+                entry = self._read_file(path)
+                self._files[path] = entry
+
+            self._track(entry.deps)
+
+        if entry.error is not None:
+            if isinstance(entry.error, FileNotFoundError) and missing_ok:
+                return None
+            raise entry.error
+
+        return entry.value
+
+    def _read_file(self, path: Path) -> _Entry:
+        sig = _signature(path)
+        if sig is None:
+            return _Entry(None, FileNotFoundError(f"JSON file not found: {path}"), {path: None})
+
+        try:
+            with path.open("r", encoding="utf-8") as f:
+                value = json.load(f)
+        except (OSError, ValueError) as e:
+            return _Entry(None, e, {path: sig})
+
+        return _Entry(value, None, {path: sig})
+
+    # ------------------------------------------------------------
+    # Directories
+    # ------------------------------------------------------------
+    def list_dirs(self, path: Path) -> List[str]:
+        """
+        Sorted names of sub-directories of `path` ([] if it does not exist).
+        """
+        path = Path(path)
+
+        with self._lock:
+            entry = self._dirs.get(path)
+            if entry is None or not self._is_fresh(entry):
+                sig = _signature(path)
+                names: List[str] = []
+                if sig is not None and path.is_dir():
+                    names = sorted(p.name for p in path.iterdir() if p.is_dir())
+                entry = _Entry(tuple(names), None, {path: sig})
+                self._dirs[path] = entry
+
+            self._track(entry.deps)
+
+        return list(entry.value)
+
+    # ------------------------------------------------------------
+    # Derived indexes
+    # ------------------------------------------------------------
+    def memo(self, key: Any, builder: Callable[[], T]) -> T:
+        """
+        Cached builder() result. The files and directories read through this
+        store while building become the entry's dependencies.
+        Exceptions raised by builder are not cached.
+        """
+        with self._lock:
+            entry = self._memos.get(key)
+            if entry is not None and self._is_fresh(entry):
+                self._track(entry.deps)
+                return entry.value
+
+            stack = self._tracking()
+            deps: Dict[Path, Signature] = {}
+            stack.append(deps)
+            try:
+                value = builder()
+            finally:
+                stack.pop()
+
+            entry = _Entry(value, None, deps)
+            self._memos[key] = entry
+            self._track(deps)
+
+        return value
+
+    # ------------------------------------------------------------
+    # Maintenance
+    # ------------------------------------------------------------
+    def preload(self, roots: Iterable[Path] = CONTENT_ROOTS) -> int:
+        """
+        Parse every *.json under `roots` so the first user does not pay for it.
+        Broken files are logged and skipped. Returns the number of files loaded.
+        """
+        loaded = 0
+        broken: List[str] = []
+
+        for root in roots:
+            root = Path(root)
+            if not root.exists():
+                continue
+
+            for path in sorted(root.rglob("*.json")):
+                try:
+                    self.load_json(path)
+                    loaded += 1
+                except Exception:
+                    broken.append(str(path.relative_to(BASE_DIR)))
+
+        if broken:
+            logger.warning(
+                "⚠️ Content store skipped %s unreadable JSON files (first: %s)",
+                len(broken),
+                broken[0],
+            )
+
+        logger.info("📚 Content store preloaded %s JSON files", loaded)
+        return loaded
+
+    def invalidate(self, paths: Optional[Iterable[Path]] = None) -> None:
+        """
+        Drop cached entries (all, or those depending on `paths`).
+        Normally unnecessary: changed files are picked up by mtime.
+        """
+        with self._lock:
+            if paths is None:
+                self._files.clear()
+                self._dirs.clear()
+                self._memos.clear()
+                return
+
+            targets: Set[Path] = {Path(p) for p in paths}
+            for cache in (self._files, self._dirs, self._memos):
+                for key in [k for k, e in cache.items() if targets & e.deps.keys()]:
+                    del cache[key]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "files": len(self._files),
+                "dirs": len(self._dirs),
+                "indexes": len(self._memos),
+            }
+
+
+# ====================================================================
+# SHARED INSTANCE
+# ====================================================================
+_STORE: Optional[ContentStore] = None
+
+
+def get_content_store() -> ContentStore:
+    global _STORE
+
+    if _STORE is None:
+        _STORE = ContentStore()
+
+    return _STORE
@@ -113,6 +113,71 @@ class ReferralWalletORM(Base):
         server_default=text("0.00"),
     )
 
+    # -------------------------------------------------
+    # Running aggregates
+    #
+    # Maintained by wallet_service / withdrawal_service /
+    # referral_finance in the same transaction as the
+    # ledger rows they summarize; checked against the
+    # ledger by wallet_reconciliation.py.
+    # -------------------------------------------------
+
+    total_rejected_withdrawals: Mapped[Decimal] = mapped_column(
+        MONEY,
+        nullable=False,
+        default=Decimal("0.00"),
+        server_default=text("0.00"),
+    )
+
+    total_cancelled_withdrawals: Mapped[Decimal] = mapped_column(
+        MONEY,
+        nullable=False,
+        default=Decimal("0.00"),
+        server_default=text("0.00"),
+    )
+
+    withdrawal_count: Mapped[int] = mapped_column(
+        Integer,
+        nullable=False,
+        default=0,
+        server_default=text("0"),
+    )
+
+    commission_count: Mapped[int] = mapped_column(
+        Integer,
+        nullable=False,
+        default=0,
+        server_default=text("0"),
+    )
+
+    referral_count: Mapped[int] = mapped_column(
+        Integer,
+        nullable=False,
+        default=0,
+        server_default=text("0"),
+    )
+
+    active_referral_count: Mapped[int] = mapped_column(
+        Integer,
+        nullable=False,
+        default=0,
+        server_default=text("0"),
+    )
+
+    pending_referral_count: Mapped[int] = mapped_column(
+        Integer,
+        nullable=False,
+        default=0,
+        server_default=text("0"),
+    )
+
+    inactive_referral_count: Mapped[int] = mapped_column(
+        Integer,
+        nullable=False,
+        default=0,
+        server_default=text("0"),
+    )
+
     is_locked: Mapped[bool] = mapped_column(
         Boolean,
         nullable=False,
@@ -18,7 +18,6 @@ from telegram import (
     Update,
     InputMediaPhoto,
     InputFile,
-    Bot,
 )
 from telegram.ext import (
     ContextTypes,
@@ -35,9 +34,11 @@ from sqlalchemy import select, text, update as sql_update, func, and_
 from sqlalchemy import text as sql_text
 
 from handlers.core import fallback
+from update_router import StateGatedHandler
 from db import AsyncSessionLocal, get_async_session
 from helpers import add_tries, get_user_by_id
-from models import Proof, User, Payment, GameState, GlobalCounter, PrizeWinner
+from models import Proof, User, Payment, GameState, PrizeWinner
+from services.paid_try_counter import get_paid_try_totals, start_next_counter_cycle
 from logging_config import setup_logger
 
 
@@ -813,9 +814,9 @@ async def show_top_tier_campaign_reward_points(update: Update, context: ContextT
         rows = detail_res.fetchall()
 
         # Also show how far the current paid cycle has progressed vs threshold
-        gs = await session.get(GameState, 1)
-        paid_this_cycle = gs.paid_tries_this_cycle if gs else 0
-        current_cycle = gs.current_cycle if gs else 1
+        totals = await get_paid_try_totals(session)
+        paid_this_cycle = totals["paid_tries_this_cycle"]
+        current_cycle = totals["current_cycle"]
 
     details = (
         "\n".join(
@@ -1114,8 +1115,8 @@ async def admin_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
             async with AsyncSessionLocal() as session:
                 # --- Core objects ---
-                gc = await session.get(GlobalCounter, 1)
                 gs = await session.get(GameState, 1)
+                totals = await get_paid_try_totals(session)
 
                 # --- Current UTC time (aware)
                 now_aware = datetime.now(timezone.utc)
@@ -1246,9 +1247,9 @@ async def admin_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 ).scalar() or 0
 
                 # --- Game state ---
-                lifetime_paid = gc.paid_tries_total if gc else 0
-                current_cycle = gs.current_cycle if gs else 1
-                paid_this_cycle = gs.paid_tries_this_cycle if gs else 0
+                lifetime_paid = totals["purchased_tries_total"]
+                current_cycle = totals["current_cycle"]
+                paid_this_cycle = totals["paid_tries_this_cycle"]
                 created_at = gs.created_at if gs else None
 
                 now = datetime.now(timezone.utc)
@@ -1454,8 +1455,8 @@ async def admin_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
                     query, "⚠️ GameState not found.", parse_mode="HTML"
                 )
 
-            gs.current_cycle += 1
-            gs.paid_tries_this_cycle = 0
+            await start_next_counter_cycle(session, ended_cycle=int(gs.current_cycle or 1))
+            await session.refresh(gs)
             gs.created_at = datetime.utcnow()
             await session.commit()
 
@@ -1909,8 +1910,7 @@ async def handle_pw_mark_in_transit(
 
         # notify winner
         try:
-            bot = Bot(token=os.getenv("BOT_TOKEN"))
-            await bot.send_message(
+            await context.bot.send_message(
                 chat_id=pw.tg_id,
                 text=(
                     f"🚚 Hi! Your prize ({pw.choice}) is now *In Transit*. "
@@ -2090,6 +2090,12 @@ async def export_csv_handler(update: Update, context: ContextTypes.DEFAULT_TYPE)
 # ---------------------------------------------------------
 # Step 3 — Single Message Custom Range Date Input
 # ---------------------------------------------------------
+def admin_text_gate(update: Update, user_data) -> bool:
+    """update_router gate: the admin text routers only act for the admin."""
+    user = update.effective_user
+    return user is not None and is_admin(user.id)
+
+
 async def date_range_message_router(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
     Handles admin text input for custom CSV date ranges.
@@ -2424,8 +2430,7 @@ async def handle_pw_mark_delivered(
         await session.commit()
 
         try:
-            bot = Bot(token=os.getenv("BOT_TOKEN"))
-            await bot.send_message(
+            await context.bot.send_message(
                 chat_id=pw.tg_id,
                 text=(
                     f"✅ Hi! Your prize ({pw.choice}) has been *delivered*. "
@@ -2713,7 +2718,10 @@ def register_handlers(application):
 
     # ✅ Admin custom date input (only acts when awaiting_date_range=True)
     application.add_handler(
-        MessageHandler(filters.TEXT & ~filters.COMMAND, date_range_message_router),
+        StateGatedHandler(
+            MessageHandler(filters.TEXT & ~filters.COMMAND, date_range_message_router),
+            admin_text_gate,
+        ),
         group=ADMIN_GROUP
     )
 
@@ -2760,7 +2768,10 @@ def register_handlers(application):
 
     # ✅ User search text handler (also must be guarded or scoped)
     application.add_handler(
-        MessageHandler(filters.TEXT & ~filters.COMMAND, user_search_handler),
+        StateGatedHandler(
+            MessageHandler(filters.TEXT & ~filters.COMMAND, user_search_handler),
+            admin_text_gate,
+        ),
         group=ADMIN_GROUP
     )
 
@@ -20,6 +20,13 @@ from telegram.ext import (
 from db import AsyncSessionLocal
 from services.question_history_service import record_question_history
 from logger import logger
+from send_scheduler import PRIORITY_LOW, fire_and_forget
+from services.deadline_service import (
+    BATTLE_QUESTION_KIND,
+    resolve_question_deadline,
+    schedule_question_deadline,
+)
+from services.timer_wheel import get_timer_wheel
 from services.battle_service import (
     create_battle_room,
     save_host_lobby_message,
@@ -41,7 +48,9 @@ from services.battle_service import (
     set_battle_draft_max_players,
     get_battle_draft,
     delete_battle_draft,
+    get_trivia_question_by_id,
 )
+from services.room_broadcast import broadcast_to_room
 
 # ============================================================
 # Conversation states
@@ -265,35 +274,38 @@ def build_battle_answer_result_text(
 
 
 # ============================================================
-# Battle question timeout/countdown
+# Battle question timeout (timer wheel handler)
 # ============================================================
-async def handle_battle_question_timeout(
-    context: ContextTypes.DEFAULT_TYPE,
-    room_code: str,
-    user_id: int,
-    question_id: int,
-    question_order: int,
-    question_count: int,
-    message_id: int,
-    category: str,
-    question_text: str,
-    option_a: str,
-    option_b: str,
-    option_c: str,
-    option_d: str,
-):
-    from datetime import datetime, timezone
-
-    while True:
-        await asyncio.sleep(1)
+async def battle_question_deadline_timer(key: str, payload: dict):
+    """
+    The battle ended while this question was still open: record it as
+    skipped. Fires only if the answer/skip handler did not resolve the
+    deadline first, so the database is read once per expired question.
+    """
+    room_code = payload["room_code"]
+    user_id = int(payload["user_id"])
+    question_id = int(payload["question_id"])
+    message_id = payload.get("message_id")
+
+    bot = payload.get("bot")
+    if bot is None:
+        from bot_instance import bot
 
-        async with AsyncSessionLocal() as session:
-            state = await get_player_battle_state(
+    async with AsyncSessionLocal() as session:
+        async with session.begin():
+            current = await get_current_battle_question_for_player(
                 session,
                 room_code=room_code,
                 tg_id=user_id,
             )
-            if not state or state.get("status") != "active":
+            if not current or current["done"]:
+                return
+
+            state = current["state"]
+            if state.get("status") != "active":
+                return
+
+            if int(current["question_id"]) != question_id:
                 return
 
             already_answered = await has_player_answered_question(
@@ -305,118 +317,79 @@ async def handle_battle_question_timeout(
             if already_answered:
                 return
 
-            ends_at = state.get("ends_at")
-            if not ends_at:
-                return
+            q = current["question"]
 
-            now = datetime.now(timezone.utc)
-            if ends_at.tzinfo is None:
-                ends_at = ends_at.replace(tzinfo=timezone.utc)
-
-            seconds_left = int((ends_at - now).total_seconds())
-
-            current = await get_current_battle_question_for_player(
+            await record_battle_answer(
                 session,
-                room_code=room_code,
+                battle_id=str(state["battle_id"]),
                 tg_id=user_id,
+                question_id=question_id,
+                question_index=int(current["question_index"]),
+                selected_option=None,
+                is_correct=False,
+                was_skipped=True,
             )
-            if not current or current["done"]:
-                return
 
-            expected_question_id = int(current["question_id"])
-            if expected_question_id != question_id:
-                return
-
-            if seconds_left <= 0:
-                await record_battle_answer(
-                    session,
-                    battle_id=str(state["battle_id"]),
-                    tg_id=user_id,
-                    question_id=question_id,
-                    question_index=int(current["question_index"]),
-                    selected_option=None,
-                    is_correct=False,
-                    was_skipped=True,
-                )
+            await record_question_history(
+                session,
+                tg_id=user_id,
+                source_type=BATTLE_HISTORY_SOURCE,
+                category=q["category"],
+                question_key=str(question_id),
+            )
 
-                await record_question_history(
-                    session,
-                    tg_id=user_id,
-                    source_type=BATTLE_HISTORY_SOURCE,
-                    category=category,
-                    question_key=str(question_id),
-                )
+            player_finished = await mark_player_finished_if_done(
+                session,
+                battle_id=str(state["battle_id"]),
+                tg_id=user_id,
+                question_count=int(state["question_count"]),
+            )
 
-                player_finished = await mark_player_finished_if_done(
-                    session,
-                    battle_id=str(state["battle_id"]),
-                    tg_id=user_id,
+    if message_id is not None:
+        options = q.get("options") or {}
+        try:
+            await bot.edit_message_text(
+                chat_id=user_id,
+                message_id=int(message_id),
+                text=build_battle_timeout_text(
+                    question_order=int(current["question_index"]) + 1,
                     question_count=int(state["question_count"]),
-                )
-
-                await session.commit()
-
-                try:
-                    await context.bot.edit_message_text(
-                        chat_id=user_id,
-                        message_id=message_id,
-                        text=build_battle_timeout_text(
-                            question_order=question_order,
-                            question_count=question_count,
-                            category=category,
-                            question_text=question_text,
-                            option_a=option_a,
-                            option_b=option_b,
-                            option_c=option_c,
-                            option_d=option_d,
-                        ),
-                        parse_mode="HTML",
-                        reply_markup=None,
-                    )
-                except Exception:
-                    pass
-
-                await asyncio.sleep(1.0)
-
-                if player_finished:
-                    try:
-                        await context.bot.send_message(
-                            chat_id=user_id,
-                            text="🏁 You have completed your battle questions.\n\nPlease wait for the final result.",
-                            parse_mode="HTML",
-                        )
-                    except Exception:
-                        pass
-                    return
+                    category=q["category"],
+                    question_text=q["question"],
+                    option_a=options.get("A", "N/A"),
+                    option_b=options.get("B", "N/A"),
+                    option_c=options.get("C", "N/A"),
+                    option_d=options.get("D", "N/A"),
+                ),
+                parse_mode="HTML",
+                reply_markup=None,
+            )
+        except Exception:
+            pass
 
-                await send_battle_question_to_player(
-                    context.bot,
-                    room_code,
-                    user_id,
-                    context=context,
-                )
-                return
+    await asyncio.sleep(1.0)
 
+    if player_finished:
         try:
-            await context.bot.edit_message_text(
+            await bot.send_message(
                 chat_id=user_id,
-                message_id=message_id,
-                text=build_battle_question_text(
-                    question_order=question_order,
-                    question_count=question_count,
-                    category=category,
-                    question_text=question_text,
-                    option_a=option_a,
-                    option_b=option_b,
-                    option_c=option_c,
-                    option_d=option_d,
-                    seconds_left=seconds_left,
-                ),
+                text="🏁 You have completed your battle questions.\n\nPlease wait for the final result.",
                 parse_mode="HTML",
-                reply_markup=battle_question_keyboard(room_code, question_id),
             )
         except Exception:
             pass
+        return
+
+    await send_battle_question_to_player(bot, room_code, user_id)
+
+
+def resolve_battle_question(room_code: str, tg_id: int, question_id: int) -> None:
+    resolve_question_deadline(
+        BATTLE_QUESTION_KIND,
+        room=room_code,
+        user_id=tg_id,
+        question_id=question_id,
+    )
 
 
 # ============================================================
@@ -996,59 +969,106 @@ async def send_battle_question_to_player(
                 )
             return
 
-        q = current["question"]
-        question_index = int(current["question_index"])
-        question_id = int(current["question_id"])
+    try:
+        await _send_battle_question(
+            bot,
+            room_code=room_code,
+            tg_id=tg_id,
+            question=current["question"],
+            question_index=int(current["question_index"]),
+            question_id=int(current["question_id"]),
+            question_count=int(state["question_count"]),
+            ends_at=ends_at,
+        )
+    except Exception:
+        logger.exception(
+            "❌ Failed to send battle question | room_code=%s | tg_id=%s",
+            room_code,
+            tg_id,
+        )
 
-        options = q.get("options") or {}
-        option_a = options.get("A", "N/A")
-        option_b = options.get("B", "N/A")
-        option_c = options.get("C", "N/A")
-        option_d = options.get("D", "N/A")
 
-        try:
-            sent_message = await bot.send_message(
+async def _send_battle_question(
+    bot,
+    *,
+    room_code: str,
+    tg_id: int,
+    question: dict,
+    question_index: int,
+    question_id: int,
+    question_count: int,
+    ends_at,
+):
+    """
+    Send one question card and arm its deadline + countdown.
+    Raises if the send fails (room broadcasts isolate it per player).
+    """
+    from datetime import datetime, timezone
+
+    if ends_at.tzinfo is None:
+        ends_at = ends_at.replace(tzinfo=timezone.utc)
+
+    q = question
+    question_order = question_index + 1
+    seconds_left = max(0, int((ends_at - datetime.now(timezone.utc)).total_seconds()))
+
+    options = q.get("options") or {}
+    option_a = options.get("A", "N/A")
+    option_b = options.get("B", "N/A")
+    option_c = options.get("C", "N/A")
+    option_d = options.get("D", "N/A")
+
+    def question_text_for(remaining: int) -> str:
+        return build_battle_question_text(
+            question_order=question_order,
+            question_count=question_count,
+            category=q["category"],
+            question_text=q["question"],
+            option_a=option_a,
+            option_b=option_b,
+            option_c=option_c,
+            option_d=option_d,
+            seconds_left=remaining,
+        )
+
+    sent_message = await bot.send_message(
+        chat_id=tg_id,
+        text=question_text_for(seconds_left),
+        parse_mode="HTML",
+        reply_markup=battle_question_keyboard(room_code, question_id),
+    )
+    message_id = sent_message.message_id
+
+    async def countdown_tick(remaining: int) -> bool:
+        fire_and_forget(
+            bot.edit_message_text(
                 chat_id=tg_id,
-                text=build_battle_question_text(
-                    question_order=question_index + 1,
-                    question_count=int(state["question_count"]),
-                    category=q["category"],
-                    question_text=q["question"],
-                    option_a=option_a,
-                    option_b=option_b,
-                    option_c=option_c,
-                    option_d=option_d,
-                    seconds_left=seconds_left,
-                ),
+                message_id=message_id,
+                text=question_text_for(remaining),
                 parse_mode="HTML",
                 reply_markup=battle_question_keyboard(room_code, question_id),
-            )
-        except Exception:
-            logger.exception(
-                "❌ Failed to send battle question | room_code=%s | tg_id=%s",
-                room_code,
-                tg_id,
-            )
-            return
-
-    if context is not None:
-        asyncio.create_task(
-            handle_battle_question_timeout(
-                context=context,
-                room_code=room_code,
-                user_id=tg_id,
-                question_id=question_id,
-                question_order=question_index + 1,
-                question_count=int(state["question_count"]),
-                message_id=sent_message.message_id,
-                category=q["category"],
-                question_text=q["question"],
-                option_a=option_a,
-                option_b=option_b,
-                option_c=option_c,
-                option_d=option_d,
-            )
+            ),
+            priority=PRIORITY_LOW,
         )
+        return True
+
+    schedule_question_deadline(
+        BATTLE_QUESTION_KIND,
+        room=room_code,
+        user_id=tg_id,
+        question_id=question_id,
+        due_at=ends_at,
+        payload={
+            "room_code": room_code,
+            "user_id": tg_id,
+            "question_id": question_id,
+            "question_order": question_order,
+            "message_id": message_id,
+            "bot": bot,
+        },
+        on_tick=countdown_tick,
+    )
+    return sent_message
 
 
 # ============================================================
@@ -1125,14 +1145,33 @@ async def battle_start_handler(update: Update, context: ContextTypes.DEFAULT_TYP
             parse_mode="Markdown",
         )
 
-        for player in result["players"]:
-            tg_id = int(player["tg_id"])
-            await send_battle_question_to_player(
-                context.bot,
+        # Everyone starts on question 1: load it once, send to all at once
+        first_question_id = int(result["question_ids"][0])
+        # In-memory bank lookup: no DB connection needed
+        first_question = await get_trivia_question_by_id(None, first_question_id)
+
+        if not first_question:
+            logger.error(
+                "❌ First battle question missing | room_code=%s | question_id=%s",
                 room_code,
-                tg_id,
-                context=context,
+                first_question_id,
             )
+            return
+
+        await broadcast_to_room(
+            [int(player["tg_id"]) for player in result["players"]],
+            lambda tg_id: _send_battle_question(
+                context.bot,
+                room_code=room_code,
+                tg_id=tg_id,
+                question=first_question,
+                question_index=0,
+                question_id=first_question_id,
+                question_count=int(result["question_count"]),
+                ends_at=result["ends_at"],
+            ),
+            label=f"battle:{room_code}:q1",
+        )
 
     except Exception:
         logger.exception(
@@ -1266,6 +1305,8 @@ async def battle_answer_handler(update: Update, context: ContextTypes.DEFAULT_TY
                     question_count=int(state["question_count"]),
                 )
 
+        resolve_battle_question(room_code, user.id, question_id)
+
         await query.edit_message_text(
             text=build_battle_answer_result_text(
                 question_order=int(current["question_index"]) + 1,
@@ -1413,6 +1454,8 @@ async def battle_skip_handler(update: Update, context: ContextTypes.DEFAULT_TYPE
                     question_count=int(state["question_count"]),
                 )
 
+        resolve_battle_question(room_code, user.id, question_id)
+
         await query.edit_message_text(
             "⏭️ <b>Question skipped.</b>",
             parse_mode="HTML",
@@ -1528,6 +1571,8 @@ async def battle_cancel_room_handler(update: Update, context: ContextTypes.DEFAU
 # Register handlers
 # ============================================================
 def register_handlers(application):
+    get_timer_wheel().register_handler(BATTLE_QUESTION_KIND, battle_question_deadline_timer)
+
     application.add_handler(
         CommandHandler("battle", battle_mode_entry_handler),
         group=-3,
@@ -3,6 +3,8 @@
 # ==========================================================
 
 import asyncio
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
 from urllib.parse import quote
 
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
@@ -16,14 +18,26 @@ from telegram.ext import (
 
 from sqlalchemy import text
 from db import AsyncSessionLocal
-from services.question_history_service import record_question_history
+from send_scheduler import PRIORITY_LOW, fire_and_forget
+from services.deadline_service import (
+    CHALLENGE_QUESTION_KIND,
+    CHALLENGE_QUESTION_SECONDS,
+    resolve_question_deadline,
+    schedule_question_deadline,
+)
+from services.room_broadcast import broadcast_to_room
+from services.timer_wheel import get_timer_wheel
+from services.question_history_service import (
+    get_seen_question_stats_for_users,
+    record_question_history,
+)
 
 # ==========================================================
 # CONFIG
 # ==========================================================
 
 CHALLENGE_QUESTION_COUNT = 5
-CHALLENGE_QUESTION_TIME_LIMIT = 15
+CHALLENGE_QUESTION_TIME_LIMIT = CHALLENGE_QUESTION_SECONDS
 
 CHALLENGE_CATEGORIES = [
     "nigeria_history",
@@ -143,122 +157,66 @@ async def upsert_telegram_user(user):
         await session.commit()
 
 # ====================================================
-# Handle Challenge Question Timeout
+# Challenge Question Keyboard
 # ====================================================
-async def handle_challenge_question_timeout(
-    context: ContextTypes.DEFAULT_TYPE,
-    challenge_id: int,
-    user_id: int,
-    question_id: int,
-    question_order: int,
-    message_id: int,
-    category: str,
-    question_text: str,
-    option_a: str,
-    option_b: str,
-    option_c: str,
-    option_d: str,
-):
-    seconds_left = CHALLENGE_QUESTION_TIME_LIMIT
-
-    while seconds_left > 0:
-        await asyncio.sleep(1)
-        seconds_left -= 1
+def challenge_question_keyboard(challenge_id: int, question_order: int, question_id: int) -> InlineKeyboardMarkup:
+    return InlineKeyboardMarkup([
+        [
+            InlineKeyboardButton(
+                "A",
+                callback_data=f"challenge_answer_{challenge_id}|{question_order}|A|{question_id}",
+            ),
+            InlineKeyboardButton(
+                "B",
+                callback_data=f"challenge_answer_{challenge_id}|{question_order}|B|{question_id}",
+            ),
+        ],
+        [
+            InlineKeyboardButton(
+                "C",
+                callback_data=f"challenge_answer_{challenge_id}|{question_order}|C|{question_id}",
+            ),
+            InlineKeyboardButton(
+                "D",
+                callback_data=f"challenge_answer_{challenge_id}|{question_order}|D|{question_id}",
+            ),
+        ],
+    ])
 
-        async with AsyncSessionLocal() as session:
-            result = await session.execute(
-                text("""
-                    SELECT answered, timed_out
-                    FROM challenge_question_delivery
-                    WHERE challenge_id = :cid
-                      AND user_id = :uid
-                      AND question_id = :qid
-                    LIMIT 1
-                """),
-                {
-                    "cid": challenge_id,
-                    "uid": user_id,
-                    "qid": question_id,
-                },
-            )
-            row = result.fetchone()
 
-        if not row:
-            return
+# ====================================================
+# Handle Challenge Question Timeout (timer wheel handler)
+# ====================================================
+async def challenge_question_deadline_timer(key: str, payload: dict):
+    """
+    Fires only when nobody resolved the deadline (answer handler) first.
+    Deadlines restored after a restart carry no context / message_id:
+    the bot instance is used and the question card is left as is.
+    """
+    from utils.questions_loader import get_question_by_id
 
-        if row.answered or row.timed_out:
-            return
+    challenge_id = int(payload["challenge_id"])
+    user_id = int(payload["user_id"])
+    question_id = int(payload["question_id"])
+    question_order = int(payload["question_order"])
+    message_id = payload.get("message_id")
 
-        if seconds_left > 0:
-            try:
-                await context.bot.edit_message_text(
-                    chat_id=user_id,
-                    message_id=message_id,
-                    text=build_challenge_question_text(
-                        question_order=question_order,
-                        category=category,
-                        question_text=question_text,
-                        option_a=option_a,
-                        option_b=option_b,
-                        option_c=option_c,
-                        option_d=option_d,
-                        seconds_left=seconds_left,
-                    ),
-                    parse_mode="HTML",
-                    reply_markup=InlineKeyboardMarkup([
-                        [
-                            InlineKeyboardButton(
-                                "A",
-                                callback_data=f"challenge_answer_{challenge_id}|{question_order}|A|{question_id}",
-                            ),
-                            InlineKeyboardButton(
-                                "B",
-                                callback_data=f"challenge_answer_{challenge_id}|{question_order}|B|{question_id}",
-                            ),
-                        ],
-                        [
-                            InlineKeyboardButton(
-                                "C",
-                                callback_data=f"challenge_answer_{challenge_id}|{question_order}|C|{question_id}",
-                            ),
-                            InlineKeyboardButton(
-                                "D",
-                                callback_data=f"challenge_answer_{challenge_id}|{question_order}|D|{question_id}",
-                            ),
-                        ],
-                    ]),
-                )
-            except Exception:
-                pass
+    context = payload.get("context")
+    if context is None:
+        from bot_instance import bot
+        context = SimpleNamespace(bot=bot)
 
     async with AsyncSessionLocal() as session:
         result = await session.execute(
-            text("""
-                SELECT answered, timed_out
-                FROM challenge_question_delivery
-                WHERE challenge_id = :cid
-                  AND user_id = :uid
-                  AND question_id = :qid
-                LIMIT 1
-            """),
-            {
-                "cid": challenge_id,
-                "uid": user_id,
-                "qid": question_id,
-            },
-        )
-        row = result.fetchone()
-
-        if not row or row.answered or row.timed_out:
-            return
-
-        await session.execute(
             text("""
                 UPDATE challenge_question_delivery
                 SET timed_out = true
                 WHERE challenge_id = :cid
                   AND user_id = :uid
                   AND question_id = :qid
+                  AND answered = false
+                  AND timed_out = false
+                RETURNING question_order
             """),
             {
                 "cid": challenge_id,
@@ -266,26 +224,32 @@ async def handle_challenge_question_timeout(
                 "qid": question_id,
             },
         )
+        if result.fetchone() is None:
+            return
         await session.commit()
 
-    try:
-        await context.bot.edit_message_text(
-            chat_id=user_id,
-            message_id=message_id,
-            text=build_challenge_timeout_text(
-                question_order=question_order,
-                category=category,
-                question_text=question_text,
-                option_a=option_a,
-                option_b=option_b,
-                option_c=option_c,
-                option_d=option_d,
-            ),
-            parse_mode="HTML",
-            reply_markup=None,
-        )
-    except Exception:
-        pass
+    question = get_question_by_id(question_id)
+
+    if message_id is not None and question:
+        options = question.get("options") or {}
+        try:
+            await context.bot.edit_message_text(
+                chat_id=user_id,
+                message_id=int(message_id),
+                text=build_challenge_timeout_text(
+                    question_order=question_order,
+                    category=question["category"],
+                    question_text=question["question"],
+                    option_a=options.get("A", ""),
+                    option_b=options.get("B", ""),
+                    option_c=options.get("C", ""),
+                    option_d=options.get("D", ""),
+                ),
+                parse_mode="HTML",
+                reply_markup=None,
+            )
+        except Exception:
+            pass
 
     try:
         await context.bot.send_message(
@@ -432,7 +396,11 @@ async def generate_challenge_questions(
     Selected JSON question ids are stored in challenge_round_questions.
     Game progress remains in DB.
     """
-    from utils.questions_loader import get_questions_for_category
+    from utils.questions_loader import (
+        get_category_question_count,
+        get_question_by_id,
+        pick_fresh_question_ids,
+    )
 
     async with AsyncSessionLocal() as session:
         # 1) Get all players in the challenge
@@ -451,70 +419,32 @@ async def generate_challenge_questions(
 
         player_ids = [int(row.user_id) for row in player_rows]
 
-        # 2) Load all category questions from JSON
-        all_questions = get_questions_for_category(category)
+        # 2) Category size from the in-memory question bank
+        total_questions = get_category_question_count(category)
 
-        if not all_questions:
+        if not total_questions:
             return []
 
-        total_questions = len(all_questions)
-
-        # 3) Find players who have NOT exhausted this category
-        active_players = []
-
-        for player_id in player_ids:
-            result = await session.execute(
-                text("""
-                    SELECT COUNT(DISTINCT question_key) AS answered_count
-                    FROM user_question_history
-                    WHERE tg_id = :tg_id
-                      AND source_type = 'shared_json_questions'
-                      AND category = :category
-                """),
-                {
-                    "tg_id": player_id,
-                    "category": category,
-                },
-            )
-            row = result.fetchone()
-            answered_count = int(row.answered_count or 0) if row else 0
-
-            if answered_count < total_questions:
-                active_players.append(player_id)
-
-        # 4) Build exclusion set from active players only
-        excluded_question_ids = set()
-
-        for player_id in active_players:
-            result = await session.execute(
-                text("""
-                    SELECT DISTINCT question_key
-                    FROM user_question_history
-                    WHERE tg_id = :tg_id
-                      AND source_type = 'shared_json_questions'
-                      AND category = :category
-                """),
-                {
-                    "tg_id": player_id,
-                    "category": category,
-                },
-            )
-
-            for row in result.fetchall():
-                excluded_question_ids.add(str(row.question_key))
-
-        # 5) Pick fresh questions first
-        fresh_questions = [q for q in all_questions if str(q["id"]) not in excluded_question_ids]
-        selected_questions = fresh_questions[:question_count]
+        # 3) One query: per-player seen counts + union of seen keys
+        #    from players who have NOT exhausted this category
+        _, excluded_question_ids = await get_seen_question_stats_for_users(
+            session,
+            tg_ids=player_ids,
+            source_type="shared_json_questions",
+            category=category,
+            total_questions=total_questions,
+        )
 
-        # 6) If not enough fresh questions remain, reset cycle from beginning
-        if len(selected_questions) < question_count:
-            selected_questions = all_questions[:question_count]
+        # 4) Fresh questions first; reset cycle if not enough remain
+        selected_questions = [
+            get_question_by_id(qid)
+            for qid in pick_fresh_question_ids(category, excluded_question_ids, question_count)
+        ]
 
         if not selected_questions:
             return []
 
-        # 7) Clear previously stored round questions
+        # 5) Clear previously stored round questions
         await session.execute(
             text("""
                 DELETE FROM challenge_round_questions
@@ -523,7 +453,7 @@ async def generate_challenge_questions(
             {"cid": challenge_id},
         )
 
-        # 8) Save selected JSON question ids into DB
+        # 6) Save selected JSON question ids into DB
         for i, q in enumerate(selected_questions, start=1):
             await session.execute(
                 text("""
@@ -595,24 +525,22 @@ async def send_challenge_question(
     challenge_id: int,
     question_order: int,
 ):
-    async with AsyncSessionLocal() as session:
-        result = await session.execute(
-            text("""
-                SELECT user_id
-                FROM challenge_players
-                WHERE challenge_id = :cid
-            """),
-            {"cid": challenge_id},
-        )
-        players = result.fetchall()
+    prepared = await _prepare_challenge_question(
+        challenge_id=challenge_id,
+        question_order=question_order,
+    )
+    if prepared is None:
+        return
 
-    for player in players:
-        await send_challenge_question_to_one_player(
-            context=context,
-            challenge_id=challenge_id,
-            question_order=question_order,
-            user_id=player.user_id,
-        )
+    question_id, question, user_ids = prepared
+    await _deliver_challenge_question(
+        context,
+        challenge_id=challenge_id,
+        question_order=question_order,
+        question_id=question_id,
+        question=question,
+        user_ids=user_ids,
+    )
 
 
 # ==========================================================
@@ -624,15 +552,51 @@ async def send_challenge_question_to_one_player(
     question_order: int,
     user_id: int,
 ):
+    prepared = await _prepare_challenge_question(
+        challenge_id=challenge_id,
+        question_order=question_order,
+        user_ids=[int(user_id)],
+    )
+    if prepared is None:
+        return
+
+    question_id, question, user_ids = prepared
+    await _deliver_challenge_question(
+        context,
+        challenge_id=challenge_id,
+        question_order=question_order,
+        question_id=question_id,
+        question=question,
+        user_ids=user_ids,
+    )
+
+
+async def _prepare_challenge_question(
+    *,
+    challenge_id: int,
+    question_order: int,
+    user_ids: list[int] | None = None,
+):
+    """
+    One session: read the round question (and the room's players when
+    user_ids is None) and upsert every player's delivery row at once.
+    Returns (question_id, question, user_ids) or None.
+    """
     from utils.questions_loader import get_question_by_id
 
     async with AsyncSessionLocal() as session:
         result = await session.execute(
             text("""
-                SELECT question_id
-                FROM challenge_round_questions
-                WHERE challenge_id = :cid
-                  AND question_order = :qorder
+                SELECT
+                    q.question_id,
+                    ARRAY(
+                        SELECT p.user_id
+                        FROM challenge_players p
+                        WHERE p.challenge_id = :cid
+                    ) AS user_ids
+                FROM challenge_round_questions q
+                WHERE q.challenge_id = :cid
+                  AND q.question_order = :qorder
                 LIMIT 1
             """),
             {
@@ -643,19 +607,25 @@ async def send_challenge_question_to_one_player(
 
         row = result.fetchone()
         if not row:
-            return
+            return None
 
         question_id = int(row.question_id)
         question = get_question_by_id(question_id)
 
         if not question:
-            return
+            return None
+
+        if user_ids is None:
+            user_ids = [int(uid) for uid in (row.user_ids or [])]
+        if not user_ids:
+            return None
 
         await session.execute(
             text("""
                 INSERT INTO challenge_question_delivery
-                (challenge_id, user_id, question_id, question_order, answered, timed_out)
-                VALUES (:cid, :uid, :qid, :qorder, false, false)
+                (challenge_id, user_id, question_id, question_order, answered, timed_out, sent_at)
+                SELECT :cid, uid, :qid, :qorder, false, false, now()
+                FROM unnest(CAST(:uids AS bigint[])) AS uid
                 ON CONFLICT (challenge_id, user_id, question_id)
                 DO UPDATE SET
                     question_order = EXCLUDED.question_order,
@@ -665,7 +635,7 @@ async def send_challenge_question_to_one_player(
             """),
             {
                 "cid": challenge_id,
-                "uid": user_id,
+                "uids": user_ids,
                 "qid": question_id,
                 "qorder": question_order,
             },
@@ -673,43 +643,37 @@ async def send_challenge_question_to_one_player(
 
         await session.commit()
 
-    keyboard = InlineKeyboardMarkup([
-        [
-            InlineKeyboardButton(
-                "A",
-                callback_data=f"challenge_answer_{challenge_id}|{question_order}|A|{question_id}",
-            ),
-            InlineKeyboardButton(
-                "B",
-                callback_data=f"challenge_answer_{challenge_id}|{question_order}|B|{question_id}",
-            ),
-        ],
-        [
-            InlineKeyboardButton(
-                "C",
-                callback_data=f"challenge_answer_{challenge_id}|{question_order}|C|{question_id}",
-            ),
-            InlineKeyboardButton(
-                "D",
-                callback_data=f"challenge_answer_{challenge_id}|{question_order}|D|{question_id}",
-            ),
-        ],
-    ])
+    return question_id, question, user_ids
+
+
+async def _deliver_challenge_question(
+    context: ContextTypes.DEFAULT_TYPE,
+    *,
+    challenge_id: int,
+    question_order: int,
+    question_id: int,
+    question: dict,
+    user_ids: list[int],
+) -> None:
+    keyboard = challenge_question_keyboard(challenge_id, question_order, question_id)
 
     options = question.get("options") or {}
 
-    text_message = build_challenge_question_text(
-        question_order=question_order,
-        category=question["category"],
-        question_text=question["question"],
-        option_a=options.get("A", ""),
-        option_b=options.get("B", ""),
-        option_c=options.get("C", ""),
-        option_d=options.get("D", ""),
-        seconds_left=CHALLENGE_QUESTION_TIME_LIMIT,
-    )
+    def question_text_for(seconds_left: int) -> str:
+        return build_challenge_question_text(
+            question_order=question_order,
+            category=question["category"],
+            question_text=question["question"],
+            option_a=options.get("A", ""),
+            option_b=options.get("B", ""),
+            option_c=options.get("C", ""),
+            option_d=options.get("D", ""),
+            seconds_left=seconds_left,
+        )
 
-    try:
+    text_message = question_text_for(CHALLENGE_QUESTION_TIME_LIMIT)
+
+    async def send(user_id: int):
         sent_message = await context.bot.send_message(
             chat_id=user_id,
             text=text_message,
@@ -717,23 +681,73 @@ async def send_challenge_question_to_one_player(
             reply_markup=keyboard,
         )
 
-        asyncio.create_task(
-            handle_challenge_question_timeout(
-                context=context,
-                challenge_id=challenge_id,
-                user_id=user_id,
-                question_id=question_id,
-                question_order=question_order,
-                message_id=sent_message.message_id,
-                category=question["category"],
-                question_text=question["question"],
-                option_a=options.get("A", ""),
-                option_b=options.get("B", ""),
-                option_c=options.get("C", ""),
-                option_d=options.get("D", ""),
+        deadline = datetime.now(timezone.utc) + timedelta(seconds=CHALLENGE_QUESTION_TIME_LIMIT)
+        message_id = sent_message.message_id
+
+        async def countdown_tick(remaining: int) -> bool:
+            fire_and_forget(
+                context.bot.edit_message_text(
+                    chat_id=user_id,
+                    message_id=message_id,
+                    text=question_text_for(remaining),
+                    parse_mode="HTML",
+                    reply_markup=keyboard,
+                ),
+                priority=PRIORITY_LOW,
             )
+            return True
+
+        schedule_question_deadline(
+            CHALLENGE_QUESTION_KIND,
+            room=challenge_id,
+            user_id=user_id,
+            question_id=question_id,
+            due_at=deadline,
+            payload={
+                "challenge_id": challenge_id,
+                "user_id": user_id,
+                "question_id": question_id,
+                "question_order": question_order,
+                "message_id": message_id,
+                "context": context,
+            },
+            on_tick=countdown_tick,
         )
+        return sent_message
 
+    result = await broadcast_to_room(
+        user_ids,
+        send,
+        label=f"challenge:{challenge_id}:q{question_order}",
+    )
+    if not result.sent_at:
+        return
+
+    # Deadlines count from the real send time; keep the rows in step
+    # for the restart scan.
+    delivered = list(result.sent_at)
+    try:
+        async with AsyncSessionLocal() as session:
+            await session.execute(
+                text("""
+                    UPDATE challenge_question_delivery d
+                    SET sent_at = v.sent_at
+                    FROM unnest(
+                        CAST(:uids AS bigint[]),
+                        CAST(:sent_at AS timestamptz[])
+                    ) AS v(user_id, sent_at)
+                    WHERE d.challenge_id = :cid
+                      AND d.question_id = :qid
+                      AND d.user_id = v.user_id
+                """),
+                {
+                    "cid": challenge_id,
+                    "qid": question_id,
+                    "uids": delivered,
+                    "sent_at": [result.sent_at[uid] for uid in delivered],
+                },
+            )
+            await session.commit()
     except Exception:
         pass
 
@@ -1091,6 +1105,28 @@ async def handle_challenge_answer(update: Update, context: ContextTypes.DEFAULT_
 
         is_correct = (selected_option == correct_option)
 
+        # Claim the delivery; loses to a timeout that already fired
+        result = await session.execute(
+            text("""
+                UPDATE challenge_question_delivery
+                SET answered = true
+                WHERE challenge_id = :cid
+                  AND user_id = :uid
+                  AND question_id = :qid
+                  AND answered = false
+                  AND timed_out = false
+                RETURNING question_order
+            """),
+            {
+                "cid": challenge_id,
+                "uid": user_id,
+                "qid": question_id,
+            },
+        )
+        if result.fetchone() is None:
+            await query.answer("Time is up for this question.", show_alert=True)
+            return
+
         # Acknowledge callback only once here, after validation succeeded
         await query.answer()
 
@@ -1119,22 +1155,6 @@ async def handle_challenge_answer(update: Update, context: ContextTypes.DEFAULT_
             question_key=str(question_id),
         )
 
-        # Mark delivery as answered so timeout task stops
-        await session.execute(
-            text("""
-                UPDATE challenge_question_delivery
-                SET answered = true
-                WHERE challenge_id = :cid
-                  AND user_id = :uid
-                  AND question_id = :qid
-            """),
-            {
-                "cid": challenge_id,
-                "uid": user_id,
-                "qid": question_id,
-            },
-        )
-
         # Update score if correct
         if is_correct:
             await session.execute(
@@ -1152,6 +1172,13 @@ async def handle_challenge_answer(update: Update, context: ContextTypes.DEFAULT_
 
         await session.commit()
 
+    resolve_question_deadline(
+        CHALLENGE_QUESTION_KIND,
+        room=challenge_id,
+        user_id=user_id,
+        question_id=question_id,
+    )
+
     # Edit the same question card to show result
     try:
         await query.edit_message_text(
@@ -1318,16 +1345,16 @@ async def show_challenge_result(
     ])
 
     # Send result to every player in the challenge
-    for row in rows:
-        try:
-            await context.bot.send_message(
-                chat_id=row.user_id,
-                text=message,
-                parse_mode="HTML",
-                reply_markup=keyboard,
-            )
-        except Exception:
-            pass
+    await broadcast_to_room(
+        [row.user_id for row in rows],
+        lambda user_id: context.bot.send_message(
+            chat_id=user_id,
+            text=message,
+            parse_mode="HTML",
+            reply_markup=keyboard,
+        ),
+        label=f"challenge:{challenge_id}:result",
+    )
 
 
 # ==========================================================
@@ -1335,6 +1362,8 @@ async def show_challenge_result(
 # ==========================================================
 
 def register_handlers(application):
+    get_timer_wheel().register_handler(CHALLENGE_QUESTION_KIND, challenge_question_deadline_timer)
+
     application.add_handler(
         CommandHandler("challenge", create_challenge)
     )
@@ -14,6 +14,7 @@ from telegram.ext import (
 )
 
 from helpers import md_escape, get_or_create_user
+from update_router import StateGatedHandler
 from db import get_async_session
 from handlers.challenge import join_challenge
 from services.mockjamb_room_service import get_mockjamb_room_by_code
@@ -877,6 +878,11 @@ async def mytries(update: Update, context: ContextTypes.DEFAULT_TYPE):
 # ===============================================================
 # Smart Fallback (LAST handler)
 # ===============================================================
+def fallback_gate(update: Update, user_data) -> bool:
+    """update_router gate: fallback stays quiet inside conversations."""
+    return not user_data.get("_in_conversation")
+
+
 async def fallback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if context.user_data.get("_in_conversation"):
         return
@@ -1019,12 +1025,15 @@ def register_handlers(application):
     # Fallback
     # ---------------------------------------------------
     application.add_handler(
-        MessageHandler(
-            filters.TEXT
-            & ~filters.COMMAND
-            & ~filters.Regex(r"^[0-9+ ]+$")
-            & ~filters.UpdateType.EDITED_MESSAGE,
-            fallback,
+        StateGatedHandler(
+            MessageHandler(
+                filters.TEXT
+                & ~filters.COMMAND
+                & ~filters.Regex(r"^[0-9+ ]+$")
+                & ~filters.UpdateType.EDITED_MESSAGE,
+                fallback,
+            ),
+            fallback_gate,
         ),
         group=20,
     )
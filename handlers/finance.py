@@ -44,10 +44,7 @@ from services.finance.bank_account_service import (
     get_verified_bank_account,
     create_bank_account,
 )
-from services.flutterwave_client import (
-    get_ng_banks,
-    resolve_bank_account,
-)
+from services.bank_directory import BankEntry, get_bank_directory
 
 logger = logging.getLogger(__name__)
 
@@ -1311,7 +1308,7 @@ BANKS_PER_PAGE = 8
 
 
 def _bank_selection_keyboard(
-    banks: list[dict],
+    banks: tuple[BankEntry, ...],
     page: int,
 ) -> InlineKeyboardMarkup:
     """
@@ -1339,16 +1336,10 @@ def _bank_selection_keyboard(
     ])
 
     for bank in page_banks:
-        bank_code = str(bank.get("code") or "").strip()
-        bank_name = str(bank.get("name") or "").strip()
-
-        if not bank_code or not bank_name:
-            continue
-
         rows.append([
             InlineKeyboardButton(
-                f"🏦 {bank_name}",
-                callback_data=f"{FINANCE_BANK_SELECT}:{bank_code}",
+                f"🏦 {bank.name}",
+                callback_data=f"{FINANCE_BANK_SELECT}:{bank.code}",
             )
         ])
 
@@ -1390,13 +1381,58 @@ def _bank_selection_keyboard(
     return InlineKeyboardMarkup(rows)
 
 
+async def _show_bank_list_unavailable(update: Update):
+    """
+    Shown while the shared bank directory has no banks
+    (Flutterwave unavailable; the directory logs the failure).
+    """
+
+    query = update.callback_query
+
+    text = (
+        "🏦 <b>Add Bank Account</b>\n\n"
+        "❌ We couldn't load the available banks right now.\n\n"
+        "Please try again shortly."
+    )
+
+    keyboard = InlineKeyboardMarkup([
+        [
+            InlineKeyboardButton(
+                "🔄 Try Again",
+                callback_data=FINANCE_BANK_ADD,
+            )
+        ],
+        [
+            InlineKeyboardButton(
+                "🔙 Bank Account",
+                callback_data=FINANCE_BANK_ACCOUNT,
+            )
+        ],
+    ])
+
+    if query:
+        await query.edit_message_text(
+            text,
+            reply_markup=keyboard,
+            parse_mode="HTML",
+        )
+    else:
+        await update.message.reply_text(
+            text,
+            reply_markup=keyboard,
+            parse_mode="HTML",
+        )
+
+    return MENU
+
+
 async def start_bank_account_add(
     update: Update,
     context: ContextTypes.DEFAULT_TYPE,
 ):
     """
-    Retrieve the current Flutterwave Nigerian bank list
-    and display the first page.
+    Display the first page of the shared Nigerian bank directory
+    (services.bank_directory).
 
     No database write occurs here.
     """
@@ -1410,126 +1446,26 @@ async def start_bank_account_add(
     # Starting a fresh bank-selection cycle.
     #
     # Clear only temporary account/verification data from
-    # the previous registration attempt.
-    #
-    # Keep finance_bank_list because it will be refreshed below.
+    # the previous registration attempt, and any per-user bank
+    # list stored before the directory was shared.
     # ---------------------------------------------------------
 
     for key in (
+        "finance_bank_list",
         "finance_account_number",
         "finance_verified_account_name",
     ):
         context.user_data.pop(key, None)
 
-    result = await get_ng_banks()
-
-    if not result.get("success"):
-        logger.error(
-            "Unable to retrieve Flutterwave bank list: %s",
-            result.get("error") or result.get("message"),
-        )
-
-        text = (
-            "🏦 <b>Add Bank Account</b>\n\n"
-            "❌ We couldn't load the available banks right now.\n\n"
-            "Please try again shortly."
-        )
-
-        keyboard = InlineKeyboardMarkup([
-            [
-                InlineKeyboardButton(
-                    "🔄 Try Again",
-                    callback_data=FINANCE_BANK_ADD,
-                )
-            ],
-            [
-                InlineKeyboardButton(
-                    "🔙 Bank Account",
-                    callback_data=FINANCE_BANK_ACCOUNT,
-                )
-            ],
-        ])
-
-        if query:
-            await query.edit_message_text(
-                text,
-                reply_markup=keyboard,
-                parse_mode="HTML",
-            )
-        else:
-            await update.message.reply_text(
-                text,
-                reply_markup=keyboard,
-                parse_mode="HTML",
-            )
-
-        return MENU
-
-    banks = result.get("banks") or []
-
-    # ---------------------------------------------------------
-    # Keep only valid Nigerian bank entries.
-    # ---------------------------------------------------------
-
-    cleaned_banks = []
-
-    for bank in banks:
-        code = str(bank.get("code") or "").strip()
-        name = str(bank.get("name") or "").strip()
-
-        if code and name:
-            cleaned_banks.append({
-                "code": code,
-                "name": name,
-            })
-
-    # Sort by name so the UI is predictable.
-    cleaned_banks.sort(
-        key=lambda item: item["name"].lower()
-    )
-
-    if not cleaned_banks:
-        logger.error(
-            "Flutterwave returned an empty Nigerian bank list."
-        )
-
-        text = (
-            "🏦 <b>Add Bank Account</b>\n\n"
-            "❌ No banks are currently available.\n\n"
-            "Please try again later."
-        )
-
-        keyboard = InlineKeyboardMarkup([
-            [
-                InlineKeyboardButton(
-                    "🔙 Bank Account",
-                    callback_data=FINANCE_BANK_ACCOUNT,
-                )
-            ],
-        ])
-
-        if query:
-            await query.edit_message_text(
-                text,
-                reply_markup=keyboard,
-                parse_mode="HTML",
-            )
-        else:
-            await update.message.reply_text(
-                text,
-                reply_markup=keyboard,
-                parse_mode="HTML",
-            )
+    banks = await get_bank_directory().load()
 
-        return MENU
+    if not banks:
+        return await _show_bank_list_unavailable(update)
 
     # ---------------------------------------------------------
-    # Store the server-provided bank list temporarily.
-    #
-    # No database write.
+    # Only the page index is kept per user.
     # ---------------------------------------------------------
 
-    context.user_data["finance_bank_list"] = cleaned_banks
     context.user_data["finance_bank_page"] = 0
 
     text = (
@@ -1540,7 +1476,7 @@ async def start_bank_account_add(
     )
 
     markup = _bank_selection_keyboard(
-        cleaned_banks,
+        banks,
         page=0,
     )
 
@@ -1574,15 +1510,15 @@ async def start_bank_search(
         await query.answer()
 
     # ---------------------------------------------------------
-    # Make sure the Flutterwave bank list still exists.
+    # Make sure the shared bank directory is loaded.
     # ---------------------------------------------------------
 
-    banks = context.user_data.get("finance_bank_list")
+    banks = await get_bank_directory().load()
 
     if not banks:
         await _show(
             update,
-            "❌ <b>Bank List Expired</b>\n\n"
+            "❌ <b>Bank List Unavailable</b>\n\n"
             "Please open the bank selection again.",
             InlineKeyboardMarkup([
                 [
@@ -1648,7 +1584,8 @@ async def search_bank(
     context: ContextTypes.DEFAULT_TYPE,
 ):
     """
-    Search the server-fetched Flutterwave bank list.
+    Ranked search of the shared bank directory
+    (names, aliases such as GTB / UBA, acronyms).
 
     No database write is performed here.
     """
@@ -1677,13 +1614,12 @@ async def search_bank(
         )
         return BANK_SEARCH
 
-    banks = context.user_data.get(
-        "finance_bank_list"
-    ) or []
+    directory = get_bank_directory()
+    banks = await directory.load()
 
     if not banks:
         await update.message.reply_text(
-            "❌ <b>Bank List Expired</b>\n\n"
+            "❌ <b>Bank List Unavailable</b>\n\n"
             "Please open bank selection again.",
             parse_mode="HTML",
             reply_markup=InlineKeyboardMarkup([
@@ -1703,14 +1639,10 @@ async def search_bank(
         )
         return MENU
 
-    normalized_search = search_term.casefold()
-
-    matches = [
-        bank
-        for bank in banks
-        if normalized_search
-        in str(bank.get("name") or "").casefold()
-    ]
+    matches = directory.search(
+        search_term,
+        limit=20,
+    )
 
     if not matches:
         await update.message.reply_text(
@@ -1744,23 +1676,12 @@ async def search_bank(
 
     rows = []
 
-    for bank in matches[:20]:
-        bank_code = str(
-            bank.get("code") or ""
-        ).strip()
-
-        bank_name = str(
-            bank.get("name") or ""
-        ).strip()
-
-        if not bank_code or not bank_name:
-            continue
-
+    for bank in matches:
         rows.append([
             InlineKeyboardButton(
-                f"🏦 {bank_name}",
+                f"🏦 {bank.name}",
                 callback_data=(
-                    f"{FINANCE_BANK_SELECT}:{bank_code}"
+                    f"{FINANCE_BANK_SELECT}:{bank.code}"
                 ),
             )
         ])
@@ -1808,13 +1729,10 @@ async def show_bank_page(
     if query:
         await query.answer()
 
-    banks = context.user_data.get("finance_bank_list")
+    banks = await get_bank_directory().load()
 
     if not banks:
-        return await start_bank_account_add(
-            update,
-            context,
-        )
+        return await _show_bank_list_unavailable(update)
 
     try:
         page = int(
@@ -1860,8 +1778,6 @@ async def select_bank(
     if query:
         await query.answer()
 
-    banks = context.user_data.get("finance_bank_list") or []
-
     if not query or not query.data:
         return BANK_SELECT
 
@@ -1871,18 +1787,14 @@ async def select_bank(
         return BANK_SELECT
 
     # ---------------------------------------------------------
-    # Validate the callback against the bank list that THIS
-    # user received from Flutterwave.
+    # Validate the callback against the shared Flutterwave
+    # bank directory.
     # ---------------------------------------------------------
 
-    selected_bank = next(
-        (
-            bank
-            for bank in banks
-            if str(bank.get("code")) == bank_code
-        ),
-        None,
-    )
+    directory = get_bank_directory()
+    await directory.load()
+
+    selected_bank = directory.by_code(bank_code)
 
     if selected_bank is None:
         await query.answer(
@@ -1891,7 +1803,7 @@ async def select_bank(
         )
         return BANK_SELECT
 
-    bank_name = selected_bank["name"]
+    bank_name = selected_bank.name
 
     # ---------------------------------------------------------
     # Store only temporarily.
@@ -2091,10 +2003,11 @@ async def collect_account_number(
 
         # -----------------------------------------------------
         # Flutterwave account resolution
+        # (successful lookups are cached briefly per bank/account)
         # -----------------------------------------------------
 
         try:
-            result = await resolve_bank_account(
+            result = await get_bank_directory().resolve_account(
                 account_number=value,
                 account_bank=bank_code,
             )
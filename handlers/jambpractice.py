@@ -16,6 +16,8 @@ from helpers import md_escape
 from services.flutterwave_client import create_checkout, build_tx_ref, calculate_jamb_credits
 from services.jamb_payments import create_pending_jamb_payment
 from db import get_async_session
+from question_refs import EXAM_JAMB, current_version, hydrate_rows, question_ref, register
+from services.practice_repository import JAMB_PRACTICE, CHARGE_FREE, CHARGE_PAID
 from jamb_loader import (
     get_jamb_subjects,
     get_subject_topics,
@@ -174,174 +176,6 @@ async def deduct_one_mock_session(user_id: int) -> bool:
             return row is not None
 
 
-async def deduct_one_free_question(user_id: int) -> bool:
-    """
-    Deduct 1 free question if available.
-    Returns True if deducted, False otherwise.
-    """
-    async with get_async_session() as session:
-        async with session.begin():
-            result = await session.execute(
-                text("""
-                    update jamb_user_access
-                    set
-                        free_questions_remaining = free_questions_remaining - 1,
-                        total_questions_used = total_questions_used + 1,
-                        updated_at = now()
-                    where user_id = :user_id
-                      and free_questions_remaining > 0
-                    returning free_questions_remaining
-                """),
-                {"user_id": user_id},
-            )
-            row = result.first()
-            return row is not None
-
-
-async def deduct_one_paid_question(user_id: int) -> bool:
-    """
-    Deduct 1 paid question credit if available.
-    Returns True if deducted, False otherwise.
-    """
-    async with get_async_session() as session:
-        async with session.begin():
-            result = await session.execute(
-                text("""
-                    update jamb_user_access
-                    set
-                        paid_question_credits = paid_question_credits - 1,
-                        total_questions_used = total_questions_used + 1,
-                        updated_at = now()
-                    where user_id = :user_id
-                      and paid_question_credits > 0
-                    returning paid_question_credits
-                """),
-                {"user_id": user_id},
-            )
-            row = result.first()
-            return row is not None
-
-
-async def add_question_to_topic_history(
-    user_id: int,
-    subject_code: str,
-    topic_id: str,
-    question_id: str,
-):
-    async with get_async_session() as session:
-        async with session.begin():
-            await session.execute(
-                text("""
-                    insert into jamb_user_topic_history (
-                        user_id,
-                        subject_code,
-                        topic_id,
-                        question_id
-                    )
-                    values (
-                        :user_id,
-                        :subject_code,
-                        :topic_id,
-                        :question_id
-                    )
-                    on conflict (user_id, subject_code, topic_id, question_id) do nothing
-                """),
-                {
-                    "user_id": user_id,
-                    "subject_code": subject_code,
-                    "topic_id": topic_id,
-                    "question_id": question_id,
-                },
-            )
-
-
-async def record_jamb_attempt(
-    session_id: int,
-    user_id: int,
-    subject_code: str,
-    topic_id: str,
-    question_id: str,
-    selected_option: str,
-    correct_option: str,
-    is_correct: bool,
-):
-    async with get_async_session() as session:
-        async with session.begin():
-            await session.execute(
-                text("""
-                    insert into jamb_attempts (
-                        session_id,
-                        user_id,
-                        subject_code,
-                        topic_id,
-                        question_id,
-                        selected_option,
-                        correct_option,
-                        is_correct
-                    )
-                    values (
-                        :session_id,
-                        :user_id,
-                        :subject_code,
-                        :topic_id,
-                        :question_id,
-                        :selected_option,
-                        :correct_option,
-                        :is_correct
-                    )
-                """),
-                {
-                    "session_id": session_id,
-                    "user_id": user_id,
-                    "subject_code": subject_code,
-                    "topic_id": topic_id,
-                    "question_id": question_id,
-                    "selected_option": selected_option,
-                    "correct_option": correct_option,
-                    "is_correct": is_correct,
-                },
-            )
-
-
-async def increment_jamb_session_served(session_id: int):
-    async with get_async_session() as session:
-        async with session.begin():
-            await session.execute(
-                text("""
-                    update jamb_sessions
-                    set
-                        questions_served = questions_served + 1
-                    where id = :session_id
-                """),
-                {"session_id": session_id},
-            )
-
-
-async def increment_jamb_session_result(session_id: int, is_correct: bool):
-    async with get_async_session() as session:
-        async with session.begin():
-            if is_correct:
-                await session.execute(
-                    text("""
-                        update jamb_sessions
-                        set
-                            correct_count = correct_count + 1
-                        where id = :session_id
-                    """),
-                    {"session_id": session_id},
-                )
-            else:
-                await session.execute(
-                    text("""
-                        update jamb_sessions
-                        set
-                            wrong_count = wrong_count + 1
-                        where id = :session_id
-                    """),
-                    {"session_id": session_id},
-                )
-
-
 async def complete_jamb_session(session_id: int):
     async with get_async_session() as session:
         async with session.begin():
@@ -547,6 +381,8 @@ async def deduct_paid_questions(user_id: int, question_count: int) -> bool:
 
 
 async def get_latest_active_jamb_mock_session_for_user(user_id: int, subject_code: str) -> Optional[dict]:
+    await JAMB_PRACTICE.sync()
+
     async with get_async_session() as session:
         result = await session.execute(
             text("""
@@ -602,6 +438,8 @@ async def set_jamb_session_current_question_index(session_id: int, current_quest
 
 
 async def get_jamb_session_paper(session_id: int) -> list[dict]:
+    await JAMB_PRACTICE.sync()
+
     async with get_async_session() as session:
         result = await session.execute(
             text("""
@@ -613,6 +451,7 @@ async def get_jamb_session_paper(session_id: int) -> list[dict]:
                     question_id,
                     question_order,
                     question_json,
+                    content_version,
                     correct_option,
                     selected_option,
                     is_correct,
@@ -625,7 +464,7 @@ async def get_jamb_session_paper(session_id: int) -> list[dict]:
             {"session_id": int(session_id)},
         )
         rows = result.mappings().all()
-        return [dict(row) for row in rows]
+        return await hydrate_rows(session, [dict(row) for row in rows])
 
 
 async def create_jamb_subject_mock_paper_if_needed(
@@ -661,9 +500,15 @@ async def create_jamb_subject_mock_paper_if_needed(
 
     selected_questions = batch["selected_questions"]
 
+    cv = current_version(EXAM_JAMB, subject_code)
+
+    refs = [question_ref(cv, question) for question in selected_questions]
+
     async with get_async_session() as session:
         async with session.begin():
-            for idx, question in enumerate(selected_questions, start=1):
+            if any(content_version for content_version, _ in refs):
+                await register(session, cv)
+            for idx, (question, (content_version, question_json)) in enumerate(zip(selected_questions, refs), start=1):
                 await session.execute(
                     text("""
                         insert into jamb_session_questions (
@@ -673,6 +518,7 @@ async def create_jamb_subject_mock_paper_if_needed(
                             question_id,
                             question_order,
                             question_json,
+                            content_version,
                             correct_option,
                             selected_option,
                             is_correct,
@@ -686,6 +532,7 @@ async def create_jamb_subject_mock_paper_if_needed(
                             :question_id,
                             :question_order,
                             :question_json,
+                            :content_version,
                             :correct_option,
                             null,
                             null,
@@ -700,7 +547,8 @@ async def create_jamb_subject_mock_paper_if_needed(
                         "subject_code": subject_code,
                         "question_id": str(question.get("id")),
                         "question_order": idx,
-                        "question_json": json.dumps(question),
+                        "question_json": question_json,
+                        "content_version": content_version,
                         "correct_option": extract_correct_option(question),
                     },
                 )
@@ -773,6 +621,8 @@ async def create_jamb_mock_session(
 
 
 async def get_jamb_session_by_id(session_id: int) -> Optional[dict]:
+    await JAMB_PRACTICE.sync()
+
     async with get_async_session() as session:
         result = await session.execute(
             text("""
@@ -2116,45 +1966,45 @@ async def send_current_jamb_question(update: Update, context: ContextTypes.DEFAU
     # Charge and record history when question is served, not when answered
     if question_id not in served_question_ids:
         if session_mode == "free_trial":
-            deducted = await deduct_one_free_question(user_id)
-            if not deducted:
+            charged = await JAMB_PRACTICE.record_served(
+                session_id=session_id,
+                user_id=user_id,
+                subject_code=subject_code,
+                topic_id=topic_id,
+                question_id=question_id,
+                charge=CHARGE_FREE,
+            )
+            if not charged:
                 return await update.effective_message.reply_text(
                     "⚠️ You have no free question balance left\\.\n\nPlease buy a question pack to continue\\.",
                     parse_mode="MarkdownV2",
                 )
 
-            await add_question_to_topic_history(
+        elif session_mode == "paid_session":
+            charged = await JAMB_PRACTICE.record_served(
+                session_id=session_id,
                 user_id=user_id,
                 subject_code=subject_code,
                 topic_id=topic_id,
                 question_id=question_id,
+                charge=CHARGE_PAID,
             )
-
-            if session_id:
-                await increment_jamb_session_served(int(session_id))
-
-        elif session_mode == "paid_session":
-            deducted = await deduct_one_paid_question(user_id)
-            if not deducted:
+            if not charged:
                 return await update.effective_message.reply_text(
                     "⚠️ You have no paid JAMB question credits left\\.\n\nPlease buy another question pack to continue\\.",
                     parse_mode="MarkdownV2",
                 )
 
-            await add_question_to_topic_history(
+        elif session_mode == "mock_utme":
+            await JAMB_PRACTICE.record_served(
+                session_id=session_id,
                 user_id=user_id,
                 subject_code=subject_code,
                 topic_id=topic_id,
                 question_id=question_id,
+                charge=None,
             )
 
-            if session_id:
-                await increment_jamb_session_served(int(session_id))
-
-        elif session_mode == "mock_utme":
-            if session_id:
-                await increment_jamb_session_served(int(session_id))
-
         served_question_ids.append(question_id)
         context.user_data["jp_served_question_ids"] = served_question_ids
 
@@ -2401,7 +2251,7 @@ async def jamb_answer_handler(update: Update, context: ContextTypes.DEFAULT_TYPE
 
             return
 
-        await record_jamb_attempt(
+        await JAMB_PRACTICE.record_answer(
             session_id=session_id,
             user_id=user_id,
             subject_code=subject_code,
@@ -2410,34 +2260,9 @@ async def jamb_answer_handler(update: Update, context: ContextTypes.DEFAULT_TYPE
             selected_option=selected_option,
             correct_option=correct_option,
             is_correct=is_correct,
+            question_order=question_order if session_mode == "mock_utme" else None,
         )
 
-        await increment_jamb_session_result(
-            session_id,
-            is_correct,
-        )
-
-        if session_mode == "mock_utme":
-            async with get_async_session() as session:
-                async with session.begin():
-                    await session.execute(
-                        text("""
-                            UPDATE jamb_session_questions
-                            SET
-                                selected_option = :selected_option,
-                                is_correct = :is_correct,
-                                updated_at = NOW()
-                            WHERE session_id = :session_id
-                              AND question_order = :question_order
-                        """),
-                        {
-                            "session_id": session_id,
-                            "question_order": question_order,
-                            "selected_option": selected_option,
-                            "is_correct": is_correct,
-                        },
-                    )
-
         context.user_data["jp_last_selected_option"] = selected_option
         context.user_data["jp_last_correct_option"] = correct_option
         context.user_data["jp_last_answered_question"] = question
@@ -3,7 +3,6 @@
 # ===============================================================
 
 import os
-from datetime import datetime, timezone, timedelta
 
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes, CallbackQueryHandler, CommandHandler
@@ -12,18 +11,23 @@ from sqlalchemy import select, func, desc
 
 from db import get_async_session
 from models import (
-    PremiumRewardEntry,
     User,
     GameState,
     UserCycleStat,
     AirtimePayout,
     NonAirtimeWinner,
-)  # PremiumRewardEntry = quiz entry log
+)
 
 from services.playtrivia import (
     AIRTIME_MILESTONES,
     NON_AIRTIME_MILESTONES,
 )
+from services.paid_try_counter import get_paid_try_totals
+from services.leaderboard_service import (
+    get_board,
+    get_user_activity,
+    load_leaderboard_profiles,
+)
 
 LEADERBOARD_PAGE_SIZE = 10
 
@@ -143,33 +147,6 @@ def _next_reward(points: int):
         "remaining": 0,
     }
 
-# ---------------------------------------------------------
-# 📆 Streak helper (quiz activity days)
-# ---------------------------------------------------------
-def _compute_streaks(dates) -> tuple[int, int]:
-    """
-    Given a list of datetime objects (quiz activity timestamps for a user),
-    return (current_streak_days, best_streak_days) based on consecutive days.
-    """
-    if not dates:
-        return 0, 0
-
-    # Unique dates (no duplicates), sorted
-    day_list = sorted({d.astimezone(timezone.utc).date() for d in dates})
-    best = 1
-    current = 1
-
-    for prev, curr in zip(day_list, day_list[1:]):
-        if (curr - prev).days == 1:
-            current += 1
-            best = max(best, current)
-        else:
-            current = 1
-
-    # Current streak is the streak ending on the last recorded day
-    return current, best
-
-
 # ---------------------------------------------------------
 # 🏆 LEADERBOARD ROUTER
 # ---------------------------------------------------------
@@ -224,171 +201,56 @@ async def leaderboard_render(
     not luck, betting, or gambling.
     """
     tg_user = update.effective_user
-    now = datetime.now(timezone.utc)
 
     # -----------------------
-    # Scope filter
+    # Scope
     # -----------------------
-    filter_clause = None
-    scope_label = ""
-
     if scope == "week":
-        start = now - timedelta(days=7)
-        filter_clause = PremiumRewardEntry.created_at >= start
         scope_label = "🔥 <b>This Week (Last 7 days)</b>"
     else:
         scope = "cycle"
         scope_label = "🏆 <b>This Reward Season</b>"
 
     async with get_async_session() as session:
-        # ----- Base query for leaderboard -----
-
-        if scope == "week":
-
-            base_q = select(
-                PremiumRewardEntry.user_id,
-                func.count(PremiumRewardEntry.id).label("points"),
-            )
-
-            if filter_clause is not None:
-                base_q = base_q.where(filter_clause)
-
-            base_q = base_q.group_by(PremiumRewardEntry.user_id)
-
-        else:
-
-            gs = await session.get(GameState, 1)
-
-            current_cycle = gs.current_cycle if gs else 1
-
-            base_q = (
-                select(
-                    UserCycleStat.user_id,
-                    UserCycleStat.points.label("points"),
-                )
-                .where(
-                    UserCycleStat.cycle_id == current_cycle
-                )
-            )
-
-        # ----- Totals -----
-        total_q = select(func.count(PremiumRewardEntry.id))
-        distinct_q = select(func.count(func.distinct(PremiumRewardEntry.user_id)))
-        if filter_clause is not None:
-            total_q = total_q.where(filter_clause)
-            distinct_q = distinct_q.where(filter_clause)
+        # ----- Cycle progress (paid questions only) + current season -----
+        paid_this_cycle = 0
+        current_cycle = 1
+        if scope == "cycle" or WIN_THRESHOLD > 0:
+            totals = await get_paid_try_totals(session)
+            paid_this_cycle = totals["paid_tries_this_cycle"]
+            current_cycle = totals["current_cycle"]
 
-        total_points = (await session.execute(total_q)).scalar() or 0
-        distinct_users = (await session.execute(distinct_q)).scalar() or 0
+        # ----- Ranked board (materialized, in memory) -----
+        board = await get_board(session, scope, cycle_id=current_cycle)
 
         # ----- Page of top users -----
         offset = max(page - 1, 0) * LEADERBOARD_PAGE_SIZE
-        if scope == "week":
-            page_q = (
-                base_q
-                .order_by(func.count(PremiumRewardEntry.id).desc())
-                .offset(offset)
-                .limit(LEADERBOARD_PAGE_SIZE)
-            )
-        else:
-            page_q = (
-                base_q
-                .order_by(UserCycleStat.points.desc())
-                .offset(offset)
-                .limit(LEADERBOARD_PAGE_SIZE)
-            )
-        rows = (await session.execute(page_q)).all()
+        rows = board.page(offset, LEADERBOARD_PAGE_SIZE)
 
         if not rows and page != 1:
             return await leaderboard_render(update, context, scope=scope, page=1)
 
-        # ----- Load user objects -----
-        user_ids = [uid for (uid, _) in rows]
-        users_by_id = {}
-        if user_ids:
-            users_res = await session.execute(
-                select(User).where(User.id.in_(user_ids))
-            )
-            for u in users_res.scalars():
-                users_by_id[u.id] = u
-
-        # ----- Viewer info -----
-        viewer_db_user = None
-        viewer_user_id = None
-        if tg_user:
-            res_me = await session.execute(
-                select(User).where(User.tg_id == tg_user.id)
-            )
-            viewer_db_user = res_me.scalars().first()
-            if viewer_db_user:
-                viewer_user_id = str(viewer_db_user.id)
-
-        my_points = 0
-        my_rank = None
-        current_streak = 0
-        best_streak = 0
-
-        if viewer_user_id:
-
-            if scope == "week":
-
-                my_count_q = select(
-                    func.count(PremiumRewardEntry.id)
-                ).where(
-                    PremiumRewardEntry.user_id == viewer_user_id
-                )
-
-                if filter_clause is not None:
-                    my_count_q = my_count_q.where(
-                        filter_clause
-                    )
-
-                my_points = (
-                    await session.execute(my_count_q)
-                ).scalar() or 0
-
-            else:
-
-                gs = await session.get(GameState, 1)
-
-                current_cycle = gs.current_cycle if gs else 1
-
-                my_points_q = select(
-                    UserCycleStat.points
-                ).where(
-                    UserCycleStat.user_id == viewer_user_id,
-                    UserCycleStat.cycle_id == current_cycle,
-                )
-
-                my_points = (
-                    await session.execute(my_points_q)
-                ).scalar() or 0
-
-            if my_points > 0:
-                subq = base_q.subquery()
-                better_q = select(func.count()).select_from(subq).where(
-                    subq.c.points > my_points
-                )
-                better_count = (await session.execute(better_q)).scalar() or 0
-                my_rank = better_count + 1
+        # ----- Page players + viewer (with streak rollup) in one read -----
+        users_by_id, viewer = await load_leaderboard_profiles(
+            session,
+            user_ids=[uid for (uid, _) in rows],
+            viewer_tg_id=tg_user.id if tg_user else None,
+        )
 
-                streak_dates_res = await session.execute(
-                    select(PremiumRewardEntry.created_at).where(
-                        PremiumRewardEntry.user_id == viewer_user_id
-                    )
-                )
-                dates = [row[0] for row in streak_dates_res.fetchall()]
-                current_streak, best_streak = _compute_streaks(dates)
+    viewer_user_id = viewer["id"] if viewer else None
+    my_points = 0
+    my_rank = None
+    current_streak = 0
+    best_streak = 0
 
-        next_reward_info = _next_reward(my_points)
+    if viewer_user_id:
+        my_points = board.score_of(viewer_user_id)
+        if my_points > 0:
+            my_rank = board.rank_of(viewer_user_id)
+            current_streak = viewer["current_streak"]
+            best_streak = viewer["best_streak"]
 
-        # ----- Cycle progress for trust & merit messaging -----
-        # Uses GameState.paid_tries_this_cycle (paid questions only)
-        paid_this_cycle = 0
-        if WIN_THRESHOLD > 0:
-            gs = await session.get(GameState, 1)
-            if gs and getattr(gs, "paid_tries_this_cycle", None) is not None:
-                paid_this_cycle = gs.paid_tries_this_cycle
+    next_reward_info = _next_reward(my_points)
 
     # ----- Build leaderboard text -----
     text_lines = []
@@ -676,10 +538,10 @@ async def leaderboard_render(
 
             if player:
 
-                if getattr(player, "username", None):
-                    name = f"@{player.username}"
+                if player.get("username"):
+                    name = f"@{player['username']}"
                 else:
-                    name = f"Player #{str(player.tg_id)[-4:]}"
+                    name = f"Player #{str(player['tg_id'])[-4:]}"
             else:
                 name = "Unknown Player"
 
@@ -803,35 +665,9 @@ async def my_achievements_handler(update: Update, context: ContextTypes.DEFAULT_
 
         user_id = str(db_user.id)
 
-        # All-time performance  entries/points
-        total_points_all = (
-            await session.execute(
-                select(func.count(PremiumRewardEntry.id)).where(
-                    PremiumRewardEntry.user_id == user_id
-                )
-            )
-        ).scalar() or 0
-
-        # Last 7 days quiz points (for extra context)
-        now = datetime.now(timezone.utc)
-        start_week = now - timedelta(days=7)
-        points_last_7 = (
-            await session.execute(
-                select(func.count(PremiumRewardEntry.id)).where(
-                    PremiumRewardEntry.user_id == user_id,
-                    PremiumRewardEntry.created_at >= start_week,
-                )
-            )
-        ).scalar() or 0
-
-        # Streaks (based on ALL performance  entries)
-        streak_dates_res = await session.execute(
-            select(PremiumRewardEntry.created_at).where(
-                PremiumRewardEntry.user_id == user_id
-            )
-        )
-        dates = [row[0] for row in streak_dates_res.fetchall()]
-        current_streak, best_streak = _compute_streaks(dates)
+        # All-time entries (precomputed rollup)
+        activity = await get_user_activity(session, user_id)
+        total_points_all = activity["total_entries"]
 
     rank = _reward_rank(total_points_all)
 
@@ -936,33 +772,12 @@ async def achievement_season_handler(
         ).scalar() or 0
 
         # -------------------------------------------------
-        # Last 7 Days (optional - keep for future use)
-        # -------------------------------------------------
-
-        now = datetime.now(timezone.utc)
-        start_week = now - timedelta(days=7)
-
-        points_last_7 = (
-            await session.execute(
-                select(func.count(PremiumRewardEntry.id)).where(
-                    PremiumRewardEntry.user_id == user_id,
-                    PremiumRewardEntry.created_at >= start_week,
-                )
-            )
-        ).scalar() or 0
-
-        # -------------------------------------------------
-        # Learning Streaks
+        # Learning Streaks (precomputed rollup)
         # -------------------------------------------------
 
-        streak_dates_res = await session.execute(
-            select(PremiumRewardEntry.created_at).where(
-                PremiumRewardEntry.user_id == user_id
-            )
-        )
-
-        dates = [row[0] for row in streak_dates_res.fetchall()]
-        current_streak, best_streak = _compute_streaks(dates)
+        activity = await get_user_activity(session, user_id)
+        current_streak = activity["current_streak"]
+        best_streak = activity["best_streak"]
 
     # -------------------------------------------------
     # Reward Rank
@@ -1265,30 +1080,12 @@ async def achievement_alltime_handler(
         user_id = str(db_user.id)
 
         # -------------------------------------------------
-        # Lifetime Premium Points
-        # -------------------------------------------------
-
-        total_points_all = (
-            await session.execute(
-                select(func.count(PremiumRewardEntry.id)).where(
-                    PremiumRewardEntry.user_id == user_id
-                )
-            )
-        ).scalar() or 0
-
-        # -------------------------------------------------
-        # Learning Streak
+        # Lifetime Premium Points + Learning Streak (rollup)
         # -------------------------------------------------
 
-        streak_dates_res = await session.execute(
-            select(PremiumRewardEntry.created_at).where(
-                PremiumRewardEntry.user_id == user_id
-            )
-        )
-
-        dates = [row[0] for row in streak_dates_res.fetchall()]
-
-        current_streak, best_streak = _compute_streaks(dates)
+        activity = await get_user_activity(session, user_id)
+        total_points_all = activity["total_entries"]
+        best_streak = activity["best_streak"]
 
         # -------------------------------------------------
         # Reward Seasons Played
@@ -16,6 +16,10 @@ from telegram.error import BadRequest
 
 from jamb_loader import get_course_subject_map, get_course_by_code, get_course_subjects, get_subject_by_code
 from db import get_async_session
+from send_scheduler import PRIORITY_HIGH
+from services.deadline_service import MOCKJAMB_EXAM_KIND
+from services.room_broadcast import broadcast_to_room
+from services.timer_wheel import get_timer_wheel
 from helpers import md_escape
 from services.flutterwave_client import create_checkout, build_tx_ref
 from services.mockjamb_payments import create_pending_mockjamb_payment, get_mockjamb_payment
@@ -33,10 +37,12 @@ from services.mockjamb_exam_service import (
     calculate_mockjamb_subject_score,
     get_mockjamb_review_rows,
     get_mockjamb_subject_question_by_order,
+    get_mockjamb_live_paper_rows,
     get_mockjamb_subject_question_count,
-    get_mockjamb_subject_result_stats,
 )
 
+from services.exam_results import MOCKJAMB_RESULTS
+
 from services.mockjamb_room_service import (
     create_mockjamb_room,
     add_mockjamb_room_player,
@@ -1310,17 +1316,9 @@ async def build_mockjamb_result_from_session(
         except Exception:
             scores = {}
 
-        answered_counts = {}
-        correct_counts = {}
-
-        for subject_code in subject_codes:
-            stats = await get_mockjamb_subject_result_stats(
-                session,
-                payment_reference=payment_reference,
-                subject_code=subject_code,
-            )
-            answered_counts[subject_code] = int(stats.get("answered_count") or 0)
-            correct_counts[subject_code] = int(stats.get("correct_count") or 0)
+        exam_result = await MOCKJAMB_RESULTS.for_session(session, payment_reference)
+        answered_counts = exam_result.answered_counts(subject_codes)
+        correct_counts = exam_result.correct_counts(subject_codes)
 
     message_text = build_mockjamb_final_result_text(
         course_code=course_code,
@@ -1342,26 +1340,12 @@ async def finalize_mockjamb_exam_now(
     course_code: str,
     subject_codes: list[str],
 ) -> tuple[str, InlineKeyboardMarkup]:
-    scores = {}
-    answered_counts = {}
-    correct_counts = {}
-
     async with get_async_session() as session:
-        for subject_code in subject_codes:
-            score_info = await calculate_mockjamb_subject_score(
-                session,
-                payment_reference=payment_reference,
-                subject_code=subject_code,
-            )
-            scores[subject_code] = int(score_info.get("score_100") or 0)
-
-            stats = await get_mockjamb_subject_result_stats(
-                session,
-                payment_reference=payment_reference,
-                subject_code=subject_code,
-            )
-            answered_counts[subject_code] = int(stats.get("answered_count") or 0)
-            correct_counts[subject_code] = int(stats.get("correct_count") or 0)
+        exam_result = await MOCKJAMB_RESULTS.for_session(session, payment_reference)
+        scores = exam_result.scores(subject_codes)
+        answered_counts = exam_result.answered_counts(subject_codes)
+        correct_counts = exam_result.correct_counts(subject_codes)
+        MOCKJAMB_RESULTS.note_completion(session, payment_reference)
 
         await session.execute(
             text("""
@@ -2731,25 +2715,21 @@ async def notify_mockjamb_room_players_match_started(
         "Tap below to enter your Mock JAMB exam."
     )
 
-    for player in players:
-        player_user_id = int(player.get("user_id") or 0)
-        if not player_user_id or player_user_id == int(host_user_id):
-            continue
-
-        try:
-            await context.bot.send_message(
-                chat_id=player_user_id,
-                text=message_text,
-                parse_mode="Markdown",
-                reply_markup=markup,
-                disable_web_page_preview=True,
-            )
-        except Exception:
-            logger.exception(
-                "Failed to notify room player that match started | room_code=%s | player_user_id=%s",
-                room_code,
-                player_user_id,
-            )
+    await broadcast_to_room(
+        [
+            int(player.get("user_id") or 0)
+            for player in players
+            if int(player.get("user_id") or 0) != int(host_user_id)
+        ],
+        lambda player_user_id: context.bot.send_message(
+            chat_id=player_user_id,
+            text=message_text,
+            parse_mode="Markdown",
+            reply_markup=markup,
+            disable_web_page_preview=True,
+        ),
+        label=f"mockjamb_room:{room_code}:started",
+    )
 
 # -------------------------------------------
 # Mock JAMB Room Pay Friend Handler
@@ -3916,10 +3896,8 @@ async def mockjamb_answer_handler(update: Update, context: ContextTypes.DEFAULT_
                 next_question_order = int(answer_result["next_question_order"])
                 total_questions = int(answer_result["total_questions"])
 
-                session_row = await get_mockjamb_session_by_payment_reference(
-                    session,
-                    payment_reference,
-                )
+                # exam_ends_at does not change mid-exam: reuse the row read above
+                session_row = active_session
 
                 context.user_data["mj_current_subject_code"] = subject_code
                 context.user_data["mj_current_question_order"] = next_question_order
@@ -3947,22 +3925,11 @@ async def mockjamb_answer_handler(update: Update, context: ContextTypes.DEFAULT_
                         context=context,
                         force_show=False,
                     ):
-                        paper_info = await session.execute(
-                            text("""
-                                select
-                                    question_order,
-                                    question_json
-                                from public.mockjamb_subject_questions
-                                where payment_reference = :payment_reference
-                                and subject_code = :subject_code
-                                order by question_order asc
-                            """),
-                            {
-                                "payment_reference": payment_reference,
-                                "subject_code": subject_code,
-                            },
+                        paper_rows = await get_mockjamb_live_paper_rows(
+                            session,
+                            payment_reference=payment_reference,
+                            subject_code=subject_code,
                         )
-                        paper_rows = [dict(row) for row in paper_info.mappings().all()]
 
                         passage_start, passage_end = get_passage_question_range(
                             paper_rows=paper_rows,
@@ -4113,17 +4080,9 @@ async def mockjamb_answer_handler(update: Update, context: ContextTypes.DEFAULT_
                     )
                     markup = make_mockjamb_next_subject_keyboard(remaining_subject_codes)
                 else:
-                    answered_counts = {}
-                    correct_counts = {}
-
-                    for code in subject_codes:
-                        stats = await get_mockjamb_subject_result_stats(
-                            session,
-                            payment_reference=payment_reference,
-                            subject_code=code,
-                        )
-                        answered_counts[code] = int(stats.get("answered_count") or 0)
-                        correct_counts[code] = int(stats.get("correct_count") or 0)
+                    exam_result = await MOCKJAMB_RESULTS.for_session(session, payment_reference)
+                    answered_counts = exam_result.answered_counts(subject_codes)
+                    correct_counts = exam_result.correct_counts(subject_codes)
 
                     message_text = build_mockjamb_final_result_text(
                         course_code=course_code,
@@ -4346,17 +4305,9 @@ async def mockjamb_back_to_result_handler(update: Update, context: ContextTypes.
         except Exception:
             scores = {}
 
-        answered_counts = {}
-        correct_counts = {}
-
-        for code in subject_codes:
-            stats = await get_mockjamb_subject_result_stats(
-                session,
-                payment_reference=payment_reference,
-                subject_code=code,
-            )
-            answered_counts[code] = int(stats.get("answered_count") or 0)
-            correct_counts[code] = int(stats.get("correct_count") or 0)
+        exam_result = await MOCKJAMB_RESULTS.for_session(session, payment_reference)
+        answered_counts = exam_result.answered_counts(subject_codes)
+        correct_counts = exam_result.correct_counts(subject_codes)
 
     message_text = build_mockjamb_final_result_text(
         course_code=course_code,
@@ -4463,18 +4414,10 @@ async def mockjamb_resume_exam_handler(update: Update, context: ContextTypes.DEF
         return
     
     if status == "completed":
-        answered_counts = {}
-        correct_counts = {}
-
         async with get_async_session() as session:
-            for code in subject_codes:
-                stats = await get_mockjamb_subject_result_stats(
-                    session,
-                    payment_reference=payment_reference,
-                    subject_code=code,
-                )
-                answered_counts[code] = int(stats.get("answered_count") or 0)
-                correct_counts[code] = int(stats.get("correct_count") or 0)
+            exam_result = await MOCKJAMB_RESULTS.for_session(session, payment_reference)
+            answered_counts = exam_result.answered_counts(subject_codes)
+            correct_counts = exam_result.correct_counts(subject_codes)
 
         message_text = build_mockjamb_final_result_text(
             course_code=course_code,
@@ -4540,22 +4483,11 @@ async def mockjamb_resume_exam_handler(update: Update, context: ContextTypes.DEF
                 force_show=True,
             ):
                 async with get_async_session() as range_session:
-                    result = await range_session.execute(
-                        text("""
-                            select
-                                question_order,
-                                question_json
-                            from public.mockjamb_subject_questions
-                            where payment_reference = :payment_reference
-                            and subject_code = :subject_code
-                            order by question_order asc
-                        """),
-                        {
-                            "payment_reference": payment_reference,
-                            "subject_code": current_subject_code,
-                        },
+                    paper_rows = await get_mockjamb_live_paper_rows(
+                        range_session,
+                        payment_reference=payment_reference,
+                        subject_code=current_subject_code,
                     )
-                    paper_rows = [dict(row) for row in result.mappings().all()]
 
                 passage_start, passage_end = get_passage_question_range(
                     paper_rows=paper_rows,
@@ -4629,18 +4561,10 @@ async def mockjamb_resume_exam_handler(update: Update, context: ContextTypes.DEF
             )
         return
 
-    answered_counts = {}
-    correct_counts = {}
-
     async with get_async_session() as session:
-        for code in subject_codes:
-            stats = await get_mockjamb_subject_result_stats(
-                session,
-                payment_reference=payment_reference,
-                subject_code=code,
-            )
-            answered_counts[code] = int(stats.get("answered_count") or 0)
-            correct_counts[code] = int(stats.get("correct_count") or 0)
+        exam_result = await MOCKJAMB_RESULTS.for_session(session, payment_reference)
+        answered_counts = exam_result.answered_counts(subject_codes)
+        correct_counts = exam_result.correct_counts(subject_codes)
 
     message_text = build_mockjamb_final_result_text(
         course_code=course_code,
@@ -4983,10 +4907,45 @@ async def mockjamb_end_exam_handler(update: Update, context: ContextTypes.DEFAUL
         )
 
 
+# ====================================================================
+# Exam time-up notice (fired by the shared timer wheel)
+# ====================================================================
+async def notify_mockjamb_exam_time_up(bot, payment_reference: str) -> None:
+    async with get_async_session() as session:
+        session_row = await get_mockjamb_session_by_payment_reference(session, payment_reference)
+
+    if not session_row:
+        return
+
+    status = str(session_row.get("status") or "").strip().lower()
+    if status not in ("ready", "in_progress"):
+        return
+
+    if not is_mockjamb_time_expired(session_row.get("exam_ends_at")):
+        return
+
+    await bot.send_message(
+        chat_id=int(session_row["user_id"]),
+        text=(
+            "⏱ *Time up!*\n\n"
+            "Your Mock JAMB / UTME exam time has ended.\n"
+            "Submit now to see your result."
+        ),
+        parse_mode="Markdown",
+        reply_markup=make_mockjamb_time_up_keyboard(),
+        rate_limit_args={"priority": PRIORITY_HIGH},
+    )
+
+
 # ====================================================================
 # Register Handlers
 # ====================================================================
 def register_handlers(application):
+    async def _exam_time_up(payment_reference: str, payload) -> None:
+        await notify_mockjamb_exam_time_up(application.bot, payment_reference)
+
+    get_timer_wheel().register_handler(MOCKJAMB_EXAM_KIND, _exam_time_up)
+
     application.add_handler(CommandHandler("mockjamb", mockjamb_start_handler))
     application.add_handler(CallbackQueryHandler(mockjamb_start_handler, pattern=r"^mock:jamb$"))
     application.add_handler(CallbackQueryHandler(mockjamb_course_page_handler, pattern=r"^mj_course_page_"))
@@ -13,6 +13,10 @@ from telegram.ext import CallbackQueryHandler, CommandHandler, ContextTypes
 
 from waec_loader import get_waec_subjects, get_subject_by_code
 from db import get_async_session
+from send_scheduler import PRIORITY_HIGH
+from services.deadline_service import MOCKWAEC_EXAM_KIND
+from services.room_broadcast import broadcast_to_room
+from services.timer_wheel import get_timer_wheel
 from helpers import md_escape
 from services.flutterwave_client import create_checkout, build_tx_ref
 from services.mockwaec_payments import create_pending_mockwaec_payment, get_mockwaec_payment
@@ -29,11 +33,13 @@ from services.mockwaec_exam_service import (
     calculate_mockwaec_subject_score,
     get_mockwaec_review_rows,
     get_mockwaec_subject_question_by_order,
+    get_mockwaec_live_paper_rows,
     get_mockwaec_subject_question_count,
-    get_mockwaec_subject_result_stats,
     get_mockwaec_grade_from_score,
 )
 
+from services.exam_results import MOCKWAEC_RESULTS
+
 from services.mockwaec_room_service import (
     create_mockwaec_room,
     add_mockwaec_room_player,
@@ -1433,17 +1439,9 @@ async def build_mockwaec_result_from_session(
         except Exception:
             scores = {}
 
-        answered_counts = {}
-        correct_counts = {}
-
-        for subject_code in subject_codes:
-            stats = await get_mockwaec_subject_result_stats(
-                session,
-                payment_reference=payment_reference,
-                subject_code=subject_code,
-            )
-            answered_counts[subject_code] = int(stats.get("answered_count") or 0)
-            correct_counts[subject_code] = int(stats.get("correct_count") or 0)
+        exam_result = await MOCKWAEC_RESULTS.for_session(session, payment_reference)
+        answered_counts = exam_result.answered_counts(subject_codes)
+        correct_counts = exam_result.correct_counts(subject_codes)
 
     message_text = build_mockwaec_final_result_text(
         subject_codes=subject_codes,
@@ -1596,18 +1594,10 @@ async def mockwaec_submit_subject_yes_handler(update: Update, context: ContextTy
             )
         return
 
-    answered_counts = {}
-    correct_counts = {}
-
     async with get_async_session() as session:
-        for code in subject_codes:
-            stats = await get_mockwaec_subject_result_stats(
-                session,
-                payment_reference=payment_reference,
-                subject_code=code,
-            )
-            answered_counts[code] = int(stats.get("answered_count") or 0)
-            correct_counts[code] = int(stats.get("correct_count") or 0)
+        exam_result = await MOCKWAEC_RESULTS.for_session(session, payment_reference)
+        answered_counts = exam_result.answered_counts(subject_codes)
+        correct_counts = exam_result.correct_counts(subject_codes)
 
     message_text = build_mockwaec_final_result_text(
         subject_codes=subject_codes,
@@ -1639,26 +1629,12 @@ async def finalize_mockwaec_exam_now(
     course_code: str,
     subject_codes: list[str],
 ) -> tuple[str, InlineKeyboardMarkup]:
-    scores = {}
-    answered_counts = {}
-    correct_counts = {}
-
     async with get_async_session() as session:
-        for subject_code in subject_codes:
-            score_info = await calculate_mockwaec_subject_score(
-                session,
-                payment_reference=payment_reference,
-                subject_code=subject_code,
-            )
-            scores[subject_code] = int(score_info.get("score_100") or 0)
-
-            stats = await get_mockwaec_subject_result_stats(
-                session,
-                payment_reference=payment_reference,
-                subject_code=subject_code,
-            )
-            answered_counts[subject_code] = int(stats.get("answered_count") or 0)
-            correct_counts[subject_code] = int(stats.get("correct_count") or 0)
+        exam_result = await MOCKWAEC_RESULTS.for_session(session, payment_reference)
+        scores = exam_result.scores(subject_codes)
+        answered_counts = exam_result.answered_counts(subject_codes)
+        correct_counts = exam_result.correct_counts(subject_codes)
+        MOCKWAEC_RESULTS.note_completion(session, payment_reference)
 
         await session.execute(
             text("""
@@ -3187,25 +3163,21 @@ async def notify_mockwaec_room_players_match_started(
         "Tap below to enter your Mock WAEC exam."
     )
 
-    for player in players:
-        player_user_id = int(player.get("user_id") or 0)
-        if not player_user_id or player_user_id == int(host_user_id):
-            continue
-
-        try:
-            await context.bot.send_message(
-                chat_id=player_user_id,
-                text=message_text,
-                parse_mode="HTML",
-                reply_markup=markup,
-                disable_web_page_preview=True,
-            )
-        except Exception:
-            logger.exception(
-                "Failed to notify WAEC room player that match started | room_code=%s | player_user_id=%s",
-                room_code,
-                player_user_id,
-            )
+    await broadcast_to_room(
+        [
+            int(player.get("user_id") or 0)
+            for player in players
+            if int(player.get("user_id") or 0) != int(host_user_id)
+        ],
+        lambda player_user_id: context.bot.send_message(
+            chat_id=player_user_id,
+            text=message_text,
+            parse_mode="HTML",
+            reply_markup=markup,
+            disable_web_page_preview=True,
+        ),
+        label=f"mockwaec_room:{room_code}:started",
+    )
 
 
 async def mockwaec_room_resume_match_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -4281,10 +4253,8 @@ async def mockwaec_answer_handler(update: Update, context: ContextTypes.DEFAULT_
                 next_question_order = int(answer_result["next_question_order"])
                 total_questions = int(answer_result["total_questions"])
 
-                session_row = await get_mockwaec_session_by_payment_reference(
-                    session,
-                    payment_reference,
-                )
+                # exam_ends_at does not change mid-exam: reuse the row read above
+                session_row = active_session
 
                 context.user_data["mw_current_subject_code"] = subject_code
                 context.user_data["mw_current_question_order"] = next_question_order
@@ -4312,22 +4282,11 @@ async def mockwaec_answer_handler(update: Update, context: ContextTypes.DEFAULT_
                         context=context,
                         force_show=False,
                     ):
-                        paper_info = await session.execute(
-                            text("""
-                                select
-                                    question_order,
-                                    question_json
-                                from public.mockwaec_subject_questions
-                                where payment_reference = :payment_reference
-                                and subject_code = :subject_code
-                                order by question_order asc
-                            """),
-                            {
-                                "payment_reference": payment_reference,
-                                "subject_code": subject_code,
-                            },
+                        paper_rows = await get_mockwaec_live_paper_rows(
+                            session,
+                            payment_reference=payment_reference,
+                            subject_code=subject_code,
                         )
-                        paper_rows = [dict(row) for row in paper_info.mappings().all()]
 
                         passage_start, passage_end = get_passage_question_range(
                             paper_rows=paper_rows,
@@ -4475,17 +4434,9 @@ async def mockwaec_answer_handler(update: Update, context: ContextTypes.DEFAULT_
                     )
                     markup = make_mockwaec_next_subject_keyboard(remaining_subject_codes)
                 else:
-                    answered_counts = {}
-                    correct_counts = {}
-
-                    for code in subject_codes:
-                        stats = await get_mockwaec_subject_result_stats(
-                            session,
-                            payment_reference=payment_reference,
-                            subject_code=code,
-                        )
-                        answered_counts[code] = int(stats.get("answered_count") or 0)
-                        correct_counts[code] = int(stats.get("correct_count") or 0)
+                    exam_result = await MOCKWAEC_RESULTS.for_session(session, payment_reference)
+                    answered_counts = exam_result.answered_counts(subject_codes)
+                    correct_counts = exam_result.correct_counts(subject_codes)
 
                     message_text = build_mockwaec_final_result_text(
                         subject_codes=subject_codes,
@@ -4707,17 +4658,9 @@ async def mockwaec_back_to_result_handler(update: Update, context: ContextTypes.
         except Exception:
             scores = {}
 
-        answered_counts = {}
-        correct_counts = {}
-
-        for code in subject_codes:
-            stats = await get_mockwaec_subject_result_stats(
-                session,
-                payment_reference=payment_reference,
-                subject_code=code,
-            )
-            answered_counts[code] = int(stats.get("answered_count") or 0)
-            correct_counts[code] = int(stats.get("correct_count") or 0)
+        exam_result = await MOCKWAEC_RESULTS.for_session(session, payment_reference)
+        answered_counts = exam_result.answered_counts(subject_codes)
+        correct_counts = exam_result.correct_counts(subject_codes)
 
     message_text = build_mockwaec_final_result_text(
         subject_codes=subject_codes,
@@ -4832,18 +4775,11 @@ async def mockwaec_resume_exam_handler(update: Update, context: ContextTypes.DEF
             context=context,
         )
         
-        answered_counts = {}
-        correct_counts = {}
 
         async with get_async_session() as session:
-            for code in subject_codes:
-                stats = await get_mockwaec_subject_result_stats(
-                    session,
-                    payment_reference=payment_reference,
-                    subject_code=code,
-                )
-                answered_counts[code] = int(stats.get("answered_count") or 0)
-                correct_counts[code] = int(stats.get("correct_count") or 0)
+            exam_result = await MOCKWAEC_RESULTS.for_session(session, payment_reference)
+            answered_counts = exam_result.answered_counts(subject_codes)
+            correct_counts = exam_result.correct_counts(subject_codes)
 
         message_text = build_mockwaec_final_result_text(
             subject_codes=subject_codes,
@@ -4908,22 +4844,11 @@ async def mockwaec_resume_exam_handler(update: Update, context: ContextTypes.DEF
                 force_show=True,
             ):
                 async with get_async_session() as range_session:
-                    result = await range_session.execute(
-                        text("""
-                            select
-                                question_order,
-                                question_json
-                            from public.mockwaec_subject_questions
-                            where payment_reference = :payment_reference
-                            and subject_code = :subject_code
-                            order by question_order asc
-                        """),
-                        {
-                            "payment_reference": payment_reference,
-                            "subject_code": current_subject_code,
-                        },
+                    paper_rows = await get_mockwaec_live_paper_rows(
+                        range_session,
+                        payment_reference=payment_reference,
+                        subject_code=current_subject_code,
                     )
-                    paper_rows = [dict(row) for row in result.mappings().all()]
 
                 passage_start, passage_end = get_passage_question_range(
                     paper_rows=paper_rows,
@@ -5023,18 +4948,11 @@ async def mockwaec_resume_exam_handler(update: Update, context: ContextTypes.DEF
         context=context,
     )
     
-    answered_counts = {}
-    correct_counts = {}
 
     async with get_async_session() as session:
-        for code in subject_codes:
-            stats = await get_mockwaec_subject_result_stats(
-                session,
-                payment_reference=payment_reference,
-                subject_code=code,
-            )
-            answered_counts[code] = int(stats.get("answered_count") or 0)
-            correct_counts[code] = int(stats.get("correct_count") or 0)
+        exam_result = await MOCKWAEC_RESULTS.for_session(session, payment_reference)
+        answered_counts = exam_result.answered_counts(subject_codes)
+        correct_counts = exam_result.correct_counts(subject_codes)
 
     message_text = build_mockwaec_final_result_text(
         subject_codes=subject_codes,
@@ -5212,10 +5130,45 @@ async def mockwaec_end_exam_handler(update: Update, context: ContextTypes.DEFAUL
             reply_markup=markup,
         )
 
+# ====================================================================
+# Exam time-up notice (fired by the shared timer wheel)
+# ====================================================================
+async def notify_mockwaec_exam_time_up(bot, payment_reference: str) -> None:
+    async with get_async_session() as session:
+        session_row = await get_mockwaec_session_by_payment_reference(session, payment_reference)
+
+    if not session_row:
+        return
+
+    status = str(session_row.get("status") or "").strip().lower()
+    if status not in ("ready", "in_progress"):
+        return
+
+    if not is_mockwaec_time_expired(session_row.get("exam_ends_at")):
+        return
+
+    await bot.send_message(
+        chat_id=int(session_row["user_id"]),
+        text=(
+            "⏱ *Time up!*\n\n"
+            "Your Mock WAEC / NECO exam time has ended.\n"
+            "Submit now to see your result."
+        ),
+        parse_mode="Markdown",
+        reply_markup=make_mockwaec_time_up_keyboard(),
+        rate_limit_args={"priority": PRIORITY_HIGH},
+    )
+
+
 # ====================================================================
 # Register Handlers
 # ====================================================================
 def register_handlers(application):
+    async def _exam_time_up(payment_reference: str, payload) -> None:
+        await notify_mockwaec_exam_time_up(application.bot, payment_reference)
+
+    get_timer_wheel().register_handler(MOCKWAEC_EXAM_KIND, _exam_time_up)
+
     application.add_handler(CommandHandler("mockwaec", mockwaec_start_handler))
     application.add_handler(CallbackQueryHandler(mockwaec_start_handler, pattern=r"^mock:waec$"))
     application.add_handler(CallbackQueryHandler(mockwaec_subjects_open_handler, pattern=r"^mw_subjects_open$"))
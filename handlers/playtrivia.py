@@ -6,9 +6,9 @@ import asyncio
 import random
 import logging
 import time
+from datetime import datetime, timezone
 
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Update
-from telegram.error import BadRequest
 from telegram.ext import (
     CommandHandler,
     CallbackQueryHandler,
@@ -17,15 +17,19 @@ from telegram.ext import (
 from sqlalchemy import text
 
 from db import get_async_session
-from helpers import get_or_create_user, consume_try
-from utils.questions_loader import get_next_question_for_user
+from send_scheduler import PRIORITY_LOW, fire_and_forget
+from helpers import get_or_create_user, consume_try, add_tries
+from utils.questions_loader import get_next_question_for_user, record_paid_question_seen
 from utils.signer import generate_signed_token
 from services.question_history_service import record_question_history, make_json_question_key
 from services.playtrivia import resolve_trivia_attempt, admin_add_cycle_points, admin_reset_cycle
 from services.airtime_service import create_pending_airtime_payout
+from services.leaderboard_service import mark_cycle_board_stale
+from services.deadline_service import TRIVIA_DEADLINE_KIND, clear_deadline, persist_deadline
+from services.timer_wheel import get_timer_wheel
 from handlers.leaderboard import _reward_rank, _next_reward
 
-from models import GameState, GlobalCounter
+from models import GameState
 
 logger = logging.getLogger(__name__)
 
@@ -221,29 +225,6 @@ async def trivia_category_handler(update: Update, context: ContextTypes.DEFAULT_
     q["category_label"] = category_label
     q["category_key"] = category_key
 
-    # ------------------------------------------------------------
-    # Record shared question history WHEN QUESTION IS SERVED
-    # so timed-out questions also count as seen.
-    # ------------------------------------------------------------
-    try:
-        question_key = q.get("id") or make_json_question_key(
-            category_key or "unknown",
-            q["question"],
-        )
-
-        if category_key:
-            async with get_async_session() as session:
-                async with session.begin():
-                    await record_question_history(
-                        session,
-                        tg_id=tg_user.id,
-                        source_type="json_paid",
-                        category=category_key,
-                        question_key=str(question_key),
-                    )
-    except Exception:
-        logger.exception("❌ Failed to record paid trivia question history on serve")
-
     context.user_data["pending_trivia_question"] = q
     context.user_data["trivia_answered"] = False
     context.user_data["trivia_processing_lock"] = False
@@ -278,60 +259,147 @@ async def trivia_category_handler(update: Update, context: ContextTypes.DEFAULT_
     )
 
     sent_msg = await query.message.reply_text(
-        question_text,
+        f"{question_text}\n\n⏳ *Time left:* {TRIVIA_TIMEOUT_SECONDS}s",
         parse_mode="Markdown",
         reply_markup=keyboard,
     )
 
     current_qid = str(q["id"])
+    tg_id = tg_user.id
+    deadline = context.user_data["trivia_deadline"]
 
-    async def countdown(message, base_text, kb_markup, secs: int, qid: str):
-        for remaining in range(secs, 0, -1):
-            current_question = context.user_data.get("pending_trivia_question")
+    # ------------------------------------------------------------
+    # Deadline + coarse countdown on the shared timer wheel
+    # (replaces one countdown task and one timeout task per player)
+    # ------------------------------------------------------------
+    async def countdown_tick(remaining: int) -> bool:
+        current_question = context.user_data.get("pending_trivia_question")
 
-            if context.user_data.get("trivia_answered", False):
-                break
+        if context.user_data.get("trivia_answered", False):
+            return False
 
-            if not current_question or str(current_question.get("id")) != qid:
-                break
+        if not current_question or str(current_question.get("id")) != current_qid:
+            return False
 
-            try:
-                await message.edit_text(
-                    f"{base_text}\n\n⏳ *Time left:* {remaining}s",
-                    parse_mode="Markdown",
-                    reply_markup=kb_markup,
-                )
-            except BadRequest:
-                break
-            except Exception:
-                break
+        fire_and_forget(
+            sent_msg.edit_text(
+                f"{question_text}\n\n⏳ *Time left:* {remaining}s",
+                parse_mode="Markdown",
+                reply_markup=keyboard,
+            ),
+            priority=PRIORITY_LOW,
+        )
+        return True
+
+    wheel = get_timer_wheel()
+    wheel.schedule_countdown(f"trivia:{tg_id}", deadline, countdown_tick)
+    wheel.schedule(
+        TRIVIA_DEADLINE_KIND,
+        str(tg_id),
+        deadline,
+        payload={
+            "chat_id": sent_msg.chat_id,
+            "message_id": sent_msg.message_id,
+            "question_id": current_qid,
+            "update": update,
+            "context": context,
+        },
+    )
 
-            await asyncio.sleep(1)
+    # ------------------------------------------------------------
+    # Record shared question history WHEN QUESTION IS SERVED
+    # so timed-out questions also count as seen; persist the
+    # deadline in the same transaction so a restart can re-arm it.
+    # ------------------------------------------------------------
+    try:
+        question_key = q.get("id") or make_json_question_key(
+            category_key or "unknown",
+            q["question"],
+        )
 
-    asyncio.create_task(
-        countdown(sent_msg, question_text, keyboard, TRIVIA_TIMEOUT_SECONDS, current_qid)
-    )
+        async with get_async_session() as session:
+            async with session.begin():
+                if category_key:
+                    await record_question_history(
+                        session,
+                        tg_id=tg_id,
+                        source_type="json_paid",
+                        category=category_key,
+                        question_key=str(question_key),
+                    )
+                    await record_paid_question_seen(
+                        session,
+                        tg_id=tg_id,
+                        category=category_key,
+                        question_id=str(question_key),
+                    )
+                await persist_deadline(
+                    session,
+                    kind=TRIVIA_DEADLINE_KIND,
+                    key=str(tg_id),
+                    due_at=datetime.fromtimestamp(deadline, tz=timezone.utc),
+                    payload={
+                        "chat_id": sent_msg.chat_id,
+                        "message_id": sent_msg.message_id,
+                        "question_id": current_qid,
+                    },
+                )
+    except Exception:
+        logger.exception("❌ Failed to record paid trivia question history on serve")
 
-    old_timer = context.user_data.get("trivia_timer")
-    if isinstance(old_timer, asyncio.Task) and not old_timer.done():
-        old_timer.cancel()
 
-    context.user_data["trivia_timer"] = asyncio.create_task(
-        trivia_timeout_task(update, context, sent_msg.message_id, TRIVIA_TIMEOUT_SECONDS)
-    )
+def cancel_trivia_timers(tg_id: int) -> None:
+    wheel = get_timer_wheel()
+    wheel.cancel(TRIVIA_DEADLINE_KIND, str(tg_id))
+    wheel.cancel_countdown(f"trivia:{tg_id}")
 
 
 # ================================================================
-# ⏱️ TRIVIA TIMEOUT TASK
+# ⏱️ TRIVIA TIMEOUT (timer wheel handler)
 # ================================================================
-async def trivia_timeout_task(
+async def trivia_deadline_timer(tg_id: str, payload: dict):
+    """
+    Live deadline -> process the round as incorrect (as before).
+    Deadline restored after a restart -> the round state is gone, so just
+    close the question message; no attempt was consumed.
+    """
+    update = payload.get("update")
+    context = payload.get("context")
+
+    if update is not None and context is not None:
+        await handle_trivia_timeout(update, context, int(payload["message_id"]))
+        return
+
+    from bot_instance import bot
+
+    try:
+        await bot.edit_message_text(
+            chat_id=int(payload["chat_id"]),
+            message_id=int(payload["message_id"]),
+            text=(
+                "⏳ *Time’s up!*\n\n"
+                "This round expired while the bot was restarting. "
+                "No attempt was used."
+            ),
+            parse_mode="Markdown",
+            reply_markup=make_play_keyboard(),
+        )
+    except Exception:
+        pass
+
+    try:
+        async with get_async_session() as session:
+            async with session.begin():
+                await clear_deadline(session, kind=TRIVIA_DEADLINE_KIND, key=str(tg_id))
+    except Exception:
+        logger.exception("❌ Failed to clear restored trivia deadline | tg_id=%s", tg_id)
+
+
+async def handle_trivia_timeout(
     update: Update,
     context: ContextTypes.DEFAULT_TYPE,
     message_id: int,
-    timeout_seconds: int,
 ):
-    await asyncio.sleep(timeout_seconds)
-
     if context.user_data.get("trivia_answered", False):
         return
 
@@ -342,6 +410,8 @@ async def trivia_timeout_task(
     context.user_data["trivia_answered"] = True
     context.user_data["is_correct_answer"] = False
 
+    get_timer_wheel().cancel_countdown(f"trivia:{update.effective_user.id}")
+
     try:
         await context.bot.edit_message_text(
             chat_id=update.effective_chat.id,
@@ -390,12 +460,7 @@ async def trivia_answer_handler(update: Update, context: ContextTypes.DEFAULT_TY
     except Exception:
         pass
 
-    timer = context.user_data.pop("trivia_timer", None)
-    if isinstance(timer, asyncio.Task) and not timer.done():
-        try:
-            timer.cancel()
-        except Exception:
-            pass
+    cancel_trivia_timers(query.from_user.id)
 
     try:
         _, qid, selected = query.data.split("_", 2)
@@ -459,16 +524,17 @@ async def run_spin_and_apply_reward(update: Update, context: ContextTypes.DEFAUL
     for _ in range(random.randint(7, 12)):
         frame = " ".join(random.choice(symbols) for _ in range(3))
         if frame != last_frame:
-            try:
-                await msg.edit_text(f"🎡 {frame}")
-            except Exception:
-                pass
+            # Not awaited: queued frames coalesce, the result edit below wins.
+            fire_and_forget(msg.edit_text(f"🎡 {frame}"), priority=PRIORITY_LOW)
             last_frame = frame
         await asyncio.sleep(0.30)
 
     try:
         async with get_async_session() as session:
             async with session.begin():
+                # Round resolved: nothing to re-arm after a restart
+                await clear_deadline(session, kind=TRIVIA_DEADLINE_KIND, key=str(tg_id))
+
                 user = await get_or_create_user(
                     session,
                     tg_id=tg_id,
@@ -957,6 +1023,7 @@ async def resetpoints_handler(update: Update, context: ContextTypes.DEFAULT_TYPE
                 text("""
                     UPDATE user_cycle_stats
                     SET points = 0,
+                        points_reached_at = NULL,
                         updated_at = NOW()
                     WHERE user_id = :uid
                       AND cycle_id = :cycle
@@ -966,6 +1033,7 @@ async def resetpoints_handler(update: Update, context: ContextTypes.DEFAULT_TYPE
                     "cycle": cycle_id,
                 },
             )
+            mark_cycle_board_stale(session, cycle_id=cycle_id)
 
     return await update.effective_message.reply_text(
         f"♻️ Points reset successful.\n\n"
@@ -1009,26 +1077,7 @@ async def addtries_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 full_name=getattr(tg, "full_name", None),
             )
 
-            user.tries_paid = int(user.tries_paid or 0) + count
-
-            gc = await session.get(GlobalCounter, 1)
-            if not gc:
-                gc = GlobalCounter(id=1, paid_tries_total=0)
-                session.add(gc)
-
-            gs = await session.get(GameState, 1)
-            if not gs:
-                gs = GameState(
-                    id=1,
-                    current_cycle=1,
-                    paid_tries_this_cycle=0,
-                    lifetime_paid_tries=0,
-                )
-                session.add(gs)
-
-            gc.paid_tries_total += count
-            gs.paid_tries_this_cycle += count
-            gs.lifetime_paid_tries += count
+            await add_tries(session, user, count, paid=True)
 
     return await update.effective_message.reply_text(
         f"✅ Added *{count} paid tries*\n\n"
@@ -1076,6 +1125,8 @@ async def resetcycle_handler(update: Update, context: ContextTypes.DEFAULT_TYPE)
 # REGISTER HANDLERS
 # ================================================================
 def register_handlers(application, handle_buy_callback=None, free_menu=None):
+    get_timer_wheel().register_handler(TRIVIA_DEADLINE_KIND, trivia_deadline_timer)
+
     application.add_handler(CallbackQueryHandler(trivia_category_handler, pattern=r"^cat_"))
     application.add_handler(CallbackQueryHandler(trivia_answer_handler, pattern=r"^ans_.+_[A-D]$"))
     application.add_handler(CommandHandler("playtrivia", playtrivia_handler))
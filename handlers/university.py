@@ -17,6 +17,15 @@ from helpers import md_escape
 from services.flutterwave_client import create_checkout, build_tx_ref
 from services.university_payments import create_pending_university_payment
 from db import get_async_session
+from question_refs import (
+    EXAM_UNIVERSITY,
+    current_version,
+    hydrate_rows,
+    question_ref,
+    register,
+    university_scope,
+)
+from services.practice_repository import UNIVERSITY_PRACTICE, CHARGE_FREE, CHARGE_PAID
 from university_loader import (
     get_university_categories,
     get_university_category_by_code,
@@ -181,174 +190,6 @@ async def deduct_one_mock_session(user_id: int) -> bool:
             return row is not None
 
 
-async def deduct_one_free_question(user_id: int) -> bool:
-    """
-    Deduct 1 free question if available.
-    Returns True if deducted, False otherwise.
-    """
-    async with get_async_session() as session:
-        async with session.begin():
-            result = await session.execute(
-                text("""
-                    update university_user_access
-                    set
-                        free_questions_remaining = free_questions_remaining - 1,
-                        total_questions_used = total_questions_used + 1,
-                        updated_at = now()
-                    where user_id = :user_id
-                      and free_questions_remaining > 0
-                    returning free_questions_remaining
-                """),
-                {"user_id": user_id},
-            )
-            row = result.first()
-            return row is not None
-
-
-async def deduct_one_paid_question(user_id: int) -> bool:
-    """
-    Deduct 1 paid question credit if available.
-    Returns True if deducted, False otherwise.
-    """
-    async with get_async_session() as session:
-        async with session.begin():
-            result = await session.execute(
-                text("""
-                    update university_user_access
-                    set
-                        paid_question_credits = paid_question_credits - 1,
-                        total_questions_used = total_questions_used + 1,
-                        updated_at = now()
-                    where user_id = :user_id
-                      and paid_question_credits > 0
-                    returning paid_question_credits
-                """),
-                {"user_id": user_id},
-            )
-            row = result.first()
-            return row is not None
-
-
-async def add_question_to_topic_history(
-    user_id: int,
-    subject_code: str,
-    topic_id: str,
-    question_id: str,
-):
-    async with get_async_session() as session:
-        async with session.begin():
-            await session.execute(
-                text("""
-                    insert into university_user_topic_history (
-                        user_id,
-                        subject_code,
-                        topic_id,
-                        question_id
-                    )
-                    values (
-                        :user_id,
-                        :subject_code,
-                        :topic_id,
-                        :question_id
-                    )
-                    on conflict (user_id, subject_code, topic_id, question_id) do nothing
-                """),
-                {
-                    "user_id": user_id,
-                    "subject_code": subject_code,
-                    "topic_id": topic_id,
-                    "question_id": question_id,
-                },
-            )
-
-
-async def record_university_attempt(
-    session_id: int,
-    user_id: int,
-    subject_code: str,
-    topic_id: str,
-    question_id: str,
-    selected_option: str,
-    correct_option: str,
-    is_correct: bool,
-):
-    async with get_async_session() as session:
-        async with session.begin():
-            await session.execute(
-                text("""
-                    insert into university_attempts (
-                        session_id,
-                        user_id,
-                        subject_code,
-                        topic_id,
-                        question_id,
-                        selected_option,
-                        correct_option,
-                        is_correct
-                    )
-                    values (
-                        :session_id,
-                        :user_id,
-                        :subject_code,
-                        :topic_id,
-                        :question_id,
-                        :selected_option,
-                        :correct_option,
-                        :is_correct
-                    )
-                """),
-                {
-                    "session_id": session_id,
-                    "user_id": user_id,
-                    "subject_code": subject_code,
-                    "topic_id": topic_id,
-                    "question_id": question_id,
-                    "selected_option": selected_option,
-                    "correct_option": correct_option,
-                    "is_correct": is_correct,
-                },
-            )
-
-
-async def increment_university_session_served(session_id: int):
-    async with get_async_session() as session:
-        async with session.begin():
-            await session.execute(
-                text("""
-                    update university_sessions
-                    set
-                        questions_served = questions_served + 1
-                    where id = :session_id
-                """),
-                {"session_id": session_id},
-            )
-
-
-async def increment_university_session_result(session_id: int, is_correct: bool):
-    async with get_async_session() as session:
-        async with session.begin():
-            if is_correct:
-                await session.execute(
-                    text("""
-                        update university_sessions
-                        set
-                            correct_count = correct_count + 1
-                        where id = :session_id
-                    """),
-                    {"session_id": session_id},
-                )
-            else:
-                await session.execute(
-                    text("""
-                        update university_sessions
-                        set
-                            wrong_count = wrong_count + 1
-                        where id = :session_id
-                    """),
-                    {"session_id": session_id},
-                )
-
-
 async def complete_university_session(session_id: int):
     async with get_async_session() as session:
         async with session.begin():
@@ -546,6 +387,8 @@ async def deduct_paid_questions(user_id: int, question_count: int) -> bool:
 
 
 async def get_latest_active_university_mock_session_for_user(user_id: int, subject_code: str) -> Optional[dict]:
+    await UNIVERSITY_PRACTICE.sync()
+
     async with get_async_session() as session:
         result = await session.execute(
             text("""
@@ -601,6 +444,8 @@ async def set_university_session_current_question_index(session_id: int, current
 
 
 async def get_university_session_paper(session_id: int) -> list[dict]:
+    await UNIVERSITY_PRACTICE.sync()
+
     async with get_async_session() as session:
         result = await session.execute(
             text("""
@@ -612,6 +457,7 @@ async def get_university_session_paper(session_id: int) -> list[dict]:
                     question_id,
                     question_order,
                     question_json,
+                    content_version,
                     correct_option,
                     selected_option,
                     is_correct,
@@ -624,7 +470,7 @@ async def get_university_session_paper(session_id: int) -> list[dict]:
             {"session_id": int(session_id)},
         )
         rows = result.mappings().all()
-        return [dict(row) for row in rows]
+        return await hydrate_rows(session, [dict(row) for row in rows])
 
 
 async def create_university_course_mock_paper_if_needed(
@@ -657,9 +503,15 @@ async def create_university_course_mock_paper_if_needed(
 
     selected_questions = batch["selected_questions"]
 
+    cv = current_version(EXAM_UNIVERSITY, university_scope(category_code, subject_code))
+
+    refs = [question_ref(cv, question) for question in selected_questions]
+
     async with get_async_session() as session:
         async with session.begin():
-            for idx, question in enumerate(selected_questions, start=1):
+            if any(content_version for content_version, _ in refs):
+                await register(session, cv)
+            for idx, (question, (content_version, question_json)) in enumerate(zip(selected_questions, refs), start=1):
                 await session.execute(
                     text("""
                         insert into university_session_questions (
@@ -669,6 +521,7 @@ async def create_university_course_mock_paper_if_needed(
                             question_id,
                             question_order,
                             question_json,
+                            content_version,
                             correct_option,
                             selected_option,
                             is_correct,
@@ -682,6 +535,7 @@ async def create_university_course_mock_paper_if_needed(
                             :question_id,
                             :question_order,
                             :question_json,
+                            :content_version,
                             :correct_option,
                             null,
                             null,
@@ -696,7 +550,8 @@ async def create_university_course_mock_paper_if_needed(
                         "subject_code": subject_code,
                         "question_id": str(question.get("id")),
                         "question_order": idx,
-                        "question_json": json.dumps(question),
+                        "question_json": question_json,
+                        "content_version": content_version,
                         "correct_option": extract_correct_option(question),
                     },
                 )
@@ -769,6 +624,8 @@ async def create_university_mock_session(
 
 
 async def get_university_session_by_id(session_id: int) -> Optional[dict]:
+    await UNIVERSITY_PRACTICE.sync()
+
     async with get_async_session() as session:
         result = await session.execute(
             text("""
@@ -2543,55 +2400,49 @@ async def send_current_university_question(update: Update, context: ContextTypes
     if question_id not in served_question_ids:
 
         if session_mode == "free_trial":
-            deducted = await deduct_one_free_question(user_id)
+            charged = await UNIVERSITY_PRACTICE.record_served(
+                session_id=session_id,
+                user_id=user_id,
+                subject_code=subject_code,
+                topic_id=topic_id,
+                question_id=question_id,
+                charge=CHARGE_FREE,
+            )
 
-            if not deducted:
+            if not charged:
                 return await update.effective_message.reply_text(
                     "⚠️ You have no free question balance left\\.\n\n"
                     "Please buy a question pack to continue\\.",
                     parse_mode="MarkdownV2",
                 )
 
-            await add_question_to_topic_history(
+        elif session_mode == "paid_session":
+            charged = await UNIVERSITY_PRACTICE.record_served(
+                session_id=session_id,
                 user_id=user_id,
                 subject_code=subject_code,
                 topic_id=topic_id,
                 question_id=question_id,
+                charge=CHARGE_PAID,
             )
 
-            if session_id:
-                await increment_university_session_served(
-                    int(session_id)
-                )
-
-        elif session_mode == "paid_session":
-            deducted = await deduct_one_paid_question(user_id)
-
-            if not deducted:
+            if not charged:
                 return await update.effective_message.reply_text(
                     "⚠️ You have no paid UNIVERSITY question credits left\\.\n\n"
                     "Please buy another question pack to continue\\.",
                     parse_mode="MarkdownV2",
                 )
 
-            await add_question_to_topic_history(
+        elif session_mode == "course_mock":
+            await UNIVERSITY_PRACTICE.record_served(
+                session_id=session_id,
                 user_id=user_id,
                 subject_code=subject_code,
                 topic_id=topic_id,
                 question_id=question_id,
+                charge=None,
             )
 
-            if session_id:
-                await increment_university_session_served(
-                    int(session_id)
-                )
-
-        elif session_mode == "course_mock":
-            if session_id:
-                await increment_university_session_served(
-                    int(session_id)
-                )
-
         served_question_ids.append(question_id)
 
         context.user_data["ut_served_question_ids"] = (
@@ -2827,7 +2678,7 @@ async def university_answer_handler(update: Update, context: ContextTypes.DEFAUL
     is_correct = selected_option == correct_option
     question_order = int(context.user_data.get("ut_current_index", 0)) + 1
 
-    await record_university_attempt(
+    await UNIVERSITY_PRACTICE.record_answer(
         session_id=session_id,
         user_id=user_id,
         subject_code=subject_code,
@@ -2836,31 +2687,9 @@ async def university_answer_handler(update: Update, context: ContextTypes.DEFAUL
         selected_option=selected_option,
         correct_option=correct_option,
         is_correct=is_correct,
+        question_order=question_order if session_mode == "course_mock" else None,
     )
 
-    await increment_university_session_result(session_id, is_correct)
-
-    if session_mode == "course_mock":
-        async with get_async_session() as session:
-            async with session.begin():
-                await session.execute(
-                    text("""
-                        update university_session_questions
-                        set
-                            selected_option = :selected_option,
-                            is_correct = :is_correct,
-                            updated_at = now()
-                        where session_id = :session_id
-                          and question_order = :question_order
-                    """),
-                    {
-                        "session_id": int(session_id),
-                        "question_order": int(question_order),
-                        "selected_option": selected_option,
-                        "is_correct": bool(is_correct),
-                    },
-                )
-
     context.user_data["ut_answered_current"] = True
     context.user_data["ut_last_selected_option"] = selected_option
     context.user_data["ut_last_correct_option"] = correct_option
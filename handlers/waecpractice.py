@@ -15,6 +15,8 @@ from helpers import md_escape
 from services.flutterwave_client import create_checkout, build_tx_ref, calculate_waec_credits
 from services.waec_payments import create_pending_waec_payment
 from db import get_async_session
+from question_refs import EXAM_WAEC, current_version, hydrate_rows, question_ref, register
+from services.practice_repository import WAEC_PRACTICE, CHARGE_FREE, CHARGE_PAID
 from waec_loader import (
     get_waec_subjects,
     get_waec_subject_by_code,
@@ -204,174 +206,6 @@ async def deduct_one_waec_mock_session(user_id: int) -> bool:
             return row is not None
 
 
-async def deduct_one_free_question(user_id: int) -> bool:
-    """
-    Deduct 1 free question if available.
-    Returns True if deducted, False otherwise.
-    """
-    async with get_async_session() as session:
-        async with session.begin():
-            result = await session.execute(
-                text("""
-                    update waec_user_access
-                    set
-                        free_questions_remaining = free_questions_remaining - 1,
-                        total_questions_used = total_questions_used + 1,
-                        updated_at = now()
-                    where user_id = :user_id
-                      and free_questions_remaining > 0
-                    returning free_questions_remaining
-                """),
-                {"user_id": user_id},
-            )
-            row = result.first()
-            return row is not None
-
-
-async def deduct_one_paid_question(user_id: int) -> bool:
-    """
-    Deduct 1 paid question credit if available.
-    Returns True if deducted, False otherwise.
-    """
-    async with get_async_session() as session:
-        async with session.begin():
-            result = await session.execute(
-                text("""
-                    update waec_user_access
-                    set
-                        paid_question_credits = paid_question_credits - 1,
-                        total_questions_used = total_questions_used + 1,
-                        updated_at = now()
-                    where user_id = :user_id
-                      and paid_question_credits > 0
-                    returning paid_question_credits
-                """),
-                {"user_id": user_id},
-            )
-            row = result.first()
-            return row is not None
-
-
-async def add_question_to_topic_history(
-    user_id: int,
-    subject_code: str,
-    topic_id: str,
-    question_id: str,
-):
-    async with get_async_session() as session:
-        async with session.begin():
-            await session.execute(
-                text("""
-                    insert into waec_user_topic_history (
-                        user_id,
-                        subject_code,
-                        topic_id,
-                        question_id
-                    )
-                    values (
-                        :user_id,
-                        :subject_code,
-                        :topic_id,
-                        :question_id
-                    )
-                    on conflict (user_id, subject_code, topic_id, question_id) do nothing
-                """),
-                {
-                    "user_id": user_id,
-                    "subject_code": subject_code,
-                    "topic_id": topic_id,
-                    "question_id": question_id,
-                },
-            )
-
-
-async def record_waec_attempt(
-    session_id: int,
-    user_id: int,
-    subject_code: str,
-    topic_id: str,
-    question_id: str,
-    selected_option: str,
-    correct_option: str,
-    is_correct: bool,
-):
-    async with get_async_session() as session:
-        async with session.begin():
-            await session.execute(
-                text("""
-                    insert into waec_attempts (
-                        session_id,
-                        user_id,
-                        subject_code,
-                        topic_id,
-                        question_id,
-                        selected_option,
-                        correct_option,
-                        is_correct
-                    )
-                    values (
-                        :session_id,
-                        :user_id,
-                        :subject_code,
-                        :topic_id,
-                        :question_id,
-                        :selected_option,
-                        :correct_option,
-                        :is_correct
-                    )
-                """),
-                {
-                    "session_id": session_id,
-                    "user_id": user_id,
-                    "subject_code": subject_code,
-                    "topic_id": topic_id,
-                    "question_id": question_id,
-                    "selected_option": selected_option,
-                    "correct_option": correct_option,
-                    "is_correct": is_correct,
-                },
-            )
-
-
-async def increment_waec_session_served(session_id: int):
-    async with get_async_session() as session:
-        async with session.begin():
-            await session.execute(
-                text("""
-                    update waec_sessions
-                    set
-                        questions_served = questions_served + 1
-                    where id = :session_id
-                """),
-                {"session_id": session_id},
-            )
-
-
-async def increment_waec_session_result(session_id: int, is_correct: bool):
-    async with get_async_session() as session:
-        async with session.begin():
-            if is_correct:
-                await session.execute(
-                    text("""
-                        update waec_sessions
-                        set
-                            correct_count = correct_count + 1
-                        where id = :session_id
-                    """),
-                    {"session_id": session_id},
-                )
-            else:
-                await session.execute(
-                    text("""
-                        update waec_sessions
-                        set
-                            wrong_count = wrong_count + 1
-                        where id = :session_id
-                    """),
-                    {"session_id": session_id},
-                )
-
-
 async def complete_waec_session(session_id: int):
     async with get_async_session() as session:
         async with session.begin():
@@ -577,6 +411,8 @@ async def deduct_paid_questions(user_id: int, question_count: int) -> bool:
 
 
 async def get_latest_active_waec_mock_session_for_user(user_id: int, subject_code: str) -> Optional[dict]:
+    await WAEC_PRACTICE.sync()
+
     async with get_async_session() as session:
         result = await session.execute(
             text("""
@@ -632,6 +468,8 @@ async def set_waec_session_current_question_index(session_id: int, current_quest
 
 
 async def get_waec_session_paper(session_id: int) -> list[dict]:
+    await WAEC_PRACTICE.sync()
+
     async with get_async_session() as session:
         result = await session.execute(
             text("""
@@ -643,6 +481,7 @@ async def get_waec_session_paper(session_id: int) -> list[dict]:
                     question_id,
                     question_order,
                     question_json,
+                    content_version,
                     correct_option,
                     selected_option,
                     is_correct,
@@ -655,7 +494,7 @@ async def get_waec_session_paper(session_id: int) -> list[dict]:
             {"session_id": int(session_id)},
         )
         rows = result.mappings().all()
-        return [dict(row) for row in rows]
+        return await hydrate_rows(session, [dict(row) for row in rows])
 
 
 async def create_waec_subject_mock_paper_if_needed(
@@ -691,9 +530,15 @@ async def create_waec_subject_mock_paper_if_needed(
 
     selected_questions = batch["selected_questions"]
 
+    cv = current_version(EXAM_WAEC, subject_code)
+
+    refs = [question_ref(cv, question) for question in selected_questions]
+
     async with get_async_session() as session:
         async with session.begin():
-            for idx, question in enumerate(selected_questions, start=1):
+            if any(content_version for content_version, _ in refs):
+                await register(session, cv)
+            for idx, (question, (content_version, question_json)) in enumerate(zip(selected_questions, refs), start=1):
                 await session.execute(
                     text("""
                         insert into waec_session_questions (
@@ -703,6 +548,7 @@ async def create_waec_subject_mock_paper_if_needed(
                             question_id,
                             question_order,
                             question_json,
+                            content_version,
                             correct_option,
                             selected_option,
                             is_correct,
@@ -716,6 +562,7 @@ async def create_waec_subject_mock_paper_if_needed(
                             :question_id,
                             :question_order,
                             :question_json,
+                            :content_version,
                             :correct_option,
                             null,
                             null,
@@ -730,7 +577,8 @@ async def create_waec_subject_mock_paper_if_needed(
                         "subject_code": subject_code,
                         "question_id": str(question.get("id")),
                         "question_order": idx,
-                        "question_json": json.dumps(question),
+                        "question_json": question_json,
+                        "content_version": content_version,
                         "correct_option": extract_correct_option(question),
                     },
                 )
@@ -803,6 +651,8 @@ async def create_waec_mock_session(
 
 
 async def get_waec_session_by_id(session_id: int) -> Optional[dict]:
+    await WAEC_PRACTICE.sync()
+
     async with get_async_session() as session:
         result = await session.execute(
             text("""
@@ -2147,45 +1997,45 @@ async def send_current_waec_question(update: Update, context: ContextTypes.DEFAU
     # Charge and record history when question is served, not when answered
     if question_id not in served_question_ids:
         if session_mode == "free_trial":
-            deducted = await deduct_one_free_question(user_id)
-            if not deducted:
+            charged = await WAEC_PRACTICE.record_served(
+                session_id=session_id,
+                user_id=user_id,
+                subject_code=subject_code,
+                topic_id=topic_id,
+                question_id=question_id,
+                charge=CHARGE_FREE,
+            )
+            if not charged:
                 return await update.effective_message.reply_text(
                     "⚠️ You have no free question balance left\\.\n\nPlease buy a question pack to continue\\.",
                     parse_mode="MarkdownV2",
                 )
 
-            await add_question_to_topic_history(
+        elif session_mode == "paid_session":
+            charged = await WAEC_PRACTICE.record_served(
+                session_id=session_id,
                 user_id=user_id,
                 subject_code=subject_code,
                 topic_id=topic_id,
                 question_id=question_id,
+                charge=CHARGE_PAID,
             )
-
-            if session_id:
-                await increment_waec_session_served(int(session_id))
-
-        elif session_mode == "paid_session":
-            deducted = await deduct_one_paid_question(user_id)
-            if not deducted:
+            if not charged:
                 return await update.effective_message.reply_text(
                     "⚠️ You have no paid waec question credits left\\.\n\nPlease buy another question pack to continue\\.",
                     parse_mode="MarkdownV2",
                 )
 
-            await add_question_to_topic_history(
+        elif session_mode == "mock_by_subject":
+            await WAEC_PRACTICE.record_served(
+                session_id=session_id,
                 user_id=user_id,
                 subject_code=subject_code,
                 topic_id=topic_id,
                 question_id=question_id,
+                charge=None,
             )
 
-            if session_id:
-                await increment_waec_session_served(int(session_id))
-
-        elif session_mode == "mock_by_subject":
-            if session_id:
-                await increment_waec_session_served(int(session_id))
-
         served_question_ids.append(question_id)
         context.user_data["wp_served_question_ids"] = served_question_ids
 
@@ -2458,7 +2308,7 @@ async def waec_answer_handler(update: Update, context: ContextTypes.DEFAULT_TYPE
             + 1
         )
 
-        await record_waec_attempt(
+        await WAEC_PRACTICE.record_answer(
             session_id=session_id,
             user_id=user_id,
             subject_code=subject_code,
@@ -2467,37 +2317,9 @@ async def waec_answer_handler(update: Update, context: ContextTypes.DEFAULT_TYPE
             selected_option=selected_option,
             correct_option=correct_option,
             is_correct=is_correct,
+            question_order=question_order if session_mode == "mock_by_subject" else None,
         )
 
-        await increment_waec_session_result(
-            session_id,
-            is_correct,
-        )
-
-        if session_mode == "mock_by_subject":
-
-            async with get_async_session() as session:
-
-                async with session.begin():
-
-                    await session.execute(
-                        text("""
-                            UPDATE waec_session_questions
-                            SET
-                                selected_option = :selected_option,
-                                is_correct = :is_correct,
-                                updated_at = NOW()
-                            WHERE session_id = :session_id
-                              AND question_order = :question_order
-                        """),
-                        {
-                            "session_id": session_id,
-                            "question_order": question_order,
-                            "selected_option": selected_option,
-                            "is_correct": is_correct,
-                        },
-                    )
-
         context.user_data[
             "wp_last_selected_option"
         ] = selected_option
@@ -2,7 +2,6 @@
 # helpers.py (SAFE ASYNC HELPERS — NO COMMITS INSIDE)
 # ===============================================================
 import logging
-import time
 from datetime import datetime
 from typing import Optional, Union
 
@@ -10,6 +9,8 @@ from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from models import User, GameState, GlobalCounter, Play
+from services.paid_try_counter import add_paid_tries, mark_cycle_end_pending
+from services.playtrivia import WIN_THRESHOLD
 
 logger = logging.getLogger(__name__)
 
@@ -128,8 +129,8 @@ async def add_tries(
     Increment user's tries (paid or bonus) inside an active session.
 
     - No commit here.
-    - If paid, updates GameState counters (cycle + lifetime).
-    - Optionally updates GlobalCounter if you still use it elsewhere.
+    - If paid, counts them on the striped paid-try counter (cycle,
+      lifetime and purchased totals; services/paid_try_counter.py).
 
     Returns updated User or None if user not found.
     """
@@ -147,26 +148,28 @@ async def add_tries(
     if paid:
         user.tries_paid = int(user.tries_paid or 0) + int(count)
 
-        # cycle system counters
+        # cycle system counters (no game_state row lock)
         gs = await ensure_game_state(session)
-        gs.paid_tries_this_cycle = int(gs.paid_tries_this_cycle or 0) + int(count)
-        gs.lifetime_paid_tries = int(gs.lifetime_paid_tries or 0) + int(count)
-        gs.updated_at = datetime.utcnow()
-
-        # optional global counter (safe)
-        try:
-            gc = await ensure_global_counter(session)
-            gc.paid_tries_total = int(gc.paid_tries_total or 0) + int(count)
-        except Exception:
-            pass
+        cycle_id = int(gs.current_cycle or 1)
+        quota_reached = await add_paid_tries(
+            session,
+            cycle_id=cycle_id,
+            count=int(count),
+            user_id=user.id,
+            win_threshold=WIN_THRESHOLD,
+            purchased=True,
+        )
+        if quota_reached:
+            # The winner is picked by the next paid attempt
+            await mark_cycle_end_pending(session, cycle_id=cycle_id)
 
         logger.info(
-            "✅ add_tries paid | tg_id=%s | +%s | paid=%s | cycle_paid=%s | lifetime=%s",
+            "✅ add_tries paid | tg_id=%s | +%s | paid=%s | cycle=%s | quota_reached=%s",
             user.tg_id,
             count,
             user.tries_paid,
-            gs.paid_tries_this_cycle,
-            gs.lifetime_paid_tries,
+            cycle_id,
+            quota_reached,
         )
 
     else:
@@ -258,18 +261,3 @@ def mask_sensitive(data: str, visible: int = 4) -> str:
     if len(data) <= visible:
         return data
     return f"{'*' * (len(data) - visible)}{data[-visible:]}"
-
-
-# -------------------------------
-# 🚦 Rate Limiting Helper
-# --------------------------------
-_LAST_WEBHOOK_CALL = {}
-_RATE_LIMIT_SECONDS = 10
-
-def is_rate_limited(tx_ref: str) -> bool:
-    now = time.time()
-    last_call = _LAST_WEBHOOK_CALL.get(tx_ref, 0)
-    if now - last_call < _RATE_LIMIT_SECONDS:
-        return True
-    _LAST_WEBHOOK_CALL[tx_ref] = now
-    return False
@@ -0,0 +1,292 @@
+# ====================================================================
+# http_clients.py
+# Application-lifetime HTTP clients for the payment / payout providers.
+#
+# One pooled httpx.AsyncClient per provider ("flutterwave",
+# "clubkonnect"), kept open for the life of the process so requests
+# reuse keep-alive connections instead of paying a TCP + TLS handshake
+# every call. HTTP/2 is negotiated when the optional `h2` package is
+# installed (pip install "httpx[http2]"); otherwise HTTP/1.1 pools.
+#
+# request() is the single entry point:
+#   - per-provider timeouts (connect / read / write / pool)
+#   - retries with exponential backoff + full jitter on connection
+#     errors, timeouts, 429 and 5xx. Requests that are not idempotent
+#     (POST, or a GET that buys airtime) are only retried when the
+#     request never reached the provider (connect / pool errors).
+#   - a latency histogram per (provider, endpoint label), exposed via
+#     stats() on /health.
+#
+# start() opens the pools in the FastAPI startup hook; close() closes
+# them on shutdown. A client used before start() (scripts, the notifier
+# run standalone) is opened lazily.
+# ====================================================================
+from __future__ import annotations
+
+import asyncio
+import importlib.util
+import logging
+import os
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+logger = logging.getLogger("http_clients")
+
+HTTP_ENABLE_HTTP2 = os.getenv("HTTP_ENABLE_HTTP2", "1").strip().lower() in ("1", "true", "yes")
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "2"))
+HTTP_RETRY_BASE_MS = int(os.getenv("HTTP_RETRY_BASE_MS", "250"))
+HTTP_RETRY_MAX_MS = int(os.getenv("HTTP_RETRY_MAX_MS", "4000"))
+HTTP_KEEPALIVE_SECONDS = float(os.getenv("HTTP_KEEPALIVE_SECONDS", "30"))
+
+# Upper bounds (ms) of the latency buckets; the last bucket is open-ended.
+LATENCY_BUCKETS_MS = (25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+RETRY_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+
+# Raised before any byte of the request was sent: always safe to retry.
+_NOT_SENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+
+@dataclass(slots=True)
+class ProviderConfig:
+    timeout: httpx.Timeout
+    max_connections: int
+    max_retries: int = HTTP_MAX_RETRIES
+
+
+PROVIDERS: Dict[str, ProviderConfig] = {
+    "flutterwave": ProviderConfig(
+        timeout=httpx.Timeout(
+            connect=float(os.getenv("FLW_CONNECT_TIMEOUT_SECONDS", "10")),
+            read=float(os.getenv("FLW_READ_TIMEOUT_SECONDS", "30")),
+            write=30.0,
+            pool=30.0,
+        ),
+        max_connections=int(os.getenv("FLW_MAX_CONNECTIONS", "20")),
+    ),
+    "clubkonnect": ProviderConfig(
+        timeout=httpx.Timeout(
+            connect=10.0,
+            read=float(os.getenv("CLUBKONNECT_TIMEOUT_SECONDS", "30")),
+            write=30.0,
+            pool=30.0,
+        ),
+        max_connections=int(os.getenv("CLUBKONNECT_MAX_CONNECTIONS", "16")),
+    ),
+}
+
+
+@dataclass(slots=True)
+class LatencyHistogram:
+    buckets: List[int] = field(default_factory=lambda: [0] * (len(LATENCY_BUCKETS_MS) + 1))
+    count: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+    errors: int = 0
+    retries: int = 0
+
+    def observe(self, elapsed_ms: float) -> None:
+        i = 0
+        while i < len(LATENCY_BUCKETS_MS) and elapsed_ms > LATENCY_BUCKETS_MS[i]:
+            i += 1
+        self.buckets[i] += 1
+        self.count += 1
+        self.total_ms += elapsed_ms
+        if elapsed_ms > self.max_ms:
+            self.max_ms = elapsed_ms
+
+    def percentile(self, q: float) -> Optional[int]:
+        """Upper bound (ms) of the bucket holding the q-th percentile."""
+        if not self.count:
+            return None
+        target = q * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= target:
+                return LATENCY_BUCKETS_MS[i] if i < len(LATENCY_BUCKETS_MS) else round(self.max_ms)
+        return round(self.max_ms)
+
+    def snapshot(self) -> Dict[str, Any]:
+        labels = [f"le_{b}" for b in LATENCY_BUCKETS_MS] + ["inf"]
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "retries": self.retries,
+            "avg_ms": round(self.total_ms / self.count, 1) if self.count else None,
+            "p50_ms": self.percentile(0.50),
+            "p95_ms": self.percentile(0.95),
+            "max_ms": round(self.max_ms, 1),
+            "buckets": dict(zip(labels, self.buckets)),
+        }
+
+
+def backoff_delay(attempt: int) -> float:
+    """Full-jitter exponential backoff in seconds for retry `attempt` (1-based)."""
+    cap = min(HTTP_RETRY_MAX_MS, HTTP_RETRY_BASE_MS * (2 ** (attempt - 1)))
+    return random.uniform(0, cap) / 1000.0
+
+
+class HttpClientManager:
+    def __init__(self, providers: Optional[Dict[str, ProviderConfig]] = None):
+        self.providers = dict(providers or PROVIDERS)
+        self.http2 = HTTP_ENABLE_HTTP2 and HTTP2_AVAILABLE
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._transports: Dict[str, httpx.AsyncBaseTransport] = {}
+        self._histograms: Dict[Tuple[str, str], LatencyHistogram] = {}
+
+    # --------------------------------------------------------
+    # Pools
+    # --------------------------------------------------------
+    def client(self, provider: str) -> httpx.AsyncClient:
+        client = self._clients.get(provider)
+        if client is not None and not client.is_closed:
+            return client
+
+        config = self.providers[provider]
+        transport = self._transports.get(provider)
+        client = httpx.AsyncClient(
+            timeout=config.timeout,
+            limits=httpx.Limits(
+                max_connections=config.max_connections,
+                max_keepalive_connections=config.max_connections,
+                keepalive_expiry=HTTP_KEEPALIVE_SECONDS,
+            ),
+            http2=self.http2 and transport is None,
+            transport=transport,
+        )
+        self._clients[provider] = client
+        return client
+
+    def use_transport(self, provider: str, transport: Optional[httpx.AsyncBaseTransport]) -> None:
+        """Route `provider` through `transport` (e.g. a fake provider); None = real network."""
+        if transport is None:
+            self._transports.pop(provider, None)
+        else:
+            self._transports[provider] = transport
+        old = self._clients.pop(provider, None)
+        if old is not None and not old.is_closed:
+            try:
+                asyncio.get_running_loop().create_task(old.aclose())
+            except RuntimeError:
+                pass
+
+    async def start(self) -> None:
+        for provider in self.providers:
+            self.client(provider)
+        logger.info(
+            "🌐 HTTP client pools open | providers=%s | http2=%s",
+            ",".join(self.providers),
+            self.http2,
+        )
+
+    async def close(self) -> None:
+        clients, self._clients = self._clients, {}
+        for provider, client in clients.items():
+            try:
+                await client.aclose()
+            except Exception:
+                logger.warning("⚠️ Error closing HTTP client | provider=%s", provider, exc_info=True)
+
+    # --------------------------------------------------------
+    # Requests
+    # --------------------------------------------------------
+    async def request(
+        self,
+        provider: str,
+        endpoint: str,
+        method: str,
+        url: str,
+        *,
+        idempotent: Optional[bool] = None,
+        max_retries: Optional[int] = None,
+        **kwargs: Any,
+    ) -> httpx.Response:
+        """
+        Send one request through the provider's pool. `endpoint` is the
+        histogram label ("POST /transfers", not the full URL). Returns
+        the last response (callers still raise_for_status()); raises the
+        last transport error when every attempt failed to connect.
+        """
+        method = method.upper()
+        if idempotent is None:
+            idempotent = method in IDEMPOTENT_METHODS
+        if max_retries is None:
+            max_retries = self.providers[provider].max_retries
+
+        hist = self._histograms.get((provider, endpoint))
+        if hist is None:
+            hist = self._histograms[(provider, endpoint)] = LatencyHistogram()
+
+        attempt = 0
+        while True:
+            attempt += 1
+            start = time.perf_counter()
+            try:
+                response = await self.client(provider).request(method, url, **kwargs)
+            except httpx.TransportError as exc:
+                hist.observe((time.perf_counter() - start) * 1000.0)
+                hist.errors += 1
+                retryable = idempotent or isinstance(exc, _NOT_SENT_ERRORS)
+                if not retryable or attempt > max_retries:
+                    raise
+                logger.warning(
+                    "⚠️ HTTP %s failed, retrying | provider=%s | endpoint=%s | attempt=%s | error=%s",
+                    method,
+                    provider,
+                    endpoint,
+                    attempt,
+                    exc.__class__.__name__,
+                )
+            else:
+                hist.observe((time.perf_counter() - start) * 1000.0)
+                if response.status_code not in RETRY_STATUS_CODES:
+                    return response
+                hist.errors += 1
+                if not idempotent or attempt > max_retries:
+                    return response
+                await response.aclose()
+                logger.warning(
+                    "⚠️ HTTP %s got %s, retrying | provider=%s | endpoint=%s | attempt=%s",
+                    method,
+                    response.status_code,
+                    provider,
+                    endpoint,
+                    attempt,
+                )
+
+            hist.retries += 1
+            await asyncio.sleep(backoff_delay(attempt))
+
+    async def get(self, provider: str, endpoint: str, url: str, **kwargs: Any) -> httpx.Response:
+        return await self.request(provider, endpoint, "GET", url, **kwargs)
+
+    async def post(self, provider: str, endpoint: str, url: str, **kwargs: Any) -> httpx.Response:
+        return await self.request(provider, endpoint, "POST", url, **kwargs)
+
+    def stats(self) -> Dict[str, Any]:
+        endpoints: Dict[str, Dict[str, Any]] = {}
+        for (provider, endpoint), hist in sorted(self._histograms.items()):
+            endpoints.setdefault(provider, {})[endpoint] = hist.snapshot()
+        return {
+            "http2": self.http2,
+            "open": sorted(p for p, c in self._clients.items() if not c.is_closed),
+            "endpoints": endpoints,
+        }
+
+
+_manager: Optional[HttpClientManager] = None
+
+
+def get_http_clients() -> HttpClientManager:
+    global _manager
+    if _manager is None:
+        _manager = HttpClientManager()
+    return _manager
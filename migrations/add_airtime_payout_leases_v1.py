@@ -0,0 +1,86 @@
+# ===============================================================
+# migrations/add_airtime_payout_leases_v1.py
+# Adds lease columns to airtime_payouts (idempotent)
+# The payout engine (services/airtime_providers/payout_engine.py)
+# claims rows in a short transaction and owns them through a lease
+# instead of holding row locks across provider calls.
+# ===============================================================
+import os
+import json
+from datetime import datetime, timezone
+import psycopg2
+
+MIGRATION_NAME = "add_airtime_payout_leases_v1"
+
+
+def main():
+    database_url = os.environ.get("DATABASE_URL")
+    if not database_url:
+        print("ERROR: DATABASE_URL not found in env")
+        return
+
+    # psycopg2 needs sync URL
+    if database_url.startswith("postgresql+asyncpg://"):
+        database_url = database_url.replace("postgresql+asyncpg://", "postgresql://", 1)
+
+    conn = psycopg2.connect(database_url)
+    cur = conn.cursor()
+
+    try:
+        # 0) schema_migrations table
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            name TEXT PRIMARY KEY,
+            applied_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP,
+            meta JSONB DEFAULT '{}'::jsonb
+        );
+        """)
+
+        # Stop if already applied
+        cur.execute("SELECT 1 FROM schema_migrations WHERE name=%s LIMIT 1;", (MIGRATION_NAME,))
+        if cur.fetchone():
+            print(f"✅ Migration already applied: {MIGRATION_NAME}")
+            return
+
+        print(f"🔧 Starting migration: {MIGRATION_NAME}")
+
+        # 1) Lease columns
+        cur.execute("""
+        ALTER TABLE airtime_payouts
+            ADD COLUMN IF NOT EXISTS lease_owner TEXT,
+            ADD COLUMN IF NOT EXISTS lease_expires_at TIMESTAMPTZ;
+        """)
+
+        # 2) Partial index: only rows the claim query can pick
+        cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_airtime_payouts_claimable
+        ON airtime_payouts (created_at)
+        WHERE phone_number IS NOT NULL
+          AND status IN ('pending_claim', 'failed_retryable', 'processing');
+        """)
+
+        # 3) Record migration
+        cur.execute(
+            "INSERT INTO schema_migrations (name, meta) VALUES (%s, %s::jsonb)",
+            (MIGRATION_NAME, json.dumps({
+                "applied_by": "render_migration_script",
+                "applied_at": datetime.now(timezone.utc).isoformat(),
+                "notes": "Added lease_owner / lease_expires_at to airtime_payouts for the concurrent payout engine"
+            }))
+        )
+
+        conn.commit()
+        print("🎉 Migration applied successfully!")
+
+    except Exception as e:
+        conn.rollback()
+        print("❌ Migration failed — rolled back")
+        print("Error:", e)
+        raise
+    finally:
+        cur.close()
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
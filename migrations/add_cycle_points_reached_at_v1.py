@@ -0,0 +1,108 @@
+# ===============================================================
+# migrations/add_cycle_points_reached_at_v1.py
+# Adds user_cycle_stats.points_reached_at (idempotent)
+# When the user reached their current point total, maintained as
+# points are awarded (services/playtrivia.py), so cycle-end winner
+# selection is one indexed lookup instead of a per-tied-user scan
+# of premium_reward_entries. Backfilled from premium_reward_entries.
+# ===============================================================
+import os
+import json
+from datetime import datetime, timezone
+import psycopg2
+
+MIGRATION_NAME = "add_cycle_points_reached_at_v1"
+
+
+def main():
+    database_url = os.environ.get("DATABASE_URL")
+    if not database_url:
+        print("ERROR: DATABASE_URL not found in env")
+        return
+
+    # psycopg2 needs sync URL
+    if database_url.startswith("postgresql+asyncpg://"):
+        database_url = database_url.replace("postgresql+asyncpg://", "postgresql://", 1)
+
+    conn = psycopg2.connect(database_url)
+    cur = conn.cursor()
+
+    try:
+        # 0) schema_migrations table
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            name TEXT PRIMARY KEY,
+            applied_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP,
+            meta JSONB DEFAULT '{}'::jsonb
+        );
+        """)
+
+        # Stop if already applied
+        cur.execute("SELECT 1 FROM schema_migrations WHERE name=%s LIMIT 1;", (MIGRATION_NAME,))
+        if cur.fetchone():
+            print(f"✅ Migration already applied: {MIGRATION_NAME}")
+            return
+
+        print(f"🔧 Starting migration: {MIGRATION_NAME}")
+
+        # 1) Column
+        cur.execute("""
+        ALTER TABLE user_cycle_stats
+            ADD COLUMN IF NOT EXISTS points_reached_at TIMESTAMPTZ;
+        """)
+
+        # 2) Backfill: created_at of the user's Nth entry in the cycle
+        #    (N = current points). Users whose points were set by an
+        #    admin without entries keep NULL (ranked last on ties).
+        cur.execute("""
+        WITH ranked AS (
+            SELECT
+                cycle_id,
+                user_id,
+                created_at,
+                ROW_NUMBER() OVER (PARTITION BY cycle_id, user_id ORDER BY created_at) AS n
+            FROM premium_reward_entries
+            WHERE cycle_id IS NOT NULL
+        )
+        UPDATE user_cycle_stats s
+        SET points_reached_at = r.created_at
+        FROM ranked r
+        WHERE r.cycle_id = s.cycle_id
+          AND r.user_id = s.user_id
+          AND r.n = s.points
+          AND s.points > 0
+          AND s.points_reached_at IS NULL;
+        """)
+        print(f"✅ points_reached_at backfilled: {cur.rowcount}")
+
+        # 3) Winner lookup: top points, earliest to reach them
+        cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_user_cycle_stats_cycle_winner
+        ON user_cycle_stats (cycle_id, points DESC, points_reached_at ASC NULLS LAST);
+        """)
+
+        # 4) Record migration
+        cur.execute(
+            "INSERT INTO schema_migrations (name, meta) VALUES (%s, %s::jsonb)",
+            (MIGRATION_NAME, json.dumps({
+                "applied_by": "render_migration_script",
+                "applied_at": datetime.now(timezone.utc).isoformat(),
+                "notes": "Added user_cycle_stats.points_reached_at + winner index (backfilled from premium_reward_entries)"
+            }))
+        )
+
+        conn.commit()
+        print("🎉 Migration applied successfully!")
+
+    except Exception as e:
+        conn.rollback()
+        print("❌ Migration failed — rolled back")
+        print("Error:", e)
+        raise
+    finally:
+        cur.close()
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+# ===============================================================
+# migrations/add_exam_question_refs_v1.py
+# Adds exam_content_versions + content_version on paper tables
+# (idempotent)
+# New paper rows store (content_version, question_id) instead of a
+# full question_json copy (question_refs.py). question_json becomes
+# nullable; rows written before this migration keep their copy and
+# are read as before.
+# ===============================================================
+import os
+import json
+from datetime import datetime, timezone
+import psycopg2
+
+MIGRATION_NAME = "add_exam_question_refs_v1"
+
+PAPER_TABLES = (
+    "mockjamb_subject_questions",
+    "mockjamb_room_subject_questions",
+    "mockwaec_subject_questions",
+    "mockwaec_room_subject_questions",
+    "jamb_session_questions",
+    "waec_session_questions",
+    "university_session_questions",
+)
+
+
+def main():
+    database_url = os.environ.get("DATABASE_URL")
+    if not database_url:
+        print("ERROR: DATABASE_URL not found in env")
+        return
+
+    # psycopg2 needs sync URL
+    if database_url.startswith("postgresql+asyncpg://"):
+        database_url = database_url.replace("postgresql+asyncpg://", "postgresql://", 1)
+
+    conn = psycopg2.connect(database_url)
+    cur = conn.cursor()
+
+    try:
+        # 0) schema_migrations table
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            name TEXT PRIMARY KEY,
+            applied_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP,
+            meta JSONB DEFAULT '{}'::jsonb
+        );
+        """)
+
+        # Stop if already applied
+        cur.execute("SELECT 1 FROM schema_migrations WHERE name=%s LIMIT 1;", (MIGRATION_NAME,))
+        if cur.fetchone():
+            print(f"✅ Migration already applied: {MIGRATION_NAME}")
+            return
+
+        print(f"🔧 Starting migration: {MIGRATION_NAME}")
+
+        # 1) One row per content version of a subject's question bank
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS exam_content_versions (
+            version TEXT PRIMARY KEY,
+            exam TEXT NOT NULL,
+            scope TEXT NOT NULL,
+            question_count INTEGER NOT NULL DEFAULT 0,
+            questions_json JSONB NOT NULL,
+            created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+        );
+        """)
+        print("✅ exam_content_versions ensured")
+
+        # 2) Reference column on every paper table that copied question_json
+        for table in PAPER_TABLES:
+            cur.execute("SELECT to_regclass(%s);", (f"public.{table}",))
+            if cur.fetchone()[0] is None:
+                print(f"⏭️ {table} not found, skipped")
+                continue
+            cur.execute(f"""
+            ALTER TABLE {table}
+                ADD COLUMN IF NOT EXISTS content_version TEXT;
+            """)
+            cur.execute(f"""
+            ALTER TABLE {table}
+                ALTER COLUMN question_json DROP NOT NULL;
+            """)
+            print(f"✅ {table}.content_version ensured")
+
+        # 3) Record migration
+        cur.execute(
+            "INSERT INTO schema_migrations (name, meta) VALUES (%s, %s::jsonb)",
+            (MIGRATION_NAME, json.dumps({
+                "applied_by": "render_migration_script",
+                "applied_at": datetime.now(timezone.utc).isoformat(),
+                "notes": "Added exam_content_versions + content_version on exam paper tables (question refs)"
+            }))
+        )
+
+        conn.commit()
+        print("🎉 Migration applied successfully!")
+
+    except Exception as e:
+        conn.rollback()
+        print("❌ Migration failed — rolled back")
+        print("Error:", e)
+        raise
+    finally:
+        cur.close()
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
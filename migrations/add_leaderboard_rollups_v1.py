@@ -0,0 +1,154 @@
+# ===============================================================
+# migrations/add_leaderboard_rollups_v1.py
+# Adds leaderboard_daily_points + user_activity_streaks (idempotent)
+# Rollups behind the materialized leaderboard
+# (services/leaderboard_service.py), backfilled from
+# premium_reward_entries.
+# ===============================================================
+import os
+import json
+from datetime import datetime, timezone
+import psycopg2
+
+MIGRATION_NAME = "add_leaderboard_rollups_v1"
+
+
+def main():
+    database_url = os.environ.get("DATABASE_URL")
+    if not database_url:
+        print("ERROR: DATABASE_URL not found in env")
+        return
+
+    # psycopg2 needs sync URL
+    if database_url.startswith("postgresql+asyncpg://"):
+        database_url = database_url.replace("postgresql+asyncpg://", "postgresql://", 1)
+
+    conn = psycopg2.connect(database_url)
+    cur = conn.cursor()
+
+    try:
+        # 0) schema_migrations table
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            name TEXT PRIMARY KEY,
+            applied_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP,
+            meta JSONB DEFAULT '{}'::jsonb
+        );
+        """)
+
+        # Stop if already applied
+        cur.execute("SELECT 1 FROM schema_migrations WHERE name=%s LIMIT 1;", (MIGRATION_NAME,))
+        if cur.fetchone():
+            print(f"✅ Migration already applied: {MIGRATION_NAME}")
+            return
+
+        print(f"🔧 Starting migration: {MIGRATION_NAME}")
+
+        # 1) Daily points per user (weekly board = last 7 UTC days)
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS leaderboard_daily_points (
+            user_id UUID NOT NULL REFERENCES users(id),
+            day DATE NOT NULL,
+            points INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, day)
+        );
+        """)
+        cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_leaderboard_daily_points_day
+        ON leaderboard_daily_points (day);
+        """)
+
+        # 2) Streak counters + lifetime entries per user
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS user_activity_streaks (
+            user_id UUID PRIMARY KEY REFERENCES users(id),
+            last_day DATE NOT NULL,
+            current_streak INTEGER NOT NULL DEFAULT 0,
+            best_streak INTEGER NOT NULL DEFAULT 0,
+            total_entries INTEGER NOT NULL DEFAULT 0,
+            updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+        );
+        """)
+
+        # 3) Season board load
+        cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_user_cycle_stats_cycle_points
+        ON user_cycle_stats (cycle_id, points DESC);
+        """)
+
+        # 4) Backfill daily points (recent window only)
+        cur.execute("""
+        INSERT INTO leaderboard_daily_points (user_id, day, points)
+        SELECT user_id, (created_at AT TIME ZONE 'UTC')::date, COUNT(*)
+        FROM premium_reward_entries
+        WHERE created_at >= NOW() - INTERVAL '8 days'
+        GROUP BY user_id, (created_at AT TIME ZONE 'UTC')::date
+        ON CONFLICT (user_id, day) DO NOTHING;
+        """)
+        print(f"✅ Daily points backfilled: {cur.rowcount}")
+
+        # 5) Backfill streaks (runs of consecutive UTC days)
+        cur.execute("""
+        WITH days AS (
+            SELECT DISTINCT user_id, (created_at AT TIME ZONE 'UTC')::date AS day
+            FROM premium_reward_entries
+        ),
+        grouped AS (
+            SELECT
+                user_id,
+                day,
+                day - CAST(ROW_NUMBER() OVER (PARTITION BY user_id ORDER BY day) AS INTEGER) AS grp
+            FROM days
+        ),
+        runs AS (
+            SELECT user_id, grp, COUNT(*) AS len, MAX(day) AS end_day
+            FROM grouped
+            GROUP BY user_id, grp
+        ),
+        totals AS (
+            SELECT user_id, COUNT(*) AS total
+            FROM premium_reward_entries
+            GROUP BY user_id
+        )
+        INSERT INTO user_activity_streaks (
+            user_id, last_day, current_streak, best_streak, total_entries, updated_at
+        )
+        SELECT
+            r.user_id,
+            MAX(r.end_day),
+            (ARRAY_AGG(r.len ORDER BY r.end_day DESC))[1],
+            MAX(r.len),
+            t.total,
+            NOW()
+        FROM runs r
+        JOIN totals t ON t.user_id = r.user_id
+        GROUP BY r.user_id, t.total
+        ON CONFLICT (user_id) DO NOTHING;
+        """)
+        print(f"✅ Streaks backfilled: {cur.rowcount}")
+
+        # 6) Record migration
+        cur.execute(
+            "INSERT INTO schema_migrations (name, meta) VALUES (%s, %s::jsonb)",
+            (MIGRATION_NAME, json.dumps({
+                "applied_by": "render_migration_script",
+                "applied_at": datetime.now(timezone.utc).isoformat(),
+                "notes": "Added leaderboard_daily_points + user_activity_streaks (backfilled)"
+            }))
+        )
+
+        conn.commit()
+        print("🎉 Migration applied successfully!")
+
+    except Exception as e:
+        conn.rollback()
+        print("❌ Migration failed — rolled back")
+        print("Error:", e)
+        raise
+    finally:
+        cur.close()
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
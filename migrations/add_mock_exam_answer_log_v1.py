@@ -0,0 +1,90 @@
+# ===============================================================
+# migrations/add_mock_exam_answer_log_v1.py
+# Adds mockjamb_answer_log + mockwaec_answer_log (idempotent)
+# Append-only answer taps written by the live exam engine
+# (services/live_exam_engine.py) and folded into the
+# <prefix>_subject_questions rows at checkpoint.
+# ===============================================================
+import os
+import json
+from datetime import datetime, timezone
+import psycopg2
+
+MIGRATION_NAME = "add_mock_exam_answer_log_v1"
+
+
+def main():
+    database_url = os.environ.get("DATABASE_URL")
+    if not database_url:
+        print("ERROR: DATABASE_URL not found in env")
+        return
+
+    # psycopg2 needs sync URL
+    if database_url.startswith("postgresql+asyncpg://"):
+        database_url = database_url.replace("postgresql+asyncpg://", "postgresql://", 1)
+
+    conn = psycopg2.connect(database_url)
+    cur = conn.cursor()
+
+    try:
+        # 0) schema_migrations table
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            name TEXT PRIMARY KEY,
+            applied_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP,
+            meta JSONB DEFAULT '{}'::jsonb
+        );
+        """)
+
+        # Stop if already applied
+        cur.execute("SELECT 1 FROM schema_migrations WHERE name=%s LIMIT 1;", (MIGRATION_NAME,))
+        if cur.fetchone():
+            print(f"✅ Migration already applied: {MIGRATION_NAME}")
+            return
+
+        print(f"🔧 Starting migration: {MIGRATION_NAME}")
+
+        # 1) + 2) One narrow append-only table per exam
+        for prefix in ("mockjamb", "mockwaec"):
+            cur.execute(f"""
+            CREATE TABLE IF NOT EXISTS {prefix}_answer_log (
+                id BIGSERIAL PRIMARY KEY,
+                payment_reference TEXT NOT NULL,
+                subject_code TEXT NOT NULL,
+                question_order INTEGER NOT NULL,
+                selected_option TEXT NOT NULL,
+                is_correct BOOLEAN NOT NULL,
+                answered_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+            );
+            """)
+            cur.execute(f"""
+            CREATE INDEX IF NOT EXISTS idx_{prefix}_answer_log_paper
+            ON {prefix}_answer_log (payment_reference, subject_code);
+            """)
+            print(f"✅ {prefix}_answer_log ensured")
+
+        # 3) Record migration
+        cur.execute(
+            "INSERT INTO schema_migrations (name, meta) VALUES (%s, %s::jsonb)",
+            (MIGRATION_NAME, json.dumps({
+                "applied_by": "render_migration_script",
+                "applied_at": datetime.now(timezone.utc).isoformat(),
+                "notes": "Added mockjamb_answer_log / mockwaec_answer_log for the live exam engine"
+            }))
+        )
+
+        conn.commit()
+        print("🎉 Migration applied successfully!")
+
+    except Exception as e:
+        conn.rollback()
+        print("❌ Migration failed — rolled back")
+        print("Error:", e)
+        raise
+    finally:
+        cur.close()
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+# ===============================================================
+# migrations/add_paid_try_counter_stripes_v1.py
+# Adds paid_try_counter_stripes + game_state stripe columns (idempotent)
+# Striped paid-try counter (services/paid_try_counter.py). Existing
+# game_state / global_counter totals are carried into spill rows
+# (stripe = -1) so live totals continue from today's values.
+# ===============================================================
+import os
+import json
+from datetime import datetime, timezone
+import psycopg2
+
+MIGRATION_NAME = "add_paid_try_counter_stripes_v1"
+
+
+def main():
+    database_url = os.environ.get("DATABASE_URL")
+    if not database_url:
+        print("ERROR: DATABASE_URL not found in env")
+        return
+
+    # psycopg2 needs sync URL
+    if database_url.startswith("postgresql+asyncpg://"):
+        database_url = database_url.replace("postgresql+asyncpg://", "postgresql://", 1)
+
+    conn = psycopg2.connect(database_url)
+    cur = conn.cursor()
+
+    try:
+        # 0) schema_migrations table
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            name TEXT PRIMARY KEY,
+            applied_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP,
+            meta JSONB DEFAULT '{}'::jsonb
+        );
+        """)
+
+        # Stop if already applied
+        cur.execute("SELECT 1 FROM schema_migrations WHERE name=%s LIMIT 1;", (MIGRATION_NAME,))
+        if cur.fetchone():
+            print(f"✅ Migration already applied: {MIGRATION_NAME}")
+            return
+
+        print(f"🔧 Starting migration: {MIGRATION_NAME}")
+
+        # 1) Create paid_try_counter_stripes
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS paid_try_counter_stripes (
+            cycle_id INTEGER NOT NULL,
+            stripe INTEGER NOT NULL,
+            cap BIGINT NOT NULL DEFAULT 0,
+            paid_tries BIGINT NOT NULL DEFAULT 0,
+            purchased_tries BIGINT NOT NULL DEFAULT 0,
+            updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+            PRIMARY KEY (cycle_id, stripe)
+        );
+        """)
+
+        # 2) game_state bookkeeping for cycle-end detection
+        cur.execute("""
+        ALTER TABLE game_state
+            ADD COLUMN IF NOT EXISTS stripes_filled INTEGER NOT NULL DEFAULT 0,
+            ADD COLUMN IF NOT EXISTS cycle_end_pending BOOLEAN NOT NULL DEFAULT FALSE;
+        """)
+
+        # 3) Carry current totals into spill rows:
+        #    current cycle -> paid_tries_this_cycle
+        #    cycle 0       -> earlier lifetime tries + all purchased tries
+        cur.execute("""
+        SELECT
+            gs.current_cycle,
+            gs.paid_tries_this_cycle,
+            gs.lifetime_paid_tries,
+            COALESCE((SELECT paid_tries_total FROM global_counter WHERE id = 1), 0)
+        FROM game_state gs
+        WHERE gs.id = 1;
+        """)
+        row = cur.fetchone()
+        if row:
+            current_cycle, this_cycle, lifetime, purchased = (int(v or 0) for v in row)
+            cur.execute("""
+            INSERT INTO paid_try_counter_stripes (cycle_id, stripe, cap, paid_tries, purchased_tries)
+            VALUES (%s, -1, 0, %s, 0), (0, -1, 0, %s, %s)
+            ON CONFLICT (cycle_id, stripe) DO NOTHING;
+            """, (current_cycle, this_cycle, max(0, lifetime - this_cycle), purchased))
+            print(f"✅ Carried cycle={current_cycle} paid={this_cycle} lifetime={lifetime} purchased={purchased}")
+
+        # 4) Record migration
+        cur.execute(
+            "INSERT INTO schema_migrations (name, meta) VALUES (%s, %s::jsonb)",
+            (MIGRATION_NAME, json.dumps({
+                "applied_by": "render_migration_script",
+                "applied_at": datetime.now(timezone.utc).isoformat(),
+                "notes": "Added paid_try_counter_stripes; carried game_state/global_counter totals"
+            }))
+        )
+
+        conn.commit()
+        print("🎉 Migration applied successfully!")
+
+    except Exception as e:
+        conn.rollback()
+        print("❌ Migration failed — rolled back")
+        print("Error:", e)
+        raise
+    finally:
+        cur.close()
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# ===============================================================
+# migrations/add_rate_limit_windows_v1.py
+# Adds rate_limit_windows table (idempotent)
+# UNLOGGED (no WAL, emptied after a crash — fine for short windows):
+# shared rate-limit / dedupe windows for RATE_LIMIT_BACKEND=postgres
+# (rate_limit_store.py).
+# ===============================================================
+import os
+import json
+from datetime import datetime, timezone
+import psycopg2
+
+MIGRATION_NAME = "add_rate_limit_windows_v1"
+
+
+def main():
+    database_url = os.environ.get("DATABASE_URL")
+    if not database_url:
+        print("ERROR: DATABASE_URL not found in env")
+        return
+
+    # psycopg2 needs sync URL
+    if database_url.startswith("postgresql+asyncpg://"):
+        database_url = database_url.replace("postgresql+asyncpg://", "postgresql://", 1)
+
+    conn = psycopg2.connect(database_url)
+    cur = conn.cursor()
+
+    try:
+        # 0) schema_migrations table
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            name TEXT PRIMARY KEY,
+            applied_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP,
+            meta JSONB DEFAULT '{}'::jsonb
+        );
+        """)
+
+        # Stop if already applied
+        cur.execute("SELECT 1 FROM schema_migrations WHERE name=%s LIMIT 1;", (MIGRATION_NAME,))
+        if cur.fetchone():
+            print(f"✅ Migration already applied: {MIGRATION_NAME}")
+            return
+
+        print(f"🔧 Starting migration: {MIGRATION_NAME}")
+
+        # 1) Create rate_limit_windows
+        cur.execute("""
+        CREATE UNLOGGED TABLE IF NOT EXISTS rate_limit_windows (
+            key TEXT PRIMARY KEY,
+            hits INTEGER NOT NULL DEFAULT 1,
+            expires_at TIMESTAMPTZ NOT NULL
+        );
+        """)
+
+        # 2) Index for the expired-window purge
+        cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_rate_limit_windows_expires_at
+        ON rate_limit_windows (expires_at);
+        """)
+
+        # 3) Record migration
+        cur.execute(
+            "INSERT INTO schema_migrations (name, meta) VALUES (%s, %s::jsonb)",
+            (MIGRATION_NAME, json.dumps({
+                "applied_by": "render_migration_script",
+                "applied_at": datetime.now(timezone.utc).isoformat(),
+                "notes": "Added UNLOGGED rate_limit_windows for shared rate limits and webhook dedupe"
+            }))
+        )
+
+        conn.commit()
+        print("🎉 Migration applied successfully!")
+
+    except Exception as e:
+        conn.rollback()
+        print("❌ Migration failed — rolled back")
+        print("Error:", e)
+        raise
+    finally:
+        cur.close()
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+# ===============================================================
+# migrations/add_timer_deadline_fires_v1.py
+# Adds timer_deadline_fires table (idempotent)
+# Every worker re-arms the restored deadlines after a restart; the
+# first one to insert (kind, key, due_at) here fires it, the others
+# skip it (services/deadline_service.py).
+# ===============================================================
+import os
+import json
+from datetime import datetime, timezone
+import psycopg2
+
+MIGRATION_NAME = "add_timer_deadline_fires_v1"
+
+
+def main():
+    database_url = os.environ.get("DATABASE_URL")
+    if not database_url:
+        print("ERROR: DATABASE_URL not found in env")
+        return
+
+    # psycopg2 needs sync URL
+    if database_url.startswith("postgresql+asyncpg://"):
+        database_url = database_url.replace("postgresql+asyncpg://", "postgresql://", 1)
+
+    conn = psycopg2.connect(database_url)
+    cur = conn.cursor()
+
+    try:
+        # 0) schema_migrations table
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            name TEXT PRIMARY KEY,
+            applied_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP,
+            meta JSONB DEFAULT '{}'::jsonb
+        );
+        """)
+
+        # Stop if already applied
+        cur.execute("SELECT 1 FROM schema_migrations WHERE name=%s LIMIT 1;", (MIGRATION_NAME,))
+        if cur.fetchone():
+            print(f"✅ Migration already applied: {MIGRATION_NAME}")
+            return
+
+        print(f"🔧 Starting migration: {MIGRATION_NAME}")
+
+        # 1) Create timer_deadline_fires
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS timer_deadline_fires (
+            kind TEXT NOT NULL,
+            key TEXT NOT NULL,
+            due_at TIMESTAMPTZ NOT NULL,
+            fired_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+            PRIMARY KEY (kind, key, due_at)
+        );
+        """)
+
+        # 2) Old claims are pruned by fired_at
+        cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_timer_deadline_fires_fired_at
+        ON timer_deadline_fires (fired_at);
+        """)
+
+        # 3) Record migration
+        cur.execute(
+            "INSERT INTO schema_migrations (name, meta) VALUES (%s, %s::jsonb)",
+            (MIGRATION_NAME, json.dumps({
+                "applied_by": "render_migration_script",
+                "applied_at": datetime.now(timezone.utc).isoformat(),
+                "notes": "Added timer_deadline_fires so a restored deadline fires in one worker only"
+            }))
+        )
+
+        conn.commit()
+        print("🎉 Migration applied successfully!")
+
+    except Exception as e:
+        conn.rollback()
+        print("❌ Migration failed — rolled back")
+        print("Error:", e)
+        raise
+    finally:
+        cur.close()
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+# ===============================================================
+# migrations/add_wallet_aggregates_v1.py
+# Adds running aggregates to referral_wallets (idempotent)
+# total_rejected_withdrawals, total_cancelled_withdrawals,
+# withdrawal_count, commission_count and the referral counts are
+# maintained by services/finance alongside the ledger rows, so the
+# finance dashboard (reporting_service.get_finance_report) is one
+# read of the wallet row instead of a dozen SUM / COUNT queries.
+# Backfilled from referral_withdrawals, wallet_transactions and
+# referrals. total_reversed (not maintained before) is backfilled and
+# total_earned is checked against wallet_transactions, since the
+# dashboard now reads both from the wallet row instead of summing the
+# ledger.
+# ===============================================================
+import os
+import json
+from datetime import datetime, timezone
+import psycopg2
+
+MIGRATION_NAME = "add_wallet_aggregates_v1"
+
+MONEY_COLUMNS = (
+    "total_rejected_withdrawals",
+    "total_cancelled_withdrawals",
+)
+
+COUNT_COLUMNS = (
+    "withdrawal_count",
+    "commission_count",
+    "referral_count",
+    "active_referral_count",
+    "pending_referral_count",
+    "inactive_referral_count",
+)
+
+
+def main():
+    database_url = os.environ.get("DATABASE_URL")
+    if not database_url:
+        print("ERROR: DATABASE_URL not found in env")
+        return
+
+    # psycopg2 needs sync URL
+    if database_url.startswith("postgresql+asyncpg://"):
+        database_url = database_url.replace("postgresql+asyncpg://", "postgresql://", 1)
+
+    conn = psycopg2.connect(database_url)
+    cur = conn.cursor()
+
+    try:
+        # 0) schema_migrations table
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            name TEXT PRIMARY KEY,
+            applied_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP,
+            meta JSONB DEFAULT '{}'::jsonb
+        );
+        """)
+
+        # Stop if already applied
+        cur.execute("SELECT 1 FROM schema_migrations WHERE name=%s LIMIT 1;", (MIGRATION_NAME,))
+        if cur.fetchone():
+            print(f"✅ Migration already applied: {MIGRATION_NAME}")
+            return
+
+        print(f"🔧 Starting migration: {MIGRATION_NAME}")
+
+        cur.execute("SELECT to_regclass('public.referral_wallets') IS NOT NULL;")
+        if not cur.fetchone()[0]:
+            print("ℹ️ referral_wallets does not exist yet (created with the new columns by the ORM)")
+        else:
+            # 1) Columns
+            for column in MONEY_COLUMNS:
+                cur.execute(f"""
+                ALTER TABLE referral_wallets
+                    ADD COLUMN IF NOT EXISTS {column} NUMERIC(18, 2) NOT NULL DEFAULT 0.00;
+                """)
+            for column in COUNT_COLUMNS:
+                cur.execute(f"""
+                ALTER TABLE referral_wallets
+                    ADD COLUMN IF NOT EXISTS {column} INTEGER NOT NULL DEFAULT 0;
+                """)
+
+            # 2) Backfill withdrawals
+            cur.execute("""
+            UPDATE referral_wallets w
+            SET
+                withdrawal_count = wd.withdrawal_count,
+                total_rejected_withdrawals = wd.total_rejected_withdrawals,
+                total_cancelled_withdrawals = wd.total_cancelled_withdrawals
+            FROM (
+                SELECT
+                    wallet_id,
+                    COUNT(*) AS withdrawal_count,
+                    COALESCE(SUM(amount) FILTER (WHERE status = 'REJECTED'), 0) AS total_rejected_withdrawals,
+                    COALESCE(SUM(amount) FILTER (WHERE status = 'CANCELLED'), 0) AS total_cancelled_withdrawals
+                FROM referral_withdrawals
+                GROUP BY wallet_id
+            ) wd
+            WHERE wd.wallet_id = w.id;
+            """)
+            print(f"✅ Withdrawal aggregates backfilled: {cur.rowcount}")
+
+            # 3) Backfill commission count, total_reversed and total_earned
+            #    (same ledger rules as services/finance/wallet_reconciliation)
+            ledger = """
+                SELECT
+                    w.id AS wallet_id,
+                    COUNT(t.id) FILTER (
+                        WHERE t.transaction_code = 'REFERRAL_COMMISSION'
+                          AND t.transaction_type = 'credit'
+                          AND t.status = 'COMPLETED'
+                    ) AS commission_count,
+                    COALESCE(SUM(t.amount) FILTER (
+                        WHERE t.transaction_code = 'COMMISSION_REVERSAL'
+                          AND t.status IN ('COMPLETED', 'REVERSED')
+                    ), 0) AS total_reversed,
+                    COALESCE(SUM(t.amount) FILTER (
+                        WHERE t.transaction_type = 'credit'
+                          AND t.status = 'COMPLETED'
+                    ), 0) AS total_earned
+                FROM referral_wallets w
+                LEFT JOIN wallet_transactions t ON t.wallet_id = w.id
+                GROUP BY w.id
+            """
+
+            cur.execute(f"""
+            SELECT w.id, w.total_earned, tx.total_earned
+            FROM referral_wallets w
+            JOIN ({ledger}) tx ON tx.wallet_id = w.id
+            WHERE w.total_earned IS DISTINCT FROM tx.total_earned;
+            """)
+            earned_drift = cur.fetchall()
+            for wallet_id, stored, expected in earned_drift:
+                print(f"⚠️ total_earned differs from the ledger | wallet={wallet_id} | stored={stored} | ledger={expected}")
+
+            cur.execute(f"""
+            UPDATE referral_wallets w
+            SET
+                commission_count = tx.commission_count,
+                total_reversed = tx.total_reversed,
+                total_earned = tx.total_earned
+            FROM ({ledger}) tx
+            WHERE tx.wallet_id = w.id;
+            """)
+            print(
+                f"✅ Commission counts / total_reversed / total_earned backfilled: {cur.rowcount} "
+                f"(total_earned corrected on {len(earned_drift)} wallets)"
+            )
+
+            # 4) Backfill referral counts
+            cur.execute("""
+            UPDATE referral_wallets w
+            SET
+                referral_count = rf.referral_count,
+                active_referral_count = rf.active_referral_count,
+                pending_referral_count = rf.pending_referral_count,
+                inactive_referral_count = rf.inactive_referral_count
+            FROM (
+                SELECT
+                    referrer_user_id,
+                    COUNT(*) AS referral_count,
+                    COUNT(*) FILTER (WHERE status = 'active') AS active_referral_count,
+                    COUNT(*) FILTER (WHERE status = 'pending') AS pending_referral_count,
+                    COUNT(*) FILTER (WHERE status = 'inactive') AS inactive_referral_count
+                FROM referrals
+                GROUP BY referrer_user_id
+            ) rf
+            WHERE rf.referrer_user_id = w.user_id;
+            """)
+            print(f"✅ Referral counts backfilled: {cur.rowcount}")
+
+        # 5) Record migration
+        cur.execute(
+            "INSERT INTO schema_migrations (name, meta) VALUES (%s, %s::jsonb)",
+            (MIGRATION_NAME, json.dumps({
+                "applied_by": "render_migration_script",
+                "applied_at": datetime.now(timezone.utc).isoformat(),
+                "notes": "Added referral_wallets running aggregates; backfilled them, total_reversed and total_earned from the finance ledger tables"
+            }))
+        )
+
+        conn.commit()
+        print("🎉 Migration applied successfully!")
+
+    except Exception as e:
+        conn.rollback()
+        print("❌ Migration failed — rolled back")
+        print("Error:", e)
+        raise
+    finally:
+        cur.close()
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -148,6 +148,9 @@ class GameState(Base):
     current_cycle = Column(Integer, nullable=False, server_default=text("1"))
     paid_tries_this_cycle = Column(Integer, nullable=False, server_default=text("0"))
     lifetime_paid_tries = Column(Integer, nullable=False, server_default=text("0"))
+    # Live counts are striped (services/paid_try_counter.py)
+    stripes_filled = Column(Integer, nullable=False, server_default=text("0"))
+    cycle_end_pending = Column(Boolean, nullable=False, server_default=text("false"))
 
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -0,0 +1,279 @@
+# ====================================================================
+# question_refs.py
+# Exam paper rows as (content_version, question_id) references.
+#
+# Paper tables (mock JAMB / WAEC player and room papers, practice mock
+# papers) used to store json.dumps(question) in question_json for every
+# player and every question: the same static content copied thousands
+# of times, and read back on every paper read.
+#
+# New rows store content_version + question_id and leave question_json
+# NULL. A content version names one exact state of a subject's question
+# bank: "<exam>:<scope>:<sha256 prefix of the subject's questions>".
+#   - current_version(exam, scope) hashes the content store's question
+#     map; memoized, so it is recomputed only when a data file changes.
+#   - register(session, version) stores the version's questions once in
+#     exam_content_versions (same transaction as the paper rows), so a
+#     paper still resolves after the files under data/ change.
+#   - hydrate_rows(session, rows) fills question_json back in: from the
+#     content store when the row's version is current, else from
+#     exam_content_versions (cached for the last few old versions).
+# Rows that still carry question_json (legacy rows, questions missing
+# from the version) are returned untouched.
+# ====================================================================
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from content_store import get_content_store
+from jamb_loader import get_subject_question_map as get_jamb_subject_question_map
+from university_loader import get_university_subject_question_map
+from waec_loader import get_subject_question_map as get_waec_subject_question_map
+
+logger = logging.getLogger("question_refs")
+
+QUESTION_REFS_OLD_VERSIONS = int(os.getenv("QUESTION_REFS_OLD_VERSIONS", "8"))
+
+EXAM_JAMB = "jamb"
+EXAM_WAEC = "waec"
+EXAM_UNIVERSITY = "university"
+
+_PENDING_KEY = "question_refs_pending"
+
+
+@dataclass(slots=True)
+class ContentVersion:
+    version: str
+    exam: str
+    scope: str
+    by_id: Dict[str, Dict[str, Any]]
+    _json: Dict[str, str] = field(default_factory=dict)
+
+    def question_json(self, question_id: Any) -> Optional[str]:
+        """The question serialized once per version, shared by every row."""
+        key = str(question_id)
+        cached = self._json.get(key)
+        if cached is None:
+            question = self.by_id.get(key)
+            if question is None:
+                return None
+            cached = self._json[key] = json.dumps(question)
+        return cached
+
+
+def university_scope(category_code: str, subject_code: str) -> str:
+    return f"{str(category_code).strip()}/{str(subject_code).strip()}"
+
+
+def _question_map(exam: str, scope: str) -> Dict[str, Dict[str, Any]]:
+    if exam == EXAM_JAMB:
+        return get_jamb_subject_question_map(scope)
+    if exam == EXAM_WAEC:
+        return get_waec_subject_question_map(scope)
+    if exam == EXAM_UNIVERSITY:
+        category_code, _, subject_code = scope.partition("/")
+        return get_university_subject_question_map(category_code, subject_code)
+    raise ValueError(f"Unknown exam for question refs: {exam}")
+
+
+def _parse_version(version: str) -> Tuple[str, str, str]:
+    exam, scope, digest = version.split(":", 2)
+    return exam, scope, digest
+
+
+def current_version(exam: str, scope: str) -> Optional[ContentVersion]:
+    """
+    The current content version of a subject, or None when its question
+    bank cannot be loaded (callers then store question_json inline).
+    """
+    def build() -> ContentVersion:
+        by_id = _question_map(exam, scope)
+        payload = json.dumps(by_id, sort_keys=True, separators=(",", ":")).encode("utf-8")
+        digest = hashlib.sha256(payload).hexdigest()[:16]
+        return ContentVersion(version=f"{exam}:{scope}:{digest}", exam=exam, scope=scope, by_id=by_id)
+
+    try:
+        return get_content_store().memo(("question_refs", exam, scope), build)
+    except Exception as e:
+        logger.warning("⚠️ No content version | exam=%s | scope=%s | error=%s", exam, scope, e)
+        return None
+
+
+class _VersionRegistry:
+    def __init__(self, old_versions: int = QUESTION_REFS_OLD_VERSIONS):
+        self.old_versions = max(1, old_versions)
+        self._registered: Set[str] = set()
+        self._old: "OrderedDict[str, Optional[ContentVersion]]" = OrderedDict()
+
+        self.registered_now = 0
+        self.old_loads = 0
+
+    def is_registered(self, version: str) -> bool:
+        return version in self._registered
+
+    def mark_registered(self, versions: Iterable[str]) -> None:
+        self._registered.update(versions)
+
+    async def resolve(self, session: AsyncSession, version: str) -> Optional[ContentVersion]:
+        try:
+            exam, scope, _digest = _parse_version(version)
+        except ValueError:
+            return None
+
+        current = current_version(exam, scope)
+        if current is not None and current.version == version:
+            return current
+
+        if version in self._old:
+            self._old.move_to_end(version)
+            return self._old[version]
+
+        result = await session.execute(
+            text("""
+                select questions_json
+                from public.exam_content_versions
+                where version = :version
+                limit 1
+            """),
+            {"version": version},
+        )
+        raw = result.scalar_one_or_none()
+        resolved: Optional[ContentVersion] = None
+        if raw is not None:
+            by_id = json.loads(raw) if isinstance(raw, str) else dict(raw)
+            resolved = ContentVersion(version=version, exam=exam, scope=scope, by_id=by_id)
+            self.old_loads += 1
+        else:
+            logger.error("❌ Content version missing | version=%s", version)
+
+        self._old[version] = resolved
+        while len(self._old) > self.old_versions:
+            self._old.popitem(last=False)
+        return resolved
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "registered": len(self._registered),
+            "registered_now": self.registered_now,
+            "old_cached": len(self._old),
+            "old_loads": self.old_loads,
+        }
+
+
+_registry = _VersionRegistry()
+
+
+async def register(session: AsyncSession, cv: Optional[ContentVersion]) -> None:
+    """
+    Make sure `cv` is stored in exam_content_versions before paper rows
+    reference it. Runs in the caller's transaction; the version counts
+    as registered in this process once that transaction commits.
+    """
+    if cv is None or _registry.is_registered(cv.version):
+        return
+
+    pending = session.info.setdefault(_PENDING_KEY, set())
+    if cv.version in pending:
+        return
+
+    await session.execute(
+        text("""
+            insert into public.exam_content_versions (
+                version,
+                exam,
+                scope,
+                question_count,
+                questions_json,
+                created_at
+            )
+            values (
+                :version,
+                :exam,
+                :scope,
+                :question_count,
+                cast(:questions_json as jsonb),
+                now()
+            )
+            on conflict (version) do nothing
+        """),
+        {
+            "version": cv.version,
+            "exam": cv.exam,
+            "scope": cv.scope,
+            "question_count": len(cv.by_id),
+            "questions_json": json.dumps(cv.by_id),
+        },
+    )
+    pending.add(cv.version)
+    _registry.registered_now += 1
+
+
+@event.listens_for(Session, "after_commit")
+def _mark_registered(sync_session: Session) -> None:
+    pending = sync_session.info.pop(_PENDING_KEY, None)
+    if pending:
+        _registry.mark_registered(pending)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_pending(sync_session: Session) -> None:
+    sync_session.info.pop(_PENDING_KEY, None)
+
+
+def _same_question(stored: Dict[str, Any], question: Dict[str, Any]) -> bool:
+    """
+    True when `question` is the bank's `stored` question. Selection
+    annotations (underscore keys the bank does not have, such as
+    _utme_section) are ignored; nothing reads them back from a paper.
+    """
+    for key, value in question.items():
+        if key in stored:
+            if stored[key] != value:
+                return False
+        elif not key.startswith("_"):
+            return False
+    return all(key in question for key in stored)
+
+
+def question_ref(cv: Optional[ContentVersion], question: Dict[str, Any]) -> Tuple[Optional[str], Optional[str]]:
+    """
+    (content_version, question_json) for one paper row: a reference when
+    the question is `cv`'s question of that id, else the question inline
+    (some banks reuse an id across topic files; only the first one is
+    addressable by id).
+    """
+    if cv is not None:
+        stored = cv.by_id.get(str(question.get("id")))
+        if stored is not None and _same_question(stored, question):
+            return cv.version, None
+    return None, json.dumps(question)
+
+
+async def hydrate_rows(session: AsyncSession, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Fill question_json of referencing rows in place; returns `rows`."""
+    resolved: Dict[str, Optional[ContentVersion]] = {}
+    for row in rows:
+        if row.get("question_json") is not None:
+            continue
+        version = row.get("content_version")
+        if not version:
+            continue
+        if version not in resolved:
+            resolved[version] = await _registry.resolve(session, version)
+        cv = resolved[version]
+        row["question_json"] = cv.question_json(row.get("question_id")) if cv is not None else None
+    return rows
+
+
+def question_refs_stats() -> Dict[str, Any]:
+    return _registry.stats()
@@ -0,0 +1,278 @@
+# ====================================================================
+# rate_limit_store.py
+# Windowed rate limits and delivery dedupe for the HTTP endpoints.
+#
+# Every key holds a fixed window: a hit counter and the time the window
+# expires. hit() counts one request and says whether it is still within
+# `limit`; seen() is a window of limit 1, so the first call for a key
+# returns False and repeats inside `ttl_seconds` return True.
+#
+# Backends (RATE_LIMIT_BACKEND):
+#   memory   -> OrderedDict per process, expired windows swept as they
+#               age out, never more than RATE_LIMIT_MAX_KEYS keys
+#               (oldest window evicted first). Right for one worker.
+#   postgres -> UNLOGGED rate_limit_windows table, one upsert per hit,
+#               so every worker / instance sees the same windows.
+#               Expired rows are purged every RATE_LIMIT_PURGE_SECONDS.
+#               If the database errors, the call falls back to the
+#               in-process store instead of failing the request.
+#
+# Used by the Telegram webhook (update_id dedupe + per-user flood
+# limit), the Flutterwave webhook (delivery dedupe) and the payment
+# redirect pages (verify throttle per tx_ref). Counters via stats()
+# (exposed on /health).
+# ====================================================================
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import text
+
+logger = logging.getLogger("rate_limit_store")
+
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory").strip().lower()
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "50000"))
+RATE_LIMIT_PURGE_SECONDS = int(os.getenv("RATE_LIMIT_PURGE_SECONDS", "60"))
+
+
+@dataclass(slots=True)
+class WindowHit:
+    allowed: bool
+    hits: int
+    retry_after: float
+
+
+class WindowStore(ABC):
+    """
+    Backend interface. Keys are free-form strings; callers namespace
+    them ("tg:update:<id>", "flw:verify:<tx_ref>", ...).
+    """
+
+    name = "base"
+
+    @abstractmethod
+    async def hit(self, key: str, *, limit: int, window_seconds: float) -> WindowHit:
+        """Count one request for `key` in its current window."""
+
+    @abstractmethod
+    async def forget(self, key: str) -> None:
+        """Drop the window of `key` (e.g. a failed delivery may be retried)."""
+
+    async def seen(self, key: str, *, ttl_seconds: float) -> bool:
+        result = await self.hit(key, limit=1, window_seconds=ttl_seconds)
+        return not result.allowed
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": self.name}
+
+
+# ------------------------------------------------------------
+# In-process backend
+# ------------------------------------------------------------
+class MemoryWindowStore(WindowStore):
+    name = "memory"
+
+    def __init__(self, *, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        # key -> (expires_at monotonic, hits); insertion order = window start
+        self._windows: "OrderedDict[str, Tuple[float, int]]" = OrderedDict()
+        self._max_keys = max(1, int(max_keys))
+        self._hits = 0
+        self._limited = 0
+        self._evicted = 0
+
+    def _sweep(self, now: float) -> None:
+        windows = self._windows
+        while windows:
+            key, (expires_at, _) = next(iter(windows.items()))
+            if expires_at > now:
+                break
+            del windows[key]
+
+        while len(windows) > self._max_keys:
+            windows.popitem(last=False)
+            self._evicted += 1
+
+    def hit_now(self, key: str, *, limit: int, window_seconds: float) -> WindowHit:
+        now = time.monotonic()
+        self._hits += 1
+
+        current = self._windows.get(key)
+        if current is None or current[0] <= now:
+            # New window goes to the back, behind every older one
+            self._windows.pop(key, None)
+            current = (now + float(window_seconds), 1)
+        else:
+            current = (current[0], current[1] + 1)
+        self._windows[key] = current
+        self._sweep(now)
+
+        expires_at, hits = current
+        if hits <= limit:
+            return WindowHit(True, hits, 0.0)
+
+        self._limited += 1
+        return WindowHit(False, hits, max(0.0, expires_at - now))
+
+    async def hit(self, key: str, *, limit: int, window_seconds: float) -> WindowHit:
+        return self.hit_now(key, limit=limit, window_seconds=window_seconds)
+
+    async def forget(self, key: str) -> None:
+        self._windows.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.name,
+            "keys": len(self._windows),
+            "max_keys": self._max_keys,
+            "hits": self._hits,
+            "limited": self._limited,
+            "evicted": self._evicted,
+        }
+
+
+# ------------------------------------------------------------
+# Postgres backend (UNLOGGED table, shared by all workers)
+# ------------------------------------------------------------
+class PostgresWindowStore(WindowStore):
+    name = "postgres"
+
+    def __init__(self, *, fallback: Optional[MemoryWindowStore] = None):
+        self._fallback = fallback or MemoryWindowStore()
+        self._last_purge = time.monotonic()
+        self._purge_task: Optional[asyncio.Task] = None
+        self._hits = 0
+        self._limited = 0
+        self._errors = 0
+        self._purged = 0
+
+    async def hit(self, key: str, *, limit: int, window_seconds: float) -> WindowHit:
+        from db import get_async_session
+
+        self._hits += 1
+        try:
+            async with get_async_session() as session:
+                async with session.begin():
+                    res = await session.execute(
+                        text("""
+                            INSERT INTO rate_limit_windows (key, hits, expires_at)
+                            VALUES (:k, 1, NOW() + make_interval(secs => :w))
+                            ON CONFLICT (key)
+                            DO UPDATE SET
+                                hits = CASE
+                                    WHEN rate_limit_windows.expires_at <= NOW() THEN 1
+                                    ELSE rate_limit_windows.hits + 1
+                                END,
+                                expires_at = CASE
+                                    WHEN rate_limit_windows.expires_at <= NOW() THEN EXCLUDED.expires_at
+                                    ELSE rate_limit_windows.expires_at
+                                END
+                            RETURNING
+                                hits,
+                                EXTRACT(EPOCH FROM (expires_at - NOW())) AS ttl
+                        """),
+                        {"k": str(key), "w": float(window_seconds)},
+                    )
+                    row = res.mappings().one()
+        except Exception:
+            self._errors += 1
+            logger.warning("⚠️ rate_limit_windows unavailable, using in-process window | key=%s", key, exc_info=True)
+            return self._fallback.hit_now(key, limit=limit, window_seconds=window_seconds)
+
+        self._maybe_purge()
+
+        hits = int(row["hits"])
+        if hits <= limit:
+            return WindowHit(True, hits, 0.0)
+
+        self._limited += 1
+        return WindowHit(False, hits, max(0.0, float(row["ttl"] or 0)))
+
+    async def forget(self, key: str) -> None:
+        from db import get_async_session
+
+        await self._fallback.forget(key)
+        try:
+            async with get_async_session() as session:
+                async with session.begin():
+                    await session.execute(
+                        text("DELETE FROM rate_limit_windows WHERE key = :k"),
+                        {"k": str(key)},
+                    )
+        except Exception:
+            self._errors += 1
+            logger.warning("⚠️ Could not forget rate-limit key=%s", key, exc_info=True)
+
+    def _maybe_purge(self) -> None:
+        now = time.monotonic()
+        if now - self._last_purge < RATE_LIMIT_PURGE_SECONDS:
+            return
+        if self._purge_task is not None and not self._purge_task.done():
+            return
+        self._last_purge = now
+        self._purge_task = asyncio.get_running_loop().create_task(self._purge(), name="RateLimitPurge")
+
+    async def _purge(self) -> None:
+        from db import get_async_session
+
+        try:
+            async with get_async_session() as session:
+                async with session.begin():
+                    res = await session.execute(
+                        text("DELETE FROM rate_limit_windows WHERE expires_at < NOW()")
+                    )
+            self._purged += int(res.rowcount or 0)
+        except Exception:
+            self._errors += 1
+            logger.warning("⚠️ rate_limit_windows purge failed", exc_info=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.name,
+            "hits": self._hits,
+            "limited": self._limited,
+            "errors": self._errors,
+            "purged": self._purged,
+            "fallback": self._fallback.stats(),
+        }
+
+
+# ====================================================================
+# SHARED INSTANCE
+# ====================================================================
+_STORE: Optional[WindowStore] = None
+
+
+def get_window_store() -> WindowStore:
+    global _STORE
+
+    if _STORE is None:
+        if RATE_LIMIT_BACKEND == "postgres":
+            _STORE = PostgresWindowStore()
+        else:
+            if RATE_LIMIT_BACKEND != "memory":
+                logger.warning("⚠️ Unknown RATE_LIMIT_BACKEND=%s, using memory", RATE_LIMIT_BACKEND)
+            _STORE = MemoryWindowStore()
+
+    return _STORE
+
+
+async def is_rate_limited(key: str, *, limit: int = 1, window_seconds: float = 10) -> bool:
+    """True when `key` has already been hit `limit` times in this window."""
+    result = await get_window_store().hit(key, limit=limit, window_seconds=window_seconds)
+    return not result.allowed
+
+
+async def already_seen(key: str, *, ttl_seconds: float) -> bool:
+    """First call for `key` -> False; repeats within ttl_seconds -> True."""
+    return await get_window_store().seen(key, ttl_seconds=ttl_seconds)
+
+
+async def forget(key: str) -> None:
+    await get_window_store().forget(key)
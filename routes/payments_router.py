@@ -8,19 +8,25 @@ from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from fastapi.responses import HTMLResponse, JSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from telegram import Bot
 
 from db import get_session
 from services.flutterwave_client import (
+    calculate_tries,
     normalize_flw_status,
     validate_flutterwave_webhook,
-    verify_payment,
+)
+from services.payment_verification import (
+    PaymentResolution,
+    get_payment_verifier,
+    resolution_from_info,
 )
 from services.trivia_payments import finalize_trivia_payment, get_trivia_payment
 from services.jamb_payments import finalize_jamb_payment, get_jamb_payment
 from services.mockjamb_payments import finalize_mockjamb_payment, get_mockjamb_payment
 from services.mockwaec_payments import finalize_mockwaec_payment, get_mockwaec_payment
 from services.waec_payment_finalizer import finalize_waec_payment, get_waec_payment
+from send_scheduler import PRIORITY_HIGH
+from rate_limit_store import already_seen, forget, is_rate_limited
 
 logger = logging.getLogger("payments_router")
 logger.setLevel(logging.INFO)
@@ -30,6 +36,11 @@ router = APIRouter()
 BOT_USERNAME = os.getenv("BOT_USERNAME", "NaijaPrizeGateBot")
 BOT_TOKEN = os.getenv("BOT_TOKEN")
 
+# Flutterwave retries a webhook until it gets a 200; drop repeats.
+FLW_WEBHOOK_DEDUPE_SECONDS = int(os.getenv("FLW_WEBHOOK_DEDUPE_SECONDS", "3600"))
+# Redirect pages poll; verify with Flutterwave at most once per interval per tx_ref.
+FLW_VERIFY_MIN_INTERVAL_SECONDS = float(os.getenv("FLW_VERIFY_MIN_INTERVAL_SECONDS", "3"))
+
 
 def _product_type_from_tx_ref(tx_ref: str) -> str:
     tx_ref = (tx_ref or "").upper().strip()
@@ -52,6 +63,43 @@ def _product_type_from_tx_ref(tx_ref: str) -> str:
     return "TRIVIA"
 
 
+def _verifying_page() -> HTMLResponse:
+    return HTMLResponse("""
+        <html><head><meta charset="utf-8"><title>Verifying Payment</title></head>
+        <body style="font-family: Arial, sans-serif; text-align:center; padding:40px;">
+          <h2>⏳ Verifying your payment...</h2>
+          <div style="margin:20px auto;height:40px;width:40px;border:5px solid #ccc;border-top-color:#4CAF50;border-radius:50%;animation:spin 1s linear infinite;"></div>
+          <p>Please wait — we are checking the payment status. This page will auto-refresh.</p>
+          <script>setTimeout(() => location.reload(), 4000);</script>
+          <style>@keyframes spin { to { transform: rotate(360deg); } }</style>
+        </body></html>
+    """, status_code=200)
+
+
+def _pending_status(tx_ref: str) -> JSONResponse:
+    return JSONResponse({
+        "done": False,
+        "html": f"""
+        <h2 style="color:orange;">⏳ Payment Pending</h2>
+        <p>Transaction Reference: <b>{tx_ref}</b></p>
+        <p>⚠️ Your payment is still being processed.</p>
+        <div class="spinner" style="margin:20px auto;height:40px;width:40px;border:5px solid #ccc;border-top-color:#f39c12;border-radius:50%;animation:spin 1s linear infinite;"></div>
+        <style>@keyframes spin {{ to {{ transform: rotate(360deg); }} }}</style>
+        """
+    })
+
+
+async def _verify_throttled(tx_ref: str) -> bool:
+    """
+    True when this tx_ref was verified less than
+    FLW_VERIFY_MIN_INTERVAL_SECONDS ago (by any tab or poll).
+    """
+    return await is_rate_limited(
+        f"flw:verify:{tx_ref}",
+        window_seconds=FLW_VERIFY_MIN_INTERVAL_SECONDS,
+    )
+
+
 def _success_url(tx_ref: str, product_type: str, subject_code: str | None = None) -> str:
     product_type = (product_type or "").upper().strip()
     subject_code = (subject_code or "").strip().lower()
@@ -120,7 +168,7 @@ async def _send_payment_success_message(
         return
 
     try:
-        bot = Bot(token=BOT_TOKEN)
+        from bot_instance import bot
 
         if product_type == "TRIVIA":
             text = (
@@ -179,6 +227,7 @@ async def _send_payment_success_message(
             chat_id=tg_id,
             text=text,
             parse_mode="Markdown",
+            rate_limit_args={"priority": PRIORITY_HIGH},
         )
 
     except Exception as e:
@@ -471,6 +520,11 @@ async def flutterwave_webhook(
     if flw_status != "successful":
         return JSONResponse({"status": "ignored"})
 
+    delivery_key = f"flw:webhook:{event}:{data.get('id') or tx_ref}"
+    if await already_seen(delivery_key, ttl_seconds=FLW_WEBHOOK_DEDUPE_SECONDS):
+        logger.info("🔁 Duplicate Flutterwave webhook ignored | tx_ref=%s", tx_ref)
+        return JSONResponse({"status": "duplicate"})
+
     verified = {
         "status": "successful",
         "amount": int(data.get("amount") or 0),
@@ -488,12 +542,25 @@ async def flutterwave_webhook(
         await session.commit()
     except Exception as e:
         await session.rollback()
+        await forget(delivery_key)
         logger.exception("❌ Webhook finalization failed | tx_ref=%s | err=%s", tx_ref, e)
         return JSONResponse({"status": "error"})
 
     if info.get("status") != "successful":
+        # Let Flutterwave's retry try again
+        await forget(delivery_key)
         return JSONResponse({"status": "error", "reason": info.get("reason")})
 
+    # Redirect-status polls for this tx_ref are now answered from memory
+    get_payment_verifier().remember(
+        tx_ref,
+        resolution_from_info(
+            product_type,
+            info,
+            str((verified.get("meta") or {}).get("subject_code") or ""),
+        ),
+    )
+
     if info.get("credited_now"):
         if product_type == "JAMB":
             await _send_payment_success_message(
@@ -550,12 +617,15 @@ async def flutterwave_redirect(
 ):
     del status, transaction_id
 
+    if await _verify_throttled(tx_ref):
+        return _verifying_page()
+
     product_type_hint = _product_type_from_tx_ref(tx_ref)
     success_url = _success_url(tx_ref, product_type_hint)
     failed_url = _failed_url(tx_ref, product_type_hint)
 
     try:
-        verified = await verify_payment(tx_ref)
+        verified = await get_payment_verifier().verify(tx_ref)
         verify_status = normalize_flw_status(verified.get("status"))
 
         logger.info(
@@ -584,6 +654,11 @@ async def flutterwave_redirect(
             )
 
             if info.get("status") == "successful":
+                get_payment_verifier().remember(
+                    tx_ref,
+                    resolution_from_info(product_type, info, subject_code),
+                )
+
                 if info.get("credited_now"):
                     if product_type == "JAMB":
                         await _send_payment_success_message(
@@ -738,16 +813,7 @@ async def flutterwave_redirect(
                 </body></html>
             """, status_code=200)
 
-        return HTMLResponse(f"""
-            <html><head><meta charset="utf-8"><title>Verifying Payment</title></head>
-            <body style="font-family: Arial, sans-serif; text-align:center; padding:40px;">
-              <h2>⏳ Verifying your payment...</h2>
-              <div style="margin:20px auto;height:40px;width:40px;border:5px solid #ccc;border-top-color:#4CAF50;border-radius:50%;animation:spin 1s linear infinite;"></div>
-              <p>Please wait — we are checking the payment status. This page will auto-refresh.</p>
-              <script>setTimeout(() => location.reload(), 4000);</script>
-              <style>@keyframes spin {{ to {{ transform: rotate(360deg); }} }}</style>
-            </body></html>
-        """, status_code=200)
+        return _verifying_page()
 
     except Exception as e:
         await session.rollback()
@@ -762,17 +828,168 @@ async def flutterwave_redirect(
         """, status_code=200)
 
 
+async def _local_resolution(session: AsyncSession, tx_ref: str) -> PaymentResolution | None:
+    """
+    The finalized outcome straight from the payments tables (the webhook
+    usually got there first). None while the payment is not yet credited.
+    """
+    product_type = _product_type_from_tx_ref(tx_ref)
+
+    if product_type == "TRIVIA":
+        payment = await get_trivia_payment(session, tx_ref)
+        if not payment or payment.status != "COMPLETED":
+            return None
+        return PaymentResolution(
+            status="successful",
+            product_type="TRIVIA",
+            tries=calculate_tries(int(payment.amount or 0)),
+        )
+
+    if product_type in ("JAMB", "JAMBMOCKSUBJECT"):
+        payment = await get_jamb_payment(session, tx_ref)
+    elif product_type in ("WAEC", "WAECMOCKSUBJECT"):
+        payment = await get_waec_payment(session, tx_ref)
+    elif product_type == "MOCKJAMB":
+        payment = await get_mockjamb_payment(session, tx_ref)
+    else:
+        payment = await get_mockwaec_payment(session, tx_ref)
+
+    if not payment or str(payment.get("payment_status") or "").lower() != "successful":
+        return None
+
+    return PaymentResolution(
+        status="successful",
+        product_type=product_type,
+        subject_code=str(payment.get("subject_code") or "").strip().lower(),
+        credits=int(payment.get("question_credits_added") or 0),
+        mock_sessions=int(payment.get("mock_sessions_added") or 0),
+    )
+
+
+def _resolved_status(tx_ref: str, resolution: PaymentResolution) -> JSONResponse:
+    product_type = resolution.product_type
+    success_url = _success_url(tx_ref, product_type, resolution.subject_code)
+    failed_url = _failed_url(tx_ref, product_type, resolution.subject_code)
+
+    if resolution.status != "successful":
+        logger.info(
+            "↩️ Redirect status failed target chosen | tx_ref=%s | product_type=%s | failed_url=%s",
+            tx_ref,
+            product_type,
+            failed_url,
+        )
+
+        return JSONResponse({
+            "done": True,
+            "html": f"""
+            <h2 style="color:red;">❌ Payment Failed</h2>
+            <p>Transaction Reference: <b>{tx_ref}</b></p>
+            <script>setTimeout(() => window.location.href="{failed_url}", 5000);</script>
+            """
+        })
+
+    if product_type == "JAMBMOCKSUBJECT":
+        mock_sessions = resolution.mock_sessions
+        return JSONResponse({
+            "done": True,
+            "html": f"""
+            <h2 style="color:green;">✅ Mock UTME \\(By Subject\\) Payment Successful</h2>
+            <p>Transaction Reference: <b>{tx_ref}</b></p>
+            <p>🎟 You’ve been credited with <b>{mock_sessions} mock session{'s' if mock_sessions != 1 else ''}</b>.</p>
+            <p>This tab will redirect to Telegram in 5 seconds...</p>
+            <script>setTimeout(() => window.location.href="{success_url}", 5000);</script>
+            """
+        })
+
+    if product_type == "MOCKJAMB":
+        return JSONResponse({
+            "done": True,
+            "html": f"""
+            <h2 style="color:green;">✅ Mock JAMB / UTME Payment Successful</h2>
+            <p>Transaction Reference: <b>{tx_ref}</b></p>
+            <p>📝 Your Mock JAMB / UTME access has been activated.</p>
+            <p>This tab will redirect to Telegram in 5 seconds...</p>
+            <script>setTimeout(() => window.location.href="{success_url}", 5000);</script>
+            """
+        })
+
+    if product_type == "MOCKWAEC":
+        return JSONResponse({
+            "done": True,
+            "html": f"""
+            <h2 style="color:green;">✅ Mock WAEC / NECO Payment Successful</h2>
+            <p>Transaction Reference: <b>{tx_ref}</b></p>
+            <p>📝 Your Mock WAEC / NECO access has been activated.</p>
+            <p>This tab will redirect to Telegram in 5 seconds...</p>
+            <script>setTimeout(() => window.location.href="{success_url}", 5000);</script>
+            """
+        })
+
+    if product_type == "JAMB":
+        credits = resolution.credits
+        return JSONResponse({
+            "done": True,
+            "html": f"""
+            <h2 style="color:green;">✅ JAMB Payment Successful</h2>
+            <p>Transaction Reference: <b>{tx_ref}</b></p>
+            <p>📚 You’ve been credited with <b>{credits} JAMB question credits</b>.</p>
+            <p>This tab will redirect to Telegram in 5 seconds...</p>
+            <script>setTimeout(() => window.location.href="{success_url}", 5000);</script>
+            """
+        })
+
+    if product_type == "WAEC":
+        credits = resolution.credits
+        return JSONResponse({
+            "done": True,
+            "html": f"""
+            <h2 style="color:green;">✅ WAEC Payment Successful</h2>
+            <p>Transaction Reference: <b>{tx_ref}</b></p>
+            <p>📚 You’ve been credited with <b>{credits} WAEC question credits</b>.</p>
+            <p>This tab will redirect to Telegram in 5 seconds...</p>
+            <script>setTimeout(() => window.location.href="{success_url}", 5000);</script>
+            """
+        })
+
+    tries = resolution.tries
+    return JSONResponse({
+        "done": True,
+        "html": f"""
+        <h2 style="color:green;">✅ Payment Successful</h2>
+        <p>Transaction Reference: <b>{tx_ref}</b></p>
+        <p>🎁 You’ve been credited with <b>{tries} spin{'s' if tries > 1 else ''}</b>! 🎉</p>
+        <p>This tab will redirect to Telegram in 5 seconds...</p>
+        <script>setTimeout(() => window.location.href="{success_url}", 5000);</script>
+        """
+    })
+
+
 @router.get("/flw/redirect/status")
 async def flutterwave_redirect_status(
     tx_ref: str,
     session: AsyncSession = Depends(get_session),
 ):
+    verifier = get_payment_verifier()
     product_type_hint = _product_type_from_tx_ref(tx_ref)
-    success_url = _success_url(tx_ref, product_type_hint)
     failed_url = _failed_url(tx_ref, product_type_hint)
 
     try:
-        verified = await verify_payment(tx_ref)
+        # 1) Already credited in this process (webhook / earlier poll)
+        resolution = verifier.resolved(tx_ref)
+        if resolution is not None:
+            return _resolved_status(tx_ref, resolution)
+
+        # 2) Finalized by another worker: the payments tables say so
+        resolution = await _local_resolution(session, tx_ref)
+        if resolution is not None:
+            verifier.remember(tx_ref, resolution)
+            return _resolved_status(tx_ref, resolution)
+
+        # 3) Ask Flutterwave (coalesced per tx_ref, throttled across polls)
+        if await _verify_throttled(tx_ref):
+            return _pending_status(tx_ref)
+
+        verified = await verifier.verify(tx_ref)
         verify_status = normalize_flw_status(verified.get("status"))
 
         if verify_status == "successful":
@@ -784,128 +1001,35 @@ async def flutterwave_redirect_status(
             await session.commit()
 
             subject_code = str((verified.get("meta") or {}).get("subject_code") or "").strip().lower()
-            success_url = _success_url(tx_ref, product_type, subject_code)
             failed_url = _failed_url(tx_ref, product_type, subject_code)
 
-            logger.info(
-                "↩️ Redirect status target chosen | tx_ref=%s | product_type=%s | success_url=%s",
-                tx_ref,
-                product_type,
-                success_url,
-            )
-
-            if info.get("status") == "successful":
-                if product_type == "JAMBMOCKSUBJECT":
-                    mock_sessions = int(info.get("mock_sessions") or 0)
-                    return JSONResponse({
-                        "done": True,
-                        "html": f"""
-                        <h2 style="color:green;">✅ Mock UTME \\(By Subject\\) Payment Successful</h2>
-                        <p>Transaction Reference: <b>{tx_ref}</b></p>
-                        <p>🎟 You’ve been credited with <b>{mock_sessions} mock session{'s' if mock_sessions != 1 else ''}</b>.</p>
-                        <p>This tab will redirect to Telegram in 5 seconds...</p>
-                        <script>setTimeout(() => window.location.href="{success_url}", 5000);</script>
-                        """
-                    })
-                
-                if product_type == "MOCKJAMB":
-                    return JSONResponse({
-                        "done": True,
-                        "html": f"""
-                        <h2 style="color:green;">✅ Mock JAMB / UTME Payment Successful</h2>
-                        <p>Transaction Reference: <b>{tx_ref}</b></p>
-                        <p>📝 Your Mock JAMB / UTME access has been activated.</p>
-                        <p>This tab will redirect to Telegram in 5 seconds...</p>
-                        <script>setTimeout(() => window.location.href="{success_url}", 5000);</script>
-                        """
-                    })
-
-                if product_type == "MOCKWAEC":
-                    return JSONResponse({
-                        "done": True,
-                        "html": f"""
-                        <h2 style="color:green;">✅ Mock WAEC / NECO Payment Successful</h2>
-                        <p>Transaction Reference: <b>{tx_ref}</b></p>
-                        <p>📝 Your Mock WAEC / NECO access has been activated.</p>
-                        <p>This tab will redirect to Telegram in 5 seconds...</p>
-                        <script>setTimeout(() => window.location.href="{success_url}", 5000);</script>
-                        """
-                    })
-
-                if product_type == "JAMB":
-                    credits = int(info.get("credits") or 0)
-                    return JSONResponse({
-                        "done": True,
-                        "html": f"""
-                        <h2 style="color:green;">✅ JAMB Payment Successful</h2>
-                        <p>Transaction Reference: <b>{tx_ref}</b></p>
-                        <p>📚 You’ve been credited with <b>{credits} JAMB question credits</b>.</p>
-                        <p>This tab will redirect to Telegram in 5 seconds...</p>
-                        <script>setTimeout(() => window.location.href="{success_url}", 5000);</script>
-                        """
-                    })
-                
-                if product_type == "WAEC":
-                    credits = int(info.get("credits") or 0)
-                    return JSONResponse({
-                        "done": True,
-                        "html": f"""
-                        <h2 style="color:green;">✅ WAEC Payment Successful</h2>
-                        <p>Transaction Reference: <b>{tx_ref}</b></p>
-                        <p>📚 You’ve been credited with <b>{credits} WAEC question credits</b>.</p>
-                        <p>This tab will redirect to Telegram in 5 seconds...</p>
-                        <script>setTimeout(() => window.location.href="{success_url}", 5000);</script>
-                        """
-                    })
-
-                tries = int(info.get("tries") or 0)
+            if info.get("status") != "successful":
                 return JSONResponse({
                     "done": True,
                     "html": f"""
-                    <h2 style="color:green;">✅ Payment Successful</h2>
+                    <h2 style="color:red;">❌ Payment Processing Error</h2>
                     <p>Transaction Reference: <b>{tx_ref}</b></p>
-                    <p>🎁 You’ve been credited with <b>{tries} spin{'s' if tries > 1 else ''}</b>! 🎉</p>
-                    <p>This tab will redirect to Telegram in 5 seconds...</p>
-                    <script>setTimeout(() => window.location.href="{success_url}", 5000);</script>
+                    <script>setTimeout(() => window.location.href="{failed_url}", 5000);</script>
                     """
                 })
 
-            return JSONResponse({
-                "done": True,
-                "html": f"""
-                <h2 style="color:red;">❌ Payment Processing Error</h2>
-                <p>Transaction Reference: <b>{tx_ref}</b></p>
-                <script>setTimeout(() => window.location.href="{failed_url}", 5000);</script>
-                """
-            })
+            resolution = resolution_from_info(product_type, info, subject_code)
+            verifier.remember(tx_ref, resolution)
 
-        if verify_status in ("failed", "expired"):
             logger.info(
-                "↩️ Redirect status failed target chosen | tx_ref=%s | product_type=%s | failed_url=%s",
+                "↩️ Redirect status target chosen | tx_ref=%s | product_type=%s | success_url=%s",
                 tx_ref,
-                product_type_hint,
-                failed_url,
+                product_type,
+                _success_url(tx_ref, product_type, subject_code),
             )
+            return _resolved_status(tx_ref, resolution)
 
-            return JSONResponse({
-                "done": True,
-                "html": f"""
-                <h2 style="color:red;">❌ Payment Failed</h2>
-                <p>Transaction Reference: <b>{tx_ref}</b></p>
-                <script>setTimeout(() => window.location.href="{failed_url}", 5000);</script>
-                """
-            })
+        if verify_status in ("failed", "expired"):
+            # Not cached: the webhook may still confirm it (step 2 next poll)
+            resolution = PaymentResolution(status=verify_status, product_type=product_type_hint)
+            return _resolved_status(tx_ref, resolution)
 
-        return JSONResponse({
-            "done": False,
-            "html": f"""
-            <h2 style="color:orange;">⏳ Payment Pending</h2>
-            <p>Transaction Reference: <b>{tx_ref}</b></p>
-            <p>⚠️ Your payment is still being processed.</p>
-            <div class="spinner" style="margin:20px auto;height:40px;width:40px;border:5px solid #ccc;border-top-color:#f39c12;border-radius:50%;animation:spin 1s linear infinite;"></div>
-            <style>@keyframes spin {{ to {{ transform: rotate(360deg); }} }}</style>
-            """
-        })
+        return _pending_status(tx_ref)
 
     except Exception as e:
         await session.rollback()
@@ -919,4 +1043,3 @@ async def flutterwave_redirect_status(
             <p><a href="https://t.me/{BOT_USERNAME}">Return to Telegram</a></p>
             """
         })
-
@@ -0,0 +1,537 @@
+# ====================================================================
+# send_scheduler.py
+# Outbound Telegram send/edit scheduler.
+#
+# Plugged into python-telegram-bot as the ExtBot rate limiter, so every
+# send*/edit*/copy*/forward* call made through the application bot or
+# bot_instance.bot passes through here:
+#
+# - token bucket per chat (private / group rates) and one global bucket
+# - one request in flight per chat, so a chat's messages keep their order
+# - priority queue: payments/results before normal replies before
+#   animation frames and countdown ticks
+# - edits to the same message that are still queued are coalesced
+#   (latest frame wins, every caller gets the final result)
+# - RetryAfter pauses the chat (or everything for chat-less calls) for
+#   retry_after seconds and requeues the request
+# - queue depth / wait metrics via stats() (exposed on /health)
+#
+# Priority: pass rate_limit_args={"priority": PRIORITY_HIGH} on bot calls,
+# or wrap Message shortcuts (which cannot take rate_limit_args) in
+# `with send_priority(PRIORITY_LOW): ...`.
+# ====================================================================
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import contextvars
+import heapq
+import itertools
+import logging
+import os
+import time
+from datetime import timedelta
+from typing import Any, Callable, Coroutine, Dict, Hashable, Iterator, List, Optional, Set, Tuple
+
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+
+logger = logging.getLogger("send_scheduler")
+
+PRIORITY_HIGH = 0     # payments, results, payouts
+PRIORITY_NORMAL = 1   # regular replies (default)
+PRIORITY_LOW = 2      # animation frames, countdown ticks
+
+GLOBAL_RATE = float(os.getenv("TG_SEND_GLOBAL_RATE", "30"))
+GLOBAL_BURST = float(os.getenv("TG_SEND_GLOBAL_BURST", "30"))
+CHAT_RATE = float(os.getenv("TG_SEND_CHAT_RATE", "1"))
+CHAT_BURST = float(os.getenv("TG_SEND_CHAT_BURST", "4"))
+GROUP_RATE = float(os.getenv("TG_SEND_GROUP_RATE", str(20 / 60)))
+GROUP_BURST = float(os.getenv("TG_SEND_GROUP_BURST", "3"))
+MAX_IN_FLIGHT = int(os.getenv("TG_SEND_MAX_IN_FLIGHT", "64"))
+MAX_RETRIES = int(os.getenv("TG_SEND_MAX_RETRIES", "3"))
+DRAIN_SECONDS = float(os.getenv("TG_SEND_DRAIN_SECONDS", "5"))
+
+BUCKET_IDLE_SECONDS = 120.0
+
+# Endpoints that produce chat output and are therefore scheduled.
+_SCHEDULED_PREFIXES = ("send", "edit", "copy", "forward")
+
+# Edits where only the newest queued version matters.
+_COALESCE_ENDPOINTS = frozenset({
+    "editMessageText",
+    "editMessageCaption",
+    "editMessageReplyMarkup",
+    "editMessageMedia",
+})
+
+_priority_var: contextvars.ContextVar[Optional[int]] = contextvars.ContextVar(
+    "tg_send_priority", default=None
+)
+
+
+@contextlib.contextmanager
+def send_priority(priority: int) -> Iterator[None]:
+    """
+    Priority for bot calls made inside the block (and tasks created in it).
+    """
+    token = _priority_var.set(int(priority))
+    try:
+        yield
+    finally:
+        _priority_var.reset(token)
+
+
+def _retry_after_seconds(exc: RetryAfter) -> float:
+    value = exc.retry_after
+    if isinstance(value, timedelta):
+        return value.total_seconds()
+    return float(value)
+
+
+# ------------------------------------------------------------
+# Token bucket
+# ------------------------------------------------------------
+class _TokenBucket:
+    __slots__ = ("rate", "capacity", "tokens", "updated", "paused_until")
+
+    def __init__(self, rate: float, capacity: float, now: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+        self.paused_until = 0.0
+
+    def delay(self, now: float) -> float:
+        """
+        Seconds until one token can be taken (0 = now).
+        """
+        if now < self.paused_until:
+            return self.paused_until - now
+
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self) -> None:
+        self.tokens -= 1
+
+    def pause(self, until: float) -> None:
+        self.paused_until = max(self.paused_until, until)
+        self.tokens = 0.0
+
+    def idle(self, now: float) -> bool:
+        return now >= self.paused_until and now - self.updated > BUCKET_IDLE_SECONDS
+
+
+# ------------------------------------------------------------
+# Queued request
+# ------------------------------------------------------------
+class _SendJob:
+    __slots__ = (
+        "seq",
+        "priority",
+        "endpoint",
+        "chat_id",
+        "lane",
+        "coalesce_key",
+        "callback",
+        "args",
+        "kwargs",
+        "future",
+        "enqueued_at",
+        "attempts",
+        "dispatched",
+    )
+
+    def __init__(
+        self,
+        *,
+        seq: int,
+        priority: int,
+        endpoint: str,
+        chat_id: Any,
+        coalesce_key: Optional[Hashable],
+        callback: Callable[..., Coroutine[Any, Any, Any]],
+        args: Any,
+        kwargs: Dict[str, Any],
+    ):
+        self.seq = seq
+        self.priority = priority
+        self.endpoint = endpoint
+        self.chat_id = chat_id
+        self.lane = chat_id if chat_id is not None else coalesce_key
+        self.coalesce_key = coalesce_key
+        self.callback = callback
+        self.args = args
+        self.kwargs = kwargs
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.enqueued_at = time.monotonic()
+        self.attempts = 0
+        self.dispatched = False
+
+
+# ------------------------------------------------------------
+# Scheduler
+# ------------------------------------------------------------
+class TelegramSendScheduler(BaseRateLimiter[Dict[str, Any]]):
+    def __init__(
+        self,
+        *,
+        global_rate: float = GLOBAL_RATE,
+        global_burst: float = GLOBAL_BURST,
+        chat_rate: float = CHAT_RATE,
+        chat_burst: float = CHAT_BURST,
+        group_rate: float = GROUP_RATE,
+        group_burst: float = GROUP_BURST,
+        max_in_flight: int = MAX_IN_FLIGHT,
+        max_retries: int = MAX_RETRIES,
+    ):
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.group_rate = group_rate
+        self.group_burst = group_burst
+        self.max_in_flight = max_in_flight
+        self.max_retries = max_retries
+
+        self._global = _TokenBucket(global_rate, global_burst, time.monotonic())
+        self._chats: Dict[Any, _TokenBucket] = {}
+        self._heap: List[Tuple[int, int, _SendJob]] = []
+        self._queued: Set[_SendJob] = set()
+        self._pending_edits: Dict[Hashable, _SendJob] = {}
+        self._busy_lanes: Set[Hashable] = set()
+        self._in_flight = 0
+        self._seq = itertools.count()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._last_prune = time.monotonic()
+
+        self._sent = 0
+        self._failed = 0
+        self._coalesced = 0
+        self._retry_after = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    # --------------------------------------------------------
+    # BaseRateLimiter
+    # --------------------------------------------------------
+    async def initialize(self) -> None:
+        self._ensure_running()
+
+    async def shutdown(self) -> None:
+        """
+        Give queued sends DRAIN_SECONDS to go out, then stop the dispatcher.
+        Requests arriving later restart it (bot_instance.bot may outlive
+        the application bot).
+        """
+        deadline = time.monotonic() + DRAIN_SECONDS
+        while (self._queued or self._in_flight) and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+
+        task, self._dispatcher = self._dispatcher, None
+        if task is not None and not task.done():
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+
+    async def process_request(
+        self,
+        callback: Callable[..., Coroutine[Any, Any, Any]],
+        args: Any,
+        kwargs: Dict[str, Any],
+        endpoint: str,
+        data: Dict[str, Any],
+        rate_limit_args: Optional[Dict[str, Any]],
+    ) -> Any:
+        if not endpoint.startswith(_SCHEDULED_PREFIXES):
+            return await callback(*args, **kwargs)
+
+        self._ensure_running()
+
+        priority = self._resolve_priority(rate_limit_args)
+        chat_id = data.get("chat_id")
+
+        coalesce_key: Optional[Hashable] = None
+        if endpoint in _COALESCE_ENDPOINTS:
+            target = data.get("message_id") or data.get("inline_message_id")
+            if target is not None:
+                coalesce_key = (endpoint, chat_id, target)
+
+        if coalesce_key is not None:
+            job = self._pending_edits.get(coalesce_key)
+            if job is not None and not job.dispatched:
+                # Latest frame wins; earlier callers get its result too.
+                job.callback, job.args, job.kwargs = callback, args, kwargs
+                self._coalesced += 1
+                if priority < job.priority:
+                    job.priority = priority
+                    heapq.heappush(self._heap, (priority, job.seq, job))
+                    self._wake()
+                return await asyncio.shield(job.future)
+
+        job = _SendJob(
+            seq=next(self._seq),
+            priority=priority,
+            endpoint=endpoint,
+            chat_id=chat_id,
+            coalesce_key=coalesce_key,
+            callback=callback,
+            args=args,
+            kwargs=kwargs,
+        )
+        self._enqueue(job)
+        if coalesce_key is not None:
+            self._pending_edits[coalesce_key] = job
+
+        return await asyncio.shield(job.future)
+
+    # --------------------------------------------------------
+    # Queue
+    # --------------------------------------------------------
+    @staticmethod
+    def _resolve_priority(rate_limit_args: Optional[Dict[str, Any]]) -> int:
+        if isinstance(rate_limit_args, dict) and rate_limit_args.get("priority") is not None:
+            return int(rate_limit_args["priority"])
+        if isinstance(rate_limit_args, int):
+            return int(rate_limit_args)
+
+        priority = _priority_var.get()
+        return PRIORITY_NORMAL if priority is None else priority
+
+    def _enqueue(self, job: _SendJob) -> None:
+        self._queued.add(job)
+        heapq.heappush(self._heap, (job.priority, job.seq, job))
+        self._wake()
+
+    def _wake(self) -> None:
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _ensure_running(self) -> None:
+        if self._dispatcher is not None and not self._dispatcher.done():
+            return
+
+        self._wakeup = asyncio.Event()
+        self._dispatcher = asyncio.get_running_loop().create_task(
+            self._dispatch_loop(), name="TelegramSendScheduler"
+        )
+
+    def _chat_bucket(self, chat_id: Any, now: float) -> _TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            is_group = isinstance(chat_id, str) or (isinstance(chat_id, int) and chat_id < 0)
+            if is_group:
+                bucket = _TokenBucket(self.group_rate, self.group_burst, now)
+            else:
+                bucket = _TokenBucket(self.chat_rate, self.chat_burst, now)
+            self._chats[chat_id] = bucket
+        return bucket
+
+    def _prune_buckets(self, now: float) -> None:
+        if now - self._last_prune < BUCKET_IDLE_SECONDS:
+            return
+        self._last_prune = now
+
+        waiting = {job.chat_id for job in self._queued}
+        for chat_id in [c for c, b in self._chats.items() if b.idle(now) and c not in waiting]:
+            del self._chats[chat_id]
+
+    # --------------------------------------------------------
+    # Dispatch
+    # --------------------------------------------------------
+    async def _dispatch_loop(self) -> None:
+        assert self._wakeup is not None
+
+        while True:
+            self._wakeup.clear()
+            try:
+                delay = self._dispatch_ready()
+            except Exception:
+                logger.exception("❌ Send scheduler dispatch error")
+                delay = 1.0
+
+            if delay is None:
+                await self._wakeup.wait()
+                continue
+
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+
+    def _dispatch_ready(self) -> Optional[float]:
+        """
+        Start every job allowed to go now, highest priority first.
+        Returns seconds until the next job could become ready
+        (None = wait for a new request or a finished send).
+        """
+        now = time.monotonic()
+        self._prune_buckets(now)
+
+        deferred: List[Tuple[int, int, _SendJob]] = []
+        next_delay: Optional[float] = None
+
+        while self._heap and self._in_flight < self.max_in_flight:
+            entry = heapq.heappop(self._heap)
+            priority, _, job = entry
+
+            # Stale entry (job re-prioritised or already sent)
+            if job.dispatched or priority != job.priority:
+                continue
+
+            if job.lane is not None and job.lane in self._busy_lanes:
+                deferred.append(entry)
+                continue
+
+            if job.chat_id is not None:
+                chat_bucket = self._chat_bucket(job.chat_id, now)
+                wait = chat_bucket.delay(now)
+                if wait > 0:
+                    deferred.append(entry)
+                    next_delay = wait if next_delay is None else min(next_delay, wait)
+                    continue
+            else:
+                chat_bucket = None
+
+            wait = self._global.delay(now)
+            if wait > 0:
+                deferred.append(entry)
+                next_delay = wait if next_delay is None else min(next_delay, wait)
+                break
+
+            self._global.take()
+            if chat_bucket is not None:
+                chat_bucket.take()
+            self._start(job, now)
+
+        for entry in deferred:
+            heapq.heappush(self._heap, entry)
+
+        return next_delay
+
+    def _start(self, job: _SendJob, now: float) -> None:
+        job.dispatched = True
+        self._queued.discard(job)
+        if job.coalesce_key is not None and self._pending_edits.get(job.coalesce_key) is job:
+            del self._pending_edits[job.coalesce_key]
+
+        waited = now - job.enqueued_at
+        self._wait_total += waited
+        self._wait_max = max(self._wait_max, waited)
+
+        self._in_flight += 1
+        if job.lane is not None:
+            self._busy_lanes.add(job.lane)
+
+        asyncio.get_running_loop().create_task(self._run(job))
+
+    async def _run(self, job: _SendJob) -> None:
+        try:
+            result = await job.callback(*job.args, **job.kwargs)
+        except RetryAfter as e:
+            self._retry_after += 1
+            self._on_retry_after(job, _retry_after_seconds(e), e)
+        except Exception as e:
+            self._failed += 1
+            if not job.future.done():
+                job.future.set_exception(e)
+        else:
+            self._sent += 1
+            if not job.future.done():
+                job.future.set_result(result)
+        finally:
+            self._in_flight -= 1
+            if job.lane is not None:
+                self._busy_lanes.discard(job.lane)
+            self._wake()
+
+    def _on_retry_after(self, job: _SendJob, seconds: float, exc: RetryAfter) -> None:
+        until = time.monotonic() + seconds
+
+        if job.chat_id is not None:
+            self._chat_bucket(job.chat_id, time.monotonic()).pause(until)
+        else:
+            self._global.pause(until)
+
+        logger.warning(
+            "⏳ Telegram flood control | endpoint=%s | chat_id=%s | retry_after=%.1fs | attempt=%s",
+            job.endpoint,
+            job.chat_id,
+            seconds,
+            job.attempts + 1,
+        )
+
+        if job.attempts >= self.max_retries:
+            self._failed += 1
+            if not job.future.done():
+                job.future.set_exception(exc)
+            return
+
+        job.attempts += 1
+        job.dispatched = False
+        self._enqueue(job)
+
+    # --------------------------------------------------------
+    # Metrics
+    # --------------------------------------------------------
+    def stats(self) -> Dict[str, Any]:
+        by_priority = {"high": 0, "normal": 0, "low": 0}
+        names = {PRIORITY_HIGH: "high", PRIORITY_NORMAL: "normal", PRIORITY_LOW: "low"}
+        for job in self._queued:
+            name = names.get(job.priority, "low" if job.priority > PRIORITY_LOW else "high")
+            by_priority[name] += 1
+
+        dispatched = self._sent + self._failed
+        return {
+            "queued": len(self._queued),
+            "queued_by_priority": by_priority,
+            "in_flight": self._in_flight,
+            "sent": self._sent,
+            "failed": self._failed,
+            "coalesced": self._coalesced,
+            "retry_after": self._retry_after,
+            "chats_tracked": len(self._chats),
+            "avg_wait_ms": round(self._wait_total / dispatched * 1000, 1) if dispatched else 0.0,
+            "max_wait_ms": round(self._wait_max * 1000, 1),
+        }
+
+
+# ====================================================================
+# SHARED INSTANCE + HELPERS
+# ====================================================================
+_SCHEDULER: Optional[TelegramSendScheduler] = None
+_background: Set[asyncio.Task] = set()
+
+
+def get_send_scheduler() -> TelegramSendScheduler:
+    global _SCHEDULER
+
+    if _SCHEDULER is None:
+        _SCHEDULER = TelegramSendScheduler()
+
+    return _SCHEDULER
+
+
+def fire_and_forget(coro: Coroutine[Any, Any, Any], *, priority: Optional[int] = None) -> asyncio.Task:
+    """
+    Run a bot call in the background (animation frames): the caller does
+    not wait for the send, and queued frames for the same message coalesce.
+    Errors are logged at debug level only.
+    """
+    if priority is None:
+        task = asyncio.create_task(coro)
+    else:
+        with send_priority(priority):
+            task = asyncio.create_task(coro)
+
+    _background.add(task)
+    task.add_done_callback(_forget_task)
+    return task
+
+
+def _forget_task(task: asyncio.Task) -> None:
+    _background.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.debug("Background Telegram send failed: %s", task.exception())
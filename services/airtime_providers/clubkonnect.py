@@ -9,7 +9,7 @@ import uuid
 import logging
 from typing import Optional, Dict, Any
 
-import httpx
+from http_clients import get_http_clients
 
 logger = logging.getLogger(__name__)
 
@@ -119,7 +119,7 @@ async def buy_airtime(
             "amount": amt,
         }
 
-
+    # Payouts pass NP-<payout_id> so a resend is a duplicate to the provider
     rid = request_id or f"NP-{uuid.uuid4()}"
 
     params = {
@@ -141,8 +141,15 @@ async def buy_airtime(
     logger.info(f"ClubKonnect airtime request | phone={p} amount={amt} network={net} request_id={rid}")
 
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            resp = await client.get(url, params=params)
+        # Pooled "clubkonnect" client (http_clients); a purchase is never
+        # replayed here, the payout engine owns retries.
+        resp = await get_http_clients().get(
+            "clubkonnect",
+            "GET /APIAirtimeV1.asp",
+            url,
+            params=params,
+            idempotent=False,
+        )
     except Exception as e:
         return {"status": "error", "message": f"Provider request failed: {e.__class__.__name__}"}
 
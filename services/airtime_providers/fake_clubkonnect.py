@@ -0,0 +1,107 @@
+# ==========================================================
+# services/airtime_providers/fake_clubkonnect.py
+# Local stand-in for the ClubKonnect airtime API (no network).
+#
+# An httpx transport answering GET /APIAirtimeV1.asp the way the real
+# provider does, so clubkonnect.buy_airtime / service.send_airtime /
+# the payout engine run unchanged:
+#
+#   get_http_clients().use_transport("clubkonnect", FakeClubKonnectTransport(latency_ms=300))
+#
+# Knobs: response latency, share of 5xx / non-JSON / "completed"
+# answers, and a provider-side rate limit (requests above max_rps in
+# a one-second window get a 503, like a throttling gateway). Counters
+# record requests per phone, peak concurrency and peak rate for the
+# benchmark.
+# ==========================================================
+from __future__ import annotations
+
+import asyncio
+import json
+import random
+import time
+import uuid
+from collections import Counter, deque
+from typing import Deque, Optional
+
+import httpx
+
+
+class FakeClubKonnectTransport(httpx.AsyncBaseTransport):
+    def __init__(
+        self,
+        *,
+        latency_ms: float = 300.0,
+        jitter_ms: float = 100.0,
+        server_error_rate: float = 0.0,
+        non_json_rate: float = 0.0,
+        completed_rate: float = 0.3,
+        max_rps: Optional[float] = None,
+        seed: int = 7,
+    ):
+        self.latency_ms = float(latency_ms)
+        self.jitter_ms = float(jitter_ms)
+        self.server_error_rate = float(server_error_rate)
+        self.non_json_rate = float(non_json_rate)
+        self.completed_rate = float(completed_rate)
+        self.max_rps = max_rps
+        self._rng = random.Random(seed)
+        self._window: Deque[float] = deque()
+
+        self.requests = 0
+        self.throttled = 0
+        self.per_phone: Counter = Counter()
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.peak_rps = 0
+
+    def _over_rate(self) -> bool:
+        now = time.monotonic()
+        while self._window and self._window[0] <= now - 1.0:
+            self._window.popleft()
+        self._window.append(now)
+        self.peak_rps = max(self.peak_rps, len(self._window))
+        return self.max_rps is not None and len(self._window) > self.max_rps
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        params = dict(request.url.params)
+        phone = params.get("MobileNumber", "")
+        self.requests += 1
+        self.per_phone[phone] += 1
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            throttled = self._over_rate()
+            delay = self.latency_ms + self._rng.uniform(-self.jitter_ms, self.jitter_ms)
+            await asyncio.sleep(max(0.0, delay) / 1000.0)
+
+            if throttled:
+                self.throttled += 1
+                return httpx.Response(503, text="Service Unavailable", request=request)
+
+            roll = self._rng.random()
+            if roll < self.server_error_rate:
+                return httpx.Response(502, text="Bad Gateway", request=request)
+            roll -= self.server_error_rate
+            if roll < self.non_json_rate:
+                return httpx.Response(200, text="<html>maintenance</html>", request=request)
+
+            if self._rng.random() < self.completed_rate:
+                body = {"statuscode": "200", "status": "ORDER_COMPLETED"}
+            else:
+                body = {"statuscode": "100", "status": "ORDER_RECEIVED"}
+            body.update(
+                orderid=uuid.uuid4().hex[:12],
+                mobilenetwork=params.get("MobileNetwork"),
+                mobilenumber=phone,
+                amountcharged=params.get("Amount"),
+                requestid=params.get("RequestID"),
+            )
+            return httpx.Response(
+                200,
+                content=json.dumps(body).encode(),
+                headers={"content-type": "application/json"},
+                request=request,
+            )
+        finally:
+            self.in_flight -= 1
@@ -0,0 +1,785 @@
+# ====================================================================
+# services/airtime_providers/payout_engine.py
+# Concurrent airtime payout engine.
+#
+#   claim   -> one short transaction: pick ready rows (FOR UPDATE SKIP
+#              LOCKED), mark them 'processing', bump retry_count and
+#              give them a lease (lease_owner / lease_expires_at).
+#              No row lock is held while the provider is called.
+#   workers -> AIRTIME_PAYOUT_WORKERS tasks send the claimed payouts
+#              concurrently; every provider call first takes a token
+#              from a shared bucket (AIRTIME_PROVIDER_RATE_PER_SECOND,
+#              burst AIRTIME_PROVIDER_BURST).
+#   writer  -> outcomes are written back in batches (one UPDATE ... FROM
+#              unnest) every AIRTIME_RESULT_FLUSH_MS; only rows whose
+#              lease this engine still owns are updated. on_result runs
+#              for each written row (user / admin notifications).
+#
+# Only as many rows are claimed as the workers can start soon, so a
+# lease never expires while its row waits in the queue; while a write-back
+# keeps failing the leases of the held results are renewed. On shutdown,
+# started sends get AIRTIME_SHUTDOWN_GRACE_SECONDS to finish and rows
+# never sent are released with their attempt given back.
+#
+# Every send uses RequestID NP-<payout_id>, so the provider sees a resend
+# of the same payout as a duplicate. A row whose lease expired (process
+# died mid-send, or could not write back in time) may already be paid: it
+# is never resent but moved to 'failed_needs_review' for an admin. The
+# owner keeps lease_owner, so a late write-back still records the outcome.
+#
+# The store and the send function are injected: PostgresPayoutStore +
+# service.send_airtime in production, in-memory / fake provider in
+# benchmarks/bench_airtime_payouts.py.
+# ====================================================================
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import socket
+import time
+import uuid
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import text
+
+logger = logging.getLogger("payout_engine")
+
+AIRTIME_PAYOUT_WORKERS = int(os.getenv("AIRTIME_PAYOUT_WORKERS", "8"))
+AIRTIME_PROVIDER_RATE_PER_SECOND = float(os.getenv("AIRTIME_PROVIDER_RATE_PER_SECOND", "5"))
+AIRTIME_PROVIDER_BURST = int(os.getenv("AIRTIME_PROVIDER_BURST", "5"))
+AIRTIME_CLAIM_BATCH = int(os.getenv("AIRTIME_CLAIM_BATCH", "25"))
+AIRTIME_LEASE_SECONDS = int(os.getenv("AIRTIME_LEASE_SECONDS", "180"))
+AIRTIME_IDLE_POLL_SECONDS = float(os.getenv("AIRTIME_IDLE_POLL_SECONDS", "5"))
+AIRTIME_RESULT_FLUSH_MS = int(os.getenv("AIRTIME_RESULT_FLUSH_MS", "200"))
+AIRTIME_SHUTDOWN_GRACE_SECONDS = float(os.getenv("AIRTIME_SHUTDOWN_GRACE_SECONDS", "10"))
+
+MAX_AIRTIME_RETRIES = 3
+AIRTIME_RETRY_COOLDOWN_MINUTES = 10
+
+REVIEW_STATUS = "failed_needs_review"
+
+
+@dataclass(slots=True)
+class PayoutJob:
+    id: Any
+    tg_id: int
+    phone: str
+    amount: int
+    attempt_no: int
+    from_status: str
+
+
+@dataclass(slots=True)
+class PayoutOutcome:
+    status: str
+    success: bool = False
+    provider: Optional[str] = None
+    reference: str = ""
+    message: str = ""
+    raw: Optional[Dict[str, Any]] = None   # None -> keep the stored provider fields
+    payload: Optional[str] = None
+
+
+def provider_request_id(payout_id: Any) -> str:
+    """RequestID sent to the provider; stable across attempts of one payout."""
+    return f"NP-{payout_id}"
+
+
+# ====================================================================
+# OUTCOME CLASSIFICATION
+# ====================================================================
+def _classify_failure(res) -> Tuple[str, bool]:
+    """
+    Returns: (new_status, should_retry)
+    """
+    raw = (res.raw or {}) if hasattr(res, "raw") else {}
+    status = str(raw.get("status") or "").upper().strip()
+    msg = str(getattr(res, "message", "") or "").upper().strip()
+
+    if status == "INSUFFICIENT_BALANCE" or msg == "INSUFFICIENT_BALANCE":
+        return ("failed_needs_funding", False)
+
+    retryable = raw.get("retryable")
+    if isinstance(retryable, bool):
+        return ("failed_retryable", retryable)
+
+    http_status = raw.get("http_status")
+    try:
+        http_status = int(http_status) if http_status is not None else 0
+    except Exception:
+        http_status = 0
+
+    msg_lower = str(raw.get("message") or "").lower()
+
+    if http_status >= 500 or "non-json response" in msg_lower or "timeout" in msg_lower:
+        return ("failed_retryable", True)
+
+    return ("failed_permanent", False)
+
+
+def _resolve_success_status(res) -> str:
+    """
+    Distinguish between sent vs completed when provider reports success.
+    """
+    raw = (res.raw or {}) if hasattr(res, "raw") else {}
+
+    status_code = str(raw.get("statuscode") or raw.get("statusCode") or "").strip()
+    status_text = str(raw.get("status") or "").upper().strip()
+
+    if status_code == "200" or status_text in ("ORDER_COMPLETED", "COMPLETED", "SUCCESS"):
+        return "completed"
+
+    if status_code in ("100", "300") or status_text in ("ORDER_RECEIVED", "ORDER_PROCESSED"):
+        return "sent"
+
+    if getattr(res, "success", False):
+        return "sent"
+
+    return "failed"
+
+
+def outcome_from_result(job: PayoutJob, res, *, max_retries: int = MAX_AIRTIME_RETRIES) -> PayoutOutcome:
+    """Provider AirtimeResult -> row status and stored response."""
+    raw = getattr(res, "raw", None) or {}
+    raw_json = json.dumps(raw, ensure_ascii=False)
+
+    if getattr(res, "success", False):
+        status = _resolve_success_status(res)
+    else:
+        status, should_retry = _classify_failure(res)
+        if should_retry and job.attempt_no >= max_retries:
+            status = "failed_permanent"
+
+    return PayoutOutcome(
+        status=status,
+        success=bool(getattr(res, "success", False)),
+        provider=getattr(res, "provider", None) or "clubkonnect",
+        reference=str(getattr(res, "reference", None) or "").strip(),
+        message=str(getattr(res, "message", "") or ""),
+        raw=raw,
+        payload=raw_json[:5000],
+    )
+
+
+# ====================================================================
+# PROVIDER RATE LIMIT
+# ====================================================================
+class ProviderRateLimiter:
+    """Token bucket shared by all workers; waiters are served in order."""
+
+    def __init__(self, rate_per_second: float = AIRTIME_PROVIDER_RATE_PER_SECOND, burst: int = AIRTIME_PROVIDER_BURST):
+        self.rate = float(rate_per_second)
+        self.burst = max(1, int(burst))
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+        self.waited = 0
+
+    async def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                self.waited += 1
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+# ====================================================================
+# STORE
+# ====================================================================
+class PayoutStore(ABC):
+    @abstractmethod
+    async def claim(
+        self,
+        *,
+        owner: str,
+        limit: int,
+        max_retries: int,
+        cooldown_minutes: int,
+        lease_seconds: int,
+    ) -> List[PayoutJob]:
+        """Lease up to `limit` ready payouts to `owner`."""
+
+    @abstractmethod
+    async def complete(self, *, owner: str, results: Sequence[Tuple[PayoutJob, PayoutOutcome]]) -> Set[str]:
+        """Write outcomes; returns the ids (as str) that were updated."""
+
+    @abstractmethod
+    async def renew(self, *, owner: str, ids: Sequence[Any], lease_seconds: int) -> int:
+        """Extend the leases `owner` still holds on `ids`; returns how many."""
+
+    @abstractmethod
+    async def release(self, *, owner: str, jobs: Sequence[PayoutJob]) -> int:
+        """Hand back never-sent jobs: previous status, attempt not counted."""
+
+    @abstractmethod
+    async def expire(self) -> List[PayoutJob]:
+        """Move 'processing' rows with an expired lease to review."""
+
+
+class PostgresPayoutStore(PayoutStore):
+    async def claim(
+        self,
+        *,
+        owner: str,
+        limit: int,
+        max_retries: int,
+        cooldown_minutes: int,
+        lease_seconds: int,
+    ) -> List[PayoutJob]:
+        from db import get_async_session
+
+        async with get_async_session() as session:
+            async with session.begin():
+                res = await session.execute(
+                    text("""
+                        WITH picked AS (
+                            SELECT id, status
+                            FROM airtime_payouts
+                            WHERE phone_number IS NOT NULL
+                              AND (
+                                  status = 'pending_claim'
+                                  OR (
+                                      status = 'failed_retryable'
+                                      AND COALESCE(retry_count, 0) < :max_retries
+                                      AND (
+                                          last_retry_at IS NULL
+                                          OR last_retry_at < NOW() - make_interval(mins => :cooldown)
+                                      )
+                                  )
+                              )
+                            ORDER BY created_at ASC
+                            LIMIT :limit
+                            FOR UPDATE SKIP LOCKED
+                        )
+                        UPDATE airtime_payouts a
+                        SET retry_count = COALESCE(a.retry_count, 0) + 1,
+                            last_retry_at = NOW(),
+                            status = 'processing',
+                            lease_owner = :owner,
+                            lease_expires_at = NOW() + make_interval(secs => :lease)
+                        FROM picked p
+                        WHERE a.id = p.id
+                        RETURNING
+                            a.id,
+                            p.status AS from_status,
+                            a.tg_id,
+                            a.phone_number,
+                            a.amount,
+                            a.retry_count
+                    """),
+                    {
+                        "owner": owner,
+                        "limit": int(limit),
+                        "max_retries": int(max_retries),
+                        "cooldown": int(cooldown_minutes),
+                        "lease": int(lease_seconds),
+                    },
+                )
+                rows = res.fetchall()
+
+        return [
+            PayoutJob(
+                id=row.id,
+                tg_id=int(row.tg_id),
+                phone=(row.phone_number or "").strip(),
+                amount=int(row.amount or 0),
+                attempt_no=int(row.retry_count or 0),
+                from_status=row.from_status,
+            )
+            for row in rows
+        ]
+
+    async def complete(self, *, owner: str, results: Sequence[Tuple[PayoutJob, PayoutOutcome]]) -> Set[str]:
+        from db import get_async_session
+
+        if not results:
+            return set()
+
+        async with get_async_session() as session:
+            async with session.begin():
+                res = await session.execute(
+                    text("""
+                        UPDATE airtime_payouts a
+                        SET status = r.status,
+                            sent_at = CASE
+                                WHEN r.status IN ('sent', 'completed')
+                                THEN COALESCE(a.sent_at, NOW())
+                                ELSE a.sent_at
+                            END,
+                            completed_at = CASE
+                                WHEN r.status = 'completed'
+                                THEN COALESCE(a.completed_at, NOW())
+                                ELSE a.completed_at
+                            END,
+                            provider = COALESCE(r.provider, a.provider),
+                            provider_ref = CASE WHEN r.response IS NULL THEN a.provider_ref ELSE r.ref END,
+                            provider_reference = CASE
+                                WHEN r.response IS NULL THEN a.provider_reference
+                                ELSE CAST(r.ref AS varchar)
+                            END,
+                            provider_response = COALESCE(CAST(r.response AS jsonb), a.provider_response),
+                            provider_payload = COALESCE(r.payload, a.provider_payload),
+                            lease_owner = NULL,
+                            lease_expires_at = NULL
+                        FROM unnest(
+                            CAST(:ids AS uuid[]),
+                            CAST(:statuses AS text[]),
+                            CAST(:providers AS text[]),
+                            CAST(:refs AS text[]),
+                            CAST(:responses AS text[]),
+                            CAST(:payloads AS text[])
+                        ) AS r(id, status, provider, ref, response, payload)
+                        WHERE a.id = r.id
+                          AND a.lease_owner = :owner
+                        RETURNING a.id
+                    """),
+                    {
+                        "owner": owner,
+                        "ids": [str(job.id) for job, _ in results],
+                        "statuses": [o.status for _, o in results],
+                        "providers": [o.provider for _, o in results],
+                        "refs": [o.reference or None for _, o in results],
+                        "responses": [
+                            json.dumps(o.raw, ensure_ascii=False) if o.raw is not None else None
+                            for _, o in results
+                        ],
+                        "payloads": [o.payload for _, o in results],
+                    },
+                )
+                return {str(r[0]) for r in res.fetchall()}
+
+    async def renew(self, *, owner: str, ids: Sequence[Any], lease_seconds: int) -> int:
+        from db import get_async_session
+
+        if not ids:
+            return 0
+
+        async with get_async_session() as session:
+            async with session.begin():
+                res = await session.execute(
+                    text("""
+                        UPDATE airtime_payouts
+                        SET lease_expires_at = NOW() + make_interval(secs => :lease)
+                        WHERE id = ANY(CAST(:ids AS uuid[]))
+                          AND lease_owner = :owner
+                          AND status = 'processing'
+                    """),
+                    {"owner": owner, "ids": [str(i) for i in ids], "lease": int(lease_seconds)},
+                )
+                return int(res.rowcount or 0)
+
+    async def release(self, *, owner: str, jobs: Sequence[PayoutJob]) -> int:
+        from db import get_async_session
+
+        if not jobs:
+            return 0
+
+        async with get_async_session() as session:
+            async with session.begin():
+                res = await session.execute(
+                    text("""
+                        UPDATE airtime_payouts a
+                        SET status = r.status,
+                            retry_count = GREATEST(COALESCE(a.retry_count, 0) - 1, 0),
+                            lease_owner = NULL,
+                            lease_expires_at = NULL
+                        FROM unnest(
+                            CAST(:ids AS uuid[]),
+                            CAST(:statuses AS text[])
+                        ) AS r(id, status)
+                        WHERE a.id = r.id
+                          AND a.lease_owner = :owner
+                          AND a.status IN ('processing', :review)
+                    """),
+                    {
+                        "owner": owner,
+                        "ids": [str(job.id) for job in jobs],
+                        "statuses": [job.from_status for job in jobs],
+                        "review": REVIEW_STATUS,
+                    },
+                )
+                return int(res.rowcount or 0)
+
+    async def expire(self) -> List[PayoutJob]:
+        from db import get_async_session
+
+        async with get_async_session() as session:
+            async with session.begin():
+                res = await session.execute(
+                    text("""
+                        UPDATE airtime_payouts
+                        SET status = :review,
+                            lease_expires_at = NULL
+                        WHERE status = 'processing'
+                          AND phone_number IS NOT NULL
+                          AND (lease_expires_at IS NULL OR lease_expires_at < NOW())
+                        RETURNING id, tg_id, phone_number, amount, retry_count
+                    """),
+                    {"review": REVIEW_STATUS},
+                )
+                rows = res.fetchall()
+
+        return [
+            PayoutJob(
+                id=row.id,
+                tg_id=int(row.tg_id),
+                phone=(row.phone_number or "").strip(),
+                amount=int(row.amount or 0),
+                attempt_no=int(row.retry_count or 0),
+                from_status="processing",
+            )
+            for row in rows
+        ]
+
+
+# ====================================================================
+# ENGINE
+# ====================================================================
+SendFn = Callable[..., Awaitable[Any]]
+ResultFn = Callable[[PayoutJob, PayoutOutcome], Awaitable[None]]
+
+# Engines currently inside run() (registered on start, removed on stop)
+_ENGINES: List["PayoutEngine"] = []
+
+
+def request_payout_run() -> None:
+    """A payout became ready (phone saved): claim now instead of at the next poll."""
+    for engine in _ENGINES:
+        engine.wake()
+
+
+class PayoutEngine:
+    def __init__(
+        self,
+        *,
+        store: Optional[PayoutStore] = None,
+        send: Optional[SendFn] = None,
+        on_result: Optional[ResultFn] = None,
+        limiter: Optional[ProviderRateLimiter] = None,
+        workers: int = AIRTIME_PAYOUT_WORKERS,
+        claim_batch: int = AIRTIME_CLAIM_BATCH,
+        lease_seconds: int = AIRTIME_LEASE_SECONDS,
+        max_retries: int = MAX_AIRTIME_RETRIES,
+        cooldown_minutes: int = AIRTIME_RETRY_COOLDOWN_MINUTES,
+        idle_poll_seconds: float = AIRTIME_IDLE_POLL_SECONDS,
+        flush_ms: int = AIRTIME_RESULT_FLUSH_MS,
+    ):
+        if send is None:
+            from services.airtime_providers.service import send_airtime as send
+
+        self.store = store or PostgresPayoutStore()
+        self.send = send
+        self.on_result = on_result
+        self.limiter = limiter or ProviderRateLimiter()
+        self.workers = max(1, int(workers))
+        self.claim_batch = max(1, int(claim_batch))
+        self.lease_seconds = int(lease_seconds)
+        self.max_retries = int(max_retries)
+        self.cooldown_minutes = int(cooldown_minutes)
+        self.idle_poll_seconds = float(idle_poll_seconds)
+        self.flush_seconds = max(0.0, flush_ms / 1000.0)
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+        self._queue: "asyncio.Queue[PayoutJob]" = asyncio.Queue()
+        self._in_flight = 0
+        self._results: List[Tuple[PayoutJob, PayoutOutcome]] = []
+        self._wake = asyncio.Event()
+        self._results_ready = asyncio.Event()
+        self._capacity = asyncio.Event()
+        self._callbacks: Set[asyncio.Task] = set()
+        self._sending: Set[Any] = set()
+        self._unsent: List[PayoutJob] = []
+
+        self._claimed = 0
+        self._sent = 0
+        self._written = 0
+        self._lost_leases = 0
+        self._released = 0
+        self._expired = 0
+        self._errors = 0
+
+    def wake(self) -> None:
+        self._wake.set()
+
+    # --------------------------------------------------------
+    # One payout
+    # --------------------------------------------------------
+    async def _attempt(self, job: PayoutJob) -> PayoutOutcome:
+        if not job.phone or job.amount <= 0:
+            message = "Invalid payout amount" if job.amount <= 0 else "Missing phone number"
+            logger.error("❌ Invalid payout | payout_id=%s | tg_id=%s | amount=%s", job.id, job.tg_id, job.amount)
+            return PayoutOutcome(
+                status="failed_permanent",
+                message=message,
+                raw={"status": "error", "message": message},
+                payload=message,
+            )
+
+        await self.limiter.acquire()
+        logger.info(
+            "📡 Airtime attempt #%s | payout_id=%s | from_status=%s | tg_id=%s | phone=%s | amount=₦%s",
+            job.attempt_no,
+            job.id,
+            job.from_status,
+            job.tg_id,
+            job.phone,
+            job.amount,
+        )
+
+        # Stays set if cancelled mid-call: the payout may have gone through
+        self._sending.add(job.id)
+        try:
+            res = await self.send(phone=job.phone, amount=job.amount, request_id=provider_request_id(job.id))
+            self._sent += 1
+        except Exception as e:
+            self._sending.discard(job.id)
+            self._errors += 1
+            logger.exception("❌ Exception during airtime sending | payout_id=%s | error=%s", job.id, e)
+            status = "failed_permanent" if job.attempt_no >= self.max_retries else "failed_retryable"
+            return PayoutOutcome(status=status, message=str(e))
+        self._sending.discard(job.id)
+
+        return outcome_from_result(job, res, max_retries=self.max_retries)
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            try:
+                try:
+                    outcome = await self._attempt(job)
+                except asyncio.CancelledError:
+                    # Cancelled before the provider call started: nothing was paid
+                    if job.id not in self._sending:
+                        self._unsent.append(job)
+                    raise
+                self._results.append((job, outcome))
+                self._results_ready.set()
+            finally:
+                self._in_flight -= 1
+                self._capacity.set()
+                self._queue.task_done()
+
+    # --------------------------------------------------------
+    # Claiming
+    # --------------------------------------------------------
+    async def expire(self) -> int:
+        """Send rows whose lease ran out to review instead of resending them."""
+        jobs = await self.store.expire()
+        for job in jobs:
+            logger.error(
+                "❌ Payout lease expired, needs review (may already be paid) | payout_id=%s | tg_id=%s | amount=₦%s",
+                job.id,
+                job.tg_id,
+                job.amount,
+            )
+            if self.on_result is not None:
+                outcome = PayoutOutcome(
+                    status=REVIEW_STATUS,
+                    message="Lease expired before the result was recorded",
+                )
+                task = asyncio.get_running_loop().create_task(self._notify(job, outcome))
+                self._callbacks.add(task)
+                task.add_done_callback(self._callbacks.discard)
+        self._expired += len(jobs)
+        return len(jobs)
+
+    async def claim(self) -> int:
+        try:
+            await self.expire()
+        except Exception:
+            self._errors += 1
+            logger.exception("❌ Failed to expire airtime payout leases")
+
+        room = self.workers * 2 - self._in_flight
+        if room <= 0:
+            return 0
+
+        jobs = await self.store.claim(
+            owner=self.owner,
+            limit=min(self.claim_batch, room),
+            max_retries=self.max_retries,
+            cooldown_minutes=self.cooldown_minutes,
+            lease_seconds=self.lease_seconds,
+        )
+        if jobs:
+            logger.info("📦 Claimed %s airtime payout(s) | owner=%s", len(jobs), self.owner)
+        for job in jobs:
+            self._in_flight += 1
+            self._queue.put_nowait(job)
+        self._claimed += len(jobs)
+        return len(jobs)
+
+    async def _claim_loop(self) -> None:
+        while True:
+            try:
+                claimed = await self.claim()
+            except Exception:
+                self._errors += 1
+                logger.exception("❌ Failed to claim airtime payouts")
+                claimed = 0
+
+            if claimed:
+                # More may be ready; claim again once workers free up
+                self._capacity.clear()
+                if self._in_flight >= self.workers * 2:
+                    await self._capacity.wait()
+                continue
+
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.idle_poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+    # --------------------------------------------------------
+    # Writing back
+    # --------------------------------------------------------
+    async def flush(self) -> int:
+        if not self._results:
+            return 0
+
+        batch, self._results = self._results, []
+        try:
+            written = await self.store.complete(owner=self.owner, results=batch)
+        except Exception:
+            self._errors += 1
+            # Retry with the next flush and keep the leases alive until then.
+            # If even that fails they run out and the rows go to review,
+            # where the late write-back still lands (lease_owner is kept).
+            self._results[:0] = batch
+            logger.exception("❌ Failed to write airtime payout results | rows=%s", len(batch))
+            try:
+                await self.store.renew(
+                    owner=self.owner,
+                    ids=[job.id for job, _ in batch],
+                    lease_seconds=self.lease_seconds,
+                )
+            except Exception:
+                logger.exception("❌ Failed to renew airtime payout leases | rows=%s", len(batch))
+            return 0
+
+        self._written += len(written)
+        for job, outcome in batch:
+            if str(job.id) not in written:
+                self._lost_leases += 1
+                logger.error(
+                    "❌ Payout lease lost before write-back | payout_id=%s | status=%s",
+                    job.id,
+                    outcome.status,
+                )
+                continue
+            if self.on_result is not None:
+                task = asyncio.get_running_loop().create_task(self._notify(job, outcome))
+                self._callbacks.add(task)
+                task.add_done_callback(self._callbacks.discard)
+        return len(written)
+
+    async def _notify(self, job: PayoutJob, outcome: PayoutOutcome) -> None:
+        try:
+            await self.on_result(job, outcome)
+        except Exception:
+            logger.exception("⚠️ Payout result callback failed | payout_id=%s", job.id)
+
+    async def _release_unsent(self) -> int:
+        """Give back jobs that were claimed but never reached the provider."""
+        jobs, self._unsent = self._unsent, []
+        while not self._queue.empty():
+            jobs.append(self._queue.get_nowait())
+            self._in_flight -= 1
+            self._queue.task_done()
+        if not jobs:
+            return 0
+
+        try:
+            released = await self.store.release(owner=self.owner, jobs=jobs)
+        except Exception:
+            self._errors += 1
+            logger.exception("❌ Failed to release unsent airtime payouts | rows=%s", len(jobs))
+            return 0
+        logger.info("↩️ Released %s unsent airtime payout(s) | owner=%s", released, self.owner)
+        self._released += released
+        return released
+
+    async def _writer(self) -> None:
+        while True:
+            await self._results_ready.wait()
+            if self.flush_seconds:
+                await asyncio.sleep(self.flush_seconds)
+            self._results_ready.clear()
+            await self.flush()
+            if self._results:
+                self._results_ready.set()
+
+    # --------------------------------------------------------
+    # Entry points
+    # --------------------------------------------------------
+    async def run(self) -> None:
+        """Claim, send and write back until cancelled."""
+        tasks = [asyncio.create_task(self._worker(), name=f"AirtimeWorker-{i}") for i in range(self.workers)]
+        tasks.append(asyncio.create_task(self._writer(), name="AirtimeResultWriter"))
+        _ENGINES.append(self)
+        try:
+            await self._claim_loop()
+        finally:
+            _ENGINES.remove(self)
+            # Let started sends finish so their outcome is recorded; rows
+            # never sent are released, sends cut off mid-call are left to
+            # expire into review.
+            try:
+                await asyncio.wait_for(self._queue.join(), timeout=AIRTIME_SHUTDOWN_GRACE_SECONDS)
+            except asyncio.TimeoutError:
+                logger.warning("⚠️ Airtime workers still busy at shutdown | in_flight=%s", self._in_flight)
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await self._release_unsent()
+            await self.flush()
+            if self._callbacks:
+                await asyncio.gather(*self._callbacks, return_exceptions=True)
+
+    async def run_once(self) -> int:
+        """Claim one batch, send it through the pool and write it back."""
+        claimed = await self.claim()
+        if not claimed:
+            return 0
+
+        tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        try:
+            await self._queue.join()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await self._release_unsent()
+        await self.flush()
+        if self._callbacks:
+            await asyncio.gather(*self._callbacks, return_exceptions=True)
+        return claimed
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "owner": self.owner,
+            "workers": self.workers,
+            "in_flight": self._in_flight,
+            "claimed": self._claimed,
+            "sent": self._sent,
+            "written": self._written,
+            "pending_results": len(self._results),
+            "lost_leases": self._lost_leases,
+            "released": self._released,
+            "expired_to_review": self._expired,
+            "rate_limit_waits": self.limiter.waited,
+            "errors": self._errors,
+        }
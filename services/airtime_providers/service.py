@@ -3,6 +3,8 @@
 # =======================================================================
 from __future__ import annotations
 
+from typing import Optional
+
 from services.airtime_providers.types import AirtimeResult
 from services.airtime_providers.clubkonnect import buy_airtime
 
@@ -50,16 +52,19 @@ def _is_retryable_http(data: dict) -> bool:
     return False
 
 
-async def send_airtime(phone: str, amount: int) -> AirtimeResult:
+async def send_airtime(phone: str, amount: int, request_id: Optional[str] = None) -> AirtimeResult:
     """
     Provider-agnostic entry point (currently ClubKonnect only).
 
+    request_id is passed to the provider as its idempotency key; the payout
+    engine sends the same one for every attempt of a payout.
+
     Returns AirtimeResult(success=...) plus extra hints in raw:
       raw["retryable"] = True/False
       raw["provider_state"] = "completed"|"accepted"|"pending"|"need_network"|"failed"
       raw["failure_reason"] = e.g. "INSUFFICIENT_BALANCE"
     """
-    data = await buy_airtime(phone=phone, amount=amount)
+    data = await buy_airtime(phone=phone, amount=amount, request_id=request_id)
     if not isinstance(data, dict):
         data = {"status": "error", "message": "Unexpected provider response type", "raw": str(data)[:300]}
 
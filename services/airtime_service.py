@@ -7,7 +7,6 @@ from __future__ import annotations
 
 import os
 import uuid
-import httpx
 import json
 from datetime import datetime, timezone, timedelta
 from typing import Optional, Dict, Any
@@ -20,8 +19,10 @@ from telegram.ext import ContextTypes, ConversationHandler
 from logger import logger
 from utils.conversation_states import AIRTIME_PHONE
 from db import AsyncSessionLocal
+from http_clients import get_http_clients
 from utils.security import validate_phone
 from services.playtrivia import AIRTIME_MILESTONES
+from services.airtime_providers.payout_engine import request_payout_run
 
 # -------------------------------------------------------------------
 # Environment & Constants (Flutterwave still used for buying tries)
@@ -151,8 +152,14 @@ async def send_airtime_via_clubkonnect(
         url = f"{CK_BASE_URL}{ep}"
 
         try:
-            async with httpx.AsyncClient(timeout=25.0) as client:
-                resp = await client.get(url, params=params)
+            # Buys airtime: never replayed once sent (idempotent=False)
+            resp = await get_http_clients().get(
+                "clubkonnect",
+                f"GET {ep}",
+                url,
+                params=params,
+                idempotent=False,
+            )
 
             body_snip = (resp.text or "")[:300].replace("\n", " ").replace("\r", " ")
             logger.info(
@@ -485,6 +492,20 @@ async def handle_claim_airtime_button(
 # ===============================================================
 # Handle Airtime Claim Phone
 # ===============================================================
+def airtime_phone_gate(update: Update, user_data) -> bool:
+    """
+    update_router gate for handle_airtime_claim_phone: a claim session
+    is open, or the text carries enough digits to be a phone number
+    (the DB fallback path). Anything else the handler ignores.
+    """
+    if user_data.get("support_active"):
+        return False
+    if user_data.get("awaiting_airtime_phone") or user_data.get("pending_payout_id"):
+        return True
+    text_msg = (update.effective_message.text if update.effective_message else "") or ""
+    return sum(ch.isdigit() for ch in text_msg) >= 11
+
+
 async def handle_airtime_claim_phone(
     update: Update,
     context: ContextTypes.DEFAULT_TYPE,
@@ -666,6 +687,7 @@ async def handle_airtime_claim_phone(
             tg_id,
             phone,
         )
+        request_payout_run()
 
     except Exception:
         logger.exception("❌ DB error while saving phone | payout_id=%s", payout_id)
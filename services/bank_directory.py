@@ -0,0 +1,448 @@
+# ====================================================================
+# services/bank_directory.py
+# Process-wide Nigerian bank directory for the Finance bank-account flow.
+#
+# start_bank_account_add used to call get_ng_banks() for every user who
+# opened bank selection and keep the whole cleaned list in
+# context.user_data["finance_bank_list"]; search_bank then scanned that
+# copy with a casefold substring test.
+#
+# BankDirectory keeps ONE shared copy of the list:
+#
+#   load()     -> the current banks; fetched from Flutterwave only when
+#                 the process has none yet (concurrent callers await the
+#                 same request). After a failed fetch, callers get no
+#                 banks without refetching for BANK_DIRECTORY_RETRY_SECONDS.
+#                 tasks/bank_directory.py refreshes it in the background
+#                 every BANK_DIRECTORY_REFRESH_SECONDS (sooner after a
+#                 failure); a failed refresh keeps the previous copy.
+#   search()   -> ranked matches from an index built once per refresh:
+#                 exact name / alias / acronym, then prefixes of the
+#                 name, its words, aliases (GTB, UBA, FCMB...) and
+#                 acronyms, then trigram containment for substrings
+#                 and typos.
+#   by_code()  -> validates a selection callback.
+#
+# resolve_account() fronts flutterwave_client.resolve_bank_account():
+# successful resolutions are cached per (bank code, account number) for
+# BANK_RESOLVE_TTL_SECONDS and concurrent lookups of the same account
+# share one paid request. Failures are not cached.
+#
+# Per process. Counters via stats() (exposed on /health).
+# ====================================================================
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from services.flutterwave_client import get_ng_banks, resolve_bank_account
+
+logger = logging.getLogger("bank_directory")
+
+BANK_DIRECTORY_REFRESH_SECONDS = int(os.getenv("BANK_DIRECTORY_REFRESH_SECONDS", str(60 * 60 * 6)))
+BANK_DIRECTORY_RETRY_SECONDS = float(os.getenv("BANK_DIRECTORY_RETRY_SECONDS", "60"))
+BANK_RESOLVE_TTL_SECONDS = float(os.getenv("BANK_RESOLVE_TTL_SECONDS", "600"))
+BANK_RESOLVE_CACHE_MAX_ENTRIES = int(os.getenv("BANK_RESOLVE_CACHE_MAX_ENTRIES", "5000"))
+BANK_SEARCH_MIN_CONTAINMENT = float(os.getenv("BANK_SEARCH_MIN_CONTAINMENT", "0.6"))
+
+# Names users type that neither the bank's own words nor its acronym
+# produce. A bank gets the aliases of every key its normalized name
+# starts with ("first bank" covers "First Bank of Nigeria" and "First
+# Bank PLC").
+BANK_ALIASES: Dict[str, Tuple[str, ...]] = {
+    "guaranty trust": ("gtb", "gtbank", "gt bank", "gtco"),
+    "gtbank": ("gtb", "guaranty trust", "gtco"),
+    "united bank for africa": ("uba",),
+    "first bank": ("fbn", "firstbank"),
+    "first city monument": ("fcmb",),
+    "fcmb": ("first city monument",),
+    "access bank diamond": ("diamond",),
+    "stanbic ibtc": ("stanbic", "ibtc"),
+    "standard chartered": ("stanchart", "scb"),
+    "union bank": ("ubn",),
+    "ecobank": ("eco bank",),
+    "wema bank": ("alat",),
+    "sterling bank": ("onebank",),
+    "polaris bank": ("skye", "skye bank"),
+    "opay": ("paycom",),
+    "paycom": ("opay",),
+    "moniepoint": ("teamapt",),
+    "palmpay": ("palm pay",),
+}
+
+_STOPWORDS = frozenset({"of", "for", "and", "the", "plc", "ltd", "limited"})
+_NON_WORD = re.compile(r"[^0-9a-z]+")
+
+# Match ranks (higher first)
+_RANK_EXACT_ALIAS = 100
+_RANK_EXACT_NAME = 95
+_RANK_EXACT_ACRONYM = 92
+_RANK_NAME_PREFIX = 90
+_RANK_ALIAS_PREFIX = 85
+_RANK_WORD_PREFIX = 80
+_RANK_ACRONYM_PREFIX = 75
+_RANK_ALL_WORDS = 70
+_RANK_SUBSTRING = 60
+_RANK_FUZZY = 50
+
+
+def normalize_bank_text(value: Any) -> str:
+    """Casefold, drop punctuation and collapse spaces."""
+    return _NON_WORD.sub(" ", str(value or "").casefold()).strip()
+
+
+def _trigrams(value: str) -> Set[str]:
+    padded = f" {value} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _aliases_for(key: str) -> Tuple[str, ...]:
+    aliases: Dict[str, None] = {}
+    for name, names in BANK_ALIASES.items():
+        if key == name or key.startswith(f"{name} "):
+            aliases.update(dict.fromkeys(normalize_bank_text(alias) for alias in names))
+    return tuple(alias for alias in aliases if alias != key)
+
+
+def _offer(ranks_by_key: Dict[str, Dict[int, int]], key: str, position: int, rank: int) -> None:
+    ranks = ranks_by_key.setdefault(key, {})
+    ranks[position] = max(rank, ranks.get(position, 0))
+
+
+def _offer_prefixes(ranks_by_key: Dict[str, Dict[int, int]], key: str, position: int, rank: int) -> None:
+    for end in range(1, len(key) + 1):
+        _offer(ranks_by_key, key[:end], position, rank)
+
+
+def _best_first(item: Tuple[int, int]) -> Tuple[int, int]:
+    # (position, rank): positions follow name order, so ties come out
+    # alphabetically.
+    position, rank = item
+    return (-rank, position)
+
+
+@dataclass(slots=True)
+class BankEntry:
+    code: str
+    name: str
+    key: str
+    words: Tuple[str, ...] = ()
+    aliases: Tuple[str, ...] = ()
+    acronym: str = ""
+
+
+@dataclass(slots=True)
+class BankIndex:
+    """Immutable search index over one bank list; rebuilt on refresh."""
+
+    banks: Tuple[BankEntry, ...] = ()
+    by_code: Dict[str, BankEntry] = field(default_factory=dict)
+    exact: Dict[str, Dict[int, int]] = field(default_factory=dict)
+    # prefix -> (position, rank) pairs, best rank first, then name order
+    prefixes: Dict[str, Tuple[Tuple[int, int], ...]] = field(default_factory=dict)
+    word_prefixes: Dict[str, Set[int]] = field(default_factory=dict)
+    trigrams: Dict[str, Set[int]] = field(default_factory=dict)
+
+    @classmethod
+    def build(cls, raw_banks: Iterable[Dict[str, Any]]) -> "BankIndex":
+        seen: Dict[str, BankEntry] = {}
+        for raw in raw_banks:
+            code = str(raw.get("code") or "").strip()
+            name = str(raw.get("name") or "").strip()
+            if not code or not name or code in seen:
+                continue
+            key = normalize_bank_text(name)
+            words = tuple(key.split())
+            significant = [word for word in words if word not in _STOPWORDS] or list(words)
+            seen[code] = BankEntry(
+                code=code,
+                name=name,
+                key=key,
+                words=words,
+                aliases=_aliases_for(key),
+                acronym="".join(word[0] for word in significant) if len(significant) > 1 else "",
+            )
+
+        # Sort by name so the UI is predictable.
+        banks = tuple(sorted(seen.values(), key=lambda bank: bank.name.lower()))
+        index = cls(banks=banks, by_code={bank.code: bank for bank in banks})
+        prefixes: Dict[str, Dict[int, int]] = {}
+
+        for i, bank in enumerate(banks):
+            _offer(index.exact, bank.key, i, _RANK_EXACT_NAME)
+            _offer_prefixes(prefixes, bank.key, i, _RANK_NAME_PREFIX)
+            for alias in bank.aliases:
+                _offer(index.exact, alias, i, _RANK_EXACT_ALIAS)
+                _offer_prefixes(prefixes, alias, i, _RANK_ALIAS_PREFIX)
+            if bank.acronym:
+                _offer(index.exact, bank.acronym, i, _RANK_EXACT_ACRONYM)
+                _offer_prefixes(prefixes, bank.acronym, i, _RANK_ACRONYM_PREFIX)
+            for word in bank.words:
+                _offer_prefixes(prefixes, word, i, _RANK_WORD_PREFIX)
+                for end in range(1, len(word) + 1):
+                    index.word_prefixes.setdefault(word[:end], set()).add(i)
+            for gram in _trigrams(bank.key):
+                index.trigrams.setdefault(gram, set()).add(i)
+
+        index.prefixes = {
+            prefix: tuple(sorted(ranks.items(), key=_best_first))
+            for prefix, ranks in prefixes.items()
+        }
+        return index
+
+    def search(self, query: str, *, limit: int = 20) -> List[BankEntry]:
+        """Banks matching query, best match first (ties by name)."""
+        term = normalize_bank_text(query)
+        if not term or not self.banks:
+            return []
+
+        ranks: Dict[int, int] = {}
+
+        def offer(position: int, rank: int) -> None:
+            if rank > ranks.get(position, 0):
+                ranks[position] = rank
+
+        exact = self.exact.get(term, {})
+        for position, rank in exact.items():
+            offer(position, rank)
+        # Prefix postings are already ranked: anything past the first
+        # limit + len(exact) cannot reach the top `limit`.
+        for position, rank in self.prefixes.get(term, ())[:limit + len(exact)]:
+            offer(position, rank)
+
+        if len(ranks) >= limit:
+            return self._ranked(ranks, limit)
+
+        # "first nig" -> every query word starts some word of the name
+        words = term.split()
+        if len(words) > 1:
+            postings = sorted((self.word_prefixes.get(word, set()) for word in words), key=len)
+            for position in postings[0].intersection(*postings[1:]):
+                offer(position, _RANK_ALL_WORDS)
+
+        if len(ranks) >= limit:
+            return self._ranked(ranks, limit)
+
+        # Substrings: names holding every trigram of the query
+        grams = _trigrams(term)
+        postings = sorted((self.trigrams.get(gram, set()) for gram in grams), key=len)
+        for position in postings[0].intersection(*postings[1:]):
+            if position not in ranks and term in self.banks[position].key:
+                offer(position, _RANK_SUBSTRING)
+
+        if ranks:
+            return self._ranked(ranks, limit)
+
+        # Typos: names holding most of the query's trigrams
+        shared: Dict[int, int] = {}
+        for gram in grams:
+            for position in self.trigrams.get(gram, ()):
+                shared[position] = shared.get(position, 0) + 1
+        for position, count in shared.items():
+            containment = count / len(grams)
+            if containment >= BANK_SEARCH_MIN_CONTAINMENT:
+                offer(position, int(_RANK_FUZZY * containment))
+
+        return self._ranked(ranks, limit)
+
+    def _ranked(self, ranks: Dict[int, int], limit: int) -> List[BankEntry]:
+        ordered = sorted(ranks.items(), key=_best_first)
+        return [self.banks[position] for position, _ in ordered[:limit]]
+
+
+class _TtlCache:
+    def __init__(self, *, ttl_seconds: float, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._items: "OrderedDict[Tuple[str, str], tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key: Tuple[str, str]) -> Any:
+        item = self._items.get(key)
+        if item is None:
+            return None
+        expires_at, value = item
+        if expires_at <= time.monotonic():
+            del self._items[key]
+            return None
+        return value
+
+    def put(self, key: Tuple[str, str], value: Any) -> None:
+        self._items[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_entries:
+            self._items.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+class BankDirectory:
+    def __init__(
+        self,
+        *,
+        fetch: Callable[[], Awaitable[Dict[str, Any]]] = get_ng_banks,
+        resolve: Callable[..., Awaitable[Dict[str, Any]]] = resolve_bank_account,
+        resolve_ttl_seconds: float = BANK_RESOLVE_TTL_SECONDS,
+        resolve_max_entries: int = BANK_RESOLVE_CACHE_MAX_ENTRIES,
+    ):
+        self._fetch = fetch
+        self._resolve = resolve
+        self._index = BankIndex()
+        self._refresh_lock = asyncio.Lock()
+        self._resolved = _TtlCache(ttl_seconds=resolve_ttl_seconds, max_entries=resolve_max_entries)
+        self._inflight: Dict[Tuple[str, str], asyncio.Future] = {}
+
+        self.loaded_at: Optional[float] = None
+        self.failed_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.refreshes = 0
+        self.refresh_failures = 0
+        self.backoff_skips = 0
+        self.searches = 0
+        self.resolve_hits = 0
+        self.resolve_coalesced = 0
+        self.resolve_calls = 0
+
+    # --------------------------------------------------------
+    # Bank list
+    # --------------------------------------------------------
+    @property
+    def banks(self) -> Tuple[BankEntry, ...]:
+        return self._index.banks
+
+    async def refresh(self) -> bool:
+        """
+        Fetch the bank list and swap in a new index. On failure (or an
+        empty list) the current copy is kept. Returns True on success.
+        """
+        async with self._refresh_lock:
+            return await self._refresh()
+
+    async def _refresh(self) -> bool:
+        self.refreshes += 1
+        result = await self._fetch()
+
+        if not result.get("success"):
+            return self._failed(str(result.get("error") or result.get("message") or "unknown error"))
+
+        index = BankIndex.build(result.get("banks") or [])
+        if not index.banks:
+            return self._failed("Flutterwave returned an empty Nigerian bank list")
+
+        self._index = index
+        self.loaded_at = time.monotonic()
+        self.failed_at = None
+        self.last_error = None
+        logger.info("🏦 Bank directory refreshed | banks=%s", len(index.banks))
+        return True
+
+    def _failed(self, error: str) -> bool:
+        self.refresh_failures += 1
+        self.failed_at = time.monotonic()
+        self.last_error = error
+        logger.error("❌ Unable to refresh the bank directory: %s", error)
+        return False
+
+    def _backing_off(self) -> bool:
+        return (
+            self.failed_at is not None
+            and time.monotonic() - self.failed_at < BANK_DIRECTORY_RETRY_SECONDS
+        )
+
+    async def load(self) -> Tuple[BankEntry, ...]:
+        """
+        The current banks; fetched now only if none are loaded yet and
+        the last fetch did not fail within BANK_DIRECTORY_RETRY_SECONDS.
+        Empty when the list is unavailable (see last_error).
+        """
+        if self._index.banks:
+            return self._index.banks
+        if self._backing_off():
+            self.backoff_skips += 1
+            return ()
+
+        async with self._refresh_lock:
+            # Another caller may have loaded it, or failed, while we waited.
+            if not self._index.banks and not self._backing_off():
+                await self._refresh()
+        return self._index.banks
+
+    def by_code(self, code: str) -> Optional[BankEntry]:
+        return self._index.by_code.get(str(code or "").strip())
+
+    def search(self, query: str, *, limit: int = 20) -> List[BankEntry]:
+        self.searches += 1
+        return self._index.search(query, limit=limit)
+
+    # --------------------------------------------------------
+    # Account resolution
+    # --------------------------------------------------------
+    async def resolve_account(self, *, account_bank: str, account_number: str) -> Dict[str, Any]:
+        """
+        resolve_bank_account() with a short-lived cache of successful
+        results. Same result shape.
+        """
+        key = (str(account_bank or "").strip(), str(account_number or "").strip())
+
+        cached = self._resolved.get(key)
+        if cached is not None:
+            self.resolve_hits += 1
+            return cached
+
+        future = self._inflight.get(key)
+        if future is not None:
+            self.resolve_coalesced += 1
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            self.resolve_calls += 1
+            resolved = await self._resolve(account_bank=key[0], account_number=key[1])
+        except BaseException as exc:
+            # Waiters get a plain error result; the caller that owns the
+            # request sees the real exception.
+            future.set_result({"success": False, "status": "error", "error": str(exc)})
+            raise
+        else:
+            if resolved.get("success"):
+                self._resolved.put(key, resolved)
+            future.set_result(resolved)
+            return resolved
+        finally:
+            self._inflight.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "banks": len(self._index.banks),
+            "age_seconds": (
+                round(time.monotonic() - self.loaded_at)
+                if self.loaded_at is not None
+                else None
+            ),
+            "last_error": self.last_error,
+            "refreshes": self.refreshes,
+            "refresh_failures": self.refresh_failures,
+            "backoff_skips": self.backoff_skips,
+            "searches": self.searches,
+            "resolved": len(self._resolved),
+            "resolve_hits": self.resolve_hits,
+            "resolve_coalesced": self.resolve_coalesced,
+            "resolve_calls": self.resolve_calls,
+        }
+
+
+_directory: Optional[BankDirectory] = None
+
+
+def get_bank_directory() -> BankDirectory:
+    global _directory
+    if _directory is None:
+        _directory = BankDirectory()
+    return _directory
@@ -13,7 +13,12 @@ from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from logger import logger
-from utils.questions_loader import get_questions_for_category, get_question_by_id
+from services.question_history_service import get_seen_question_stats_for_users
+from utils.questions_loader import (
+    get_category_question_count,
+    get_question_bank,
+    pick_fresh_question_ids,
+)
 
 
 # ------------------------------------------------------------
@@ -195,88 +200,47 @@ async def pick_battle_questions(
 
     player_ids = [int(row.tg_id) for row in player_rows]
 
-    # 2) Load all category questions from JSON
-    all_questions = get_questions_for_category(category)
-    if not all_questions:
+    # 2) Category size from the in-memory question bank
+    total_questions = get_category_question_count(category)
+    if not total_questions:
         return []
 
-    total_questions = len(all_questions)
-
-    # 3) Find players who have NOT exhausted this category
-    active_players: list[int] = []
-
-    for player_id in player_ids:
-        result = await session.execute(
-            text("""
-                SELECT COUNT(DISTINCT question_key) AS answered_count
-                FROM user_question_history
-                WHERE tg_id = :tg_id
-                  AND source_type = 'shared_json_questions'
-                  AND category = :category
-            """),
-            {
-                "tg_id": player_id,
-                "category": category,
-            },
-        )
-        row = result.fetchone()
-        answered_count = int(row.answered_count or 0) if row else 0
-
-        if answered_count < total_questions:
-            active_players.append(player_id)
-
-    # 4) Build exclusion set only from active players
-    excluded_question_ids: set[str] = set()
-
-    for player_id in active_players:
-        result = await session.execute(
-            text("""
-                SELECT DISTINCT question_key
-                FROM user_question_history
-                WHERE tg_id = :tg_id
-                  AND source_type = 'shared_json_questions'
-                  AND category = :category
-            """),
-            {
-                "tg_id": player_id,
-                "category": category,
-            },
-        )
-
-        for row in result.fetchall():
-            excluded_question_ids.add(str(row.question_key))
-
-    # 5) Pick fresh questions first
-    fresh_questions = [q for q in all_questions if str(q["id"]) not in excluded_question_ids]
-    selected_questions = fresh_questions[:question_count]
+    # 3) One query: per-player seen counts + union of seen keys
+    #    from players who have NOT exhausted this category
+    _, excluded_question_ids = await get_seen_question_stats_for_users(
+        session,
+        tg_ids=player_ids,
+        source_type="shared_json_questions",
+        category=category,
+        total_questions=total_questions,
+    )
 
-    # 6) If not enough fresh questions remain, reset cycle from beginning
-    if len(selected_questions) < question_count:
-        selected_questions = all_questions[:question_count]
+    # 4) Fresh questions first; reset cycle if not enough remain
+    selected_ids = pick_fresh_question_ids(category, excluded_question_ids, question_count)
 
-    return [int(q["id"]) for q in selected_questions]
+    return [int(qid) for qid in selected_ids]
 
 
 # ------------------------------------------------------------
 # Get one battle question by id from questions.json
 # ------------------------------------------------------------
-async def get_trivia_question_by_id(session: AsyncSession, question_id: int) -> Optional[dict]:
+async def get_trivia_question_by_id(session: Optional[AsyncSession], question_id: int) -> Optional[dict]:
     # session kept in signature for compatibility with existing callers
-    question = get_question_by_id(question_id)
-    if not question:
+    record = get_question_bank().get_record(question_id)
+    if not record:
         return None
 
     return {
-        "id": int(question["id"]),
-        "category": question["category"],
-        "question": question["question"],
+        "id": int(record.id),
+        "category": record.category,
+        "question": record.question,
         "options": {
-            "A": question.get("options", {}).get("A", ""),
-            "B": question.get("options", {}).get("B", ""),
-            "C": question.get("options", {}).get("C", ""),
-            "D": question.get("options", {}).get("D", ""),
+            "A": record.options[0],
+            "B": record.options[1],
+            "C": record.options[2],
+            "D": record.options[3],
         },
-        "answer": question["answer"],
+        "answer": record.answer,
     }
 
 
@@ -316,7 +280,7 @@ async def start_battle_room(
             "error": f"Not enough questions found in category '{room['category']}'.",
         }
 
-    await session.execute(
+    started = await session.execute(
         text("""
             UPDATE battle_rooms
             SET status = 'active',
@@ -324,6 +288,7 @@ async def start_battle_room(
                 started_at = NOW(),
                 ends_at = NOW() + (:duration_seconds * INTERVAL '1 second')
             WHERE id = :battle_id
+            RETURNING ends_at
         """),
         {
             "battle_id": room["id"],
@@ -345,6 +310,8 @@ async def start_battle_room(
         "room_id": str(room["id"]),
         "room_code": room_code,
         "question_ids": question_ids,
+        "question_count": int(room["question_count"]),
+        "ends_at": started.scalar_one(),
         "players": players,
     }
 
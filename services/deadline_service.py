@@ -0,0 +1,417 @@
+# ====================================================================
+# services/deadline_service.py
+# Durable deadlines for the shared timer wheel (services/timer_wheel.py).
+#
+# The wheel lives in memory; on startup rebuild_timer_wheel() re-arms
+# every pending deadline from the database:
+#   - timer_deadlines rows (paid trivia question timeouts)
+#   - mockjamb_sessions / mockwaec_sessions still running (exam_ends_at)
+#   - challenge questions delivered but neither answered nor timed out
+#     (sent_at + CHALLENGE_QUESTION_SECONDS)
+#   - the current question of every unfinished player in an active
+#     battle room (room ends_at)
+# Handlers for each kind are registered by the handler modules.
+#
+# Every worker runs the rebuild, so each restored timer carries a claim:
+# when it is due, the worker that first inserts (kind, key, due_at) into
+# timer_deadline_fires runs the handler and the others skip it.
+#
+# Challenge / battle question deadlines are keyed by (room, user,
+# question): the answer handler resolves one in memory, so the timeout
+# path only touches the database when a deadline actually expires.
+# ====================================================================
+from __future__ import annotations
+
+import json
+import logging
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db import get_async_session
+from services.battle_service import parse_question_ids
+from services.timer_wheel import CountdownTick, TimerClaim, TimerWheel, get_timer_wheel
+
+logger = logging.getLogger("deadline_service")
+
+TRIVIA_DEADLINE_KIND = "trivia_question"
+MOCKJAMB_EXAM_KIND = "mockjamb_exam"
+MOCKWAEC_EXAM_KIND = "mockwaec_exam"
+CHALLENGE_QUESTION_KIND = "challenge_question"
+BATTLE_QUESTION_KIND = "battle_question"
+
+CHALLENGE_QUESTION_SECONDS = 15
+
+# Fire claims are kept this long, well past any restored due_at
+DEADLINE_FIRE_RETENTION_HOURS = 24
+
+
+async def persist_deadline(
+    session: AsyncSession,
+    *,
+    kind: str,
+    key: str,
+    due_at: datetime,
+    payload: Optional[dict] = None,
+) -> None:
+    await session.execute(
+        text("""
+            INSERT INTO timer_deadlines (
+                kind,
+                key,
+                due_at,
+                payload,
+                created_at
+            )
+            VALUES (
+                :kind,
+                :key,
+                :due_at,
+                CAST(:payload AS jsonb),
+                NOW()
+            )
+            ON CONFLICT (kind, key)
+            DO UPDATE SET
+                due_at = EXCLUDED.due_at,
+                payload = EXCLUDED.payload,
+                created_at = NOW()
+        """),
+        {
+            "kind": kind,
+            "key": str(key),
+            "due_at": due_at,
+            "payload": json.dumps(payload or {}),
+        },
+    )
+
+
+async def clear_deadline(
+    session: AsyncSession,
+    *,
+    kind: str,
+    key: str,
+) -> None:
+    await session.execute(
+        text("""
+            DELETE FROM timer_deadlines
+            WHERE kind = :kind
+              AND key = :key
+        """),
+        {"kind": kind, "key": str(key)},
+    )
+
+
+def restored_deadline_claim(kind: str, key: str, due_at: datetime) -> TimerClaim:
+    """claim() for a restored timer: True in the one worker that fires it."""
+
+    async def claim() -> bool:
+        async with get_async_session() as session:
+            async with session.begin():
+                res = await session.execute(
+                    text("""
+                        INSERT INTO timer_deadline_fires (kind, key, due_at, fired_at)
+                        VALUES (:kind, :key, :due_at, NOW())
+                        ON CONFLICT (kind, key, due_at) DO NOTHING
+                        RETURNING 1
+                    """),
+                    {"kind": kind, "key": str(key), "due_at": due_at},
+                )
+                return res.scalar_one_or_none() is not None
+
+    return claim
+
+
+async def _prune_deadline_fires(session: AsyncSession) -> None:
+    await session.execute(
+        text("""
+            DELETE FROM timer_deadline_fires
+            WHERE fired_at < NOW() - make_interval(hours => :hours)
+        """),
+        {"hours": DEADLINE_FIRE_RETENTION_HOURS},
+    )
+
+
+async def load_pending_deadlines(session: AsyncSession) -> list[dict]:
+    res = await session.execute(
+        text("""
+            SELECT kind, key, due_at, payload
+            FROM timer_deadlines
+            ORDER BY due_at ASC
+        """)
+    )
+    rows = []
+    for row in res.mappings().all():
+        payload: Any = row["payload"]
+        if isinstance(payload, str):
+            try:
+                payload = json.loads(payload)
+            except Exception:
+                payload = {}
+        rows.append({
+            "kind": row["kind"],
+            "key": row["key"],
+            "due_at": row["due_at"],
+            "payload": payload or {},
+        })
+    return rows
+
+
+async def _load_running_exams(session: AsyncSession, table: str) -> list[dict]:
+    res = await session.execute(
+        text(f"""
+            SELECT payment_reference, user_id, exam_ends_at
+            FROM public.{table}
+            WHERE status = 'in_progress'
+              AND exam_ends_at IS NOT NULL
+              AND exam_ends_at > NOW()
+        """)
+    )
+    return [dict(row) for row in res.mappings().all()]
+
+
+def schedule_exam_deadline(
+    kind: str,
+    *,
+    payment_reference: str,
+    user_id: int,
+    exam_ends_at: datetime,
+    claim: Optional[TimerClaim] = None,
+) -> None:
+    if exam_ends_at.tzinfo is None:
+        exam_ends_at = exam_ends_at.replace(tzinfo=timezone.utc)
+
+    get_timer_wheel().schedule(
+        kind,
+        str(payment_reference),
+        exam_ends_at,
+        payload={"user_id": int(user_id)},
+        claim=claim,
+    )
+
+
+async def _load_open_challenge_questions(session: AsyncSession) -> list[dict]:
+    res = await session.execute(
+        text("""
+            SELECT
+                d.challenge_id,
+                d.user_id,
+                d.question_id,
+                d.question_order,
+                d.sent_at + make_interval(secs => :secs) AS due_at
+            FROM challenge_question_delivery d
+            JOIN challenges c
+              ON c.id = d.challenge_id
+            WHERE c.status = 'in_progress'
+              AND d.answered = false
+              AND d.timed_out = false
+              AND d.sent_at IS NOT NULL
+        """),
+        {"secs": CHALLENGE_QUESTION_SECONDS},
+    )
+    return [dict(row) for row in res.mappings().all()]
+
+
+async def _load_open_battle_questions(session: AsyncSession) -> list[dict]:
+    res = await session.execute(
+        text("""
+            SELECT
+                br.room_code,
+                br.ends_at,
+                br.question_ids,
+                bp.tg_id,
+                bp.current_question_index
+            FROM battle_rooms br
+            JOIN battle_players bp
+              ON bp.battle_id = br.id
+            WHERE br.status = 'active'
+              AND br.ends_at IS NOT NULL
+              AND br.ends_at > NOW()
+              AND bp.is_finished = FALSE
+        """)
+    )
+    rows = []
+    for row in res.mappings().all():
+        question_ids = parse_question_ids(row["question_ids"])
+        index = int(row["current_question_index"] or 0)
+        if index >= len(question_ids):
+            continue
+        rows.append({
+            "room_code": row["room_code"],
+            "user_id": int(row["tg_id"]),
+            "question_id": int(question_ids[index]),
+            "question_order": index + 1,
+            "due_at": row["ends_at"],
+        })
+    return rows
+
+
+# ====================================================================
+# CHALLENGE / BATTLE QUESTION DEADLINES
+# ====================================================================
+def question_deadline_key(room: Any, user_id: int, question_id: int) -> str:
+    return f"{room}:{int(user_id)}:{int(question_id)}"
+
+
+def schedule_question_deadline(
+    kind: str,
+    *,
+    room: Any,
+    user_id: int,
+    question_id: int,
+    due_at: datetime,
+    payload: dict,
+    on_tick: Optional[CountdownTick] = None,
+    claim: Optional[TimerClaim] = None,
+) -> str:
+    """
+    Arm the timeout of one delivered question (and its countdown, when
+    on_tick is given). Returns the deadline key.
+    """
+    if due_at.tzinfo is None:
+        due_at = due_at.replace(tzinfo=timezone.utc)
+
+    key = question_deadline_key(room, user_id, question_id)
+    wheel = get_timer_wheel()
+    wheel.schedule(kind, key, due_at, payload=payload, claim=claim)
+    if on_tick is not None:
+        wheel.schedule_countdown(f"{kind}:{key}", due_at, on_tick)
+    return key
+
+
+def resolve_question_deadline(
+    kind: str,
+    *,
+    room: Any,
+    user_id: int,
+    question_id: int,
+) -> bool:
+    """
+    The player answered (or skipped): drop the timeout and countdown.
+    False if the deadline was not pending (already fired, or never armed
+    in this process).
+    """
+    key = question_deadline_key(room, user_id, question_id)
+    wheel = get_timer_wheel()
+    wheel.cancel_countdown(f"{kind}:{key}")
+    return wheel.cancel(kind, key)
+
+
+def question_deadline_pending(
+    kind: str,
+    *,
+    room: Any,
+    user_id: int,
+    question_id: int,
+) -> bool:
+    return get_timer_wheel().is_scheduled(kind, question_deadline_key(room, user_id, question_id))
+
+
+# ====================================================================
+# REBUILD AFTER RESTART
+# ====================================================================
+async def rebuild_timer_wheel(wheel: Optional[TimerWheel] = None) -> int:
+    """
+    Re-arm every pending deadline after a restart. Overdue trivia
+    deadlines fire on the next tick. Runs in every worker; each timer
+    fires in the one worker that claims it. Returns the number of timers
+    armed.
+    """
+    wheel = wheel or get_timer_wheel()
+    armed = 0
+
+    async with get_async_session() as session:
+        deadlines = await load_pending_deadlines(session)
+        mockjamb_exams = await _load_running_exams(session, "mockjamb_sessions")
+        mockwaec_exams = await _load_running_exams(session, "mockwaec_sessions")
+        challenge_questions = await _load_open_challenge_questions(session)
+        battle_questions = await _load_open_battle_questions(session)
+
+    try:
+        async with get_async_session() as session:
+            async with session.begin():
+                await _prune_deadline_fires(session)
+    except Exception:
+        logger.exception("⚠️ Could not prune timer_deadline_fires")
+
+    for row in deadlines:
+        payload = dict(row["payload"])
+        payload["restored"] = True
+        wheel.schedule(
+            row["kind"],
+            row["key"],
+            row["due_at"],
+            payload=payload,
+            claim=restored_deadline_claim(row["kind"], row["key"], row["due_at"]),
+        )
+        armed += 1
+
+    for kind, exams in (
+        (MOCKJAMB_EXAM_KIND, mockjamb_exams),
+        (MOCKWAEC_EXAM_KIND, mockwaec_exams),
+    ):
+        for exam in exams:
+            schedule_exam_deadline(
+                kind,
+                payment_reference=exam["payment_reference"],
+                user_id=int(exam["user_id"]),
+                exam_ends_at=exam["exam_ends_at"],
+                claim=restored_deadline_claim(kind, exam["payment_reference"], exam["exam_ends_at"]),
+            )
+            armed += 1
+
+    for row in challenge_questions:
+        schedule_question_deadline(
+            CHALLENGE_QUESTION_KIND,
+            room=row["challenge_id"],
+            user_id=row["user_id"],
+            question_id=row["question_id"],
+            due_at=row["due_at"],
+            payload={
+                "challenge_id": int(row["challenge_id"]),
+                "user_id": int(row["user_id"]),
+                "question_id": int(row["question_id"]),
+                "question_order": int(row["question_order"]),
+                "restored": True,
+            },
+            claim=restored_deadline_claim(
+                CHALLENGE_QUESTION_KIND,
+                question_deadline_key(row["challenge_id"], row["user_id"], row["question_id"]),
+                row["due_at"],
+            ),
+        )
+        armed += 1
+
+    for row in battle_questions:
+        schedule_question_deadline(
+            BATTLE_QUESTION_KIND,
+            room=row["room_code"],
+            user_id=row["user_id"],
+            question_id=row["question_id"],
+            due_at=row["due_at"],
+            payload={
+                "room_code": row["room_code"],
+                "user_id": row["user_id"],
+                "question_id": row["question_id"],
+                "question_order": row["question_order"],
+                "restored": True,
+            },
+            claim=restored_deadline_claim(
+                BATTLE_QUESTION_KIND,
+                question_deadline_key(row["room_code"], row["user_id"], row["question_id"]),
+                row["due_at"],
+            ),
+        )
+        armed += 1
+
+    logger.info(
+        "⏱ Timer wheel rebuilt | deadlines=%s | mockjamb_exams=%s | mockwaec_exams=%s"
+        " | challenge_questions=%s | battle_questions=%s",
+        len(deadlines),
+        len(mockjamb_exams),
+        len(mockwaec_exams),
+        len(challenge_questions),
+        len(battle_questions),
+    )
+    return armed
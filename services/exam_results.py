@@ -0,0 +1,365 @@
+# ====================================================================
+# services/exam_results.py
+# Per-subject results (answered / correct / score) for Mock JAMB and
+# Mock WAEC sessions.
+#
+# Result screens used to run get_<prefix>_subject_result_stats() once
+# per subject, plus calculate_<prefix>_subject_score() for scores,
+# each with its own live-engine checkpoint; a room recomputed all of it
+# for every player.
+#
+# ExamResults computes every subject of one session, or of every
+# player in a room, with ONE grouped query over <prefix>_subject_questions
+# (after one checkpoint of the live answer log for those payments).
+#
+# A session whose status is 'completed' can no longer change, so its
+# result and its answered review rows are cached (LRU, at most
+# EXAM_RESULTS_MAX_SESSIONS sessions). A session completed inside the
+# current transaction (note_completion) is only cached once that
+# transaction commits.
+# ====================================================================
+from __future__ import annotations
+
+import logging
+import os
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from question_refs import hydrate_rows
+from services.live_exam_engine import MOCKJAMB_LIVE, MOCKWAEC_LIVE, LiveExamEngine
+
+logger = logging.getLogger("exam_results")
+
+EXAM_RESULTS_MAX_SESSIONS = int(os.getenv("EXAM_RESULTS_MAX_SESSIONS", "2000"))
+
+_COMPLETING_KEY = "exam_results_completing"
+_PENDING_KEY = "exam_results_pending"
+
+
+def subject_question_count(subject_code: str) -> int:
+    """Questions per subject paper; same rule for Mock JAMB and Mock WAEC."""
+    subject_code = str(subject_code or "").strip().lower()
+    if subject_code == "eng":
+        return 60
+    return 40
+
+
+def waec_grade(score_100: int) -> str:
+    score_100 = int(score_100 or 0)
+
+    if score_100 >= 75:
+        return "A1"
+    if score_100 >= 70:
+        return "B2"
+    if score_100 >= 65:
+        return "B3"
+    if score_100 >= 60:
+        return "C4"
+    if score_100 >= 55:
+        return "C5"
+    if score_100 >= 50:
+        return "C6"
+    if score_100 >= 45:
+        return "D7"
+    if score_100 >= 40:
+        return "E8"
+    return "F9"
+
+
+@dataclass(slots=True)
+class SubjectResult:
+    subject_code: str
+    total_questions: int = 0
+    answered_count: int = 0
+    correct_count: int = 0
+    score_100: int = 0
+    grade: Optional[str] = None
+
+
+@dataclass(slots=True)
+class SessionResult:
+    payment_reference: str
+    user_id: Optional[int] = None
+    status: Optional[str] = None
+    subjects: Dict[str, SubjectResult] = field(default_factory=dict)
+
+    @property
+    def is_final(self) -> bool:
+        return str(self.status or "").strip().lower() == "completed"
+
+    def subject(self, subject_code: str) -> SubjectResult:
+        """The subject's result; zeros for a subject with no paper yet."""
+        subject_code = str(subject_code or "").strip().lower()
+        return self.subjects.get(subject_code) or SubjectResult(subject_code=subject_code)
+
+    def answered_counts(self, subject_codes: Iterable[str]) -> Dict[str, int]:
+        return {code: self.subject(code).answered_count for code in subject_codes}
+
+    def correct_counts(self, subject_codes: Iterable[str]) -> Dict[str, int]:
+        return {code: self.subject(code).correct_count for code in subject_codes}
+
+    def scores(self, subject_codes: Iterable[str]) -> Dict[str, int]:
+        return {code: self.subject(code).score_100 for code in subject_codes}
+
+    def total_score(self, subject_codes: Optional[Iterable[str]] = None) -> int:
+        codes = subject_codes if subject_codes is not None else self.subjects.keys()
+        return sum(self.subject(code).score_100 for code in codes)
+
+
+class ExamResults:
+    def __init__(
+        self,
+        prefix: str,
+        live: LiveExamEngine,
+        *,
+        grade_for: Optional[Callable[[int], str]] = None,
+        max_sessions: int = EXAM_RESULTS_MAX_SESSIONS,
+    ):
+        self.prefix = prefix
+        self.live = live
+        self.grade_for = grade_for
+        self.max_sessions = max(1, max_sessions)
+        self._paper_table = f"public.{prefix}_subject_questions"
+        self._sessions_table = f"public.{prefix}_sessions"
+        self._payments_table = f"public.{prefix}_payments"
+        self._results: "OrderedDict[str, SessionResult]" = OrderedDict()
+        self._reviews: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.queries = 0
+        self.review_hits = 0
+
+    # --------------------------------------------------------
+    # Cache
+    # --------------------------------------------------------
+    @staticmethod
+    def _lru_get(cache: OrderedDict, key: str) -> Any:
+        value = cache.get(key)
+        if value is not None:
+            cache.move_to_end(key)
+        return value
+
+    def _lru_put(self, cache: OrderedDict, key: str, value: Any) -> None:
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > self.max_sessions:
+            cache.popitem(last=False)
+
+    def _completing(self, session: AsyncSession, payment_reference: str) -> bool:
+        return (self.prefix, payment_reference) in session.info.get(_COMPLETING_KEY, ())
+
+    def _keep(self, session: AsyncSession, cache: OrderedDict, payment_reference: str, value: Any) -> None:
+        if self._completing(session, payment_reference):
+            session.info.setdefault(_PENDING_KEY, []).append((self, cache, payment_reference, value))
+        else:
+            self._lru_put(cache, payment_reference, value)
+
+    def note_completion(self, session: AsyncSession, payment_reference: str) -> None:
+        """
+        The caller's transaction marks this session completed: results it
+        reads are cached only if that transaction commits.
+        """
+        session.info.setdefault(_COMPLETING_KEY, set()).add((self.prefix, payment_reference))
+        self.forget(payment_reference)
+
+    def forget(self, payment_reference: str) -> None:
+        self._results.pop(payment_reference, None)
+        self._reviews.pop(payment_reference, None)
+
+    # --------------------------------------------------------
+    # Results
+    # --------------------------------------------------------
+    def _subject_result(self, subject_code: str, total: int, answered: int, correct: int) -> SubjectResult:
+        expected_total = subject_question_count(subject_code)
+        score_100 = round((correct / expected_total) * 100) if expected_total > 0 else 0
+        return SubjectResult(
+            subject_code=subject_code,
+            total_questions=total,
+            answered_count=answered,
+            correct_count=correct,
+            score_100=int(score_100),
+            grade=self.grade_for(int(score_100)) if self.grade_for else None,
+        )
+
+    async def for_payments(
+        self,
+        session: AsyncSession,
+        payment_references: Iterable[str],
+    ) -> Dict[str, SessionResult]:
+        """Results keyed by payment_reference; payments without a session are left out."""
+        found: Dict[str, SessionResult] = {}
+        missing: List[str] = []
+        for payment_reference in dict.fromkeys(str(ref) for ref in payment_references if ref):
+            cached = self._lru_get(self._results, payment_reference)
+            if cached is not None:
+                self.hits += 1
+                found[payment_reference] = cached
+            else:
+                missing.append(payment_reference)
+
+        if not missing:
+            return found
+
+        self.misses += len(missing)
+        self.queries += 1
+        await self.live.checkpoint_many(session, payment_references=missing)
+        result = await session.execute(
+            text(f"""
+                select
+                    s.payment_reference,
+                    s.user_id,
+                    s.status,
+                    q.subject_code,
+                    count(q.id) as total_questions,
+                    count(q.selected_option) as answered_count,
+                    coalesce(sum(case when q.is_correct = true then 1 else 0 end), 0) as correct_count
+                from {self._sessions_table} s
+                left join {self._paper_table} q
+                  on q.payment_reference = s.payment_reference
+                where s.payment_reference = any(cast(:payment_references as text[]))
+                group by s.payment_reference, s.user_id, s.status, q.subject_code
+            """),
+            {"payment_references": missing},
+        )
+
+        fresh: Dict[str, SessionResult] = {}
+        for row in result.mappings().all():
+            payment_reference = str(row["payment_reference"])
+            entry = fresh.get(payment_reference)
+            if entry is None:
+                entry = fresh[payment_reference] = SessionResult(
+                    payment_reference=payment_reference,
+                    user_id=int(row["user_id"]) if row["user_id"] is not None else None,
+                    status=row["status"],
+                )
+            subject_code = row["subject_code"]
+            if subject_code is None:
+                continue
+            subject_code = str(subject_code).strip().lower()
+            entry.subjects[subject_code] = self._subject_result(
+                subject_code,
+                int(row["total_questions"] or 0),
+                int(row["answered_count"] or 0),
+                int(row["correct_count"] or 0),
+            )
+
+        for payment_reference, entry in fresh.items():
+            if entry.is_final:
+                self._keep(session, self._results, payment_reference, entry)
+            found[payment_reference] = entry
+        return found
+
+    async def for_session(self, session: AsyncSession, payment_reference: str) -> SessionResult:
+        """One session's results; an empty result when the session does not exist."""
+        results = await self.for_payments(session, [payment_reference])
+        return results.get(payment_reference) or SessionResult(payment_reference=payment_reference)
+
+    async def for_room(self, session: AsyncSession, room_code: str) -> Dict[str, SessionResult]:
+        """Results of every paid player in a room, keyed by payment_reference."""
+        room_code = str(room_code or "").strip().upper()
+        result = await session.execute(
+            text(f"""
+                select payment_reference
+                from {self._payments_table}
+                where upper(room_code) = :room_code
+                  and lower(coalesce(payment_status, '')) = 'successful'
+            """),
+            {"room_code": room_code},
+        )
+        return await self.for_payments(session, [row[0] for row in result.all()])
+
+    # --------------------------------------------------------
+    # Review
+    # --------------------------------------------------------
+    async def review_rows(
+        self,
+        session: AsyncSession,
+        *,
+        payment_reference: str,
+        wrong_only: bool = False,
+    ) -> List[Dict[str, Any]]:
+        """Answered paper rows (optionally only the wrong ones), hydrated."""
+        rows = self._lru_get(self._reviews, payment_reference)
+        if rows is not None:
+            self.review_hits += 1
+        else:
+            await self.live.checkpoint(session, payment_reference=payment_reference)
+            result = await session.execute(
+                text(f"""
+                    select
+                        q.id,
+                        q.session_id,
+                        q.payment_reference,
+                        q.user_id,
+                        q.subject_code,
+                        q.question_id,
+                        q.question_order,
+                        q.question_json,
+                        q.content_version,
+                        q.correct_option,
+                        q.selected_option,
+                        q.is_correct,
+                        q.created_at,
+                        q.updated_at,
+                        s.status as session_status
+                    from {self._paper_table} q
+                    left join {self._sessions_table} s
+                      on s.payment_reference = q.payment_reference
+                    where q.payment_reference = :payment_reference
+                      and q.selected_option is not null
+                    order by q.subject_code asc, q.question_order asc
+                """),
+                {"payment_reference": payment_reference},
+            )
+            rows = [dict(row) for row in result.mappings().all()]
+            status = rows[0].pop("session_status", None) if rows else None
+            for row in rows:
+                row.pop("session_status", None)
+            rows = await hydrate_rows(session, rows)
+            if str(status or "").strip().lower() == "completed":
+                self._keep(session, self._reviews, payment_reference, rows)
+
+        if wrong_only:
+            return [dict(row) for row in rows if not row.get("is_correct")]
+        return [dict(row) for row in rows]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "cached_results": len(self._results),
+            "cached_reviews": len(self._reviews),
+            "max_sessions": self.max_sessions,
+            "hits": self.hits,
+            "misses": self.misses,
+            "queries": self.queries,
+            "review_hits": self.review_hits,
+        }
+
+
+@event.listens_for(Session, "after_commit")
+def _cache_completed(sync_session: Session) -> None:
+    sync_session.info.pop(_COMPLETING_KEY, None)
+    pending = sync_session.info.pop(_PENDING_KEY, None)
+    if not pending:
+        return
+    for results, cache, payment_reference, value in pending:
+        results._lru_put(cache, payment_reference, value)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_completed(sync_session: Session) -> None:
+    sync_session.info.pop(_COMPLETING_KEY, None)
+    sync_session.info.pop(_PENDING_KEY, None)
+
+
+MOCKJAMB_RESULTS = ExamResults("mockjamb", MOCKJAMB_LIVE)
+MOCKWAEC_RESULTS = ExamResults("mockwaec", MOCKWAEC_LIVE, grade_for=waec_grade)
+
+
+def exam_results_stats() -> Dict[str, Any]:
+    return {results.prefix: results.stats() for results in (MOCKJAMB_RESULTS, MOCKWAEC_RESULTS)}
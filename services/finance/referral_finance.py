@@ -13,6 +13,7 @@ Responsibilities:
 - Locate referrals made by a user.
 - Activate pending referrals.
 - Read referral relationship information.
+- Keep the referrer's wallet referral counts in step.
 
 This module does NOT:
 
@@ -35,6 +36,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from finance_models import ReferralORM
 from services.finance.exceptions import ReferralNotFoundError
+from services.finance.wallet_service import adjust_referral_counts
 
 
 # ==========================================================
@@ -155,6 +157,13 @@ async def create_referral(
 
     await session.flush()
 
+    await adjust_referral_counts(
+        session,
+        referrer_user_id,
+        from_status=None,
+        to_status=status,
+    )
+
     return _to_referral_result(referral)
 
 
@@ -333,6 +342,13 @@ async def activate_referral(
 
     await session.flush()
 
+    await adjust_referral_counts(
+        session,
+        referral.referrer_user_id,
+        from_status="pending",
+        to_status="active",
+    )
+
     return _to_referral_result(referral)
 
 
@@ -369,6 +385,8 @@ async def deactivate_referral(
             f"Referral {referral_id} was not found."
         )
 
+    previous_status = referral.status
+
     referral.status = "inactive"
 
     if notes is not None:
@@ -376,6 +394,13 @@ async def deactivate_referral(
 
     await session.flush()
 
+    await adjust_referral_counts(
+        session,
+        referral.referrer_user_id,
+        from_status=previous_status,
+        to_status="inactive",
+    )
+
     return _to_referral_result(referral)
 
 
@@ -27,6 +27,11 @@ This module MUST NOT:
 
 All functions are read-only unless explicitly documented otherwise.
 
+Wallet, referral, commission and withdrawal figures are read from
+the running aggregates on referral_wallets (maintained by the wallet,
+withdrawal and referral services, checked against the ledger by
+wallet_reconciliation.py), not summed from the ledger per request.
+
 The caller owns the session lifecycle.
 """
 
@@ -46,13 +51,10 @@ from finance_models import (
     ReferralWalletORM,
     UserPremiumPointsORM,
     WalletTransactionORM,
-    WithdrawalRequestORM,
 )
 from services.finance.enums import (
-    CommissionStatus,
     WalletTransactionCode,
     WalletTransactionStatus,
-    WithdrawalStatus,
 )
 from services.finance.models import (
     WalletSummary,
@@ -145,56 +147,75 @@ class WalletTransactionReport:
 
 
 # ==========================================================
-# Wallet Summary
+# Wallet Aggregates
 # ==========================================================
 
 
-async def get_wallet_summary(
+_ZERO = Decimal("0.00")
+
+
+async def _get_wallet_and_points(
     session: AsyncSession,
     user_id: UUID,
-) -> WalletSummary:
+) -> tuple[ReferralWalletORM | None, UserPremiumPointsORM | None]:
     """
-    Returns the user's current wallet summary.
-
-    This is a read-only operation.
+    Reads the user's wallet (with its running aggregates) and
+    Premium Points row in one query on the unique user_id indexes.
     """
 
-    wallet_result = await session.execute(
-        select(ReferralWalletORM)
+    result = await session.execute(
+        select(ReferralWalletORM, UserPremiumPointsORM)
+        .select_from(ReferralWalletORM)
+        .outerjoin(
+            UserPremiumPointsORM,
+            UserPremiumPointsORM.user_id == ReferralWalletORM.user_id,
+        )
         .where(
             ReferralWalletORM.user_id == user_id
         )
     )
 
-    wallet = wallet_result.scalar_one_or_none()
+    row = result.first()
 
-    if wallet is None:
-        return WalletSummary(
-            balance=Decimal("0.00"),
-            available_balance=Decimal("0.00"),
-            total_earned=Decimal("0.00"),
-            total_withdrawn=Decimal("0.00"),
-            pending_withdrawals=Decimal("0.00"),
-            total_reversed=Decimal("0.00"),
-            eligible_points=0,
-            reserved_points=0,
-            available_points=0,
-            maximum_withdrawal=Decimal("0.00"),
-        )
+    if row is None:
+        return None, None
 
-    # ------------------------------------------------------
-    # Premium Points
-    # ------------------------------------------------------
+    return row[0], row[1]
 
-    points_result = await session.execute(
-        select(UserPremiumPointsORM)
+
+async def _get_wallet(
+    session: AsyncSession,
+    user_id: UUID,
+) -> ReferralWalletORM | None:
+    result = await session.execute(
+        select(ReferralWalletORM)
         .where(
-            UserPremiumPointsORM.user_id == user_id
+            ReferralWalletORM.user_id == user_id
         )
     )
 
-    points = points_result.scalar_one_or_none()
+    return result.scalar_one_or_none()
+
 
+def _empty_wallet_summary() -> WalletSummary:
+    return WalletSummary(
+        balance=_ZERO,
+        available_balance=_ZERO,
+        total_earned=_ZERO,
+        total_withdrawn=_ZERO,
+        pending_withdrawals=_ZERO,
+        total_reversed=_ZERO,
+        eligible_points=0,
+        reserved_points=0,
+        available_points=0,
+        maximum_withdrawal=_ZERO,
+    )
+
+
+def _wallet_summary(
+    wallet: ReferralWalletORM,
+    points: UserPremiumPointsORM | None,
+) -> WalletSummary:
     eligible_points = (
         points.eligible_points
         if points is not None
@@ -213,32 +234,11 @@ async def get_wallet_summary(
     )
 
     # ------------------------------------------------------
-    # Pending withdrawals
+    # Pending withdrawals are the funds reserved for
+    # PENDING / PROCESSING / APPROVED withdrawals.
     # ------------------------------------------------------
 
-    pending_result = await session.execute(
-        select(
-            func.coalesce(
-                func.sum(WithdrawalRequestORM.amount),
-                Decimal("0.00"),
-            )
-        )
-        .where(
-            WithdrawalRequestORM.wallet_id == wallet.id,
-            WithdrawalRequestORM.status.in_(
-                [
-                    WithdrawalStatus.PENDING.value,
-                    WithdrawalStatus.PROCESSING.value,
-                    WithdrawalStatus.APPROVED.value,
-                ]
-            ),
-        )
-    )
-
-    pending_withdrawals = (
-        pending_result.scalar_one()
-        or Decimal("0.00")
-    )
+    pending_withdrawals = wallet.total_pending_withdrawals
 
     # ------------------------------------------------------
     # Maximum withdrawal
@@ -251,8 +251,8 @@ async def get_wallet_summary(
         wallet.balance - pending_withdrawals
     )
 
-    if available_balance < Decimal("0.00"):
-        available_balance = Decimal("0.00")
+    if available_balance < _ZERO:
+        available_balance = _ZERO
 
     return WalletSummary(
         balance=wallet.balance,
@@ -268,6 +268,93 @@ async def get_wallet_summary(
     )
 
 
+def _referral_report(
+    wallet: ReferralWalletORM,
+) -> ReferralReport:
+    return ReferralReport(
+        total_referrals=wallet.referral_count,
+        active_referrals=wallet.active_referral_count,
+        pending_referrals=wallet.pending_referral_count,
+        inactive_referrals=wallet.inactive_referral_count,
+    )
+
+
+def _commission_report(
+    wallet: ReferralWalletORM | None,
+) -> CommissionReport:
+    if wallet is None:
+        return CommissionReport(
+            transaction_count=0,
+            total_commission=_ZERO,
+            total_reversed=_ZERO,
+            net_commission=_ZERO,
+        )
+
+    # Referral commission is the only wallet credit.
+    total_commission = wallet.total_earned
+    total_reversed = wallet.total_reversed
+
+    return CommissionReport(
+        transaction_count=wallet.commission_count,
+        total_commission=total_commission,
+        total_reversed=total_reversed,
+        net_commission=total_commission - total_reversed,
+    )
+
+
+def _withdrawal_report(
+    wallet: ReferralWalletORM | None,
+) -> WithdrawalReport:
+    if wallet is None:
+        return WithdrawalReport(
+            total_requests=0,
+            pending_amount=_ZERO,
+            approved_amount=_ZERO,
+            completed_amount=_ZERO,
+            rejected_amount=_ZERO,
+            cancelled_amount=_ZERO,
+        )
+
+    # approve_withdrawal() moves PENDING -> PROCESSING, so
+    # every reserved amount is pending; an APPROVED row can
+    # only come from outside the withdrawal service and is
+    # reported by the wallet reconciliation instead.
+    return WithdrawalReport(
+        total_requests=wallet.withdrawal_count,
+        pending_amount=wallet.total_pending_withdrawals,
+        approved_amount=_ZERO,
+        completed_amount=wallet.total_withdrawn,
+        rejected_amount=wallet.total_rejected_withdrawals,
+        cancelled_amount=wallet.total_cancelled_withdrawals,
+    )
+
+
+# ==========================================================
+# Wallet Summary
+# ==========================================================
+
+
+async def get_wallet_summary(
+    session: AsyncSession,
+    user_id: UUID,
+) -> WalletSummary:
+    """
+    Returns the user's current wallet summary.
+
+    This is a read-only operation.
+    """
+
+    wallet, points = await _get_wallet_and_points(
+        session,
+        user_id,
+    )
+
+    if wallet is None:
+        return _empty_wallet_summary()
+
+    return _wallet_summary(wallet, points)
+
+
 # ==========================================================
 # Wallet Transactions
 # ==========================================================
@@ -358,81 +445,9 @@ async def get_commission_report(
     are included.
     """
 
-    # ------------------------------------------------------
-    # Total commission credits
-    # ------------------------------------------------------
+    wallet = await _get_wallet(session, user_id)
 
-    credit_result = await session.execute(
-        select(
-            func.count(WalletTransactionORM.id),
-            func.coalesce(
-                func.sum(WalletTransactionORM.amount),
-                Decimal("0.00"),
-            ),
-        )
-        .where(
-            WalletTransactionORM.user_id == user_id,
-            WalletTransactionORM.transaction_code
-            == WalletTransactionCode.REFERRAL_COMMISSION.value,
-            WalletTransactionORM.transaction_type == "credit",
-            WalletTransactionORM.status
-            == WalletTransactionStatus.COMPLETED.value,
-        )
-    )
-
-    credit_count, total_commission = (
-        credit_result.one()
-    )
-
-    # ------------------------------------------------------
-    # Commission reversals
-    # ------------------------------------------------------
-
-    reversal_result = await session.execute(
-        select(
-            func.count(WalletTransactionORM.id),
-            func.coalesce(
-                func.sum(WalletTransactionORM.amount),
-                Decimal("0.00"),
-            ),
-        )
-        .where(
-            WalletTransactionORM.user_id == user_id,
-            WalletTransactionORM.transaction_code
-            == WalletTransactionCode.COMMISSION_REVERSAL.value,
-            WalletTransactionORM.status.in_(
-                [
-                    WalletTransactionStatus.COMPLETED.value,
-                    WalletTransactionStatus.REVERSED.value,
-                ]
-            ),
-        )
-    )
-
-    reversal_count, total_reversed = (
-        reversal_result.one()
-    )
-
-    total_commission = (
-        total_commission
-        or Decimal("0.00")
-    )
-
-    total_reversed = (
-        total_reversed
-        or Decimal("0.00")
-    )
-
-    net_commission = (
-        total_commission - total_reversed
-    )
-
-    return CommissionReport(
-        transaction_count=int(credit_count or 0),
-        total_commission=total_commission,
-        total_reversed=total_reversed,
-        net_commission=net_commission,
-    )
+    return _commission_report(wallet)
 
 
 # ==========================================================
@@ -440,67 +455,57 @@ async def get_commission_report(
 # ==========================================================
 
 
-async def get_referral_report(
+async def _count_referrals(
     session: AsyncSession,
     user_id: UUID,
 ) -> ReferralReport:
     """
-    Returns referral relationship statistics.
+    Counts referrals from the referrals table.
+
+    Only used for users without a wallet (the wallet
+    carries the counts once it exists).
     """
 
-    total_result = await session.execute(
-        select(func.count(ReferralORM.id))
+    result = await session.execute(
+        select(
+            ReferralORM.status,
+            func.count(ReferralORM.id),
+        )
         .where(
             ReferralORM.referrer_user_id == user_id
         )
-    )
-
-    total_referrals = int(
-        total_result.scalar_one() or 0
-    )
-
-    active_result = await session.execute(
-        select(func.count(ReferralORM.id))
-        .where(
-            ReferralORM.referrer_user_id == user_id,
-            ReferralORM.status == "active",
+        .group_by(
+            ReferralORM.status
         )
     )
 
-    active_referrals = int(
-        active_result.scalar_one() or 0
-    )
+    counts = {
+        status: int(count or 0)
+        for status, count in result.all()
+    }
 
-    pending_result = await session.execute(
-        select(func.count(ReferralORM.id))
-        .where(
-            ReferralORM.referrer_user_id == user_id,
-            ReferralORM.status == "pending",
-        )
+    return ReferralReport(
+        total_referrals=sum(counts.values()),
+        active_referrals=counts.get("active", 0),
+        pending_referrals=counts.get("pending", 0),
+        inactive_referrals=counts.get("inactive", 0),
     )
 
-    pending_referrals = int(
-        pending_result.scalar_one() or 0
-    )
 
-    inactive_result = await session.execute(
-        select(func.count(ReferralORM.id))
-        .where(
-            ReferralORM.referrer_user_id == user_id,
-            ReferralORM.status == "inactive",
-        )
-    )
+async def get_referral_report(
+    session: AsyncSession,
+    user_id: UUID,
+) -> ReferralReport:
+    """
+    Returns referral relationship statistics.
+    """
 
-    inactive_referrals = int(
-        inactive_result.scalar_one() or 0
-    )
+    wallet = await _get_wallet(session, user_id)
 
-    return ReferralReport(
-        total_referrals=total_referrals,
-        active_referrals=active_referrals,
-        pending_referrals=pending_referrals,
-        inactive_referrals=inactive_referrals,
-    )
+    if wallet is None:
+        return await _count_referrals(session, user_id)
+
+    return _referral_report(wallet)
 
 
 # ==========================================================
@@ -516,51 +521,9 @@ async def get_withdrawal_report(
     Returns withdrawal statistics for a user.
     """
 
-    result = await session.execute(
-        select(WithdrawalRequestORM)
-        .where(
-            WithdrawalRequestORM.user_id == user_id
-        )
-    )
-
-    withdrawals = result.scalars().all()
-
-    pending_amount = Decimal("0.00")
-    approved_amount = Decimal("0.00")
-    completed_amount = Decimal("0.00")
-    rejected_amount = Decimal("0.00")
-    cancelled_amount = Decimal("0.00")
-
-    for withdrawal in withdrawals:
-
-        amount = withdrawal.amount
+    wallet = await _get_wallet(session, user_id)
 
-        if withdrawal.status in (
-            WithdrawalStatus.PENDING.value,
-            WithdrawalStatus.PROCESSING.value,
-        ):
-            pending_amount += amount
-
-        elif withdrawal.status == WithdrawalStatus.APPROVED.value:
-            approved_amount += amount
-
-        elif withdrawal.status == WithdrawalStatus.COMPLETED.value:
-            completed_amount += amount
-
-        elif withdrawal.status == WithdrawalStatus.REJECTED.value:
-            rejected_amount += amount
-
-        elif withdrawal.status == WithdrawalStatus.CANCELLED.value:
-            cancelled_amount += amount
-
-    return WithdrawalReport(
-        total_requests=len(withdrawals),
-        pending_amount=pending_amount,
-        approved_amount=approved_amount,
-        completed_amount=completed_amount,
-        rejected_amount=rejected_amount,
-        cancelled_amount=cancelled_amount,
-    )
+    return _withdrawal_report(wallet)
 
 
 # ==========================================================
@@ -574,33 +537,29 @@ async def get_finance_report(
 ) -> FinanceReport:
     """
     Returns the complete read-only finance report for a user.
-    """
-
-    wallet = await get_wallet_summary(
-        session=session,
-        user_id=user_id,
-    )
 
-    referrals = await get_referral_report(
-        session=session,
-        user_id=user_id,
-    )
+    Every figure comes from the wallet's running aggregates,
+    read together with the Premium Points row in one query.
+    """
 
-    commissions = await get_commission_report(
-        session=session,
-        user_id=user_id,
+    wallet, points = await _get_wallet_and_points(
+        session,
+        user_id,
     )
 
-    withdrawals = await get_withdrawal_report(
-        session=session,
-        user_id=user_id,
-    )
+    if wallet is None:
+        return FinanceReport(
+            wallet=_empty_wallet_summary(),
+            referrals=await _count_referrals(session, user_id),
+            commissions=_commission_report(None),
+            withdrawals=_withdrawal_report(None),
+        )
 
     return FinanceReport(
-        wallet=wallet,
-        referrals=referrals,
-        commissions=commissions,
-        withdrawals=withdrawals,
+        wallet=_wallet_summary(wallet, points),
+        referrals=_referral_report(wallet),
+        commissions=_commission_report(wallet),
+        withdrawals=_withdrawal_report(wallet),
     )
 
 
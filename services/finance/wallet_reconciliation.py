@@ -0,0 +1,246 @@
+# ======================================================
+# services/finance/wallet_reconciliation.py
+# ======================================================
+
+"""
+Wallet aggregate reconciliation for the NaijaPrize Finance subsystem.
+
+referral_wallets carries running aggregates (earned, withdrawn,
+pending, rejected, cancelled, reversed, commission / withdrawal /
+referral counts) maintained by the wallet, withdrawal and referral
+services in the same transaction as the ledger rows they summarize.
+The finance dashboard reads only those aggregates.
+
+This module recomputes every aggregate from the ledger tables
+(wallet_transactions, referral_withdrawals, referrals) in one
+grouped query and reports the wallets whose stored values differ.
+
+With repair=True the drifted aggregates are overwritten with the
+ledger values. Wallet balances are never touched.
+
+The caller owns the session lifecycle.
+"""
+
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass
+from decimal import Decimal
+from uuid import UUID
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger("wallet_reconciliation")
+
+
+# ==========================================================
+# Aggregates
+# ==========================================================
+
+
+AGGREGATE_FIELDS: tuple[str, ...] = (
+    "total_earned",
+    "total_withdrawn",
+    "total_pending_withdrawals",
+    "total_reversed",
+    "total_rejected_withdrawals",
+    "total_cancelled_withdrawals",
+    "withdrawal_count",
+    "commission_count",
+    "referral_count",
+    "active_referral_count",
+    "pending_referral_count",
+    "inactive_referral_count",
+)
+
+
+_EXPECTED_CTE = """
+    with tx as (
+        select
+            wallet_id,
+            coalesce(sum(amount) filter (
+                where transaction_type = 'credit'
+                  and status = 'COMPLETED'
+            ), 0) as total_earned,
+            count(*) filter (
+                where transaction_code = 'REFERRAL_COMMISSION'
+                  and transaction_type = 'credit'
+                  and status = 'COMPLETED'
+            ) as commission_count,
+            coalesce(sum(amount) filter (
+                where transaction_code = 'COMMISSION_REVERSAL'
+                  and status in ('COMPLETED', 'REVERSED')
+            ), 0) as total_reversed
+        from wallet_transactions
+        group by wallet_id
+    ),
+    wd as (
+        select
+            wallet_id,
+            count(*) as withdrawal_count,
+            coalesce(sum(amount) filter (
+                where status = 'COMPLETED'
+            ), 0) as total_withdrawn,
+            coalesce(sum(amount) filter (
+                where status in ('PENDING', 'PROCESSING', 'APPROVED')
+            ), 0) as total_pending_withdrawals,
+            coalesce(sum(amount) filter (
+                where status = 'REJECTED'
+            ), 0) as total_rejected_withdrawals,
+            coalesce(sum(amount) filter (
+                where status = 'CANCELLED'
+            ), 0) as total_cancelled_withdrawals
+        from referral_withdrawals
+        group by wallet_id
+    ),
+    rf as (
+        select
+            referrer_user_id as user_id,
+            count(*) as referral_count,
+            count(*) filter (where status = 'active') as active_referral_count,
+            count(*) filter (where status = 'pending') as pending_referral_count,
+            count(*) filter (where status = 'inactive') as inactive_referral_count
+        from referrals
+        group by referrer_user_id
+    ),
+    expected as (
+        select
+            w.id as wallet_id,
+            coalesce(tx.total_earned, 0) as total_earned,
+            coalesce(wd.total_withdrawn, 0) as total_withdrawn,
+            coalesce(wd.total_pending_withdrawals, 0) as total_pending_withdrawals,
+            coalesce(tx.total_reversed, 0) as total_reversed,
+            coalesce(wd.total_rejected_withdrawals, 0) as total_rejected_withdrawals,
+            coalesce(wd.total_cancelled_withdrawals, 0) as total_cancelled_withdrawals,
+            coalesce(wd.withdrawal_count, 0) as withdrawal_count,
+            coalesce(tx.commission_count, 0) as commission_count,
+            coalesce(rf.referral_count, 0) as referral_count,
+            coalesce(rf.active_referral_count, 0) as active_referral_count,
+            coalesce(rf.pending_referral_count, 0) as pending_referral_count,
+            coalesce(rf.inactive_referral_count, 0) as inactive_referral_count
+        from referral_wallets w
+        left join tx on tx.wallet_id = w.id
+        left join wd on wd.wallet_id = w.id
+        left join rf on rf.user_id = w.user_id
+    )
+"""
+
+
+# ==========================================================
+# Result Models
+# ==========================================================
+
+
+@dataclass(slots=True)
+class WalletAggregateDrift:
+    """
+    One wallet aggregate that does not match the ledger.
+    """
+
+    wallet_id: UUID
+    user_id: UUID
+    field: str
+    stored: Decimal | int
+    expected: Decimal | int
+
+
+# ==========================================================
+# Reconcile
+# ==========================================================
+
+
+async def reconcile_wallet_aggregates(
+    session: AsyncSession,
+    *,
+    repair: bool = False,
+) -> list[WalletAggregateDrift]:
+    """
+    Compares every wallet's running aggregates with the ledger.
+
+    Returns one WalletAggregateDrift per mismatching field.
+
+    With repair=True the drifted wallets' aggregates are set to
+    the ledger values; the caller commits.
+    """
+
+    stored_columns = ",\n            ".join(
+        f"w.{name} as stored_{name}"
+        for name in AGGREGATE_FIELDS
+    )
+    expected_columns = ",\n            ".join(
+        f"e.{name} as expected_{name}"
+        for name in AGGREGATE_FIELDS
+    )
+    stored_tuple = ", ".join(f"w.{name}" for name in AGGREGATE_FIELDS)
+    expected_tuple = ", ".join(f"e.{name}" for name in AGGREGATE_FIELDS)
+
+    result = await session.execute(
+        text(f"""
+            {_EXPECTED_CTE}
+            select
+                w.id as wallet_id,
+                w.user_id,
+                {stored_columns},
+                {expected_columns}
+            from referral_wallets w
+            join expected e on e.wallet_id = w.id
+            where ({stored_tuple}) is distinct from ({expected_tuple})
+        """)
+    )
+
+    drifts: list[WalletAggregateDrift] = []
+
+    for row in result.mappings().all():
+        for name in AGGREGATE_FIELDS:
+            stored = row[f"stored_{name}"]
+            expected = row[f"expected_{name}"]
+
+            if stored != expected:
+                drifts.append(
+                    WalletAggregateDrift(
+                        wallet_id=row["wallet_id"],
+                        user_id=row["user_id"],
+                        field=name,
+                        stored=stored,
+                        expected=expected,
+                    )
+                )
+
+    wallet_ids = sorted({str(drift.wallet_id) for drift in drifts})
+
+    for drift in drifts:
+        logger.warning(
+            "⚠️ Wallet aggregate drift | wallet_id=%s | field=%s | stored=%s | ledger=%s",
+            drift.wallet_id,
+            drift.field,
+            drift.stored,
+            drift.expected,
+        )
+
+    if repair and wallet_ids:
+        assignments = ",\n                    ".join(
+            f"{name} = e.{name}"
+            for name in AGGREGATE_FIELDS
+        )
+
+        await session.execute(
+            text(f"""
+                {_EXPECTED_CTE}
+                update referral_wallets w
+                set
+                    {assignments},
+                    updated_at = now()
+                from expected e
+                where e.wallet_id = w.id
+                  and w.id = any(cast(:wallet_ids as uuid[]))
+            """),
+            {"wallet_ids": wallet_ids},
+        )
+
+        logger.info(
+            "🔧 Wallet aggregates repaired from the ledger | wallets=%s",
+            len(wallet_ids),
+        )
+
+    return drifts
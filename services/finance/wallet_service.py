@@ -28,11 +28,12 @@ from __future__ import annotations
 from uuid import UUID
 from decimal import Decimal
 
-from sqlalchemy import select
+from sqlalchemy import select, update
 from sqlalchemy.sql import func
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from finance_models import (
+    ReferralORM,
     ReferralWalletORM,
     WalletTransactionORM,
 )
@@ -126,6 +127,8 @@ async def get_or_create_wallet(
         wallet_code=generate_wallet_code(),
     )
 
+    await _seed_referral_counts(session, wallet)
+
     session.add(wallet)
 
     # Make the INSERT visible inside this transaction and obtain
@@ -160,6 +163,8 @@ async def create_wallet(
         wallet_code=generate_wallet_code(),
     )
 
+    await _seed_referral_counts(session, wallet)
+
     session.add(wallet)
 
     await session.commit()
@@ -379,10 +384,15 @@ async def record_wallet_transaction(
 async def debit_wallet(
     wallet: ReferralWalletORM,
     amount: Decimal,
+    *,
+    reversal: bool = False,
 ) -> ReferralWalletORM:
     """
     Debits a referral wallet.
 
+    Pass reversal=True when the debit reverses earned
+    commission, so the wallet's total_reversed follows.
+
     This function modifies the tracked ORM object.
 
     It does not query the database.
@@ -413,6 +423,9 @@ async def debit_wallet(
 
     wallet.balance -= amount
 
+    if reversal:
+        wallet.total_reversed += amount
+
     wallet.last_transaction_at = func.now()
 
     return wallet
@@ -520,7 +533,8 @@ async def credit_referral_commission(
 
     1. Validates the commission amount.
     2. Credits the wallet.
-    3. Records the wallet transaction.
+    3. Counts the commission on the wallet.
+    4. Records the wallet transaction.
 
     This function does NOT commit the transaction.
 
@@ -551,6 +565,8 @@ async def credit_referral_commission(
 
     balance_after = wallet.balance
 
+    wallet.commission_count += 1
+
     await record_wallet_transaction(
         session=session,
         wallet=wallet,
@@ -614,3 +630,99 @@ async def consume_reserved_wallet_funds(
 
     return wallet
 
+
+# -------------------------------
+# Referral Count Aggregates
+# -------------------------------
+_REFERRAL_STATUS_COUNTS = {
+    "pending": "pending_referral_count",
+    "active": "active_referral_count",
+    "inactive": "inactive_referral_count",
+}
+
+
+async def _seed_referral_counts(
+    session: AsyncSession,
+    wallet: ReferralWalletORM,
+) -> None:
+    """
+    Counts referrals made before the wallet existed
+    onto a new (not yet flushed) wallet.
+    """
+
+    result = await session.execute(
+        select(
+            ReferralORM.status,
+            func.count(ReferralORM.id),
+        )
+        .where(
+            ReferralORM.referrer_user_id == wallet.user_id
+        )
+        .group_by(
+            ReferralORM.status
+        )
+    )
+
+    wallet.referral_count = 0
+
+    for column in _REFERRAL_STATUS_COUNTS.values():
+        setattr(wallet, column, 0)
+
+    for status, count in result.all():
+        wallet.referral_count += int(count or 0)
+
+        column = _REFERRAL_STATUS_COUNTS.get(status)
+
+        if column is not None:
+            setattr(wallet, column, int(count or 0))
+
+
+async def adjust_referral_counts(
+    session: AsyncSession,
+    referrer_user_id: UUID,
+    *,
+    from_status: str | None,
+    to_status: str,
+) -> None:
+    """
+    Moves one referral between the referrer's wallet
+    referral counters.
+
+    from_status=None counts a newly created referral.
+
+    Runs as one UPDATE in the caller's transaction.
+    Does nothing when the referrer has no wallet yet;
+    the wallet counts existing referrals when created.
+
+    It does not commit the transaction.
+    """
+
+    if from_status == to_status:
+        return
+
+    values = {}
+
+    if from_status is None:
+        values["referral_count"] = ReferralWalletORM.referral_count + 1
+
+    from_column = _REFERRAL_STATUS_COUNTS.get(from_status or "")
+
+    if from_column is not None:
+        values[from_column] = getattr(ReferralWalletORM, from_column) - 1
+
+    to_column = _REFERRAL_STATUS_COUNTS.get(to_status)
+
+    if to_column is not None:
+        values[to_column] = getattr(ReferralWalletORM, to_column) + 1
+
+    if not values:
+        return
+
+    await session.execute(
+        update(ReferralWalletORM)
+        .where(
+            ReferralWalletORM.user_id == referrer_user_id
+        )
+        .values(**values)
+        .execution_options(synchronize_session="fetch")
+    )
@@ -102,7 +102,7 @@ async def create_withdrawal_request(
     1. Validate withdrawal amount.
     2. Validate the selected bank account.
     3. Calculate required Premium Points.
-    4. Reserve wallet funds.
+    4. Reserve wallet funds and count the request.
     5. Create the withdrawal request as PENDING.
     6. Record the wallet reservation event.
     7. Flush to obtain the withdrawal ID.
@@ -146,6 +146,8 @@ async def create_withdrawal_request(
         amount=amount,
     )
 
+    wallet.withdrawal_count += 1
+
     # -----------------------------------------------------------
     # Create the withdrawal in its initial PENDING state.
     #
@@ -406,7 +408,8 @@ async def reject_withdrawal(
     This workflow:
 
     1. Changes the withdrawal to REJECTED.
-    2. Releases the reserved wallet funds.
+    2. Releases the reserved wallet funds into the
+       wallet's rejected total.
     3. Records the wallet reservation release.
     4. Releases the reserved Premium Points.
 
@@ -448,6 +451,8 @@ async def reject_withdrawal(
         amount=withdrawal.amount,
     )
 
+    wallet.total_rejected_withdrawals += withdrawal.amount
+
     balance_after = wallet.balance
 
     # -----------------------------------------------------------
@@ -490,7 +495,8 @@ async def cancel_withdrawal(
     This workflow:
 
     1. Changes the withdrawal to CANCELLED.
-    2. Releases the reserved wallet funds.
+    2. Releases the reserved wallet funds into the
+       wallet's cancelled total.
     3. Records the wallet reservation release.
     4. Releases the reserved Premium Points.
 
@@ -532,6 +538,8 @@ async def cancel_withdrawal(
         amount=withdrawal.amount,
     )
 
+    wallet.total_cancelled_withdrawals += withdrawal.amount
+
     balance_after = wallet.balance
 
     # -----------------------------------------------------------
@@ -6,6 +6,7 @@ import logging
 import httpx
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from http_clients import get_http_clients
 from config import (
     FLUTTERWAVE_SECRET_KEY,
     FLUTTERWAVE_REDIRECT_URL,
@@ -86,17 +87,18 @@ async def create_flutterwave_checkout_link(
     )
 
     try:
-        async with httpx.AsyncClient(timeout=15.0) as client:
-            resp = await client.post(
-                "https://api.flutterwave.com/v3/payments",
-                json=payload,
-                headers={
-                    "Authorization": f"Bearer {FLUTTERWAVE_SECRET_KEY}",
-                    "Content-Type": "application/json",
-                },
-            )
-            resp.raise_for_status()
-            data = resp.json()
+        resp = await get_http_clients().post(
+            "flutterwave",
+            "POST /payments",
+            "https://api.flutterwave.com/v3/payments",
+            json=payload,
+            headers={
+                "Authorization": f"Bearer {FLUTTERWAVE_SECRET_KEY}",
+                "Content-Type": "application/json",
+            },
+        )
+        resp.raise_for_status()
+        data = resp.json()
     except httpx.HTTPStatusError as e:
         body = ""
         try:
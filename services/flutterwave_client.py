@@ -10,6 +10,8 @@ from typing import Any, Optional
 import httpx
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from http_clients import get_http_clients
+
 logger = logging.getLogger("flutterwave_client")
 logger.setLevel(logging.INFO)
 
@@ -219,17 +221,16 @@ async def create_flutterwave_checkout_link(
         "Content-Type": "application/json",
     }
 
-    timeout = httpx.Timeout(connect=10.0, read=30.0, write=30.0, pool=30.0)
-
     try:
-        async with httpx.AsyncClient(timeout=timeout) as client:
-            resp = await client.post(
-                f"{FLW_BASE_URL}/payments",
-                json=payload,
-                headers=headers,
-            )
-            resp.raise_for_status()
-            data = resp.json()
+        resp = await get_http_clients().post(
+            "flutterwave",
+            "POST /payments",
+            f"{FLW_BASE_URL}/payments",
+            json=payload,
+            headers=headers,
+        )
+        resp.raise_for_status()
+        data = resp.json()
     except httpx.ReadTimeout:
         logger.exception(
             "❌ Flutterwave checkout request timed out | product_type=%s | tx_ref=%s",
@@ -276,14 +277,16 @@ async def verify_payment(tx_ref: str) -> dict[str, Any]:
         return {"status": "error", "error": "missing FLW_SECRET_KEY"}
 
     headers = {"Authorization": f"Bearer {FLW_SECRET_KEY}"}
-    timeout = httpx.Timeout(connect=10.0, read=20.0, write=20.0, pool=20.0)
-
     try:
-        lookup_url = f"{FLW_BASE_URL}/transactions?tx_ref={tx_ref}"
-        async with httpx.AsyncClient(timeout=timeout) as client:
-            lookup_resp = await client.get(lookup_url, headers=headers)
-            lookup_resp.raise_for_status()
-            lookup_data = lookup_resp.json()
+        lookup_resp = await get_http_clients().get(
+            "flutterwave",
+            "GET /transactions",
+            f"{FLW_BASE_URL}/transactions",
+            params={"tx_ref": tx_ref},
+            headers=headers,
+        )
+        lookup_resp.raise_for_status()
+        lookup_data = lookup_resp.json()
 
         data_list = lookup_data.get("data") or []
         if not data_list:
@@ -293,11 +296,14 @@ async def verify_payment(tx_ref: str) -> dict[str, Any]:
         if not tx_id:
             return {"status": "invalid", "tx_ref": tx_ref}
 
-        verify_url = f"{FLW_BASE_URL}/transactions/{tx_id}/verify"
-        async with httpx.AsyncClient(timeout=timeout) as client:
-            resp = await client.get(verify_url, headers=headers)
-            resp.raise_for_status()
-            fw_resp = resp.json()
+        resp = await get_http_clients().get(
+            "flutterwave",
+            "GET /transactions/{id}/verify",
+            f"{FLW_BASE_URL}/transactions/{tx_id}/verify",
+            headers=headers,
+        )
+        resp.raise_for_status()
+        fw_resp = resp.json()
 
     except Exception as e:
         logger.exception("❌ verify_payment error for %s: %s", tx_ref, e)
@@ -404,20 +410,14 @@ async def create_bank_transfer(
         "Content-Type": "application/json",
     }
 
-    timeout = httpx.Timeout(
-        connect=10.0,
-        read=30.0,
-        write=30.0,
-        pool=30.0,
-    )
-
     try:
-        async with httpx.AsyncClient(timeout=timeout) as client:
-            response = await client.post(
-                f"{FLW_BASE_URL}/transfers",
-                json=payload,
-                headers=headers,
-            )
+        response = await get_http_clients().post(
+            "flutterwave",
+            "POST /transfers",
+            f"{FLW_BASE_URL}/transfers",
+            json=payload,
+            headers=headers,
+        )
 
         response.raise_for_status()
         data = response.json()
@@ -531,19 +531,13 @@ async def get_bank_transfer(
         "Authorization": f"Bearer {FLW_SECRET_KEY}",
     }
 
-    timeout = httpx.Timeout(
-        connect=10.0,
-        read=20.0,
-        write=20.0,
-        pool=20.0,
-    )
-
     try:
-        async with httpx.AsyncClient(timeout=timeout) as client:
-            response = await client.get(
-                f"{FLW_BASE_URL}/transfers/{transfer_id}",
-                headers=headers,
-            )
+        response = await get_http_clients().get(
+            "flutterwave",
+            "GET /transfers/{id}",
+            f"{FLW_BASE_URL}/transfers/{transfer_id}",
+            headers=headers,
+        )
 
         response.raise_for_status()
         data = response.json()
@@ -633,19 +627,13 @@ async def get_ng_banks() -> dict[str, Any]:
         "Content-Type": "application/json",
     }
 
-    timeout = httpx.Timeout(
-        connect=10.0,
-        read=30.0,
-        write=30.0,
-        pool=30.0,
-    )
-
     try:
-        async with httpx.AsyncClient(timeout=timeout) as client:
-            response = await client.get(
-                f"{FLW_BASE_URL}/banks/NG",
-                headers=headers,
-            )
+        response = await get_http_clients().get(
+            "flutterwave",
+            "GET /banks/NG",
+            f"{FLW_BASE_URL}/banks/NG",
+            headers=headers,
+        )
 
         response.raise_for_status()
         data = response.json()
@@ -760,20 +748,15 @@ async def resolve_bank_account(
         "Content-Type": "application/json",
     }
 
-    timeout = httpx.Timeout(
-        connect=10.0,
-        read=30.0,
-        write=30.0,
-        pool=30.0,
-    )
-
     try:
-        async with httpx.AsyncClient(timeout=timeout) as client:
-            response = await client.post(
-                f"{FLW_BASE_URL}/accounts/resolve",
-                json=payload,
-                headers=headers,
-            )
+        response = await get_http_clients().post(
+            "flutterwave",
+            "POST /accounts/resolve",
+            f"{FLW_BASE_URL}/accounts/resolve",
+            json=payload,
+            headers=headers,
+            idempotent=True,
+        )
 
         response.raise_for_status()
         data = response.json()
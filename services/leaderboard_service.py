@@ -0,0 +1,343 @@
+# ====================================================================
+# services/leaderboard_service.py
+# Materialized leaderboard: rollup tables + in-process ranked boards.
+#
+# Rollups (written in the same transaction as the quiz entry):
+#   leaderboard_daily_points  (user_id, day)  -> points that UTC day
+#   user_activity_streaks     (user_id)       -> current / best streak,
+#                                                lifetime entry count
+#   user_cycle_stats          (cycle_id, user_id) -> season points
+#                                                (already incremental)
+#
+# Boards ("week" = last 7 UTC days, "cycle" = current season) are
+# loaded once from the rollups and kept in a sorted key list, so rank
+# lookups are a bisect and a page is a slice. Score changes are queued
+# on the session and applied only after the transaction commits; a
+# rolled-back attempt never moves the board. Boards are reloaded when
+# the week/season changes, after LEADERBOARD_CACHE_TTL_SECONDS (other
+# workers may have written), or when marked stale.
+# ====================================================================
+from __future__ import annotations
+
+import asyncio
+import bisect
+import logging
+import os
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger("leaderboard_service")
+
+LEADERBOARD_CACHE_TTL_SECONDS = int(os.getenv("LEADERBOARD_CACHE_TTL_SECONDS", "300"))
+WEEK_DAYS = 7
+
+SCOPE_WEEK = "week"
+SCOPE_CYCLE = "cycle"
+
+_PENDING_KEY = "leaderboard_pending"
+
+
+def _utc_today() -> date:
+    return datetime.now(timezone.utc).date()
+
+
+# ====================================================================
+# RANKED BOARD
+# ====================================================================
+class RankedBoard:
+    """
+    Scores kept in a list sorted by (-score, user_id).
+    rank_of() is O(log n); a score change is one bisect + list move.
+    Zero scores are not ranked.
+    """
+
+    def __init__(self, scores: Optional[Dict[str, int]] = None):
+        self._scores: Dict[str, int] = {}
+        self._keys: List[Tuple[int, str]] = []
+        for user_id, score in (scores or {}).items():
+            if int(score) > 0:
+                self._scores[str(user_id)] = int(score)
+        self._keys = sorted((-score, user_id) for user_id, score in self._scores.items())
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def score_of(self, user_id: str) -> int:
+        return self._scores.get(str(user_id), 0)
+
+    def add(self, user_id: str, delta: int) -> int:
+        user_id = str(user_id)
+        old = self._scores.get(user_id, 0)
+        new = max(0, old + int(delta))
+
+        if old > 0:
+            idx = bisect.bisect_left(self._keys, (-old, user_id))
+            if idx < len(self._keys) and self._keys[idx] == (-old, user_id):
+                del self._keys[idx]
+
+        if new > 0:
+            self._scores[user_id] = new
+            bisect.insort(self._keys, (-new, user_id))
+        else:
+            self._scores.pop(user_id, None)
+        return new
+
+    def rank_of(self, user_id: str) -> Optional[int]:
+        """1 + number of players with a strictly higher score."""
+        score = self._scores.get(str(user_id), 0)
+        if score <= 0:
+            return None
+        return bisect.bisect_left(self._keys, (-score,)) + 1
+
+    def page(self, offset: int, limit: int) -> List[Tuple[str, int]]:
+        return [(user_id, -neg) for neg, user_id in self._keys[offset:offset + limit]]
+
+
+class _BoardSlot:
+    __slots__ = ("board", "key", "loaded_at", "stale", "lock")
+
+    def __init__(self):
+        self.board: Optional[RankedBoard] = None
+        self.key: Any = None
+        self.loaded_at = 0.0
+        self.stale = False
+        self.lock = asyncio.Lock()
+
+    def usable(self, key: Any) -> bool:
+        return (
+            self.board is not None
+            and not self.stale
+            and self.key == key
+            and time.monotonic() - self.loaded_at < LEADERBOARD_CACHE_TTL_SECONDS
+        )
+
+
+_SLOTS: Dict[str, _BoardSlot] = {SCOPE_WEEK: _BoardSlot(), SCOPE_CYCLE: _BoardSlot()}
+
+
+def _week_key(today: Optional[date] = None) -> date:
+    # First day of the 7-day window ending today
+    return (today or _utc_today()) - timedelta(days=WEEK_DAYS - 1)
+
+
+async def _load_week(session: AsyncSession, start_day: date) -> RankedBoard:
+    res = await session.execute(
+        text("""
+            SELECT user_id, SUM(points) AS points
+            FROM leaderboard_daily_points
+            WHERE day >= :start
+            GROUP BY user_id
+        """),
+        {"start": start_day},
+    )
+    return RankedBoard({str(r[0]): int(r[1] or 0) for r in res.fetchall()})
+
+
+async def _load_cycle(session: AsyncSession, cycle_id: int) -> RankedBoard:
+    res = await session.execute(
+        text("""
+            SELECT user_id, points
+            FROM user_cycle_stats
+            WHERE cycle_id = :c
+              AND points > 0
+        """),
+        {"c": int(cycle_id)},
+    )
+    return RankedBoard({str(r[0]): int(r[1] or 0) for r in res.fetchall()})
+
+
+async def get_board(session: AsyncSession, scope: str, *, cycle_id: Optional[int] = None) -> RankedBoard:
+    """
+    Ranked board for "week" or "cycle" (cycle_id required), loading it
+    from the rollup tables only when the cached one is missing, stale
+    or for another week/season.
+    """
+    key: Any = _week_key() if scope == SCOPE_WEEK else int(cycle_id or 1)
+    slot = _SLOTS[scope]
+    if slot.usable(key):
+        return slot.board
+
+    async with slot.lock:
+        if slot.usable(key):
+            return slot.board
+
+        # Deltas committed while loading may or may not be in the snapshot;
+        # anything that lands meanwhile marks the slot stale again.
+        slot.stale = False
+        if scope == SCOPE_WEEK:
+            board = await _load_week(session, key)
+        else:
+            board = await _load_cycle(session, key)
+
+        slot.board = board
+        slot.key = key
+        slot.loaded_at = time.monotonic()
+        logger.info("🏆 Leaderboard loaded | scope=%s | key=%s | players=%s", scope, key, len(board))
+        return board
+
+
+def _apply(scope: str, key: Any, user_id: str, delta: Optional[int]) -> None:
+    slot = _SLOTS[scope]
+    if slot.lock.locked():
+        slot.stale = True
+        return
+    if slot.board is None or slot.key != key:
+        return
+    if delta is None:
+        slot.stale = True
+        return
+    slot.board.add(user_id, delta)
+
+
+# ====================================================================
+# POST-COMMIT DELTAS
+# ====================================================================
+def _queue(session: AsyncSession, scope: str, key: Any, user_id: Optional[str], delta: Optional[int]) -> None:
+    session.info.setdefault(_PENDING_KEY, []).append((scope, key, str(user_id), delta))
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_pending(sync_session: Session) -> None:
+    pending = sync_session.info.pop(_PENDING_KEY, None)
+    if not pending:
+        return
+    for scope, key, user_id, delta in pending:
+        _apply(scope, key, user_id, delta)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_pending(sync_session: Session) -> None:
+    sync_session.info.pop(_PENDING_KEY, None)
+
+
+def note_cycle_points(session: AsyncSession, *, cycle_id: int, user_id: Any, delta: int) -> None:
+    """Season points changed by `delta` (applied after commit)."""
+    _queue(session, SCOPE_CYCLE, int(cycle_id), str(user_id), int(delta))
+
+
+def mark_cycle_board_stale(session: AsyncSession, *, cycle_id: int) -> None:
+    """Season points were overwritten (not incremented); reload after commit."""
+    _queue(session, SCOPE_CYCLE, int(cycle_id), None, None)
+
+
+# ====================================================================
+# ROLLUP WRITES
+# ====================================================================
+async def record_quiz_entry(
+    session: AsyncSession,
+    *,
+    user_id: Any,
+    tg_id: int,
+    cycle_id: int,
+) -> None:
+    """
+    Insert the premium_reward_entries row and bump the daily points and
+    streak rollups in the same round trip. No commit here.
+    """
+    await session.execute(
+        text("""
+            WITH entry AS (
+                INSERT INTO premium_reward_entries (user_id, tg_id, cycle_id, created_at)
+                VALUES (:u, :tg, :c, NOW())
+            ),
+            daily AS (
+                INSERT INTO leaderboard_daily_points (user_id, day, points)
+                VALUES (:u, (NOW() AT TIME ZONE 'UTC')::date, 1)
+                ON CONFLICT (user_id, day)
+                DO UPDATE SET points = leaderboard_daily_points.points + 1
+            )
+            INSERT INTO user_activity_streaks (
+                user_id,
+                last_day,
+                current_streak,
+                best_streak,
+                total_entries,
+                updated_at
+            )
+            VALUES (:u, (NOW() AT TIME ZONE 'UTC')::date, 1, 1, 1, NOW())
+            ON CONFLICT (user_id)
+            DO UPDATE SET
+                current_streak = CASE
+                    WHEN user_activity_streaks.last_day = EXCLUDED.last_day
+                        THEN user_activity_streaks.current_streak
+                    WHEN user_activity_streaks.last_day = EXCLUDED.last_day - 1
+                        THEN user_activity_streaks.current_streak + 1
+                    ELSE 1
+                END,
+                best_streak = GREATEST(
+                    user_activity_streaks.best_streak,
+                    CASE
+                        WHEN user_activity_streaks.last_day = EXCLUDED.last_day - 1
+                            THEN user_activity_streaks.current_streak + 1
+                        ELSE 1
+                    END
+                ),
+                last_day = GREATEST(user_activity_streaks.last_day, EXCLUDED.last_day),
+                total_entries = user_activity_streaks.total_entries + 1,
+                updated_at = NOW()
+        """),
+        {"u": str(user_id), "tg": int(tg_id), "c": int(cycle_id)},
+    )
+    _queue(session, SCOPE_WEEK, _week_key(), str(user_id), 1)
+
+
+# ====================================================================
+# READS
+# ====================================================================
+async def load_leaderboard_profiles(
+    session: AsyncSession,
+    *,
+    user_ids: Sequence[str],
+    viewer_tg_id: Optional[int],
+) -> Tuple[Dict[str, Dict[str, Any]], Optional[Dict[str, Any]]]:
+    """
+    One read for a leaderboard page: the listed players plus the viewer,
+    each with their streak rollup. Returns (profiles_by_user_id, viewer).
+    """
+    res = await session.execute(
+        text("""
+            SELECT
+                u.id,
+                u.tg_id,
+                u.username,
+                COALESCE(s.current_streak, 0) AS current_streak,
+                COALESCE(s.best_streak, 0) AS best_streak,
+                COALESCE(s.total_entries, 0) AS total_entries
+            FROM users u
+            LEFT JOIN user_activity_streaks s ON s.user_id = u.id
+            WHERE u.id = ANY(CAST(:ids AS uuid[]))
+               OR u.tg_id = :tg
+        """),
+        {"ids": [str(uid) for uid in user_ids], "tg": int(viewer_tg_id) if viewer_tg_id is not None else None},
+    )
+
+    profiles: Dict[str, Dict[str, Any]] = {}
+    viewer = None
+    for row in res.mappings().all():
+        profile = dict(row)
+        profile["id"] = str(profile["id"])
+        profiles[profile["id"]] = profile
+        if viewer_tg_id is not None and int(profile["tg_id"]) == int(viewer_tg_id):
+            viewer = profile
+    return profiles, viewer
+
+
+async def get_user_activity(session: AsyncSession, user_id: Any) -> Dict[str, int]:
+    """current_streak, best_streak and lifetime total_entries of one user."""
+    res = await session.execute(
+        text("""
+            SELECT current_streak, best_streak, total_entries
+            FROM user_activity_streaks
+            WHERE user_id = :u
+        """),
+        {"u": str(user_id)},
+    )
+    row = res.mappings().first()
+    if row is None:
+        return {"current_streak": 0, "best_streak": 0, "total_entries": 0}
+    return {key: int(row[key] or 0) for key in row.keys()}
@@ -0,0 +1,395 @@
+# ====================================================================
+# services/live_exam_engine.py
+# In-memory live papers for Mock JAMB / Mock WAEC answer taps.
+#
+# An answer tap used to read the current paper row, update it, re-read
+# the whole subject paper (40-60 question_json rows) just to count it,
+# read the next row and update the session: five statements, two of
+# them rewriting rows that carry the full question_json.
+#
+# LiveExamEngine keeps each active paper (payment_reference, subject)
+# in memory: the ordered paper rows, question ids, correct options and
+# the answer vector. A tap is answered from memory and persisted with
+# ONE small statement: an append to <prefix>_answer_log (plus the
+# session's current_question_index in the same statement).
+#
+# checkpoint() folds the log into <prefix>_subject_questions
+# (selected_option / is_correct) and empties it. It runs before every
+# read of answers from the paper table (scores, result stats, review,
+# paper reads in the exam services), i.e. on subject completion and on
+# submit. A paper not in memory (restart, eviction) is rehydrated from
+# the DB after a checkpoint.
+#
+# Memory follows the caller's transaction: papers touched by a
+# transaction that rolls back are dropped and rehydrated on next use.
+# At most EXAM_LIVE_MAX_PAPERS papers are kept (least recently used
+# are dropped; nothing is lost, the log is already written).
+# ====================================================================
+from __future__ import annotations
+
+import logging
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from question_refs import hydrate_rows
+
+logger = logging.getLogger("live_exam_engine")
+
+EXAM_LIVE_MAX_PAPERS = int(os.getenv("EXAM_LIVE_MAX_PAPERS", "500"))
+
+LIVE_EXAM_PREFIXES = ("mockjamb", "mockwaec")
+
+_TOUCHED_KEY = "live_exam_touched"
+
+PaperKey = Tuple[str, str]
+
+
+@dataclass(slots=True)
+class LivePaper:
+    payment_reference: str
+    subject_code: str
+    rows: List[Dict[str, Any]]
+    question_ids: List[str] = field(default_factory=list)
+    correct: List[str] = field(default_factory=list)
+    answers: List[Optional[str]] = field(default_factory=list)
+    positions: Dict[int, int] = field(default_factory=dict)
+    loaded_at: float = field(default_factory=time.monotonic)
+
+    @classmethod
+    def from_rows(cls, payment_reference: str, subject_code: str, rows: List[Dict[str, Any]]) -> "LivePaper":
+        rows = sorted(rows, key=lambda row: int(row.get("question_order") or 0))
+        return cls(
+            payment_reference=payment_reference,
+            subject_code=subject_code,
+            rows=rows,
+            question_ids=[str(row.get("question_id")) for row in rows],
+            correct=[str(row.get("correct_option") or "").strip().upper() for row in rows],
+            answers=[row.get("selected_option") for row in rows],
+            positions={int(row.get("question_order") or 0): i for i, row in enumerate(rows)},
+        )
+
+    @property
+    def total_questions(self) -> int:
+        return len(self.rows)
+
+    def question(self, question_order: int) -> Optional[Dict[str, Any]]:
+        index = self.positions.get(int(question_order))
+        return self.rows[index] if index is not None else None
+
+    def record(self, question_order: int, selected_option: str) -> bool:
+        index = self.positions[int(question_order)]
+        correct_option = self.correct[index]
+        is_correct = selected_option == correct_option if correct_option else False
+        self.answers[index] = selected_option
+        row = self.rows[index]
+        row["selected_option"] = selected_option
+        row["is_correct"] = is_correct
+        return is_correct
+
+    def answered_count(self) -> int:
+        return sum(1 for answer in self.answers if answer is not None)
+
+
+class LiveExamEngine:
+    def __init__(self, prefix: str, *, max_papers: int = EXAM_LIVE_MAX_PAPERS):
+        if prefix not in LIVE_EXAM_PREFIXES:
+            raise ValueError(f"Unknown live exam prefix: {prefix}")
+
+        self.prefix = prefix
+        self.max_papers = max(1, max_papers)
+        self._paper_table = f"public.{prefix}_subject_questions"
+        self._sessions_table = f"public.{prefix}_sessions"
+        self._log_table = f"public.{prefix}_answer_log"
+        self._papers: "OrderedDict[PaperKey, LivePaper]" = OrderedDict()
+
+        self.hits = 0
+        self.rehydrated = 0
+        self.answers_logged = 0
+        self.checkpoints = 0
+        self.rows_folded = 0
+
+    # --------------------------------------------------------
+    # Papers
+    # --------------------------------------------------------
+    def _keep(self, key: PaperKey, paper: LivePaper) -> None:
+        self._papers[key] = paper
+        self._papers.move_to_end(key)
+        while len(self._papers) > self.max_papers:
+            self._papers.popitem(last=False)
+
+    def prime(self, *, payment_reference: str, subject_code: str, rows: List[Dict[str, Any]]) -> Optional[LivePaper]:
+        """Cache a paper the caller just read from the DB (already checkpointed)."""
+        if not rows:
+            return None
+        paper = LivePaper.from_rows(payment_reference, subject_code, [dict(row) for row in rows])
+        self._keep((payment_reference, subject_code), paper)
+        return paper
+
+    async def paper(
+        self,
+        session: AsyncSession,
+        *,
+        payment_reference: str,
+        subject_code: str,
+    ) -> Optional[LivePaper]:
+        key = (payment_reference, subject_code)
+        paper = self._papers.get(key)
+        if paper is not None:
+            self._papers.move_to_end(key)
+            self.hits += 1
+            return paper
+
+        await self.checkpoint(session, payment_reference=payment_reference, subject_code=subject_code)
+        result = await session.execute(
+            text(f"""
+                select
+                    id,
+                    session_id,
+                    payment_reference,
+                    user_id,
+                    subject_code,
+                    question_id,
+                    question_order,
+                    question_json,
+                    content_version,
+                    correct_option,
+                    selected_option,
+                    is_correct,
+                    created_at,
+                    updated_at
+                from {self._paper_table}
+                where payment_reference = :payment_reference
+                  and subject_code = :subject_code
+                order by question_order asc
+            """),
+            {"payment_reference": payment_reference, "subject_code": subject_code},
+        )
+        rows = await hydrate_rows(session, [dict(row) for row in result.mappings().all()])
+        if not rows:
+            return None
+
+        self.rehydrated += 1
+        paper = LivePaper.from_rows(payment_reference, subject_code, rows)
+        self._keep(key, paper)
+        return paper
+
+    def forget(self, *, payment_reference: str, subject_code: Optional[str] = None) -> None:
+        for key in [k for k in self._papers if k[0] == payment_reference]:
+            if subject_code is None or key[1] == subject_code:
+                self._papers.pop(key, None)
+
+    # --------------------------------------------------------
+    # Answers
+    # --------------------------------------------------------
+    async def answer(
+        self,
+        session: AsyncSession,
+        *,
+        payment_reference: str,
+        subject_code: str,
+        question_order: int,
+        selected_option: str,
+    ) -> dict:
+        """
+        Record one answer. Same result shape as the old
+        answer_<prefix>_question(); no commit here.
+        """
+        paper = await self.paper(session, payment_reference=payment_reference, subject_code=subject_code)
+        if paper is None or paper.question(question_order) is None:
+            return {
+                "status": "error",
+                "reason": "question_not_found",
+            }
+
+        selected_option = str(selected_option).strip().upper()
+        is_correct = paper.record(question_order, selected_option)
+        session.info.setdefault(_TOUCHED_KEY, []).append((self, (payment_reference, subject_code)))
+
+        total_questions = paper.total_questions
+        next_question_order = int(question_order) + 1
+        params = {
+            "payment_reference": payment_reference,
+            "subject_code": subject_code,
+            "question_order": int(question_order),
+            "selected_option": selected_option,
+            "is_correct": bool(is_correct),
+        }
+        log_insert = f"""
+            insert into {self._log_table} (
+                payment_reference,
+                subject_code,
+                question_order,
+                selected_option,
+                is_correct,
+                answered_at
+            )
+            values (
+                :payment_reference,
+                :subject_code,
+                :question_order,
+                :selected_option,
+                :is_correct,
+                now()
+            )
+        """
+        self.answers_logged += 1
+
+        if next_question_order > total_questions:
+            await session.execute(text(log_insert), params)
+            return {
+                "status": "completed_subject",
+                "selected_option": selected_option,
+                "is_correct": is_correct,
+                "total_questions": total_questions,
+            }
+
+        await session.execute(
+            text(f"""
+                with logged as ({log_insert})
+                update {self._sessions_table}
+                set
+                    current_question_index = :current_question_index,
+                    updated_at = now()
+                where payment_reference = :payment_reference
+            """),
+            {**params, "current_question_index": int(next_question_order - 1)},
+        )
+
+        return {
+            "status": "next_question",
+            "selected_option": selected_option,
+            "is_correct": is_correct,
+            "next_question": paper.question(next_question_order),
+            "next_question_order": next_question_order,
+            "total_questions": total_questions,
+        }
+
+    async def checkpoint(
+        self,
+        session: AsyncSession,
+        *,
+        payment_reference: str,
+        subject_code: Optional[str] = None,
+    ) -> int:
+        """
+        Fold logged answers for one payment (optionally one subject)
+        into the paper table, latest answer per question wins. Returns
+        the number of paper rows updated. No commit here.
+        """
+        subject_filter = "and subject_code = :subject_code" if subject_code is not None else ""
+        params: Dict[str, Any] = {"payment_reference": payment_reference}
+        if subject_code is not None:
+            params["subject_code"] = subject_code
+
+        result = await session.execute(
+            text(f"""
+                with folded as (
+                    delete from {self._log_table}
+                    where payment_reference = :payment_reference
+                      {subject_filter}
+                    returning id, subject_code, question_order, selected_option, is_correct
+                ),
+                latest as (
+                    select distinct on (subject_code, question_order)
+                        subject_code,
+                        question_order,
+                        selected_option,
+                        is_correct
+                    from folded
+                    order by subject_code, question_order, id desc
+                )
+                update {self._paper_table} q
+                set
+                    selected_option = latest.selected_option,
+                    is_correct = latest.is_correct,
+                    updated_at = now()
+                from latest
+                where q.payment_reference = :payment_reference
+                  and q.subject_code = latest.subject_code
+                  and q.question_order = latest.question_order
+            """),
+            params,
+        )
+        folded = int(result.rowcount or 0)
+        self.checkpoints += 1
+        self.rows_folded += folded
+        return folded
+
+    async def checkpoint_many(self, session: AsyncSession, *, payment_references: List[str]) -> int:
+        """checkpoint() for several payments (every subject) in one statement."""
+        if not payment_references:
+            return 0
+
+        result = await session.execute(
+            text(f"""
+                with folded as (
+                    delete from {self._log_table}
+                    where payment_reference = any(cast(:payment_references as text[]))
+                    returning id, payment_reference, subject_code, question_order, selected_option, is_correct
+                ),
+                latest as (
+                    select distinct on (payment_reference, subject_code, question_order)
+                        payment_reference,
+                        subject_code,
+                        question_order,
+                        selected_option,
+                        is_correct
+                    from folded
+                    order by payment_reference, subject_code, question_order, id desc
+                )
+                update {self._paper_table} q
+                set
+                    selected_option = latest.selected_option,
+                    is_correct = latest.is_correct,
+                    updated_at = now()
+                from latest
+                where q.payment_reference = latest.payment_reference
+                  and q.subject_code = latest.subject_code
+                  and q.question_order = latest.question_order
+            """),
+            {"payment_references": list(payment_references)},
+        )
+        folded = int(result.rowcount or 0)
+        self.checkpoints += 1
+        self.rows_folded += folded
+        return folded
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "papers": len(self._papers),
+            "max_papers": self.max_papers,
+            "hits": self.hits,
+            "rehydrated": self.rehydrated,
+            "answers_logged": self.answers_logged,
+            "checkpoints": self.checkpoints,
+            "rows_folded": self.rows_folded,
+        }
+
+
+@event.listens_for(Session, "after_commit")
+def _keep_touched(sync_session: Session) -> None:
+    sync_session.info.pop(_TOUCHED_KEY, None)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_touched(sync_session: Session) -> None:
+    touched = sync_session.info.pop(_TOUCHED_KEY, None)
+    if not touched:
+        return
+    for engine, (payment_reference, subject_code) in touched:
+        engine.forget(payment_reference=payment_reference, subject_code=subject_code)
+
+
+MOCKJAMB_LIVE = LiveExamEngine("mockjamb")
+MOCKWAEC_LIVE = LiveExamEngine("mockwaec")
+
+
+def live_exam_stats() -> Dict[str, Any]:
+    return {engine.prefix: engine.stats() for engine in (MOCKJAMB_LIVE, MOCKWAEC_LIVE)}
@@ -16,24 +16,26 @@ from services.mockjamb_room_service import (
 )
 from services.mockjamb_session_service import (
     get_seen_mockjamb_question_ids,
+    get_seen_mockjamb_question_ids_for_users,
     record_seen_mockjamb_questions,
+    record_seen_mockjamb_questions_for_users,
     start_mockjamb_session_if_needed,
     set_mockjamb_current_subject,
     get_mockjamb_session_by_payment_reference,
     get_or_create_mockjamb_session_from_payment,
     mark_mockjamb_subject_completed,
 )
-
+from question_refs import EXAM_JAMB, current_version, hydrate_rows, question_ref, register
+from services.exam_results import MOCKJAMB_RESULTS, subject_question_count
+from services.live_exam_engine import MOCKJAMB_LIVE
+from utils.sql_bulk import bulk_insert
 
 logger = logging.getLogger("mockjamb_exam_service")
 logger.setLevel(logging.INFO)
 
 
 def get_mockjamb_subject_question_count(subject_code: str) -> int:
-    subject_code = str(subject_code or "").strip().lower()
-    if subject_code == "eng":
-        return 60
-    return 40
+    return subject_question_count(subject_code)
 
 
 def _extract_correct_option(question: dict[str, Any]) -> str | None:
@@ -110,6 +112,7 @@ async def get_mockjamb_subject_paper(
     payment_reference: str,
     subject_code: str,
 ) -> list[dict]:
+    await MOCKJAMB_LIVE.checkpoint(session, payment_reference=payment_reference, subject_code=subject_code)
     result = await session.execute(
         text("""
             select
@@ -121,6 +124,7 @@ async def get_mockjamb_subject_paper(
                 question_id,
                 question_order,
                 question_json,
+                content_version,
                 correct_option,
                 selected_option,
                 is_correct,
@@ -137,7 +141,7 @@ async def get_mockjamb_subject_paper(
         },
     )
     rows = result.mappings().all()
-    return [dict(row) for row in rows]
+    return await hydrate_rows(session, [dict(row) for row in rows])
 
 
 async def get_mockjamb_subject_question_by_order(
@@ -147,36 +151,87 @@ async def get_mockjamb_subject_question_by_order(
     subject_code: str,
     question_order: int,
 ) -> dict | None:
-    result = await session.execute(
-        text("""
-            select
-                id,
-                session_id,
-                payment_reference,
-                user_id,
-                subject_code,
-                question_id,
-                question_order,
-                question_json,
-                correct_option,
-                selected_option,
-                is_correct,
-                created_at,
-                updated_at
-            from public.mockjamb_subject_questions
-            where payment_reference = :payment_reference
-              and subject_code = :subject_code
-              and question_order = :question_order
-            limit 1
-        """),
-        {
+    paper = await MOCKJAMB_LIVE.paper(
+        session,
+        payment_reference=payment_reference,
+        subject_code=subject_code,
+    )
+    return paper.question(question_order) if paper else None
+
+
+async def get_mockjamb_live_paper_rows(
+    session: AsyncSession,
+    *,
+    payment_reference: str,
+    subject_code: str,
+) -> list[dict]:
+    """Paper rows in question order, served from the live paper cache."""
+    paper = await MOCKJAMB_LIVE.paper(
+        session,
+        payment_reference=payment_reference,
+        subject_code=subject_code,
+    )
+    return paper.rows if paper else []
+
+
+async def insert_mockjamb_subject_paper_rows(
+    session: AsyncSession,
+    *,
+    session_id: int,
+    payment_reference: str,
+    user_id: int,
+    subject_code: str,
+    selected_questions: list[dict],
+) -> None:
+    """
+    Materialize a player's paper in one multi-row insert.
+    Existing rows are kept (on conflict do nothing), as before.
+    """
+    cv = current_version(EXAM_JAMB, subject_code)
+    rows = []
+    for idx, question in enumerate(selected_questions, start=1):
+        content_version, question_json = question_ref(cv, question)
+        rows.append({
+            "session_id": int(session_id),
             "payment_reference": payment_reference,
+            "user_id": int(user_id),
             "subject_code": subject_code,
-            "question_order": int(question_order),
+            "question_id": str(question.get("id")),
+            "question_order": idx,
+            "question_json": question_json,
+            "content_version": content_version,
+            "correct_option": _extract_correct_option(question),
+        })
+    if any(row["content_version"] for row in rows):
+        await register(session, cv)
+
+    await bulk_insert(
+        session,
+        table="public.mockjamb_subject_questions",
+        columns=(
+            "session_id",
+            "payment_reference",
+            "user_id",
+            "subject_code",
+            "question_id",
+            "question_order",
+            "question_json",
+            "content_version",
+            "correct_option",
+            "selected_option",
+            "is_correct",
+            "created_at",
+            "updated_at",
+        ),
+        rows=rows,
+        literals={
+            "selected_option": "null",
+            "is_correct": "null",
+            "created_at": "now()",
+            "updated_at": "now()",
         },
+        on_conflict="on conflict (payment_reference, subject_code, question_id) do nothing",
     )
-    row = result.mappings().first()
-    return dict(row) if row else None
 
 
 async def get_mockjamb_room_subject_paper(
@@ -197,6 +252,7 @@ async def get_mockjamb_room_subject_paper(
                 question_id,
                 question_order,
                 question_json,
+                content_version,
                 correct_option,
                 created_at,
                 updated_at
@@ -212,7 +268,7 @@ async def get_mockjamb_room_subject_paper(
     )
 
     rows = result.mappings().all()
-    return [dict(row) for row in rows]
+    return await hydrate_rows(session, [dict(row) for row in rows])
 
 
 async def create_mockjamb_room_subject_paper(
@@ -225,40 +281,40 @@ async def create_mockjamb_room_subject_paper(
     room_code = str(room_code or "").strip().upper()
     subject_code = str(subject_code or "").strip().lower()
 
+    cv = current_version(EXAM_JAMB, subject_code)
+    rows = []
     for idx, question in enumerate(selected_questions, start=1):
-        await session.execute(
-            text("""
-                insert into public.mockjamb_room_subject_questions (
-                    room_code,
-                    subject_code,
-                    question_id,
-                    question_order,
-                    question_json,
-                    correct_option,
-                    created_at,
-                    updated_at
-                )
-                values (
-                    :room_code,
-                    :subject_code,
-                    :question_id,
-                    :question_order,
-                    :question_json,
-                    :correct_option,
-                    now(),
-                    now()
-                )
-                on conflict (room_code, subject_code, question_id) do nothing
-            """),
-            {
-                "room_code": room_code,
-                "subject_code": subject_code,
-                "question_id": str(question.get("id")),
-                "question_order": idx,
-                "question_json": json.dumps(question),
-                "correct_option": _extract_correct_option(question),
-            },
-        )
+        content_version, question_json = question_ref(cv, question)
+        rows.append({
+            "room_code": room_code,
+            "subject_code": subject_code,
+            "question_id": str(question.get("id")),
+            "question_order": idx,
+            "question_json": question_json,
+            "content_version": content_version,
+            "correct_option": _extract_correct_option(question),
+        })
+    if any(row["content_version"] for row in rows):
+        await register(session, cv)
+
+    await bulk_insert(
+        session,
+        table="public.mockjamb_room_subject_questions",
+        columns=(
+            "room_code",
+            "subject_code",
+            "question_id",
+            "question_order",
+            "question_json",
+            "content_version",
+            "correct_option",
+            "created_at",
+            "updated_at",
+        ),
+        rows=rows,
+        literals={"created_at": "now()", "updated_at": "now()"},
+        on_conflict="on conflict (room_code, subject_code, question_id) do nothing",
+    )
 
     await session.flush()
 
@@ -281,57 +337,53 @@ async def clone_mockjamb_room_subject_paper_to_player(
     room_code = str(room_code or "").strip().upper()
     subject_code = str(subject_code or "").strip().lower()
 
-    room_paper = await get_mockjamb_room_subject_paper(
-        session,
-        room_code=room_code,
-        subject_code=subject_code,
+    # Copy the room paper server-side: one statement, only the question references.
+    await session.execute(
+        text("""
+            insert into public.mockjamb_subject_questions (
+                session_id,
+                payment_reference,
+                user_id,
+                subject_code,
+                question_id,
+                question_order,
+                question_json,
+                content_version,
+                correct_option,
+                selected_option,
+                is_correct,
+                created_at,
+                updated_at
+            )
+            select
+                :session_id,
+                :payment_reference,
+                :user_id,
+                :subject_code,
+                question_id,
+                coalesce(question_order, 0),
+                question_json,
+                content_version,
+                correct_option,
+                null,
+                null,
+                now(),
+                now()
+            from public.mockjamb_room_subject_questions
+            where upper(room_code) = :room_code
+              and lower(subject_code) = :subject_code
+            order by question_order asc, id asc
+            on conflict (payment_reference, subject_code, question_id) do nothing
+        """),
+        {
+            "session_id": int(session_id),
+            "payment_reference": payment_reference,
+            "user_id": int(user_id),
+            "subject_code": subject_code,
+            "room_code": room_code,
+        },
     )
 
-    for row in room_paper:
-        await session.execute(
-            text("""
-                insert into public.mockjamb_subject_questions (
-                    session_id,
-                    payment_reference,
-                    user_id,
-                    subject_code,
-                    question_id,
-                    question_order,
-                    question_json,
-                    correct_option,
-                    selected_option,
-                    is_correct,
-                    created_at,
-                    updated_at
-                )
-                values (
-                    :session_id,
-                    :payment_reference,
-                    :user_id,
-                    :subject_code,
-                    :question_id,
-                    :question_order,
-                    :question_json,
-                    :correct_option,
-                    null,
-                    null,
-                    now(),
-                    now()
-                )
-                on conflict (payment_reference, subject_code, question_id) do nothing
-            """),
-            {
-                "session_id": int(session_id),
-                "payment_reference": payment_reference,
-                "user_id": int(user_id),
-                "subject_code": subject_code,
-                "question_id": str(row.get("question_id")),
-                "question_order": int(row.get("question_order") or 0),
-                "question_json": row.get("question_json"),
-                "correct_option": row.get("correct_option"),
-            },
-        )
-
     await session.flush()
 
     return await get_mockjamb_subject_paper(
@@ -430,21 +482,11 @@ async def create_mockjamb_subject_paper_if_needed(
             # If this subject is not shared by any paid room player for some reason,
             # fall back to solo logic below.
             if relevant_players:
-                combined_seen_ids: list[str] = []
-                combined_seen_set: set[str] = set()
-
-                for player in relevant_players:
-                    player_user_id = int(player.get("user_id") or 0)
-                    player_seen_ids = await get_seen_mockjamb_question_ids(
-                        session,
-                        user_id=player_user_id,
-                        subject_code=subject_code,
-                    )
-                    for qid in player_seen_ids:
-                        qid_str = str(qid)
-                        if qid_str not in combined_seen_set:
-                            combined_seen_set.add(qid_str)
-                            combined_seen_ids.append(qid_str)
+                combined_seen_ids = await get_seen_mockjamb_question_ids_for_users(
+                    session,
+                    user_ids=[int(player.get("user_id") or 0) for player in relevant_players],
+                    subject_code=subject_code,
+                )
 
                 # Preserve existing solo subject structure
                 if subject_code == "eng":
@@ -491,14 +533,12 @@ async def create_mockjamb_subject_paper_if_needed(
                 )
 
                 # Record seen questions for every relevant room player sharing this subject
-                for player in relevant_players:
-                    target_user_id = int(player.get("user_id") or 0)
-                    await record_seen_mockjamb_questions(
-                        session,
-                        user_id=target_user_id,
-                        subject_code=subject_code,
-                        question_ids=selected_question_ids,
-                    )
+                await record_seen_mockjamb_questions_for_users(
+                    session,
+                    user_ids=[int(player.get("user_id") or 0) for player in relevant_players],
+                    subject_code=subject_code,
+                    question_ids=selected_question_ids,
+                )
 
                 # Clone official room paper into this player's personal paper rows
                 paper_rows = await clone_mockjamb_room_subject_paper_to_player(
@@ -563,50 +603,14 @@ async def create_mockjamb_subject_paper_if_needed(
     selected_question_ids = batch["selected_question_ids"]
     session_id = int(existing_session["id"])
 
-    for idx, question in enumerate(selected_questions, start=1):
-        await session.execute(
-            text("""
-                insert into public.mockjamb_subject_questions (
-                    session_id,
-                    payment_reference,
-                    user_id,
-                    subject_code,
-                    question_id,
-                    question_order,
-                    question_json,
-                    correct_option,
-                    selected_option,
-                    is_correct,
-                    created_at,
-                    updated_at
-                )
-                values (
-                    :session_id,
-                    :payment_reference,
-                    :user_id,
-                    :subject_code,
-                    :question_id,
-                    :question_order,
-                    :question_json,
-                    :correct_option,
-                    null,
-                    null,
-                    now(),
-                    now()
-                )
-                on conflict (payment_reference, subject_code, question_id) do nothing
-            """),
-            {
-                "session_id": session_id,
-                "payment_reference": payment_reference,
-                "user_id": int(user_id),
-                "subject_code": subject_code,
-                "question_id": str(question.get("id")),
-                "question_order": idx,
-                "question_json": json.dumps(question),
-                "correct_option": _extract_correct_option(question),
-            },
-        )
+    await insert_mockjamb_subject_paper_rows(
+        session,
+        session_id=session_id,
+        payment_reference=payment_reference,
+        user_id=int(user_id),
+        subject_code=subject_code,
+        selected_questions=selected_questions,
+    )
 
     await record_seen_mockjamb_questions(
         session,
@@ -663,6 +667,11 @@ async def start_mockjamb_subject(
         subject_code=subject_code,
         requested_count=requested_count,
     )
+    MOCKJAMB_LIVE.prime(
+        payment_reference=payment_reference,
+        subject_code=subject_code,
+        rows=paper_info.get("paper_rows") or [],
+    )
 
     current_question = await get_mockjamb_subject_question_by_order(
         session,
@@ -686,90 +695,15 @@ async def answer_mockjamb_question(
     question_order: int,
     selected_option: str,
 ) -> dict:
-    current_question = await get_mockjamb_subject_question_by_order(
+    # Answered from the in-memory paper; one append-only write per tap
+    return await MOCKJAMB_LIVE.answer(
         session,
         payment_reference=payment_reference,
         subject_code=subject_code,
         question_order=question_order,
+        selected_option=selected_option,
     )
 
-    if not current_question:
-        return {
-            "status": "error",
-            "reason": "question_not_found",
-        }
-
-    selected_option = str(selected_option).strip().upper()
-    correct_option = str(current_question.get("correct_option") or "").strip().upper()
-    is_correct = selected_option == correct_option if correct_option else False
-
-    await session.execute(
-        text("""
-            update public.mockjamb_subject_questions
-            set
-                selected_option = :selected_option,
-                is_correct = :is_correct,
-                updated_at = now()
-            where payment_reference = :payment_reference
-              and subject_code = :subject_code
-              and question_order = :question_order
-        """),
-        {
-            "payment_reference": payment_reference,
-            "subject_code": subject_code,
-            "question_order": int(question_order),
-            "selected_option": selected_option,
-            "is_correct": bool(is_correct),
-        },
-    )
-
-    paper_rows = await get_mockjamb_subject_paper(
-        session,
-        payment_reference=payment_reference,
-        subject_code=subject_code,
-    )
-    total_questions = len(paper_rows)
-
-    next_question_order = int(question_order) + 1
-
-    if next_question_order > total_questions:
-        return {
-            "status": "completed_subject",
-            "selected_option": selected_option,
-            "is_correct": is_correct,
-            "total_questions": total_questions,
-        }
-
-    next_question = await get_mockjamb_subject_question_by_order(
-        session,
-        payment_reference=payment_reference,
-        subject_code=subject_code,
-        question_order=next_question_order,
-    )
-
-    await session.execute(
-        text("""
-            update public.mockjamb_sessions
-            set
-                current_question_index = :current_question_index,
-                updated_at = now()
-            where payment_reference = :payment_reference
-        """),
-        {
-            "payment_reference": payment_reference,
-            "current_question_index": int(next_question_order - 1),
-        },
-    )
-
-    return {
-        "status": "next_question",
-        "selected_option": selected_option,
-        "is_correct": is_correct,
-        "next_question": next_question,
-        "next_question_order": next_question_order,
-        "total_questions": total_questions,
-    }
-
 
 async def calculate_mockjamb_subject_score(
     session: AsyncSession,
@@ -777,36 +711,12 @@ async def calculate_mockjamb_subject_score(
     payment_reference: str,
     subject_code: str,
 ) -> dict:
-    result = await session.execute(
-        text("""
-            select
-                count(*) as total_questions,
-                coalesce(sum(case when is_correct = true then 1 else 0 end), 0) as correct_count
-            from public.mockjamb_subject_questions
-            where payment_reference = :payment_reference
-              and subject_code = :subject_code
-        """),
-        {
-            "payment_reference": payment_reference,
-            "subject_code": subject_code,
-        },
-    )
-    row = result.mappings().first() or {}
-
-    total_questions = int(row.get("total_questions") or 0)
-    correct_count = int(row.get("correct_count") or 0)
-
-    expected_total = get_mockjamb_subject_question_count(subject_code)
-
-    if expected_total <= 0:
-        score_100 = 0
-    else:
-        score_100 = round((correct_count / expected_total) * 100)
-
+    result = await MOCKJAMB_RESULTS.for_session(session, payment_reference)
+    subject = result.subject(subject_code)
     return {
-        "total_questions": total_questions,
-        "correct_count": correct_count,
-        "score_100": int(score_100),
+        "total_questions": subject.total_questions,
+        "correct_count": subject.correct_count,
+        "score_100": subject.score_100,
     }
 
 
@@ -816,58 +726,11 @@ async def get_mockjamb_review_rows(
     payment_reference: str,
     wrong_only: bool = False,
 ) -> list[dict]:
-    if wrong_only:
-        result = await session.execute(
-            text("""
-                select
-                    id,
-                    session_id,
-                    payment_reference,
-                    user_id,
-                    subject_code,
-                    question_id,
-                    question_order,
-                    question_json,
-                    correct_option,
-                    selected_option,
-                    is_correct,
-                    created_at,
-                    updated_at
-                from public.mockjamb_subject_questions
-                where payment_reference = :payment_reference
-                  and selected_option is not null
-                  and coalesce(is_correct, false) = false
-                order by subject_code asc, question_order asc
-            """),
-            {"payment_reference": payment_reference},
-        )
-    else:
-        result = await session.execute(
-            text("""
-                select
-                    id,
-                    session_id,
-                    payment_reference,
-                    user_id,
-                    subject_code,
-                    question_id,
-                    question_order,
-                    question_json,
-                    correct_option,
-                    selected_option,
-                    is_correct,
-                    created_at,
-                    updated_at
-                from public.mockjamb_subject_questions
-                where payment_reference = :payment_reference
-                  and selected_option is not null
-                order by subject_code asc, question_order asc
-            """),
-            {"payment_reference": payment_reference},
-        )
-
-    rows = result.mappings().all()
-    return [dict(row) for row in rows]
+    return await MOCKJAMB_RESULTS.review_rows(
+        session,
+        payment_reference=payment_reference,
+        wrong_only=wrong_only,
+    )
 
 
 async def get_mockjamb_subject_result_stats(
@@ -876,23 +739,9 @@ async def get_mockjamb_subject_result_stats(
     payment_reference: str,
     subject_code: str,
 ) -> dict:
-    result = await session.execute(
-        text("""
-            select
-                count(selected_option) as answered_count,
-                coalesce(sum(case when is_correct = true then 1 else 0 end), 0) as correct_count
-            from public.mockjamb_subject_questions
-            where payment_reference = :payment_reference
-              and subject_code = :subject_code
-        """),
-        {
-            "payment_reference": payment_reference,
-            "subject_code": subject_code,
-        },
-    )
-    row = result.mappings().first() or {}
-
+    result = await MOCKJAMB_RESULTS.for_session(session, payment_reference)
+    subject = result.subject(subject_code)
     return {
-        "answered_count": int(row.get("answered_count") or 0),
-        "correct_count": int(row.get("correct_count") or 0),
+        "answered_count": subject.answered_count,
+        "correct_count": subject.correct_count,
     }
@@ -8,6 +8,10 @@ from datetime import datetime, timedelta, timezone
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from services.deadline_service import MOCKJAMB_EXAM_KIND, schedule_exam_deadline
+from services.exam_results import MOCKJAMB_RESULTS
+from utils.sql_bulk import bulk_insert
+
 logger = logging.getLogger("mockjamb_session_service")
 logger.setLevel(logging.INFO)
 
@@ -154,6 +158,14 @@ async def start_mockjamb_session_if_needed(
         },
     )
     await session.flush()
+
+    # Time-up notice fires from the shared timer wheel
+    schedule_exam_deadline(
+        MOCKJAMB_EXAM_KIND,
+        payment_reference=payment_reference,
+        user_id=int(existing["user_id"]),
+        exam_ends_at=ends_at,
+    )
     return await get_mockjamb_session_by_payment_reference(session, payment_reference)
 
 
@@ -237,6 +249,8 @@ async def mark_mockjamb_subject_completed(
             "status": new_status,
         },
     )
+    if new_status == "completed":
+        MOCKJAMB_RESULTS.note_completion(session, payment_reference)
     await session.flush()
     return await get_mockjamb_session_by_payment_reference(session, payment_reference)
 
@@ -265,6 +279,50 @@ async def get_seen_mockjamb_question_ids(
     return [str(row[0]) for row in rows]
 
 
+async def get_seen_mockjamb_question_ids_for_users(
+    session: AsyncSession,
+    *,
+    user_ids: list[int],
+    subject_code: str,
+) -> list[str]:
+    """
+    Union of the seen question ids of several players, in one query.
+    Order matches calling get_seen_mockjamb_question_ids per user in
+    `user_ids` order and keeping first occurrences.
+    """
+    user_ids = [int(uid) for uid in user_ids]
+    if not user_ids:
+        return []
+
+    result = await session.execute(
+        text("""
+            select user_id, question_id
+            from public.mockjamb_seen_questions
+            where user_id = any(:user_ids)
+              and subject_code = :subject_code
+              and source_type = 'mockjamb'
+            order by id asc
+        """),
+        {
+            "user_ids": user_ids,
+            "subject_code": subject_code,
+        },
+    )
+
+    per_user: dict[int, list[str]] = {uid: [] for uid in user_ids}
+    for row in result.fetchall():
+        per_user.setdefault(int(row[0]), []).append(str(row[1]))
+
+    combined: list[str] = []
+    combined_set: set[str] = set()
+    for uid in dict.fromkeys(user_ids):
+        for qid in per_user.get(uid, []):
+            if qid not in combined_set:
+                combined_set.add(qid)
+                combined.append(qid)
+    return combined
+
+
 async def record_seen_mockjamb_questions(
     session: AsyncSession,
     *,
@@ -272,31 +330,45 @@ async def record_seen_mockjamb_questions(
     subject_code: str,
     question_ids: list[str],
 ) -> None:
-    for question_id in question_ids:
-        await session.execute(
-            text("""
-                insert into public.mockjamb_seen_questions (
-                    user_id,
-                    subject_code,
-                    question_id,
-                    source_type,
-                    created_at
-                )
-                values (
-                    :user_id,
-                    :subject_code,
-                    :question_id,
-                    'mockjamb',
-                    now()
-                )
-                on conflict (user_id, subject_code, question_id, source_type) do nothing
-            """),
-            {
-                "user_id": int(user_id),
-                "subject_code": subject_code,
-                "question_id": str(question_id),
-            },
-        )
+    await record_seen_mockjamb_questions_for_users(
+        session,
+        user_ids=[int(user_id)],
+        subject_code=subject_code,
+        question_ids=question_ids,
+    )
+
+
+async def record_seen_mockjamb_questions_for_users(
+    session: AsyncSession,
+    *,
+    user_ids: list[int],
+    subject_code: str,
+    question_ids: list[str],
+) -> None:
+    """
+    Mark `question_ids` seen for every user in `user_ids` with a bulk
+    multi-row insert (same ON CONFLICT DO NOTHING as the per-row version).
+    """
+    rows = [
+        {
+            "user_id": int(uid),
+            "subject_code": subject_code,
+            "question_id": str(question_id),
+        }
+        for uid in dict.fromkeys(int(u) for u in user_ids)
+        for question_id in question_ids
+    ]
+    if not rows:
+        return
+
+    await bulk_insert(
+        session,
+        table="public.mockjamb_seen_questions",
+        columns=("user_id", "subject_code", "question_id", "source_type", "created_at"),
+        rows=rows,
+        literals={"source_type": "'mockjamb'", "created_at": "now()"},
+        on_conflict="on conflict (user_id, subject_code, question_id, source_type) do nothing",
+    )
 
 
 async def get_latest_active_mockjamb_session_for_user(
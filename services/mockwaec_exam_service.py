@@ -11,43 +11,28 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from waec_loader import prepare_subject_question_batch, prepare_use_of_english_batch
 from services.mockwaec_session_service import (
     get_seen_mockwaec_question_ids,
+    get_seen_mockwaec_question_ids_for_users,
     record_seen_mockwaec_questions,
+    record_seen_mockwaec_questions_for_users,
     start_mockwaec_session_if_needed,
     set_mockwaec_current_subject,
     get_mockwaec_session_by_payment_reference,
     mark_mockwaec_subject_completed,
 )
+from question_refs import EXAM_WAEC, current_version, hydrate_rows, question_ref, register
+from services.exam_results import MOCKWAEC_RESULTS, subject_question_count, waec_grade
+from services.live_exam_engine import MOCKWAEC_LIVE
+from utils.sql_bulk import bulk_insert
 
 logger = logging.getLogger("mockwaec_exam_service")
 logger.setLevel(logging.INFO)
 
 
 def get_mockwaec_grade_from_score(score_100: int) -> str:
-    score_100 = int(score_100 or 0)
-
-    if score_100 >= 75:
-        return "A1"
-    if score_100 >= 70:
-        return "B2"
-    if score_100 >= 65:
-        return "B3"
-    if score_100 >= 60:
-        return "C4"
-    if score_100 >= 55:
-        return "C5"
-    if score_100 >= 50:
-        return "C6"
-    if score_100 >= 45:
-        return "D7"
-    if score_100 >= 40:
-        return "E8"
-    return "F9"
+    return waec_grade(score_100)
 
 def get_mockwaec_subject_question_count(subject_code: str) -> int:
-    subject_code = str(subject_code or "").strip().lower()
-    if subject_code == "eng":
-        return 60
-    return 40
+    return subject_question_count(subject_code)
 
 
 def _extract_correct_option(question: dict[str, Any]) -> str | None:
@@ -124,6 +109,7 @@ async def get_mockwaec_subject_paper(
     payment_reference: str,
     subject_code: str,
 ) -> list[dict]:
+    await MOCKWAEC_LIVE.checkpoint(session, payment_reference=payment_reference, subject_code=subject_code)
     result = await session.execute(
         text("""
             select
@@ -135,6 +121,7 @@ async def get_mockwaec_subject_paper(
                 question_id,
                 question_order,
                 question_json,
+                content_version,
                 correct_option,
                 selected_option,
                 is_correct,
@@ -151,7 +138,67 @@ async def get_mockwaec_subject_paper(
         },
     )
     rows = result.mappings().all()
-    return [dict(row) for row in rows]
+    return await hydrate_rows(session, [dict(row) for row in rows])
+
+
+async def insert_mockwaec_subject_paper_rows(
+    session: AsyncSession,
+    *,
+    session_id: int,
+    payment_reference: str,
+    user_id: int,
+    subject_code: str,
+    selected_questions: list[dict],
+) -> None:
+    """
+    Materialize a player's paper in one multi-row insert.
+    Existing rows are kept (on conflict do nothing), as before.
+    """
+    cv = current_version(EXAM_WAEC, subject_code)
+    rows = []
+    for idx, question in enumerate(selected_questions, start=1):
+        content_version, question_json = question_ref(cv, question)
+        rows.append({
+            "session_id": int(session_id),
+            "payment_reference": payment_reference,
+            "user_id": int(user_id),
+            "subject_code": subject_code,
+            "question_id": str(question.get("id")),
+            "question_order": idx,
+            "question_json": question_json,
+            "content_version": content_version,
+            "correct_option": _extract_correct_option(question),
+        })
+    if any(row["content_version"] for row in rows):
+        await register(session, cv)
+
+    await bulk_insert(
+        session,
+        table="public.mockwaec_subject_questions",
+        columns=(
+            "session_id",
+            "payment_reference",
+            "user_id",
+            "subject_code",
+            "question_id",
+            "question_order",
+            "question_json",
+            "content_version",
+            "correct_option",
+            "selected_option",
+            "is_correct",
+            "created_at",
+            "updated_at",
+        ),
+        rows=rows,
+        literals={
+            "selected_option": "null",
+            "is_correct": "null",
+            "created_at": "now()",
+            "updated_at": "now()",
+        },
+        on_conflict="on conflict (payment_reference, subject_code, question_id) do nothing",
+    )
 
 
 async def get_mockwaec_room_subject_paper(
@@ -172,6 +219,7 @@ async def get_mockwaec_room_subject_paper(
                 question_id,
                 question_order,
                 question_json,
+                content_version,
                 correct_option,
                 created_at,
                 updated_at
@@ -187,7 +235,7 @@ async def get_mockwaec_room_subject_paper(
     )
 
     rows = result.mappings().all()
-    return [dict(row) for row in rows]
+    return await hydrate_rows(session, [dict(row) for row in rows])
 
 
 async def create_mockwaec_room_subject_paper(
@@ -200,40 +248,40 @@ async def create_mockwaec_room_subject_paper(
     room_code = str(room_code or "").strip().upper()
     subject_code = str(subject_code or "").strip().lower()
 
+    cv = current_version(EXAM_WAEC, subject_code)
+    rows = []
     for idx, question in enumerate(selected_questions, start=1):
-        await session.execute(
-            text("""
-                insert into public.mockwaec_room_subject_questions (
-                    room_code,
-                    subject_code,
-                    question_id,
-                    question_order,
-                    question_json,
-                    correct_option,
-                    created_at,
-                    updated_at
-                )
-                values (
-                    :room_code,
-                    :subject_code,
-                    :question_id,
-                    :question_order,
-                    :question_json,
-                    :correct_option,
-                    now(),
-                    now()
-                )
-                on conflict (room_code, subject_code, question_id) do nothing
-            """),
-            {
-                "room_code": room_code,
-                "subject_code": subject_code,
-                "question_id": str(question.get("id")),
-                "question_order": idx,
-                "question_json": json.dumps(question),
-                "correct_option": _extract_correct_option(question),
-            },
-        )
+        content_version, question_json = question_ref(cv, question)
+        rows.append({
+            "room_code": room_code,
+            "subject_code": subject_code,
+            "question_id": str(question.get("id")),
+            "question_order": idx,
+            "question_json": question_json,
+            "content_version": content_version,
+            "correct_option": _extract_correct_option(question),
+        })
+    if any(row["content_version"] for row in rows):
+        await register(session, cv)
+
+    await bulk_insert(
+        session,
+        table="public.mockwaec_room_subject_questions",
+        columns=(
+            "room_code",
+            "subject_code",
+            "question_id",
+            "question_order",
+            "question_json",
+            "content_version",
+            "correct_option",
+            "created_at",
+            "updated_at",
+        ),
+        rows=rows,
+        literals={"created_at": "now()", "updated_at": "now()"},
+        on_conflict="on conflict (room_code, subject_code, question_id) do nothing",
+    )
 
     await session.flush()
 
@@ -256,77 +304,10 @@ async def clone_mockwaec_room_subject_paper_to_player(
     room_code = str(room_code or "").strip().upper()
     subject_code = str(subject_code or "").strip().lower()
 
-    room_paper = await get_mockwaec_room_subject_paper(
-        session,
-        room_code=room_code,
-        subject_code=subject_code,
-    )
-
-    for row in room_paper:
-        await session.execute(
-            text("""
-                insert into public.mockwaec_subject_questions (
-                    session_id,
-                    payment_reference,
-                    user_id,
-                    subject_code,
-                    question_id,
-                    question_order,
-                    question_json,
-                    correct_option,
-                    selected_option,
-                    is_correct,
-                    created_at,
-                    updated_at
-                )
-                values (
-                    :session_id,
-                    :payment_reference,
-                    :user_id,
-                    :subject_code,
-                    :question_id,
-                    :question_order,
-                    :question_json,
-                    :correct_option,
-                    null,
-                    null,
-                    now(),
-                    now()
-                )
-                on conflict (payment_reference, subject_code, question_id) do nothing
-            """),
-            {
-                "session_id": int(session_id),
-                "payment_reference": payment_reference,
-                "user_id": int(user_id),
-                "subject_code": subject_code,
-                "question_id": str(row.get("question_id")),
-                "question_order": int(row.get("question_order") or 0),
-                "question_json": row.get("question_json"),
-                "correct_option": row.get("correct_option"),
-            },
-        )
-
-    await session.flush()
-
-    return await get_mockwaec_subject_paper(
-        session,
-        payment_reference=payment_reference,
-        subject_code=subject_code,
-    )
-
-
-async def get_mockwaec_subject_question_by_order(
-    session: AsyncSession,
-    *,
-    payment_reference: str,
-    subject_code: str,
-    question_order: int,
-) -> dict | None:
-    result = await session.execute(
+    # Copy the room paper server-side: one statement, only the question references.
+    await session.execute(
         text("""
-            select
-                id,
+            insert into public.mockwaec_subject_questions (
                 session_id,
                 payment_reference,
                 user_id,
@@ -334,25 +315,79 @@ async def get_mockwaec_subject_question_by_order(
                 question_id,
                 question_order,
                 question_json,
+                content_version,
                 correct_option,
                 selected_option,
                 is_correct,
                 created_at,
                 updated_at
-            from public.mockwaec_subject_questions
-            where payment_reference = :payment_reference
-              and subject_code = :subject_code
-              and question_order = :question_order
-            limit 1
+            )
+            select
+                :session_id,
+                :payment_reference,
+                :user_id,
+                :subject_code,
+                question_id,
+                coalesce(question_order, 0),
+                question_json,
+                content_version,
+                correct_option,
+                null,
+                null,
+                now(),
+                now()
+            from public.mockwaec_room_subject_questions
+            where upper(room_code) = :room_code
+              and lower(subject_code) = :subject_code
+            order by question_order asc, id asc
+            on conflict (payment_reference, subject_code, question_id) do nothing
         """),
         {
+            "session_id": int(session_id),
             "payment_reference": payment_reference,
+            "user_id": int(user_id),
             "subject_code": subject_code,
-            "question_order": int(question_order),
+            "room_code": room_code,
         },
     )
-    row = result.mappings().first()
-    return dict(row) if row else None
+
+    await session.flush()
+
+    return await get_mockwaec_subject_paper(
+        session,
+        payment_reference=payment_reference,
+        subject_code=subject_code,
+    )
+
+
+async def get_mockwaec_subject_question_by_order(
+    session: AsyncSession,
+    *,
+    payment_reference: str,
+    subject_code: str,
+    question_order: int,
+) -> dict | None:
+    paper = await MOCKWAEC_LIVE.paper(
+        session,
+        payment_reference=payment_reference,
+        subject_code=subject_code,
+    )
+    return paper.question(question_order) if paper else None
+
+
+async def get_mockwaec_live_paper_rows(
+    session: AsyncSession,
+    *,
+    payment_reference: str,
+    subject_code: str,
+) -> list[dict]:
+    """Paper rows in question order, served from the live paper cache."""
+    paper = await MOCKWAEC_LIVE.paper(
+        session,
+        payment_reference=payment_reference,
+        subject_code=subject_code,
+    )
+    return paper.rows if paper else []
 
 
 async def create_mockwaec_subject_paper_if_needed(
@@ -463,21 +498,11 @@ async def create_mockwaec_subject_paper_if_needed(
 
         # If no shared room players were found, fall back to solo logic below
         if relevant_players:
-            combined_seen_ids: list[str] = []
-            combined_seen_set: set[str] = set()
-
-            for player in relevant_players:
-                player_user_id = int(player.get("user_id") or 0)
-                player_seen_ids = await get_seen_mockwaec_question_ids(
-                    session,
-                    user_id=player_user_id,
-                    subject_code=subject_code,
-                )
-                for qid in player_seen_ids:
-                    qid_str = str(qid)
-                    if qid_str not in combined_seen_set:
-                        combined_seen_set.add(qid_str)
-                        combined_seen_ids.append(qid_str)
+            combined_seen_ids = await get_seen_mockwaec_question_ids_for_users(
+                session,
+                user_ids=[int(player.get("user_id") or 0) for player in relevant_players],
+                subject_code=subject_code,
+            )
 
             # Preserve existing WAEC batching structure
             if subject_code == "eng":
@@ -531,14 +556,12 @@ async def create_mockwaec_subject_paper_if_needed(
             )
 
             # Record seen questions for every player sharing this subject
-            for player in relevant_players:
-                target_user_id = int(player.get("user_id") or 0)
-                await record_seen_mockwaec_questions(
-                    session,
-                    user_id=target_user_id,
-                    subject_code=subject_code,
-                    question_ids=selected_question_ids,
-                )
+            await record_seen_mockwaec_questions_for_users(
+                session,
+                user_ids=[int(player.get("user_id") or 0) for player in relevant_players],
+                subject_code=subject_code,
+                question_ids=selected_question_ids,
+            )
 
             # Clone official room paper into this player's personal paper rows
             paper_rows = await clone_mockwaec_room_subject_paper_to_player(
@@ -603,50 +626,14 @@ async def create_mockwaec_subject_paper_if_needed(
     selected_question_ids = batch["selected_question_ids"]
     session_id = int(existing_session["id"])
 
-    for idx, question in enumerate(selected_questions, start=1):
-        await session.execute(
-            text("""
-                insert into public.mockwaec_subject_questions (
-                    session_id,
-                    payment_reference,
-                    user_id,
-                    subject_code,
-                    question_id,
-                    question_order,
-                    question_json,
-                    correct_option,
-                    selected_option,
-                    is_correct,
-                    created_at,
-                    updated_at
-                )
-                values (
-                    :session_id,
-                    :payment_reference,
-                    :user_id,
-                    :subject_code,
-                    :question_id,
-                    :question_order,
-                    :question_json,
-                    :correct_option,
-                    null,
-                    null,
-                    now(),
-                    now()
-                )
-                on conflict (payment_reference, subject_code, question_id) do nothing
-            """),
-            {
-                "session_id": session_id,
-                "payment_reference": payment_reference,
-                "user_id": int(user_id),
-                "subject_code": subject_code,
-                "question_id": str(question.get("id")),
-                "question_order": idx,
-                "question_json": json.dumps(question),
-                "correct_option": _extract_correct_option(question),
-            },
-        )
+    await insert_mockwaec_subject_paper_rows(
+        session,
+        session_id=session_id,
+        payment_reference=payment_reference,
+        user_id=int(user_id),
+        subject_code=subject_code,
+        selected_questions=selected_questions,
+    )
 
     await record_seen_mockwaec_questions(
         session,
@@ -706,6 +693,11 @@ async def start_mockwaec_subject(
         subject_code=subject_code,
         requested_count=requested_count,
     )
+    MOCKWAEC_LIVE.prime(
+        payment_reference=payment_reference,
+        subject_code=subject_code,
+        rows=paper_info.get("paper_rows") or [],
+    )
 
     current_question_order = int(session_row.get("current_question_index") or 0) + 1
 
@@ -731,90 +723,15 @@ async def answer_mockwaec_question(
     question_order: int,
     selected_option: str,
 ) -> dict:
-    current_question = await get_mockwaec_subject_question_by_order(
+    # Answered from the in-memory paper; one append-only write per tap
+    return await MOCKWAEC_LIVE.answer(
         session,
         payment_reference=payment_reference,
         subject_code=subject_code,
         question_order=question_order,
+        selected_option=selected_option,
     )
 
-    if not current_question:
-        return {
-            "status": "error",
-            "reason": "question_not_found",
-        }
-
-    selected_option = str(selected_option).strip().upper()
-    correct_option = str(current_question.get("correct_option") or "").strip().upper()
-    is_correct = selected_option == correct_option if correct_option else False
-
-    await session.execute(
-        text("""
-            update public.mockwaec_subject_questions
-            set
-                selected_option = :selected_option,
-                is_correct = :is_correct,
-                updated_at = now()
-            where payment_reference = :payment_reference
-              and subject_code = :subject_code
-              and question_order = :question_order
-        """),
-        {
-            "payment_reference": payment_reference,
-            "subject_code": subject_code,
-            "question_order": int(question_order),
-            "selected_option": selected_option,
-            "is_correct": bool(is_correct),
-        },
-    )
-
-    paper_rows = await get_mockwaec_subject_paper(
-        session,
-        payment_reference=payment_reference,
-        subject_code=subject_code,
-    )
-    total_questions = len(paper_rows)
-
-    next_question_order = int(question_order) + 1
-
-    if next_question_order > total_questions:
-        return {
-            "status": "completed_subject",
-            "selected_option": selected_option,
-            "is_correct": is_correct,
-            "total_questions": total_questions,
-        }
-
-    next_question = await get_mockwaec_subject_question_by_order(
-        session,
-        payment_reference=payment_reference,
-        subject_code=subject_code,
-        question_order=next_question_order,
-    )
-
-    await session.execute(
-        text("""
-            update public.mockwaec_sessions
-            set
-                current_question_index = :current_question_index,
-                updated_at = now()
-            where payment_reference = :payment_reference
-        """),
-        {
-            "payment_reference": payment_reference,
-            "current_question_index": int(next_question_order - 1),
-        },
-    )
-
-    return {
-        "status": "next_question",
-        "selected_option": selected_option,
-        "is_correct": is_correct,
-        "next_question": next_question,
-        "next_question_order": next_question_order,
-        "total_questions": total_questions,
-    }
-
 
 async def calculate_mockwaec_subject_score(
     session: AsyncSession,
@@ -822,36 +739,12 @@ async def calculate_mockwaec_subject_score(
     payment_reference: str,
     subject_code: str,
 ) -> dict:
-    result = await session.execute(
-        text("""
-            select
-                count(*) as total_questions,
-                coalesce(sum(case when is_correct = true then 1 else 0 end), 0) as correct_count
-            from public.mockwaec_subject_questions
-            where payment_reference = :payment_reference
-              and subject_code = :subject_code
-        """),
-        {
-            "payment_reference": payment_reference,
-            "subject_code": subject_code,
-        },
-    )
-    row = result.mappings().first() or {}
-
-    total_questions = int(row.get("total_questions") or 0)
-    correct_count = int(row.get("correct_count") or 0)
-
-    expected_total = get_mockwaec_subject_question_count(subject_code)
-
-    if expected_total <= 0:
-        score_100 = 0
-    else:
-        score_100 = round((correct_count / expected_total) * 100)
-
+    result = await MOCKWAEC_RESULTS.for_session(session, payment_reference)
+    subject = result.subject(subject_code)
     return {
-        "total_questions": total_questions,
-        "correct_count": correct_count,
-        "score_100": int(score_100),
+        "total_questions": subject.total_questions,
+        "correct_count": subject.correct_count,
+        "score_100": subject.score_100,
     }
 
 
@@ -861,58 +754,11 @@ async def get_mockwaec_review_rows(
     payment_reference: str,
     wrong_only: bool = False,
 ) -> list[dict]:
-    if wrong_only:
-        result = await session.execute(
-            text("""
-                select
-                    id,
-                    session_id,
-                    payment_reference,
-                    user_id,
-                    subject_code,
-                    question_id,
-                    question_order,
-                    question_json,
-                    correct_option,
-                    selected_option,
-                    is_correct,
-                    created_at,
-                    updated_at
-                from public.mockwaec_subject_questions
-                where payment_reference = :payment_reference
-                  and selected_option is not null
-                  and coalesce(is_correct, false) = false
-                order by subject_code asc, question_order asc
-            """),
-            {"payment_reference": payment_reference},
-        )
-    else:
-        result = await session.execute(
-            text("""
-                select
-                    id,
-                    session_id,
-                    payment_reference,
-                    user_id,
-                    subject_code,
-                    question_id,
-                    question_order,
-                    question_json,
-                    correct_option,
-                    selected_option,
-                    is_correct,
-                    created_at,
-                    updated_at
-                from public.mockwaec_subject_questions
-                where payment_reference = :payment_reference
-                  and selected_option is not null
-                order by subject_code asc, question_order asc
-            """),
-            {"payment_reference": payment_reference},
-        )
-
-    rows = result.mappings().all()
-    return [dict(row) for row in rows]
+    return await MOCKWAEC_RESULTS.review_rows(
+        session,
+        payment_reference=payment_reference,
+        wrong_only=wrong_only,
+    )
 
 
 async def get_mockwaec_subject_result_stats(
@@ -921,24 +767,9 @@ async def get_mockwaec_subject_result_stats(
     payment_reference: str,
     subject_code: str,
 ) -> dict:
-    result = await session.execute(
-        text("""
-            select
-                count(selected_option) as answered_count,
-                coalesce(sum(case when is_correct = true then 1 else 0 end), 0) as correct_count
-            from public.mockwaec_subject_questions
-            where payment_reference = :payment_reference
-              and subject_code = :subject_code
-        """),
-        {
-            "payment_reference": payment_reference,
-            "subject_code": subject_code,
-        },
-    )
-    row = result.mappings().first() or {}
-
+    result = await MOCKWAEC_RESULTS.for_session(session, payment_reference)
+    subject = result.subject(subject_code)
     return {
-        "answered_count": int(row.get("answered_count") or 0),
-        "correct_count": int(row.get("correct_count") or 0),
+        "answered_count": subject.answered_count,
+        "correct_count": subject.correct_count,
     }
-
@@ -0,0 +1,370 @@
+# ====================================================================
+# services/paid_try_counter.py
+# Striped paid-try counter for the cycle system.
+#
+# Every paid attempt (services/playtrivia.resolve_trivia_attempt) and
+# every paid credit (helpers.add_tries) used to read-modify-write the
+# single game_state / global_counter rows, so all players queued on one
+# row lock. Counts now live in paid_try_counter_stripes:
+#
+#   (cycle_id, stripe >= 0)  quota stripes; caps sum to WIN_THRESHOLD
+#   (cycle_id, stripe = -1)  carried / spill row, outside the quota
+#                            (pre-migration counts, tries that land
+#                             after every stripe of the cycle is full)
+#
+# A player bumps "their" stripe (crc32(user_id) % PAID_TRY_STRIPES) and
+# moves to the next open stripe when it is full or locked. A stripe can
+# never pass its cap, so the cycle has reached WIN_THRESHOLD exactly when
+# the last stripe fills. Filling a stripe bumps game_state.stripes_filled
+# (at most PAID_TRY_STRIPES times per cycle); the bump that reaches the
+# stripe count is the single cycle-end signal.
+#
+# Totals are read with get_paid_try_totals(); the legacy game_state /
+# global_counter columns are rolled up at cycle end only.
+# ====================================================================
+from __future__ import annotations
+
+import logging
+import os
+import zlib
+from typing import Any, Dict, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger("paid_try_counter")
+
+PAID_TRY_STRIPES = int(os.getenv("PAID_TRY_STRIPES", "16"))
+SPILL_STRIPE = -1
+
+
+def stripe_for(user_id: Any) -> int:
+    return zlib.crc32(str(user_id).encode()) % max(1, PAID_TRY_STRIPES)
+
+
+def _stripe_caps(remaining: int) -> list[int]:
+    # A cycle already at/over the threshold gets one stripe of 1, so the
+    # next paid try ends it (matches the old ">=" check).
+    remaining = max(1, int(remaining))
+    stripes = max(1, min(PAID_TRY_STRIPES, remaining))
+    base, extra = divmod(remaining, stripes)
+    return [base + (1 if i < extra else 0) for i in range(stripes)]
+
+
+async def _ensure_cycle_stripes(
+    session: AsyncSession,
+    *,
+    cycle_id: int,
+    win_threshold: int,
+) -> bool:
+    """
+    Create the quota stripes of `cycle_id` if it has none yet.
+    Caps split whatever is left of WIN_THRESHOLD after the spill row.
+    Returns True when the cycle had no stripes before this call.
+    """
+    res = await session.execute(
+        text("""
+            SELECT
+                COUNT(*) FILTER (WHERE stripe >= 0) AS stripes,
+                COALESCE(SUM(paid_tries), 0) AS paid_tries
+            FROM paid_try_counter_stripes
+            WHERE cycle_id = :c
+        """),
+        {"c": int(cycle_id)},
+    )
+    row = res.mappings().one()
+    if int(row["stripes"] or 0) > 0:
+        return False
+
+    caps = _stripe_caps(int(win_threshold) - int(row["paid_tries"] or 0))
+    await session.execute(
+        text("""
+            INSERT INTO paid_try_counter_stripes (cycle_id, stripe, cap, paid_tries, purchased_tries)
+            SELECT :c, s.ord - 1, s.cap, 0, 0
+            FROM unnest(CAST(:caps AS bigint[])) WITH ORDINALITY AS s(cap, ord)
+            ON CONFLICT (cycle_id, stripe) DO NOTHING
+        """),
+        {"c": int(cycle_id), "caps": caps},
+    )
+    logger.info("🧮 Paid-try stripes created | cycle=%s | stripes=%s | quota=%s", cycle_id, len(caps), sum(caps))
+    return True
+
+
+async def _claim_open_stripe(
+    session: AsyncSession,
+    *,
+    cycle_id: int,
+    count: int,
+    purchased: int,
+    hint: int,
+    skip_locked: bool,
+    above: int = -1,
+) -> Optional[Dict[str, int]]:
+    """
+    Add up to `count` tries to one open stripe numbered above `above`
+    (the hinted one first), never past its cap. Returns
+    {stripe, taken, filled} or None when no open stripe could be locked.
+    """
+    res = await session.execute(
+        text(f"""
+            UPDATE paid_try_counter_stripes AS s
+            SET paid_tries = LEAST(s.cap, s.paid_tries + :n),
+                purchased_tries = s.purchased_tries + :p,
+                updated_at = NOW()
+            FROM (
+                SELECT stripe, paid_tries AS before
+                FROM paid_try_counter_stripes
+                WHERE cycle_id = :c
+                  AND stripe > :above
+                  AND paid_tries < cap
+                ORDER BY (stripe < :hint), stripe
+                LIMIT 1
+                FOR UPDATE{" SKIP LOCKED" if skip_locked else ""}
+            ) AS picked
+            WHERE s.cycle_id = :c
+              AND s.stripe = picked.stripe
+              AND s.paid_tries < s.cap
+            RETURNING s.stripe, s.paid_tries - picked.before AS taken, s.paid_tries >= s.cap AS filled
+        """),
+        {"c": int(cycle_id), "n": int(count), "p": int(purchased), "hint": int(hint), "above": int(above)},
+    )
+    row = res.mappings().first()
+    if row is None:
+        return None
+    return {"stripe": int(row["stripe"]), "taken": int(row["taken"]), "filled": bool(row["filled"])}
+
+
+async def _add_to_spill(session: AsyncSession, *, cycle_id: int, count: int, purchased: int) -> None:
+    await session.execute(
+        text("""
+            INSERT INTO paid_try_counter_stripes (cycle_id, stripe, cap, paid_tries, purchased_tries)
+            VALUES (:c, :s, 0, :n, :p)
+            ON CONFLICT (cycle_id, stripe)
+            DO UPDATE SET
+                paid_tries = paid_try_counter_stripes.paid_tries + EXCLUDED.paid_tries,
+                purchased_tries = paid_try_counter_stripes.purchased_tries + EXCLUDED.purchased_tries,
+                updated_at = NOW()
+        """),
+        {"c": int(cycle_id), "s": SPILL_STRIPE, "n": int(count), "p": int(purchased)},
+    )
+
+
+async def _record_filled_stripes(session: AsyncSession, *, cycle_id: int, filled: int) -> bool:
+    """
+    Count newly filled stripes on game_state. True only for the one call
+    whose bump fills the last stripe of the still-current cycle.
+    """
+    res = await session.execute(
+        text("""
+            UPDATE game_state
+            SET stripes_filled = stripes_filled + :f,
+                updated_at = NOW()
+            WHERE id = 1
+              AND current_cycle = :c
+            RETURNING
+                stripes_filled,
+                (
+                    SELECT COUNT(*)
+                    FROM paid_try_counter_stripes
+                    WHERE cycle_id = :c
+                      AND stripe >= 0
+                ) AS stripes
+        """),
+        {"c": int(cycle_id), "f": int(filled)},
+    )
+    row = res.mappings().first()
+    if row is None:
+        # Cycle already ended (admin reset) — nothing to signal
+        return False
+
+    after = int(row["stripes_filled"])
+    return after - int(filled) < int(row["stripes"]) <= after
+
+
+async def add_paid_tries(
+    session: AsyncSession,
+    *,
+    cycle_id: int,
+    count: int,
+    user_id: Any,
+    win_threshold: int,
+    purchased: bool = False,
+) -> bool:
+    """
+    Count `count` paid tries towards `cycle_id`. No commit here.
+
+    purchased=True also counts them as bought tries (old
+    global_counter.paid_tries_total).
+
+    Returns True exactly once per cycle: for the call that makes the
+    cycle's paid tries reach `win_threshold`.
+    """
+    remaining = int(count)
+    if remaining <= 0:
+        return False
+
+    hint = stripe_for(user_id)
+    purchased_left = remaining if purchased else 0
+    filled = 0
+    created = False
+    # Highest stripe locked by this call. Blocking waits only go upwards
+    # from it, so two straddling credits can never wait on each other.
+    held = -1
+
+    while remaining > 0:
+        claim = await _claim_open_stripe(
+            session, cycle_id=cycle_id, count=remaining, purchased=purchased_left, hint=hint, skip_locked=True,
+        )
+        if claim is None:
+            # Open stripes may all be locked right now; wait for one.
+            claim = await _claim_open_stripe(
+                session,
+                cycle_id=cycle_id,
+                count=remaining,
+                purchased=purchased_left,
+                hint=hint if held < 0 else 0,
+                skip_locked=False,
+                above=held,
+            )
+
+        if claim is None:
+            if not created and await _ensure_cycle_stripes(session, cycle_id=cycle_id, win_threshold=win_threshold):
+                created = True
+                continue
+
+            # Every stripe is full (the cycle is ending), or the only open
+            # ones are locked below `held`. Keep the count outside the quota.
+            await _add_to_spill(session, cycle_id=cycle_id, count=remaining, purchased=purchased_left)
+            break
+
+        remaining -= claim["taken"]
+        purchased_left = 0
+        held = max(held, claim["stripe"])
+        hint = claim["stripe"] + 1
+        if claim["filled"]:
+            filled += 1
+
+    if not filled:
+        return False
+
+    completed = await _record_filled_stripes(session, cycle_id=cycle_id, filled=filled)
+    if completed:
+        logger.warning("[CAMPAIGN] Paid-try quota reached | cycle=%s | threshold=%s", cycle_id, win_threshold)
+    return completed
+
+
+async def mark_cycle_end_pending(session: AsyncSession, *, cycle_id: int) -> None:
+    """
+    The quota was filled by a credit, not by an attempt; the next paid
+    attempt ends the cycle (claim_pending_cycle_end).
+    """
+    await session.execute(
+        text("""
+            UPDATE game_state
+            SET cycle_end_pending = TRUE,
+                updated_at = NOW()
+            WHERE id = 1
+              AND current_cycle = :c
+        """),
+        {"c": int(cycle_id)},
+    )
+
+
+async def claim_pending_cycle_end(session: AsyncSession, *, cycle_id: int) -> bool:
+    res = await session.execute(
+        text("""
+            UPDATE game_state
+            SET cycle_end_pending = FALSE,
+                updated_at = NOW()
+            WHERE id = 1
+              AND current_cycle = :c
+              AND cycle_end_pending
+            RETURNING id
+        """),
+        {"c": int(cycle_id)},
+    )
+    return res.scalar_one_or_none() is not None
+
+
+async def get_cycle_paid_tries(session: AsyncSession, cycle_id: int) -> int:
+    res = await session.execute(
+        text("""
+            SELECT COALESCE(SUM(paid_tries), 0)
+            FROM paid_try_counter_stripes
+            WHERE cycle_id = :c
+        """),
+        {"c": int(cycle_id)},
+    )
+    return int(res.scalar_one() or 0)
+
+
+async def get_paid_try_totals(session: AsyncSession) -> Dict[str, int]:
+    """
+    current_cycle, paid_tries_this_cycle, lifetime_paid_tries and
+    purchased_tries_total (old global_counter.paid_tries_total).
+    """
+    res = await session.execute(
+        text("""
+            SELECT
+                gs.current_cycle,
+                COALESCE(SUM(s.paid_tries) FILTER (WHERE s.cycle_id = gs.current_cycle), 0) AS paid_tries_this_cycle,
+                COALESCE(SUM(s.paid_tries), 0) AS lifetime_paid_tries,
+                COALESCE(SUM(s.purchased_tries), 0) AS purchased_tries_total
+            FROM game_state gs
+            LEFT JOIN paid_try_counter_stripes s ON TRUE
+            WHERE gs.id = 1
+            GROUP BY gs.current_cycle
+        """)
+    )
+    row = res.mappings().first()
+    if row is None:
+        return {
+            "current_cycle": 1,
+            "paid_tries_this_cycle": 0,
+            "lifetime_paid_tries": 0,
+            "purchased_tries_total": 0,
+        }
+    return {key: int(row[key] or 0) for key in row.keys()}
+
+
+async def start_next_counter_cycle(session: AsyncSession, *, ended_cycle: int) -> Optional[int]:
+    """
+    Move game_state to the next cycle and roll the stripe totals up into
+    the legacy game_state / global_counter columns.
+    Returns the new cycle id, or None if `ended_cycle` is not current.
+    """
+    res = await session.execute(
+        text("""
+            WITH totals AS (
+                SELECT
+                    COALESCE(SUM(paid_tries), 0) AS lifetime_paid_tries,
+                    COALESCE(SUM(purchased_tries), 0) AS purchased_tries_total
+                FROM paid_try_counter_stripes
+            )
+            UPDATE game_state
+            SET current_cycle = current_cycle + 1,
+                paid_tries_this_cycle = 0,
+                lifetime_paid_tries = totals.lifetime_paid_tries,
+                stripes_filled = 0,
+                cycle_end_pending = FALSE,
+                updated_at = NOW()
+            FROM totals
+            WHERE id = 1
+              AND current_cycle = :c
+            RETURNING current_cycle, totals.purchased_tries_total
+        """),
+        {"c": int(ended_cycle)},
+    )
+    row = res.mappings().first()
+    if row is None:
+        return None
+
+    await session.execute(
+        text("""
+            UPDATE global_counter
+            SET paid_tries_total = :total
+            WHERE id = 1
+        """),
+        {"total": int(row["purchased_tries_total"])},
+    )
+    return int(row["current_cycle"])
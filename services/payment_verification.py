@@ -0,0 +1,181 @@
+# ====================================================================
+# services/payment_verification.py
+# Cached, coalesced Flutterwave verification for the redirect pages.
+#
+# The /flw/redirect/status page is polled by the browser every few
+# seconds until the payment is resolved, usually long after the webhook
+# already finalized it. This layer sits in front of
+# flutterwave_client.verify_payment():
+#
+#   resolved(tx_ref)  -> the credited outcome, kept for
+#                        PAYMENT_RESOLVED_TTL_SECONDS once the webhook or
+#                        a redirect finalized it (remember()). Polls are
+#                        answered from here without a DB or API call.
+#   verify(tx_ref)    -> one Flutterwave verification per tx_ref at a
+#                        time: concurrent callers (several tabs, several
+#                        polls) await the same in-flight request.
+#                        Successful answers are cached for the same TTL.
+#
+# Only success is final: a payment reported failed / expired can still be
+# confirmed by the webhook later, so those outcomes are never cached and
+# the next poll reads the payments tables again.
+#
+# Per process; the payments tables stay the shared source of truth
+# (the router reads them before calling verify()). Counters via
+# stats() (exposed on /health).
+# ====================================================================
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from services.flutterwave_client import normalize_flw_status, verify_payment
+
+logger = logging.getLogger("payment_verification")
+
+PAYMENT_RESOLVED_TTL_SECONDS = float(os.getenv("PAYMENT_RESOLVED_TTL_SECONDS", "900"))
+PAYMENT_VERIFY_CACHE_MAX_ENTRIES = int(os.getenv("PAYMENT_VERIFY_CACHE_MAX_ENTRIES", "5000"))
+
+CACHED_STATUSES = frozenset({"successful"})
+
+
+@dataclass(slots=True)
+class PaymentResolution:
+    """What the redirect pages need to render a finished payment."""
+
+    status: str
+    product_type: str
+    subject_code: str = ""
+    credits: int = 0
+    mock_sessions: int = 0
+    tries: int = 0
+
+
+def resolution_from_info(product_type: str, info: Dict[str, Any], subject_code: str = "") -> PaymentResolution:
+    """Build a resolution from the (product_type, info) of a successful finalization."""
+    return PaymentResolution(
+        status="successful",
+        product_type=product_type,
+        subject_code=(subject_code or "").strip().lower(),
+        credits=int(info.get("credits") or 0),
+        mock_sessions=int(info.get("mock_sessions") or 0),
+        tries=int(info.get("tries") or 0),
+    )
+
+
+class _TtlCache:
+    def __init__(self, *, ttl_seconds: float, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._items: "OrderedDict[str, tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key: str) -> Any:
+        item = self._items.get(key)
+        if item is None:
+            return None
+        expires_at, value = item
+        if expires_at <= time.monotonic():
+            del self._items[key]
+            return None
+        return value
+
+    def put(self, key: str, value: Any) -> None:
+        self._items[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_entries:
+            self._items.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+class PaymentVerifier:
+    def __init__(
+        self,
+        *,
+        verify: Callable[[str], Awaitable[Dict[str, Any]]] = verify_payment,
+        ttl_seconds: float = PAYMENT_RESOLVED_TTL_SECONDS,
+        max_entries: int = PAYMENT_VERIFY_CACHE_MAX_ENTRIES,
+    ):
+        self._verify = verify
+        self._resolved = _TtlCache(ttl_seconds=ttl_seconds, max_entries=max_entries)
+        self._verified = _TtlCache(ttl_seconds=ttl_seconds, max_entries=max_entries)
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+        self.resolved_hits = 0
+        self.verify_hits = 0
+        self.coalesced = 0
+        self.api_calls = 0
+
+    # --------------------------------------------------------
+    # Final outcomes
+    # --------------------------------------------------------
+    def resolved(self, tx_ref: str) -> Optional[PaymentResolution]:
+        resolution = self._resolved.get(tx_ref)
+        if resolution is not None:
+            self.resolved_hits += 1
+        return resolution
+
+    def remember(self, tx_ref: str, resolution: PaymentResolution) -> None:
+        """Record a credited payment (webhook / redirect finalization, local tables)."""
+        if resolution.status not in CACHED_STATUSES:
+            return
+        self._resolved.put(tx_ref, resolution)
+
+    # --------------------------------------------------------
+    # Flutterwave verification
+    # --------------------------------------------------------
+    async def verify(self, tx_ref: str) -> Dict[str, Any]:
+        cached = self._verified.get(tx_ref)
+        if cached is not None:
+            self.verify_hits += 1
+            return cached
+
+        future = self._inflight.get(tx_ref)
+        if future is not None:
+            self.coalesced += 1
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[tx_ref] = future
+        try:
+            self.api_calls += 1
+            verified = await self._verify(tx_ref)
+        except BaseException as exc:
+            # Waiters get a plain error result; the caller that owns the
+            # request sees the real exception.
+            future.set_result({"status": "error", "tx_ref": tx_ref, "error": str(exc)})
+            raise
+        else:
+            if normalize_flw_status(verified.get("status")) in CACHED_STATUSES:
+                self._verified.put(tx_ref, verified)
+            future.set_result(verified)
+            return verified
+        finally:
+            self._inflight.pop(tx_ref, None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "resolved": len(self._resolved),
+            "verified": len(self._verified),
+            "in_flight": len(self._inflight),
+            "resolved_hits": self.resolved_hits,
+            "verify_hits": self.verify_hits,
+            "coalesced": self.coalesced,
+            "api_calls": self.api_calls,
+        }
+
+
+_verifier: Optional[PaymentVerifier] = None
+
+
+def get_payment_verifier() -> PaymentVerifier:
+    global _verifier
+    if _verifier is None:
+        _verifier = PaymentVerifier()
+    return _verifier
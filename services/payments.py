@@ -2,9 +2,7 @@
 # services/payments.py
 # ================================================================
 import os
-import httpx
 import hmac
-import aiohttp
 import hashlib
 import logging
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -12,6 +10,7 @@ from sqlalchemy import select
 from datetime import datetime
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
 from db import get_async_session
+from http_clients import get_http_clients
 from models import Payment, TransactionLog, GlobalCounter, User
 from helpers import add_tries  # ✅ FIX: Missing import
 from helpers import mask_sensitive
@@ -144,11 +143,15 @@ async def verify_payment(tx_ref: str, session: AsyncSession) -> dict:
 
     try:
         # Lookup by reference
-        lookup_url = f"{FLW_BASE_URL}/transactions?tx_ref={tx_ref}"
-        async with httpx.AsyncClient(timeout=15.0) as client:
-            lookup_resp = await client.get(lookup_url, headers=headers)
-            lookup_resp.raise_for_status()
-            lookup_data = lookup_resp.json()
+        lookup_resp = await get_http_clients().get(
+            "flutterwave",
+            "GET /transactions",
+            f"{FLW_BASE_URL}/transactions",
+            params={"tx_ref": tx_ref},
+            headers=headers,
+        )
+        lookup_resp.raise_for_status()
+        lookup_data = lookup_resp.json()
 
         data_list = lookup_data.get("data") or []
         if not data_list:
@@ -160,11 +163,14 @@ async def verify_payment(tx_ref: str, session: AsyncSession) -> dict:
             return {"status": "invalid"}
 
         # Verify by transaction ID
-        verify_url = f"{FLW_BASE_URL}/transactions/{tx_id}/verify"
-        async with httpx.AsyncClient(timeout=15.0) as client:
-            resp = await client.get(verify_url, headers=headers)
-            resp.raise_for_status()
-            fw_resp = resp.json()
+        resp = await get_http_clients().get(
+            "flutterwave",
+            "GET /transactions/{id}/verify",
+            f"{FLW_BASE_URL}/transactions/{tx_id}/verify",
+            headers=headers,
+        )
+        resp.raise_for_status()
+        fw_resp = resp.json()
 
     except Exception as e:
         logger.exception(f"❌ verify_payment error for {tx_ref}: {e}")
@@ -213,14 +219,18 @@ async def resolve_payment_status(tx_ref: str, session: AsyncSession) -> Payment
         return payment
 
     # 2) Ask Flutterwave for the canonical status
-    verify_url = f"{FLW_BASE_URL}/transactions/verify_by_reference?tx_ref={str(tx_ref)}"
     headers = {"Authorization": f"Bearer {FLW_SECRET_KEY}"}
 
     try:
-        async with httpx.AsyncClient(timeout=15.0) as client:
-            resp = await client.get(verify_url, headers=headers)
-            resp.raise_for_status()
-            data = resp.json().get("data", {}) or {}
+        resp = await get_http_clients().get(
+            "flutterwave",
+            "GET /transactions/verify_by_reference",
+            f"{FLW_BASE_URL}/transactions/verify_by_reference",
+            params={"tx_ref": str(tx_ref)},
+            headers=headers,
+        )
+        resp.raise_for_status()
+        data = resp.json().get("data", {}) or {}
     except Exception as e:
         logger.warning(f"⚠️ Could not verify payment {tx_ref}: {e}")
         return payment
@@ -341,7 +351,7 @@ async def verify_transaction(transaction_id: str, amount: int) -> bool:
     Verifies a Flutterwave transaction directly with Flutterwave's API.
     Returns True if the transaction is valid and successful.
     """
-    url = f"https://api.flutterwave.com/v3/transactions/{transaction_id}/verify"
+    url = f"{FLW_BASE_URL}/transactions/{transaction_id}/verify"
 
     headers = {
         "Authorization": f"Bearer {FLW_SECRET_KEY}",
@@ -349,18 +359,22 @@ async def verify_transaction(transaction_id: str, amount: int) -> bool:
     }
 
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, headers=headers) as resp:
-                data = await resp.json()
-                logger.info(f"🔍 Verify response for tx_id={transaction_id}: {data}")
-
-                if data.get("status") == "success":
-                    tx_data = data.get("data", {})
-                    if (
-                        tx_data.get("status") == "successful" and
-                        int(tx_data.get("amount", 0)) == int(amount)
-                    ):
-                        return True
+        resp = await get_http_clients().get(
+            "flutterwave",
+            "GET /transactions/{id}/verify",
+            url,
+            headers=headers,
+        )
+        data = resp.json()
+        logger.info(f"🔍 Verify response for tx_id={transaction_id}: {data}")
+
+        if data.get("status") == "success":
+            tx_data = data.get("data", {})
+            if (
+                tx_data.get("status") == "successful" and
+                int(tx_data.get("amount", 0)) == int(amount)
+            ):
+                return True
         return False
     except Exception as e:
         logger.error(f"❌ verify_transaction() failed for tx_id={transaction_id}: {e}", exc_info=True)
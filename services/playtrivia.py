@@ -12,6 +12,13 @@ from sqlalchemy import text
 
 from models import User, GameState
 from services.finance.premium_points import award_premium_point
+from services.leaderboard_service import note_cycle_points, record_quiz_entry
+from services.paid_try_counter import (
+    add_paid_tries,
+    claim_pending_cycle_end,
+    get_cycle_paid_tries,
+    start_next_counter_cycle,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -170,17 +177,19 @@ async def _get_or_create_cycle_points(session: AsyncSession, cycle_id: int, user
 async def _increment_cycle_points(session: AsyncSession, cycle_id: int, user: User) -> int:
     res = await session.execute(
         text("""
-            INSERT INTO user_cycle_stats (cycle_id, user_id, tg_id, points, updated_at)
-            VALUES (:c, :u, :tg, 1, NOW())
+            INSERT INTO user_cycle_stats (cycle_id, user_id, tg_id, points, points_reached_at, updated_at)
+            VALUES (:c, :u, :tg, 1, NOW(), NOW())
             ON CONFLICT (cycle_id, user_id)
             DO UPDATE SET
                 points = user_cycle_stats.points + 1,
+                points_reached_at = NOW(),
                 tg_id = EXCLUDED.tg_id,
                 updated_at = NOW()
             RETURNING points
         """),
         {"c": cycle_id, "u": str(user.id), "tg": int(user.tg_id)},
     )
+    note_cycle_points(session, cycle_id=cycle_id, user_id=user.id, delta=1)
     return int(res.scalar_one())
 
 # -----------------------------------------------------
@@ -203,12 +212,17 @@ async def admin_add_cycle_points(
         text("""
             UPDATE user_cycle_stats
             SET points = points + :d,
+                points_reached_at = CASE
+                    WHEN :d > 0 THEN NOW()
+                    ELSE points_reached_at
+                END,
                 updated_at = NOW()
             WHERE cycle_id = :c AND user_id = :u
             RETURNING points
         """),
         {"d": int(delta), "c": int(cycle_id), "u": str(user.id)},
     )
+    note_cycle_points(session, cycle_id=cycle_id, user_id=user.id, delta=int(delta))
     return int(res.scalar_one())
 
 # -----------------------------------------------------
@@ -241,13 +255,8 @@ async def admin_reset_cycle(session: AsyncSession) -> dict:
 # Tie-break logging entry (premium_reward_entries)
 # ---------------------------------------------------------------
 async def _record_premium_entry(session: AsyncSession, cycle_id: int, user: User) -> None:
-    await session.execute(
-        text("""
-            INSERT INTO premium_reward_entries (user_id, tg_id, cycle_id, created_at)
-            VALUES (:u, :tg, :c, NOW())
-        """),
-        {"u": str(user.id), "tg": int(user.tg_id), "c": int(cycle_id)},
-    )
+    # Also bumps the weekly / streak leaderboard rollups
+    await record_quiz_entry(session, user_id=user.id, tg_id=int(user.tg_id), cycle_id=int(cycle_id))
 
 
 # ---------------------------------------------------------------
@@ -269,69 +278,36 @@ async def _try_award_gadget(session: AsyncSession, cycle_id: int, user: User, re
 
 # ---------------------------------------------------------------
 # Winner selection (max points, tie -> earliest reached max)
+# points_reached_at is set whenever points go up, so the tie-break
+# is read straight off idx_user_cycle_stats_cycle_winner.
 # ---------------------------------------------------------------
 async def _select_cycle_winner(session: AsyncSession, cycle_id: int) -> Optional[Dict[str, Any]]:
-    # max points
-    res = await session.execute(
-        text("SELECT MAX(points) FROM user_cycle_stats WHERE cycle_id = :c"),
-        {"c": cycle_id},
-    )
-    max_points = res.scalar_one_or_none()
-    if not max_points or int(max_points) <= 0:
-        return None
-    max_points = int(max_points)
-
-    # tied list
     res = await session.execute(
         text("""
             SELECT user_id::text, tg_id, points
             FROM user_cycle_stats
-            WHERE cycle_id = :c AND points = :p
+            WHERE cycle_id = :c AND points > 0
+            ORDER BY points DESC, points_reached_at ASC NULLS LAST
+            LIMIT 1
         """),
-        {"c": cycle_id, "p": max_points},
+        {"c": cycle_id},
     )
-    tied = res.fetchall()
-    if not tied:
+    row = res.first()
+    if row is None:
         return None
 
-    if len(tied) == 1:
-        u, tg, pts = tied[0]
-        return {"user_id": u, "tg_id": int(tg), "points": int(pts)}
-
-    # tie-break: time of Nth correct (OFFSET N-1)
-    best = None
-    best_time = None
-
-    for (user_id, tg_id, pts) in tied:
-        res2 = await session.execute(
-            text("""
-                SELECT created_at
-                FROM premium_reward_entries
-                WHERE cycle_id = :c AND user_id = :u
-                ORDER BY created_at ASC
-                OFFSET :off
-                LIMIT 1
-            """),
-            {"c": cycle_id, "u": user_id, "off": max_points - 1},
-        )
-        reached_time = res2.scalar_one_or_none()
-        if reached_time is None:
-            continue
-
-        if best_time is None or reached_time < best_time:
-            best_time = reached_time
-            best = {"user_id": str(user_id), "tg_id": int(tg_id), "points": int(pts)}
-
-    return best or {"user_id": str(tied[0][0]), "tg_id": int(tied[0][1]), "points": int(tied[0][2])}
+    user_id, tg_id, pts = row
+    return {"user_id": str(user_id), "tg_id": int(tg_id), "points": int(pts)}
 
 
 async def _end_cycle_and_start_new(session: AsyncSession, gs: GameState, winner: Optional[Dict[str, Any]]) -> Dict[str, Any]:
     current_cycle = int(gs.current_cycle or 1)
+    paid_tries_final = await get_cycle_paid_tries(session, current_cycle)
 
     logger.warning(
         "[CAMPAIGN] Cycle threshold reached | cycle=%s | paid_tries=%s",
         current_cycle,
-        int(gs.paid_tries_this_cycle or 0),
+        paid_tries_final,
     )
 
     # close cycle (✅ asyncpg-safe casts — FINAL)
@@ -350,7 +326,7 @@ async def _end_cycle_and_start_new(session: AsyncSession, gs: GameState, winner:
             WHERE id = :c
         """),
         {
-            "final": int(gs.paid_tries_this_cycle or 0),
+            "final": paid_tries_final,
             "wuid": winner["user_id"] if winner else None,
             "wtg": int(winner["tg_id"]) if winner and winner.get("tg_id") is not None else None,
             "wpts": int(winner["points"]) if winner and winner.get("points") is not None else None,
@@ -360,10 +336,9 @@ async def _end_cycle_and_start_new(session: AsyncSession, gs: GameState, winner:
 
 
 
-    # new cycle
-    new_cycle = current_cycle + 1
-    gs.current_cycle = new_cycle
-    gs.paid_tries_this_cycle = 0
+    # new cycle (resets the stripe bookkeeping on game_state)
+    new_cycle = await start_next_counter_cycle(session, ended_cycle=current_cycle) or current_cycle + 1
+    await session.refresh(gs)
     await _ensure_cycle_row(session, new_cycle)
 
     logger.warning("[CAMPAIGN] New cycle started | new_cycle=%s", new_cycle)
@@ -433,11 +408,17 @@ async def resolve_trivia_attempt(
     # 2) update paid try counters if paid
     cycle_ended_now = False
     if paid_spin:
-        gs.paid_tries_this_cycle = int(gs.paid_tries_this_cycle or 0) + 1
-        gs.lifetime_paid_tries = int(gs.lifetime_paid_tries or 0) + 1
+        cycle_ended_now = await add_paid_tries(
+            session,
+            cycle_id=cycle_id,
+            count=1,
+            user_id=user.id,
+            win_threshold=WIN_THRESHOLD,
+        )
 
-        if gs.paid_tries_this_cycle >= WIN_THRESHOLD:
-            cycle_ended_now = True
+        # Quota filled earlier by a paid credit (helpers.add_tries)
+        if not cycle_ended_now and gs.cycle_end_pending:
+            cycle_ended_now = await claim_pending_cycle_end(session, cycle_id=cycle_id)
 
     # 3) wrong answer -> no points
     if not correct_answer:
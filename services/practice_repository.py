@@ -0,0 +1,414 @@
+# ====================================================================
+# services/practice_repository.py
+# Practice-session writes for JAMB / WAEC / University practice.
+#
+# The three practice handlers share one schema shape per exam prefix:
+#   <prefix>_user_access          free / paid question balances
+#   <prefix>_user_topic_history   questions already served
+#   <prefix>_sessions             served / correct / wrong counters
+#   <prefix>_attempts             one row per answer
+#   <prefix>_session_questions    mock paper rows (selected_option)
+#
+# record_served() charges the question, records history and bumps
+# questions_served in one CTE statement; record_answer() inserts the
+# attempt, bumps the session counters and marks the mock paper row in
+# one statement too (one transaction per tap instead of 3-5).
+#
+# Write-behind (PRACTICE_WRITE_BEHIND=1): answers are buffered and
+# written in one batched statement every PRACTICE_FLUSH_MS (or once
+# PRACTICE_FLUSH_MAX_ROWS are waiting). Reads of session counters /
+# paper rows call sync() first, and stop_practice_writers() flushes on
+# shutdown. Charging (record_served) is always synchronous.
+#
+# A failed batch stays buffered. Rows that were in PRACTICE_FLUSH_MAX_ATTEMPTS
+# failed batches are written one by one instead, so a row the database
+# rejects (constraint / FK / bad data) is logged and dropped rather than
+# blocking every answer buffered after it.
+# ====================================================================
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError, InterfaceError, OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db import get_async_session
+
+logger = logging.getLogger("practice_repository")
+
+PRACTICE_WRITE_BEHIND = os.getenv("PRACTICE_WRITE_BEHIND", "0").strip().lower() in ("1", "true", "yes")
+PRACTICE_FLUSH_MS = int(os.getenv("PRACTICE_FLUSH_MS", "250"))
+PRACTICE_FLUSH_MAX_ROWS = int(os.getenv("PRACTICE_FLUSH_MAX_ROWS", "500"))
+PRACTICE_FLUSH_MAX_ATTEMPTS = int(os.getenv("PRACTICE_FLUSH_MAX_ATTEMPTS", "3"))
+
+PRACTICE_PREFIXES = ("jamb", "waec", "university")
+
+CHARGE_FREE = "free"
+CHARGE_PAID = "paid"
+
+_CHARGE_COLUMNS = {
+    CHARGE_FREE: "free_questions_remaining",
+    CHARGE_PAID: "paid_question_credits",
+}
+
+
+class PracticeRepository:
+    def __init__(self, prefix: str, *, write_behind: bool = PRACTICE_WRITE_BEHIND):
+        if prefix not in PRACTICE_PREFIXES:
+            raise ValueError(f"Unknown practice prefix: {prefix}")
+
+        self.prefix = prefix
+        self.write_behind = write_behind
+        self._access = f"{prefix}_user_access"
+        self._history = f"{prefix}_user_topic_history"
+        self._sessions = f"{prefix}_sessions"
+        self._attempts = f"{prefix}_attempts"
+        self._paper = f"{prefix}_session_questions"
+
+        self._pending: List[Dict[str, Any]] = []
+        self._dropped = 0
+        self._flush_lock = asyncio.Lock()
+        self._flusher: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+    # --------------------------------------------------------
+    # Serve
+    # --------------------------------------------------------
+    async def record_served(
+        self,
+        *,
+        session_id: Optional[int],
+        user_id: int,
+        subject_code: str,
+        topic_id: str,
+        question_id: str,
+        charge: Optional[str],
+    ) -> bool:
+        """
+        A question was served. charge="free"/"paid" takes one question
+        from that balance and records topic history; charge=None (mock
+        papers, already paid for) only counts it as served.
+        Returns False, writing nothing, when the balance is empty.
+        """
+        params = {
+            "session_id": int(session_id) if session_id else None,
+            "user_id": int(user_id),
+            "subject_code": subject_code,
+            "topic_id": topic_id,
+            "question_id": str(question_id),
+        }
+
+        if charge is None:
+            if not session_id:
+                return True
+            async with get_async_session() as session:
+                async with session.begin():
+                    await session.execute(
+                        text(f"""
+                            update {self._sessions}
+                            set questions_served = questions_served + 1
+                            where id = :session_id
+                        """),
+                        {"session_id": params["session_id"]},
+                    )
+            return True
+
+        column = _CHARGE_COLUMNS[charge]
+        async with get_async_session() as session:
+            async with session.begin():
+                result = await session.execute(
+                    text(f"""
+                        with charged as (
+                            update {self._access}
+                            set
+                                {column} = {column} - 1,
+                                total_questions_used = total_questions_used + 1,
+                                updated_at = now()
+                            where user_id = :user_id
+                              and {column} > 0
+                            returning user_id
+                        ),
+                        history as (
+                            insert into {self._history} (
+                                user_id,
+                                subject_code,
+                                topic_id,
+                                question_id
+                            )
+                            select :user_id, :subject_code, :topic_id, :question_id
+                            where exists (select 1 from charged)
+                            on conflict (user_id, subject_code, topic_id, question_id) do nothing
+                        ),
+                        served as (
+                            update {self._sessions}
+                            set questions_served = questions_served + 1
+                            where id = :session_id
+                              and exists (select 1 from charged)
+                        )
+                        select exists (select 1 from charged) as charged
+                    """),
+                    params,
+                )
+                return bool(result.scalar_one())
+
+    # --------------------------------------------------------
+    # Answer
+    # --------------------------------------------------------
+    async def record_answer(
+        self,
+        *,
+        session_id: int,
+        user_id: int,
+        subject_code: str,
+        topic_id: str,
+        question_id: str,
+        selected_option: str,
+        correct_option: str,
+        is_correct: bool,
+        question_order: Optional[int] = None,
+    ) -> None:
+        """
+        Attempt row + session counter + (mock) paper row, in one
+        statement. question_order is given for mock papers only.
+        """
+        row = {
+            "session_id": int(session_id),
+            "user_id": int(user_id),
+            "subject_code": subject_code,
+            "topic_id": topic_id,
+            "question_id": str(question_id),
+            "selected_option": selected_option,
+            "correct_option": correct_option,
+            "is_correct": bool(is_correct),
+            "question_order": int(question_order) if question_order is not None else None,
+        }
+
+        if self.write_behind:
+            self._pending.append(row)
+            self._ensure_flusher()
+            if len(self._pending) >= PRACTICE_FLUSH_MAX_ROWS and self._wakeup is not None:
+                self._wakeup.set()
+            return
+
+        async with get_async_session() as session:
+            async with session.begin():
+                await self._write_answers(session, [row])
+
+    async def _write_answers(self, session: AsyncSession, rows: List[Dict[str, Any]]) -> None:
+        await session.execute(
+            text(f"""
+                with a as (
+                    select *
+                    from unnest(
+                        cast(:session_ids as bigint[]),
+                        cast(:user_ids as bigint[]),
+                        cast(:subject_codes as text[]),
+                        cast(:topic_ids as text[]),
+                        cast(:question_ids as text[]),
+                        cast(:selected_options as text[]),
+                        cast(:correct_options as text[]),
+                        cast(:is_corrects as boolean[]),
+                        cast(:question_orders as integer[])
+                    ) as t(
+                        session_id,
+                        user_id,
+                        subject_code,
+                        topic_id,
+                        question_id,
+                        selected_option,
+                        correct_option,
+                        is_correct,
+                        question_order
+                    )
+                ),
+                attempts as (
+                    insert into {self._attempts} (
+                        session_id,
+                        user_id,
+                        subject_code,
+                        topic_id,
+                        question_id,
+                        selected_option,
+                        correct_option,
+                        is_correct
+                    )
+                    select
+                        session_id,
+                        user_id,
+                        subject_code,
+                        topic_id,
+                        question_id,
+                        selected_option,
+                        correct_option,
+                        is_correct
+                    from a
+                ),
+                counters as (
+                    update {self._sessions} s
+                    set
+                        correct_count = s.correct_count + c.correct,
+                        wrong_count = s.wrong_count + c.wrong
+                    from (
+                        select
+                            session_id,
+                            count(*) filter (where is_correct) as correct,
+                            count(*) filter (where not is_correct) as wrong
+                        from a
+                        group by session_id
+                    ) c
+                    where s.id = c.session_id
+                )
+                update {self._paper} q
+                set
+                    selected_option = a.selected_option,
+                    is_correct = a.is_correct,
+                    updated_at = now()
+                from a
+                where a.question_order is not null
+                  and q.session_id = a.session_id
+                  and q.question_order = a.question_order
+            """),
+            {
+                "session_ids": [r["session_id"] for r in rows],
+                "user_ids": [r["user_id"] for r in rows],
+                "subject_codes": [r["subject_code"] for r in rows],
+                "topic_ids": [r["topic_id"] for r in rows],
+                "question_ids": [r["question_id"] for r in rows],
+                "selected_options": [r["selected_option"] for r in rows],
+                "correct_options": [r["correct_option"] for r in rows],
+                "is_corrects": [r["is_correct"] for r in rows],
+                "question_orders": [r["question_order"] for r in rows],
+            },
+        )
+
+    # --------------------------------------------------------
+    # Write-behind
+    # --------------------------------------------------------
+    def _ensure_flusher(self) -> None:
+        if self._flusher is not None and not self._flusher.done():
+            return
+        self._wakeup = asyncio.Event()
+        self._flusher = asyncio.get_running_loop().create_task(
+            self._flush_loop(), name=f"PracticeWriter:{self.prefix}"
+        )
+
+    async def _flush_loop(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=PRACTICE_FLUSH_MS / 1000.0)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.sync()
+
+    async def sync(self) -> None:
+        """
+        Write every buffered answer now. Failed batches stay buffered
+        and are retried on the next flush; rows past
+        PRACTICE_FLUSH_MAX_ATTEMPTS are retried one by one.
+
+        Always takes the flush lock, so a reader calling sync() while
+        the flusher is writing a batch waits until that batch commits.
+        """
+        async with self._flush_lock:
+            rows, self._pending = self._pending, []
+            if not rows:
+                return
+            try:
+                async with get_async_session() as session:
+                    async with session.begin():
+                        await self._write_answers(session, rows)
+            except Exception:
+                logger.exception(
+                    "❌ Practice write-behind flush failed | prefix=%s | rows=%s",
+                    self.prefix,
+                    len(rows),
+                )
+                for row in rows:
+                    row["attempts"] = row.get("attempts", 0) + 1
+                if any(row["attempts"] >= PRACTICE_FLUSH_MAX_ATTEMPTS for row in rows):
+                    rows = await self._write_one_by_one(rows)
+                self._pending[:0] = rows
+
+    async def _write_one_by_one(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Isolate the rows that keep a batch failing. Returns the rows to
+        keep buffered: the ones under the attempt limit, and everything
+        from the first connection-level error on (the database is down,
+        not the row bad).
+        """
+        keep: List[Dict[str, Any]] = []
+        for i, row in enumerate(rows):
+            if row["attempts"] < PRACTICE_FLUSH_MAX_ATTEMPTS:
+                keep.append(row)
+                continue
+            try:
+                async with get_async_session() as session:
+                    async with session.begin():
+                        await self._write_answers(session, [row])
+            except (OperationalError, InterfaceError):
+                logger.exception("❌ Practice write-behind row retry failed | prefix=%s", self.prefix)
+                keep.extend(rows[i:])
+                return keep
+            except DBAPIError as e:
+                self._dropped += 1
+                logger.error(
+                    "❌ Practice answer dropped, rejected by the database | prefix=%s | session_id=%s"
+                    " | user_id=%s | question_id=%s | question_order=%s | error=%s",
+                    self.prefix,
+                    row["session_id"],
+                    row["user_id"],
+                    row["question_id"],
+                    row["question_order"],
+                    e.orig if e.orig is not None else e,
+                )
+            except Exception:
+                logger.exception("❌ Practice write-behind row retry failed | prefix=%s", self.prefix)
+                keep.extend(rows[i:])
+                return keep
+        return keep
+
+    async def stop(self) -> None:
+        task, self._flusher = self._flusher, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        await self.sync()
+        if self._pending:
+            logger.error(
+                "❌ Practice answers not written at shutdown | prefix=%s | rows=%s",
+                self.prefix,
+                len(self._pending),
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "write_behind": self.write_behind,
+            "pending": len(self._pending),
+            "dropped": self._dropped,
+        }
+
+
+JAMB_PRACTICE = PracticeRepository("jamb")
+WAEC_PRACTICE = PracticeRepository("waec")
+UNIVERSITY_PRACTICE = PracticeRepository("university")
+
+
+_REPOSITORIES = (JAMB_PRACTICE, WAEC_PRACTICE, UNIVERSITY_PRACTICE)
+
+
+async def stop_practice_writers() -> None:
+    """Shutdown hook: stop the flush tasks and write what is buffered."""
+    for repo in _REPOSITORIES:
+        await repo.stop()
+
+
+def practice_writer_stats() -> Dict[str, Any]:
+    return {repo.prefix: repo.stats() for repo in _REPOSITORIES}
@@ -105,3 +105,75 @@ async def get_seen_question_keys_for_users(
     return {str(row[0]) for row in res.fetchall()}
 
 
+async def get_seen_question_stats_for_users(
+    session: AsyncSession,
+    *,
+    tg_ids: Iterable[int],
+    source_type: str,
+    category: str,
+    total_questions: int,
+) -> tuple[dict[int, int], set[str]]:
+    """
+    One round trip for multi-player question picking.
+
+    Returns:
+    - seen_counts: tg_id -> COUNT(DISTINCT question_key) (0 for players with no history)
+    - excluded_keys: union of seen keys, only from players who have NOT
+      exhausted the bank (seen_count < total_questions)
+    """
+    tg_ids = [int(x) for x in tg_ids]
+    if not tg_ids:
+        return {}, set()
+
+    res = await session.execute(
+        text("""
+            WITH history AS (
+                SELECT tg_id, question_key
+                FROM user_question_history
+                WHERE tg_id = ANY(:tg_ids)
+                  AND source_type = :source_type
+                  AND category = :category
+            ),
+            per_player AS (
+                SELECT tg_id, COUNT(DISTINCT question_key) AS seen_count
+                FROM history
+                GROUP BY tg_id
+            )
+            SELECT tg_id, seen_count, NULL::text AS question_key
+            FROM per_player
+
+            UNION ALL
+
+            SELECT DISTINCT NULL::bigint, NULL::bigint, h.question_key
+            FROM history h
+            JOIN per_player p ON p.tg_id = h.tg_id
+            WHERE p.seen_count < :total_questions
+        """),
+        {
+            "tg_ids": tg_ids,
+            "source_type": source_type,
+            "category": category,
+            "total_questions": int(total_questions),
+        },
+    )
+    return split_seen_question_stats(tg_ids, res.fetchall())
+
+
+def split_seen_question_stats(
+    tg_ids: Iterable[int],
+    rows: Iterable,
+) -> tuple[dict[int, int], set[str]]:
+    """
+    Split get_seen_question_stats_for_users rows into
+    (per-player seen counts, excluded question keys).
+    """
+    seen_counts = {int(x): 0 for x in tg_ids}
+    excluded_keys: set[str] = set()
+
+    for row in rows:
+        if row.tg_id is not None:
+            seen_counts[int(row.tg_id)] = int(row.seen_count or 0)
+        elif row.question_key is not None:
+            excluded_keys.add(str(row.question_key))
+
+    return seen_counts, excluded_keys
@@ -0,0 +1,78 @@
+# ====================================================================
+# services/room_broadcast.py
+# Fan-out delivery for multiplayer rooms (challenge, battle, Mock JAMB /
+# Mock WAEC rooms).
+#
+# The caller loads whatever is shared (question, result text) once and
+# passes one `send(user_id)` coroutine factory; every player's send is
+# started together, at most ROOM_BROADCAST_CONCURRENCY at a time, so
+# the last player of a full room gets the question right after the
+# first. One failing player never stops the others. The result carries
+# the per-player completion time, for bulk "sent_at" writes.
+#
+# Pacing against Telegram limits stays with send_scheduler; this only
+# decides what is handed to it concurrently.
+# ====================================================================
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, Iterable
+
+logger = logging.getLogger("room_broadcast")
+
+ROOM_BROADCAST_CONCURRENCY = int(os.getenv("ROOM_BROADCAST_CONCURRENCY", "25"))
+
+
+@dataclass(slots=True)
+class BroadcastResult:
+    delivered: Dict[int, Any] = field(default_factory=dict)        # user_id -> send() result
+    sent_at: Dict[int, datetime] = field(default_factory=dict)     # user_id -> completion time
+    failed: Dict[int, BaseException] = field(default_factory=dict)  # user_id -> error
+
+
+async def broadcast_to_room(
+    user_ids: Iterable[int],
+    send: Callable[[int], Awaitable[Any]],
+    *,
+    label: str = "room",
+    concurrency: int = ROOM_BROADCAST_CONCURRENCY,
+) -> BroadcastResult:
+    """
+    Run send(user_id) for every player concurrently (bounded), isolating
+    errors per player. Duplicate / empty ids are dropped.
+    """
+    targets = list(dict.fromkeys(int(uid) for uid in user_ids if uid))
+    result = BroadcastResult()
+    if not targets:
+        return result
+
+    semaphore = asyncio.Semaphore(max(1, int(concurrency)))
+
+    async def _one(user_id: int) -> None:
+        async with semaphore:
+            try:
+                result.delivered[user_id] = await send(user_id)
+                result.sent_at[user_id] = datetime.now(timezone.utc)
+            except Exception as e:
+                result.failed[user_id] = e
+                logger.error(
+                    "❌ Room broadcast failed | label=%s | user_id=%s | error=%s",
+                    label,
+                    user_id,
+                    e,
+                )
+
+    await asyncio.gather(*(_one(uid) for uid in targets))
+
+    if result.failed:
+        logger.warning(
+            "⚠️ Room broadcast partial | label=%s | delivered=%s | failed=%s",
+            label,
+            len(result.delivered),
+            len(result.failed),
+        )
+    return result
@@ -0,0 +1,309 @@
+# ====================================================================
+# services/seen_bitmap_service.py
+# Compact per-user, per-category "seen questions" bitmaps.
+#
+# Bit n is set when the question with dense ordinal n (position in the
+# category's deterministic order) has been served to the user.
+# Layout matches Postgres set_bit()/get_bit() on bytea:
+#   bit n -> byte n // 8, mask 1 << (n % 8)
+#
+# Rows live in user_question_seen_bitmaps next to user_question_history.
+# `version` fingerprints the category ordering; when questions.json
+# changes, the bitmap is rebuilt once from user_question_history.
+#
+# The per-process LRU only ever holds committed state: bitmaps changed
+# (marked, rebuilt) inside a transaction are kept in session.info and
+# cached after that transaction commits; a rollback drops them and
+# forgets the cached copy. With several workers (WEB_CONCURRENCY > 1)
+# another worker may have set bits since, so a cached bitmap is
+# revalidated against its row (one constant-size SELECT) before use.
+# ====================================================================
+from __future__ import annotations
+
+import os
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from services.question_history_service import get_seen_question_keys
+
+SEEN_BITMAP_CACHE_SIZE = int(os.getenv("SEEN_BITMAP_CACHE_SIZE", "5000"))
+SEEN_BITMAP_SINGLE_WORKER = int(os.getenv("WEB_CONCURRENCY", "1") or "1") <= 1
+
+_PENDING_KEY = "seen_bitmap_pending"
+
+_CacheKey = Tuple[int, str, str]
+_cache: "OrderedDict[_CacheKey, SeenBitmap]" = OrderedDict()
+
+
+# ------------------------------------------------------------
+# In-memory bitmap
+# ------------------------------------------------------------
+@dataclass(slots=True)
+class SeenBitmap:
+    version: str
+    size: int
+    bits: bytearray
+
+    @classmethod
+    def empty(cls, version: str, size: int) -> "SeenBitmap":
+        return cls(version=version, size=size, bits=bytearray((size + 7) // 8))
+
+    def is_seen(self, ordinal: int) -> bool:
+        return bool(self.bits[ordinal >> 3] & (1 << (ordinal & 7)))
+
+    def copy(self) -> "SeenBitmap":
+        return SeenBitmap(version=self.version, size=self.size, bits=bytearray(self.bits))
+
+    def mark(self, ordinal: int) -> None:
+        self.bits[ordinal >> 3] |= 1 << (ordinal & 7)
+
+    def seen_count(self) -> int:
+        return int.from_bytes(self.bits, "little").bit_count()
+
+    def first_unseen(self) -> Optional[int]:
+        """
+        Lowest ordinal whose bit is clear, or None when every question is seen.
+        """
+        value = int.from_bytes(self.bits, "little")
+        free = ~value & ((1 << self.size) - 1)
+        if not free:
+            return None
+        return (free & -free).bit_length() - 1
+
+
+# ------------------------------------------------------------
+# LRU cache
+# ------------------------------------------------------------
+def _cache_get(key: _CacheKey) -> Optional[SeenBitmap]:
+    bitmap = _cache.get(key)
+    if bitmap is not None:
+        _cache.move_to_end(key)
+    return bitmap
+
+
+def _cache_put(key: _CacheKey, bitmap: SeenBitmap) -> None:
+    _cache[key] = bitmap
+    _cache.move_to_end(key)
+    while len(_cache) > SEEN_BITMAP_CACHE_SIZE:
+        _cache.popitem(last=False)
+
+
+def forget_seen_bitmap(*, tg_id: int, source_type: str, category: str) -> None:
+    _cache.pop((int(tg_id), source_type, category), None)
+
+
+def _pending(session: AsyncSession) -> Dict[_CacheKey, SeenBitmap]:
+    return session.info.setdefault(_PENDING_KEY, {})
+
+
+@event.listens_for(Session, "after_commit")
+def _cache_committed(sync_session: Session) -> None:
+    pending = sync_session.info.pop(_PENDING_KEY, None)
+    if not pending:
+        return
+    for key, bitmap in pending.items():
+        _cache_put(key, bitmap)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_uncommitted(sync_session: Session) -> None:
+    pending = sync_session.info.pop(_PENDING_KEY, None)
+    if not pending:
+        return
+    for key in pending:
+        _cache.pop(key, None)
+
+
+# ------------------------------------------------------------
+# DB
+# ------------------------------------------------------------
+async def _upsert_full_bitmap(
+    session: AsyncSession,
+    *,
+    tg_id: int,
+    source_type: str,
+    category: str,
+    bitmap: SeenBitmap,
+) -> None:
+    await session.execute(
+        text("""
+            INSERT INTO user_question_seen_bitmaps (
+                tg_id,
+                source_type,
+                category,
+                version,
+                bits,
+                updated_at
+            )
+            VALUES (
+                :tg_id,
+                :source_type,
+                :category,
+                :version,
+                :bits,
+                NOW()
+            )
+            ON CONFLICT (tg_id, source_type, category)
+            DO UPDATE SET
+                version = EXCLUDED.version,
+                bits = EXCLUDED.bits,
+                updated_at = NOW()
+        """),
+        {
+            "tg_id": int(tg_id),
+            "source_type": source_type,
+            "category": category,
+            "version": bitmap.version,
+            "bits": bytes(bitmap.bits),
+        },
+    )
+
+
+async def load_seen_bitmap(
+    session: AsyncSession,
+    *,
+    tg_id: int,
+    source_type: str,
+    category: str,
+    version: str,
+    ordinals: Dict[str, int],
+) -> SeenBitmap:
+    """
+    Seen bitmap for one user/category. Callers must not mutate it.
+
+    Changed in this transaction -> that copy, no DB work.
+    Cache hit (single worker)   -> no DB work.
+    Row up to date              -> one constant-size SELECT.
+    Missing / stale             -> one-time rebuild from user_question_history,
+                                   persisted (cached once committed).
+    """
+    key = (int(tg_id), source_type, category)
+    size = len(ordinals)
+
+    own = session.info.get(_PENDING_KEY, {}).get(key)
+    if own is not None and own.version == version:
+        return own
+
+    cached = _cache_get(key)
+    if cached is not None and cached.version == version and SEEN_BITMAP_SINGLE_WORKER:
+        return cached
+
+    res = await session.execute(
+        text("""
+            SELECT version, bits
+            FROM user_question_seen_bitmaps
+            WHERE tg_id = :tg_id
+              AND source_type = :source_type
+              AND category = :category
+            LIMIT 1
+        """),
+        {
+            "tg_id": int(tg_id),
+            "source_type": source_type,
+            "category": category,
+        },
+    )
+    row = res.first()
+
+    if row and row.version == version and len(row.bits) == (size + 7) // 8:
+        if cached is not None and cached.version == version and cached.bits == row.bits:
+            return cached
+        bitmap = SeenBitmap(version=version, size=size, bits=bytearray(row.bits))
+        _cache_put(key, bitmap)
+        return bitmap
+
+    seen_keys = await get_seen_question_keys(
+        session,
+        tg_id=int(tg_id),
+        source_type=source_type,
+        category=category,
+    )
+
+    bitmap = SeenBitmap.empty(version, size)
+    for question_key in seen_keys:
+        ordinal = ordinals.get(question_key)
+        if ordinal is not None:
+            bitmap.mark(ordinal)
+
+    await _upsert_full_bitmap(
+        session,
+        tg_id=tg_id,
+        source_type=source_type,
+        category=category,
+        bitmap=bitmap,
+    )
+
+    _pending(session)[key] = bitmap
+    return bitmap
+
+
+async def mark_question_seen(
+    session: AsyncSession,
+    *,
+    tg_id: int,
+    source_type: str,
+    category: str,
+    version: str,
+    ordinals: Dict[str, int],
+    question_key: str,
+) -> None:
+    """
+    Set one bit in the DB (atomic set_bit, so concurrent writers never
+    lose each other's bits). The merged row comes back via RETURNING
+    and replaces the cached bitmap once the transaction commits.
+    """
+    ordinal = ordinals.get(str(question_key))
+    if ordinal is None:
+        return
+
+    key = (int(tg_id), source_type, category)
+    bitmap = (await load_seen_bitmap(
+        session,
+        tg_id=tg_id,
+        source_type=source_type,
+        category=category,
+        version=version,
+        ordinals=ordinals,
+    )).copy()
+    bitmap.mark(ordinal)
+    _pending(session)[key] = bitmap
+
+    res = await session.execute(
+        text("""
+            UPDATE user_question_seen_bitmaps
+            SET bits = set_bit(bits, :ordinal, 1),
+                updated_at = NOW()
+            WHERE tg_id = :tg_id
+              AND source_type = :source_type
+              AND category = :category
+              AND version = :version
+            RETURNING bits
+        """),
+        {
+            "tg_id": int(tg_id),
+            "source_type": source_type,
+            "category": category,
+            "version": version,
+            "ordinal": int(ordinal),
+        },
+    )
+    row = res.first()
+
+    if row is None:
+        # Row vanished or was rebuilt under another version: write ours.
+        await _upsert_full_bitmap(
+            session,
+            tg_id=tg_id,
+            source_type=source_type,
+            category=category,
+            bitmap=bitmap,
+        )
+        return
+
+    if len(row.bits) == len(bitmap.bits):
+        bitmap.bits[:] = row.bits
@@ -0,0 +1,338 @@
+# ====================================================================
+# services/timer_wheel.py
+# One process-wide hierarchical timer wheel for question deadlines,
+# exam end times and coarse countdown ticks.
+#
+# Instead of one sleeping asyncio task per player (or two, for trivia),
+# timers are slotted into wheels and a single ticker task fires every
+# due timer of a tick together.
+#
+#   level 0: 64 slots x 1s      (next ~1 minute)
+#   level 1: 64 slots x 64s     (next ~68 minutes)
+#   level 2: 64 slots x 4096s   (next ~3 days)
+#   beyond:  overflow list, cascaded down as the wheel turns
+#
+# Timers are addressed by (kind, key). A handler is registered per kind
+# and receives (key, payload) when the timer fires, so rebuilt timers
+# (services/deadline_service.py) need no live Python objects.
+#
+# Countdowns tick on shared COUNTDOWN_TICK_SECONDS boundaries, so every
+# running countdown is refreshed in the same batch.
+#
+# A timer may carry a claim() coroutine: it is awaited when the timer is
+# due and the handler only runs if it returns True (used for deadlines
+# every worker re-arms after a restart, so only one of them fires it).
+# ====================================================================
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+import os
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, Union
+
+logger = logging.getLogger("timer_wheel")
+
+TICK_SECONDS = 1.0
+WHEEL_BITS = 6
+WHEEL_SLOTS = 1 << WHEEL_BITS
+WHEEL_LEVELS = 3
+
+COUNTDOWN_TICK_SECONDS = int(os.getenv("COUNTDOWN_TICK_SECONDS", "5"))
+TIMER_WHEEL_MAX_CONCURRENCY = int(os.getenv("TIMER_WHEEL_MAX_CONCURRENCY", "50"))
+
+COUNTDOWN_KIND = "countdown"
+
+TimerKey = Tuple[str, str]
+TimerHandler = Callable[[str, Any], Awaitable[None]]
+TimerClaim = Callable[[], Awaitable[bool]]
+# on_tick(remaining_seconds) -> False to stop the countdown early
+CountdownTick = Callable[[int], Awaitable[bool]]
+
+When = Union[datetime, float, int]
+
+
+def _to_epoch(when: When) -> float:
+    if isinstance(when, datetime):
+        return when.timestamp()
+    return float(when)
+
+
+class _Timer:
+    __slots__ = ("kind", "key", "due_tick", "payload", "claim", "cancelled")
+
+    def __init__(self, kind: str, key: str, due_tick: int, payload: Any, claim: Optional[TimerClaim] = None):
+        self.kind = kind
+        self.key = key
+        self.due_tick = due_tick
+        self.payload = payload
+        self.claim = claim
+        self.cancelled = False
+
+
+class _Countdown:
+    __slots__ = ("deadline", "on_tick", "interval")
+
+    def __init__(self, deadline: float, on_tick: CountdownTick, interval: int):
+        self.deadline = deadline
+        self.on_tick = on_tick
+        self.interval = interval
+
+
+class TimerWheel:
+    def __init__(self, *, max_concurrency: int = TIMER_WHEEL_MAX_CONCURRENCY):
+        self._wheels: List[List[List[_Timer]]] = [
+            [[] for _ in range(WHEEL_SLOTS)] for _ in range(WHEEL_LEVELS)
+        ]
+        self._overflow: List[_Timer] = []
+        self._timers: Dict[TimerKey, _Timer] = {}
+        self._countdowns: Dict[str, _Countdown] = {}
+        self._handlers: Dict[str, TimerHandler] = {COUNTDOWN_KIND: self._run_countdown}
+        self._current_tick = self._elapsed_tick(time.time())
+        self._task: Optional[asyncio.Task] = None
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+        self._fired = 0
+        self._failed = 0
+        self._skipped = 0
+        self._last_batch = 0
+
+    # --------------------------------------------------------
+    # Public API
+    # --------------------------------------------------------
+    def register_handler(self, kind: str, handler: TimerHandler) -> None:
+        self._handlers[kind] = handler
+
+    def schedule(
+        self,
+        kind: str,
+        key: str,
+        when: When,
+        payload: Any = None,
+        *,
+        claim: Optional[TimerClaim] = None,
+    ) -> None:
+        """
+        Fire handler(kind)(key, payload) at `when` (datetime or epoch seconds).
+        Re-scheduling the same (kind, key) replaces the previous timer;
+        a time in the past fires on the next tick. With `claim`, the
+        handler runs only if `await claim()` returns True.
+        """
+        self.cancel(kind, key)
+
+        due_tick = max(self._tick_for(_to_epoch(when)), self._current_tick + 1)
+        timer = _Timer(kind, str(key), due_tick, payload, claim)
+        self._timers[(kind, timer.key)] = timer
+        self._place(timer)
+
+    def cancel(self, kind: str, key: str) -> bool:
+        timer = self._timers.pop((kind, str(key)), None)
+        if timer is None:
+            return False
+        timer.cancelled = True
+        return True
+
+    def is_scheduled(self, kind: str, key: str) -> bool:
+        return (kind, str(key)) in self._timers
+
+    def schedule_countdown(
+        self,
+        key: str,
+        deadline: When,
+        on_tick: CountdownTick,
+        *,
+        interval: int = COUNTDOWN_TICK_SECONDS,
+    ) -> None:
+        """
+        Call on_tick(remaining_seconds) on every shared `interval` boundary
+        before `deadline`. Stops at the deadline, on cancel_countdown(key),
+        or when on_tick returns False.
+        """
+        key = str(key)
+        countdown = _Countdown(_to_epoch(deadline), on_tick, interval)
+        self._countdowns[key] = countdown
+        self._arm_countdown(key, countdown)
+
+    def cancel_countdown(self, key: str) -> bool:
+        key = str(key)
+        self.cancel(COUNTDOWN_KIND, key)
+        return self._countdowns.pop(key, None) is not None
+
+    def start(self) -> None:
+        if self._task is not None and not self._task.done():
+            return
+        self._task = asyncio.get_running_loop().create_task(self._run(), name="TimerWheel")
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is None:
+            return
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    def stats(self) -> Dict[str, Any]:
+        by_kind: Dict[str, int] = {}
+        for kind, _ in self._timers:
+            by_kind[kind] = by_kind.get(kind, 0) + 1
+        return {
+            "scheduled": len(self._timers),
+            "countdowns": len(self._countdowns),
+            "by_kind": by_kind,
+            "fired": self._fired,
+            "failed": self._failed,
+            "skipped": self._skipped,
+            "last_batch": self._last_batch,
+            "running": self._task is not None and not self._task.done(),
+        }
+
+    # --------------------------------------------------------
+    # Wheel internals
+    # --------------------------------------------------------
+    @staticmethod
+    def _tick_for(epoch: float) -> int:
+        # First tick at or after `epoch` (timers never fire early)
+        return int(math.ceil(epoch / TICK_SECONDS))
+
+    @staticmethod
+    def _elapsed_tick(epoch: float) -> int:
+        # Last tick whose time has come
+        return int(math.floor(epoch / TICK_SECONDS))
+
+    @staticmethod
+    def _next_boundary(now: float, interval: int) -> float:
+        return (math.floor(now / interval) + 1) * interval
+
+    def _place(self, timer: _Timer) -> None:
+        delta = timer.due_tick - self._current_tick
+        for level in range(WHEEL_LEVELS):
+            if delta < (1 << (WHEEL_BITS * (level + 1))):
+                slot = (timer.due_tick >> (WHEEL_BITS * level)) & (WHEEL_SLOTS - 1)
+                self._wheels[level][slot].append(timer)
+                return
+        self._overflow.append(timer)
+
+    def _cascade(self) -> None:
+        """
+        On a level-0 wrap, move the next slot of each higher level down
+        (and the overflow once the top level wraps).
+        """
+        for level in range(1, WHEEL_LEVELS):
+            slot = (self._current_tick >> (WHEEL_BITS * level)) & (WHEEL_SLOTS - 1)
+            bucket = self._wheels[level][slot]
+            self._wheels[level][slot] = []
+            for timer in bucket:
+                if not timer.cancelled:
+                    self._place(timer)
+            if slot != 0:
+                return
+
+        overflow, self._overflow = self._overflow, []
+        for timer in overflow:
+            if not timer.cancelled:
+                self._place(timer)
+
+    def _advance(self) -> List[_Timer]:
+        """
+        Move to the next tick and return the timers due on it.
+        """
+        self._current_tick += 1
+        if self._current_tick & (WHEEL_SLOTS - 1) == 0:
+            self._cascade()
+
+        slot = self._current_tick & (WHEEL_SLOTS - 1)
+        bucket = self._wheels[0][slot]
+        self._wheels[0][slot] = []
+
+        due: List[_Timer] = []
+        for timer in bucket:
+            if timer.cancelled:
+                continue
+            if timer.due_tick > self._current_tick:
+                # Placed a full rotation ahead; keep it for later.
+                self._place(timer)
+                continue
+            if self._timers.get((timer.kind, timer.key)) is timer:
+                del self._timers[(timer.kind, timer.key)]
+            due.append(timer)
+        return due
+
+    async def _run(self) -> None:
+        logger.info("⏱ Timer wheel started")
+        while True:
+            target_tick = self._elapsed_tick(time.time())
+
+            batch: List[_Timer] = []
+            while self._current_tick < target_tick:
+                batch.extend(self._advance())
+
+            if batch:
+                self._last_batch = len(batch)
+                for timer in batch:
+                    asyncio.get_running_loop().create_task(self._fire(timer))
+
+            next_at = (self._current_tick + 1) * TICK_SECONDS
+            await asyncio.sleep(max(0.0, next_at - time.time()))
+
+    async def _fire(self, timer: _Timer) -> None:
+        handler = self._handlers.get(timer.kind)
+        if handler is None:
+            logger.warning("⚠️ No timer handler for kind=%s key=%s", timer.kind, timer.key)
+            return
+
+        async with self._semaphore:
+            try:
+                if timer.claim is not None and not await timer.claim():
+                    self._skipped += 1
+                    return
+                await handler(timer.key, timer.payload)
+                self._fired += 1
+            except Exception:
+                self._failed += 1
+                logger.exception("❌ Timer handler failed | kind=%s | key=%s", timer.kind, timer.key)
+
+    def _arm_countdown(self, key: str, countdown: _Countdown) -> None:
+        next_at = self._next_boundary(time.time(), countdown.interval)
+        if next_at >= countdown.deadline:
+            self.cancel(COUNTDOWN_KIND, key)
+            if self._countdowns.get(key) is countdown:
+                del self._countdowns[key]
+            return
+
+        self.schedule(COUNTDOWN_KIND, key, next_at, payload=countdown)
+
+    async def _run_countdown(self, key: str, countdown: _Countdown) -> None:
+        if self._countdowns.get(key) is not countdown:
+            return
+
+        remaining = int(round(countdown.deadline - time.time()))
+        keep_going = remaining > 0 and await countdown.on_tick(remaining)
+
+        # Cancelled or replaced while on_tick was running
+        if self._countdowns.get(key) is not countdown:
+            return
+
+        if keep_going is False:
+            del self._countdowns[key]
+            return
+
+        self._arm_countdown(key, countdown)
+
+
+# ====================================================================
+# SHARED INSTANCE
+# ====================================================================
+_WHEEL: Optional[TimerWheel] = None
+
+
+def get_timer_wheel() -> TimerWheel:
+    global _WHEEL
+
+    if _WHEEL is None:
+        _WHEEL = TimerWheel()
+
+    return _WHEEL
@@ -0,0 +1,488 @@
+# ====================================================================
+# state_persistence.py
+# Postgres-backed persistence for context.user_data (python-telegram-bot).
+#
+# Practice / exam flows keep batches, indexes and payment references in
+# user_data. Without persistence that state lives in one worker's
+# memory: a restart, or an update routed to another gunicorn worker,
+# loses it. This stores it in bot_user_state (one JSONB row per user,
+# with a version bumped on every write):
+#
+#   refresh_user_data  -> before every update. Compares the cached
+#                         version with the row's (the row's JSON is only
+#                         sent back when it changed); a newer version
+#                         written by another worker replaces user_data.
+#   update_user_data   -> every STATE_UPDATE_INTERVAL_SECONDS for users
+#                         touched since the last run. Unchanged state is
+#                         not written; changed users are upserted in one
+#                         batched statement.
+#
+# A per-process LRU (STATE_CACHE_MAX_ENTRIES) remembers the version and
+# encoded state of recent users (write-through). With one worker
+# (WEB_CONCURRENCY unset or 1, gunicorn's default) a cached user's
+# in-process state is always current, so the version check only runs
+# for users not cached yet (first update after a restart). With several
+# workers it runs at most every STATE_REVALIDATE_SECONDS per user.
+#
+# Encoding keeps rows small and JSON-only:
+#   - exam question dicts (jp_/mj_/wp_/mw_/ut_ keys) are stored as
+#     (exam, subject, id) plus the fields that differ from the content
+#     store copy, and rebuilt from data/ when loaded;
+#   - datetime / date / set / Decimal / non-string dict keys are tagged;
+#   - anything else that is not JSON (objects, tasks) is not stored.
+# If a stored question no longer exists, that key is dropped on load and
+# the handler falls back to its DB recovery path.
+# ====================================================================
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+from sqlalchemy import text
+from telegram.ext import BasePersistence, PersistenceInput
+
+logger = logging.getLogger("state_persistence")
+
+STATE_PERSISTENCE_ENABLED = os.getenv("STATE_PERSISTENCE_ENABLED", "1").strip().lower() in ("1", "true", "yes")
+STATE_UPDATE_INTERVAL_SECONDS = float(os.getenv("STATE_UPDATE_INTERVAL_SECONDS", "1"))
+STATE_REVALIDATE_SECONDS = float(os.getenv("STATE_REVALIDATE_SECONDS", "2"))
+STATE_SINGLE_WORKER = int(os.getenv("WEB_CONCURRENCY", "1") or "1") <= 1
+STATE_CACHE_MAX_ENTRIES = int(os.getenv("STATE_CACHE_MAX_ENTRIES", "10000"))
+
+_TAG = "__t__"
+
+# user_data key prefix -> exam whose content store holds its questions
+_QUESTION_EXAMS = {
+    "jp_": "jamb",
+    "mj_": "jamb",
+    "wp_": "waec",
+    "mw_": "waec",
+    "ut_": "university",
+}
+
+
+class _NotStorable(Exception):
+    pass
+
+
+# ====================================================================
+# QUESTION REFERENCES
+# ====================================================================
+def _is_question(value: Any) -> bool:
+    return isinstance(value, dict) and "id" in value and "options" in value and "answer" in value
+
+
+def _question_locator(exam: str, question: Dict[str, Any], user_data: Mapping) -> Optional[list]:
+    if exam == "university":
+        category_code = user_data.get("ut_category_code")
+        subject_code = user_data.get("ut_subject_code")
+        if category_code and subject_code:
+            return [category_code, subject_code]
+        return None
+
+    subject_code = question.get("subject_code")
+    return [subject_code] if subject_code else None
+
+
+def _load_question(exam: str, locator: list, question_id: str) -> Optional[Dict[str, Any]]:
+    try:
+        if exam == "jamb":
+            from jamb_loader import get_question_by_id
+
+            return get_question_by_id(locator[0], question_id)
+        if exam == "waec":
+            from waec_loader import get_question_by_id
+
+            return get_question_by_id(locator[0], question_id)
+        if exam == "university":
+            from university_loader import get_university_question_by_id
+
+            return get_university_question_by_id(locator[0], locator[1], question_id)
+    except Exception:
+        return None
+    return None
+
+
+def _question_ref(exam: str, question: Dict[str, Any], user_data: Mapping) -> Optional[Dict[str, Any]]:
+    locator = _question_locator(exam, question, user_data)
+    if locator is None:
+        return None
+
+    canonical = _load_question(exam, locator, str(question["id"]))
+    if canonical is None:
+        return None
+
+    extra = {k: v for k, v in question.items() if k not in canonical or canonical[k] != v}
+    dropped = [k for k in canonical if k not in question]
+    return {
+        _TAG: "q",
+        "e": exam,
+        "l": locator,
+        "id": str(question["id"]),
+        "x": _encode(extra, None, user_data),
+        "d": dropped,
+    }
+
+
+# ====================================================================
+# ENCODING
+# ====================================================================
+def _encode(value: Any, exam: Optional[str], user_data: Mapping) -> Any:
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+
+    if isinstance(value, datetime):
+        return {_TAG: "dt", "v": value.isoformat()}
+    if isinstance(value, date):
+        return {_TAG: "date", "v": value.isoformat()}
+    if isinstance(value, Decimal):
+        return {_TAG: "dec", "v": str(value)}
+    if isinstance(value, (set, frozenset)):
+        return {_TAG: "set", "v": [_encode(v, exam, user_data) for v in value]}
+    if isinstance(value, (list, tuple)):
+        return [_encode(v, exam, user_data) for v in value]
+
+    if isinstance(value, dict):
+        if exam is not None and _is_question(value):
+            ref = _question_ref(exam, value, user_data)
+            if ref is not None:
+                return ref
+        if all(isinstance(k, str) for k in value) and _TAG not in value:
+            return {k: _encode(v, exam, user_data) for k, v in value.items()}
+        return {
+            _TAG: "map",
+            "v": [[_encode(k, exam, user_data), _encode(v, exam, user_data)] for k, v in value.items()],
+        }
+
+    raise _NotStorable(type(value).__name__)
+
+
+def encode_user_state(user_data: Mapping) -> Dict[str, Any]:
+    """
+    JSON-safe, compact copy of user_data. Keys whose value cannot be
+    stored are left out.
+    """
+    encoded: Dict[str, Any] = {}
+    for key, value in user_data.items():
+        if not isinstance(key, str):
+            continue
+        exam = _QUESTION_EXAMS.get(key[:3])
+        try:
+            encoded[key] = _encode(value, exam, user_data)
+        except _NotStorable as e:
+            logger.debug("user_data[%s] not persisted (%s)", key, e)
+    return encoded
+
+
+def _decode(value: Any) -> Any:
+    if isinstance(value, list):
+        return [_decode(v) for v in value]
+    if not isinstance(value, dict):
+        return value
+
+    tag = value.get(_TAG)
+    if tag is None:
+        return {k: _decode(v) for k, v in value.items()}
+    if tag == "dt":
+        return datetime.fromisoformat(value["v"])
+    if tag == "date":
+        return date.fromisoformat(value["v"])
+    if tag == "dec":
+        return Decimal(value["v"])
+    if tag == "set":
+        return {_decode(v) for v in value["v"]}
+    if tag == "map":
+        return {_decode(k): _decode(v) for k, v in value["v"]}
+    if tag == "q":
+        question = _load_question(value["e"], value["l"], value["id"])
+        if question is None:
+            raise KeyError(f"question {value['e']}:{value['id']} no longer available")
+        for key in value.get("d") or ():
+            question.pop(key, None)
+        question.update(_decode(value.get("x") or {}))
+        return question
+    raise ValueError(f"unknown state tag: {tag}")
+
+
+def decode_user_state(payload: Mapping) -> Dict[str, Any]:
+    decoded: Dict[str, Any] = {}
+    for key, value in payload.items():
+        try:
+            decoded[key] = _decode(value)
+        except Exception as e:
+            logger.warning("⚠️ Dropping stored user_data[%s]: %s", key, e)
+    return decoded
+
+
+def _dump(payload: Dict[str, Any]) -> str:
+    return json.dumps(payload, separators=(",", ":"), sort_keys=True, ensure_ascii=False)
+
+
+# ====================================================================
+# PERSISTENCE
+# ====================================================================
+@dataclass(slots=True)
+class _CachedState:
+    version: int
+    blob: Optional[str]
+    checked_at: float
+
+
+class PostgresPersistence(BasePersistence):
+    """
+    user_data only; chat_data, bot_data, callback data and conversations
+    are not used by this bot and are not stored.
+    """
+
+    def __init__(
+        self,
+        *,
+        update_interval: float = STATE_UPDATE_INTERVAL_SECONDS,
+        max_entries: int = STATE_CACHE_MAX_ENTRIES,
+    ):
+        super().__init__(
+            store_data=PersistenceInput(bot_data=False, chat_data=False, user_data=True, callback_data=False),
+            update_interval=update_interval,
+        )
+        self._cache: "OrderedDict[int, _CachedState]" = OrderedDict()
+        self._max_entries = max(1, int(max_entries))
+        self._dirty: Dict[int, str] = {}
+        self._write_lock = asyncio.Lock()
+        self._flush_task: Optional[asyncio.Task] = None
+
+        self._hits = 0
+        self._reloads = 0
+        self._writes = 0
+        self._unchanged = 0
+        self._errors = 0
+
+    # --------------------------------------------------------
+    # Cache
+    # --------------------------------------------------------
+    def _remember(self, user_id: int, version: int, blob: Optional[str]) -> None:
+        self._cache[user_id] = _CachedState(version, blob, time.monotonic())
+        self._cache.move_to_end(user_id)
+        while len(self._cache) > self._max_entries:
+            self._cache.popitem(last=False)
+
+    # --------------------------------------------------------
+    # Loading
+    # --------------------------------------------------------
+    async def get_user_data(self) -> Dict[int, Dict[str, Any]]:
+        # Loaded per user on first use (refresh_user_data), not all at startup
+        return {}
+
+    async def refresh_user_data(self, user_id: int, user_data: Dict[str, Any]) -> None:
+        from db import get_async_session
+
+        user_id = int(user_id)
+        if user_id in self._dirty:
+            # Our own unwritten state is the newest there is
+            return
+
+        cached = self._cache.get(user_id)
+        if cached is not None and (
+            STATE_SINGLE_WORKER
+            or time.monotonic() - cached.checked_at < STATE_REVALIDATE_SECONDS
+        ):
+            self._hits += 1
+            self._cache.move_to_end(user_id)
+            return
+
+        try:
+            async with get_async_session() as session:
+                res = await session.execute(
+                    text("""
+                        SELECT
+                            version,
+                            CASE WHEN version = :v THEN NULL ELSE data::text END AS data
+                        FROM bot_user_state
+                        WHERE user_id = :u
+                    """),
+                    {"u": user_id, "v": cached.version if cached is not None else -1},
+                )
+                row = res.mappings().first()
+        except Exception:
+            self._errors += 1
+            logger.warning("⚠️ bot_user_state unavailable, using in-process user_data | user_id=%s", user_id, exc_info=True)
+            return
+
+        if row is None:
+            if cached is not None and cached.version >= 0:
+                # Dropped by another worker
+                user_data.clear()
+            # Nothing stored yet: remember that, so the next update
+            # does not ask again (single worker) or not for a while.
+            self._remember(user_id, -1, None)
+            return
+
+        version = int(row["version"])
+        if cached is not None and row["data"] is None:
+            self._hits += 1
+            cached.checked_at = time.monotonic()
+            self._cache.move_to_end(user_id)
+            return
+
+        payload = json.loads(row["data"])
+        user_data.clear()
+        user_data.update(decode_user_state(payload))
+        self._reloads += 1
+        self._remember(user_id, version, _dump(payload))
+
+    # --------------------------------------------------------
+    # Writing
+    # --------------------------------------------------------
+    async def update_user_data(self, user_id: int, data: Dict[str, Any]) -> None:
+        user_id = int(user_id)
+        blob = _dump(encode_user_state(data))
+
+        last = self._dirty.get(user_id)
+        if last is None:
+            cached = self._cache.get(user_id)
+            last = cached.blob if cached is not None else None
+        if blob == last:
+            self._unchanged += 1
+            return
+
+        self._dirty[user_id] = blob
+        await self._flush_soon()
+
+    async def _flush_soon(self) -> None:
+        # Every update_user_data of one update_persistence run lands in
+        # the same batch: the flush starts after they have all queued.
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.get_running_loop().create_task(
+                self._flush_after_yield(), name="UserStateFlush"
+            )
+        await self._flush_task
+
+    async def _flush_after_yield(self) -> None:
+        await asyncio.sleep(0)
+        await self.flush()
+
+    async def flush(self) -> None:
+        """Write every dirty user in batched upserts."""
+        from db import get_async_session
+
+        async with self._write_lock:
+            while self._dirty:
+                batch, self._dirty = self._dirty, {}
+                try:
+                    async with get_async_session() as session:
+                        async with session.begin():
+                            res = await session.execute(
+                                text("""
+                                    INSERT INTO bot_user_state (user_id, data, version, updated_at)
+                                    SELECT u, CAST(d AS jsonb), 1, NOW()
+                                    FROM unnest(CAST(:uids AS bigint[]), CAST(:datas AS text[])) AS t(u, d)
+                                    ON CONFLICT (user_id)
+                                    DO UPDATE SET
+                                        data = EXCLUDED.data,
+                                        version = bot_user_state.version + 1,
+                                        updated_at = NOW()
+                                    RETURNING user_id, version
+                                """),
+                                {"uids": list(batch.keys()), "datas": list(batch.values())},
+                            )
+                            versions = {int(r[0]): int(r[1]) for r in res.fetchall()}
+                except Exception:
+                    self._errors += 1
+                    # Keep for the next run; newer state queued meanwhile wins
+                    for user_id, blob in batch.items():
+                        self._dirty.setdefault(user_id, blob)
+                    logger.warning("⚠️ Could not write user state | users=%s", len(batch), exc_info=True)
+                    return
+
+                self._writes += len(batch)
+                for user_id, blob in batch.items():
+                    if user_id in versions:
+                        self._remember(user_id, versions[user_id], blob)
+
+    async def drop_user_data(self, user_id: int) -> None:
+        from db import get_async_session
+
+        user_id = int(user_id)
+        self._dirty.pop(user_id, None)
+        self._cache.pop(user_id, None)
+        try:
+            async with get_async_session() as session:
+                async with session.begin():
+                    await session.execute(
+                        text("DELETE FROM bot_user_state WHERE user_id = :u"),
+                        {"u": user_id},
+                    )
+        except Exception:
+            self._errors += 1
+            logger.warning("⚠️ Could not drop user state | user_id=%s", user_id, exc_info=True)
+
+    # --------------------------------------------------------
+    # Not stored
+    # --------------------------------------------------------
+    async def get_chat_data(self) -> Dict[int, Dict[str, Any]]:
+        return {}
+
+    async def get_bot_data(self) -> Dict[str, Any]:
+        return {}
+
+    async def get_callback_data(self) -> None:
+        return None
+
+    async def get_conversations(self, name: str) -> Dict[Tuple[int, ...], object]:
+        return {}
+
+    async def update_conversation(self, name: str, key: Tuple[int, ...], new_state: Optional[object]) -> None:
+        return None
+
+    async def update_chat_data(self, chat_id: int, data: Dict[str, Any]) -> None:
+        return None
+
+    async def update_bot_data(self, data: Dict[str, Any]) -> None:
+        return None
+
+    async def update_callback_data(self, data: Any) -> None:
+        return None
+
+    async def drop_chat_data(self, chat_id: int) -> None:
+        return None
+
+    async def refresh_chat_data(self, chat_id: int, chat_data: Dict[str, Any]) -> None:
+        return None
+
+    async def refresh_bot_data(self, bot_data: Dict[str, Any]) -> None:
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "cached": len(self._cache),
+            "max_entries": self._max_entries,
+            "single_worker": STATE_SINGLE_WORKER,
+            "dirty": len(self._dirty),
+            "hits": self._hits,
+            "reloads": self._reloads,
+            "writes": self._writes,
+            "unchanged": self._unchanged,
+            "errors": self._errors,
+        }
+
+
+# ====================================================================
+# SHARED INSTANCE
+# ====================================================================
+_PERSISTENCE: Optional[PostgresPersistence] = None
+
+
+def get_state_persistence() -> Optional[PostgresPersistence]:
+    """None when STATE_PERSISTENCE_ENABLED is off (user_data in memory only)."""
+    global _PERSISTENCE
+
+    if _PERSISTENCE is None and STATE_PERSISTENCE_ENABLED:
+        _PERSISTENCE = PostgresPersistence()
+    return _PERSISTENCE
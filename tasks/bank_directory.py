@@ -0,0 +1,35 @@
+# =======================================================
+# tasks/bank_directory.py
+# =======================================================
+"""
+Bank directory task: refreshes the shared Flutterwave Nigerian bank
+list used by the Finance bank-account flow (at startup, then every
+BANK_DIRECTORY_REFRESH_SECONDS, default 6h).
+
+A failed refresh keeps the previous list and is retried after
+BANK_DIRECTORY_RETRY_SECONDS; handlers fetch on demand if the process
+has none yet.
+"""
+
+import asyncio
+
+from logger import logger
+from services.bank_directory import (
+    BANK_DIRECTORY_REFRESH_SECONDS,
+    BANK_DIRECTORY_RETRY_SECONDS,
+    get_bank_directory,
+)
+
+CHECK_INTERVAL_SECONDS = BANK_DIRECTORY_REFRESH_SECONDS
+
+
+async def bank_directory_loop():
+    """Loop that refreshes the bank directory every CHECK_INTERVAL_SECONDS."""
+    while True:
+        refreshed = False
+        try:
+            refreshed = await get_bank_directory().refresh()
+        except Exception as e:
+            logger.exception("Bank directory refresh task error: %s", e)
+
+        await asyncio.sleep(CHECK_INTERVAL_SECONDS if refreshed else BANK_DIRECTORY_RETRY_SECONDS)
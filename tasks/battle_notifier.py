@@ -9,6 +9,8 @@ from telegram import Bot, InlineKeyboardButton, InlineKeyboardMarkup
 
 from db import get_async_session
 from logger import logger
+from send_scheduler import PRIORITY_HIGH
+from services.room_broadcast import broadcast_to_room
 from services.battle_service import (
     get_expired_active_battles,
     close_unfinished_players,
@@ -66,20 +68,19 @@ async def process_finished_battles(bot: Bot):
             result_text = build_battle_result_text(result)
             keyboard = _battle_result_keyboard()
 
-            for tg_id in player_ids:
-                try:
-                    await bot.send_message(
-                        chat_id=tg_id,
-                        text=result_text,
-                        parse_mode="HTML",
-                        reply_markup=keyboard,
-                    )
-                except Exception:
-                    logger.exception(
-                        "❌ Failed to send battle result | room_code=%s | tg_id=%s",
-                        room_code,
-                        tg_id,
-                    )
+            # The send scheduler paces these per chat and globally,
+            # so all players are queued at once.
+            await broadcast_to_room(
+                player_ids,
+                lambda tg_id: bot.send_message(
+                    chat_id=tg_id,
+                    text=result_text,
+                    parse_mode="HTML",
+                    reply_markup=keyboard,
+                    rate_limit_args={"priority": PRIORITY_HIGH},
+                ),
+                label=f"battle:{room_code}:result",
+            )
 
             logger.info(
                 "✅ Battle finalized and announced | room_code=%s | battle_id=%s",
@@ -1,20 +1,29 @@
 # ==============================================================
 # tasks/notifier.py
 # AUTO-SEND AIRTIME + SMART RETRY + ADMIN ALERTS
-# Uses ClubKonnect via services/airtime_providers/service.py
+# Uses ClubKonnect via services/airtime_providers/service.py, sent by
+# the concurrent payout engine (services/airtime_providers/payout_engine.py)
 # ==============================================================
 from __future__ import annotations
 
 import os
-import json
 import asyncio
 
-from sqlalchemy import text
-from telegram import Bot, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.constants import ParseMode
 
-from db import get_async_session
+from bot_instance import bot
 from logger import logger
+from send_scheduler import PRIORITY_HIGH, send_priority
+from http_clients import get_http_clients
+from services.airtime_providers.payout_engine import (
+    AIRTIME_RETRY_COOLDOWN_MINUTES,
+    MAX_AIRTIME_RETRIES,
+    REVIEW_STATUS,
+    PayoutEngine,
+    PayoutJob,
+    PayoutOutcome,
+)
 from services.airtime_providers.service import send_airtime
 
 
@@ -24,15 +33,10 @@ ADMIN_USER_ID = int(os.getenv("ADMIN_USER_ID", "0"))
 if not BOT_TOKEN:
     raise RuntimeError("BOT_TOKEN not set")
 
-bot = Bot(token=BOT_TOKEN)
-
+# Restart delay if the payout engine crashes; it polls on its own
 AIRTIME_LOOP_SECONDS = 60
 RETRY_NOTIFICATIONS_SECONDS = 60 * 60
 
-MAX_AIRTIME_RETRIES = 3
-AIRTIME_RETRY_COOLDOWN_MINUTES = 10
-BATCH_SIZE = 10
-
 # Avoid spamming user/admin on every retry
 NOTIFY_USER_ON_FAILURE_EVERY_N_ATTEMPTS = 2   # user on 1st, 3rd, 5th...
 NOTIFY_ADMIN_ON_FAILURE_EVERY_N_ATTEMPTS = 1  # admin every failure
@@ -45,417 +49,175 @@ def _post_airtime_keyboard() -> InlineKeyboardMarkup:
     ])
 
 
-def _classify_failure(res) -> tuple[str, bool]:
-    """
-    Returns: (new_status, should_retry)
-    """
-    raw = (res.raw or {}) if hasattr(res, "raw") else {}
-    status = str(raw.get("status") or "").upper().strip()
-    msg = str(getattr(res, "message", "") or "").upper().strip()
-
-    if status == "INSUFFICIENT_BALANCE" or msg == "INSUFFICIENT_BALANCE":
-        return ("failed_needs_funding", False)
-
-    retryable = raw.get("retryable")
-    if isinstance(retryable, bool):
-        return ("failed_retryable", retryable)
-
-    http_status = raw.get("http_status")
-    try:
-        http_status = int(http_status) if http_status is not None else 0
-    except Exception:
-        http_status = 0
-
-    msg_lower = str(raw.get("message") or "").lower()
-
-    if http_status >= 500 or "non-json response" in msg_lower or "timeout" in msg_lower:
-        return ("failed_retryable", True)
-
-    return ("failed_permanent", False)
-
-
-def _resolve_success_status(res) -> str:
-    """
-    Distinguish between sent vs completed when provider reports success.
-    """
-    raw = (res.raw or {}) if hasattr(res, "raw") else {}
-
-    status_code = str(raw.get("statuscode") or raw.get("statusCode") or "").strip()
-    status_text = str(raw.get("status") or "").upper().strip()
-
-    if status_code == "200" or status_text in ("ORDER_COMPLETED", "COMPLETED", "SUCCESS"):
-        return "completed"
-
-    if status_code in ("100", "300") or status_text in ("ORDER_RECEIVED", "ORDER_PROCESSED"):
-        return "sent"
-
-    if getattr(res, "success", False):
-        return "sent"
-
-    return "failed"
-
-
-async def process_pending_airtime():
-    async with get_async_session() as session:
-        # --------------------------------------------------------
-        # Pick only payouts ready to send:
-        #
-        # 1. Fresh claims:
-        #    status = 'pending_claim' AND phone_number IS NOT NULL
-        #
-        # 2. Retryable failures:
-        #    status = 'failed_retryable' and cooldown elapsed
-        # --------------------------------------------------------
-        pick_sql = text(f"""
-            WITH picked AS (
-                SELECT id
-                FROM airtime_payouts
-                WHERE
-                    (
-                        (
-                            status = 'pending_claim'
-                            AND phone_number IS NOT NULL
-                        )
-                        OR (
-                            status = 'failed_retryable'
-                            AND phone_number IS NOT NULL
-                            AND COALESCE(retry_count, 0) < :max_retries
-                            AND (
-                                last_retry_at IS NULL
-                                OR last_retry_at < NOW() - INTERVAL '{AIRTIME_RETRY_COOLDOWN_MINUTES} minutes'
-                            )
-                        )
-                    )
-                ORDER BY created_at ASC
-                LIMIT :limit
-                FOR UPDATE SKIP LOCKED
-            )
-            SELECT
-                a.id,
-                a.status,
-                a.tg_id,
-                a.phone_number,
-                a.amount,
-                COALESCE(a.retry_count, 0) AS retry_count
-            FROM airtime_payouts a
-            JOIN picked p ON p.id = a.id
-        """)
+async def _notify_payout_result(job: PayoutJob, outcome: PayoutOutcome) -> None:
+    """User / admin messages once a payout outcome is written."""
+    payout_id = job.id
+    tg_id = job.tg_id
+    phone = job.phone
+    amount = job.amount
+    attempt_no = job.attempt_no
+    new_status = outcome.status
+    provider = outcome.provider or "clubkonnect"
+    ref = outcome.reference
+    raw = outcome.raw or {}
 
+    if outcome.success:
         try:
-            result = await session.execute(
-                pick_sql,
-                {
-                    "limit": BATCH_SIZE,
-                    "max_retries": MAX_AIRTIME_RETRIES,
-                },
+            if new_status == "completed":
+                user_text = (
+                    f"🎉 Your airtime of ₦{amount} has been delivered!\n"
+                    f"Phone: {phone}\n"
+                    f"Ref: {ref or 'N/A'}"
+                )
+            else:
+                user_text = (
+                    f"✅ Your airtime request for ₦{amount} has been accepted.\n"
+                    f"Phone: {phone}\n"
+                    f"Ref: {ref or 'N/A'}\n\n"
+                    "It is being delivered now."
+                )
+
+            await bot.send_message(
+                chat_id=tg_id,
+                text=user_text,
+                reply_markup=_post_airtime_keyboard(),
             )
-            rows = result.fetchall()
         except Exception:
-            logger.exception("❌ Failed to pick airtime payouts batch")
-            await session.rollback()
-            return
-
-        if not rows:
-            logger.debug("ℹ️ No airtime payouts ready for processing")
-            return
-
-        logger.info("📦 Picked %s airtime payout(s) for processing", len(rows))
-
-        for row in rows:
-            payout_id = row.id
-            current_status = row.status
-            tg_id = row.tg_id
-            phone = (row.phone_number or "").strip()
-            amount = int(row.amount or 0)
-            prev_retry_count = int(row.retry_count or 0)
-            attempt_no = prev_retry_count + 1
-
-            # ----------------------------------------------------
-            # Final sanity guard
-            # ----------------------------------------------------
-            if not phone:
-                logger.warning(
-                    "⚠️ Skipping payout with empty phone_number | payout_id=%s | tg_id=%s | status=%s",
-                    payout_id,
-                    tg_id,
-                    current_status,
-                )
-                continue
+            logger.exception(
+                "⚠️ Failed to notify user success | tg_id=%s | payout_id=%s",
+                tg_id,
+                payout_id,
+            )
 
-            if amount <= 0:
-                logger.error(
-                    "❌ Invalid payout amount | payout_id=%s | tg_id=%s | amount=%s",
+        if ADMIN_USER_ID:
+            try:
+                await bot.send_message(
+                    chat_id=ADMIN_USER_ID,
+                    text=(
+                        f"✅ Airtime processed ({new_status}): ₦{amount} → {phone}\n"
+                        f"user: {tg_id}\n"
+                        f"payout_id: {payout_id}\n"
+                        f"provider: {provider}\n"
+                        f"ref: {ref or 'N/A'}\n"
+                        f"msg: {outcome.message or ''}"
+                    ),
+                )
+            except Exception:
+                logger.exception(
+                    "⚠️ Failed to notify admin success | payout_id=%s",
                     payout_id,
-                    tg_id,
-                    amount,
                 )
-                try:
-                    await session.execute(
-                        text("""
-                            UPDATE airtime_payouts
-                            SET status = 'failed_permanent',
-                                provider_response = CAST(:response AS jsonb),
-                                provider_payload = :payload
-                            WHERE id = :pid
-                        """),
-                        {
-                            "pid": payout_id,
-                            "response": json.dumps(
-                                {"status": "error", "message": "Invalid payout amount"},
-                                ensure_ascii=False,
-                            ),
-                            "payload": "Invalid payout amount",
-                        },
-                    )
-                    await session.commit()
-                except Exception:
-                    logger.exception(
-                        "❌ Failed to mark invalid-amount payout as failed | payout_id=%s",
-                        payout_id,
-                    )
-                    await session.rollback()
-                continue
-
-            # ----------------------------------------------------
-            # Mark as processing before external provider call
-            # Also increment retry metadata
-            # ----------------------------------------------------
+        return
+
+    if new_status == REVIEW_STATUS:
+        # Lease ran out mid-send: may be paid already, an admin has to check
+        if ADMIN_USER_ID:
             try:
-                await session.execute(
-                    text("""
-                        UPDATE airtime_payouts
-                        SET retry_count = COALESCE(retry_count, 0) + 1,
-                            last_retry_at = NOW(),
-                            status = 'processing'
-                        WHERE id = :pid
-                    """),
-                    {"pid": payout_id},
+                await bot.send_message(
+                    chat_id=ADMIN_USER_ID,
+                    text=(
+                        f"🔎 Airtime NEEDS REVIEW: ₦{amount} → {phone}\n"
+                        f"user: {tg_id}\n"
+                        f"payout_id: {payout_id}\n"
+                        f"attempt: {attempt_no}/{MAX_AIRTIME_RETRIES}\n"
+                        f"msg: {outcome.message or ''}\n"
+                        "Check the provider before resending."
+                    ),
                 )
-                await session.commit()
             except Exception:
-                logger.exception("❌ Failed to update retry metadata | payout_id=%s", payout_id)
-                await session.rollback()
-                continue
+                logger.exception(
+                    "⚠️ Failed to notify admin review | payout_id=%s",
+                    payout_id,
+                )
+        return
+
+    if outcome.provider is None:
+        # Never reached the provider (invalid row / exception): status only
+        return
+
+    notify_user = (
+        attempt_no % NOTIFY_USER_ON_FAILURE_EVERY_N_ATTEMPTS == 1
+    )
+
+    if notify_user:
+        user_msg = (
+            "⚠️ Airtime delivery failed.\n"
+            "We’ll retry automatically if possible. If it persists, contact support.\n\n"
+            "Send or click on /contact to report."
+        )
+
+        if new_status == "failed_needs_funding":
+            user_msg = (
+                "⚠️ Airtime is delayed due to a temporary service issue.\n"
+                "Your reward is safe and will be processed shortly.\n\n"
+                "If after ten minutes you do not get it, contact support via /contact."
+            )
 
-            logger.info(
-                "📡 Airtime attempt #%s | payout_id=%s | from_status=%s | tg_id=%s | phone=%s | amount=₦%s",
-                attempt_no,
-                payout_id,
-                current_status,
+        if new_status == "failed_permanent":
+            user_msg = (
+                "⚠️ Airtime delivery could not be completed at the moment.\n"
+                "Please contact support so we can resolve it quickly.\n\n"
+                "Send or click on /contact to report."
+            )
+
+        try:
+            await bot.send_message(
+                chat_id=tg_id,
+                text=user_msg,
+                parse_mode=ParseMode.HTML,
+                reply_markup=_post_airtime_keyboard(),
+            )
+        except Exception:
+            logger.exception(
+                "⚠️ Failed to notify user failure | tg_id=%s | payout_id=%s",
                 tg_id,
-                phone,
-                amount,
+                payout_id,
             )
 
-            # ----------------------------------------------------
-            # Send airtime
-            # ----------------------------------------------------
-            try:
-                res = await send_airtime(phone=phone, amount=amount)
-
-                provider = getattr(res, "provider", None) or "clubkonnect"
-                ref = str(getattr(res, "reference", None) or "").strip()
-                raw = getattr(res, "raw", None) or {}
-                raw_json = json.dumps(raw, ensure_ascii=False)
-                payload_text = raw_json[:5000]
-
-                if getattr(res, "success", False):
-                    new_status = _resolve_success_status(res)
-                    should_retry = False
-                else:
-                    new_status, should_retry = _classify_failure(res)
-
-                    if should_retry and attempt_no >= MAX_AIRTIME_RETRIES:
-                        new_status = "failed_permanent"
-                        should_retry = False
-
-                try:
-                    await session.execute(
-                        text("""
-                            UPDATE airtime_payouts
-                            SET status = :status,
-                                sent_at = CASE
-                                    WHEN :status IN ('sent', 'completed')
-                                    THEN COALESCE(sent_at, NOW())
-                                    ELSE sent_at
-                                END,
-                                completed_at = CASE
-                                    WHEN :status = 'completed'
-                                    THEN COALESCE(completed_at, NOW())
-                                    ELSE completed_at
-                                END,
-                                provider = :provider,
-                                provider_ref = CAST(:provider_ref AS text),
-                                provider_reference = CAST(:provider_reference AS varchar),
-                                provider_response = CAST(:response AS jsonb),
-                                provider_payload = :payload
-                            WHERE id = :pid
-                        """),
-                        {
-                            "pid": payout_id,
-                            "status": new_status,
-                            "provider": provider,
-                            "provider_ref": ref or None,
-                            "provider_reference": ref or None,
-                            "response": raw_json,
-                            "payload": payload_text,
-                        },
-                    )
-                    await session.commit()
-                except Exception:
-                    logger.exception(
-                        "❌ DB update failed after airtime send | payout_id=%s | status=%s",
-                        payout_id,
-                        new_status,
-                    )
-                    await session.rollback()
-                    continue
-
-                # ------------------------------------------------
-                # Notifications
-                # ------------------------------------------------
-                if getattr(res, "success", False):
-                    try:
-                        if new_status == "completed":
-                            user_text = (
-                                f"🎉 Your airtime of ₦{amount} has been delivered!\n"
-                                f"Phone: {phone}\n"
-                                f"Ref: {ref or 'N/A'}"
-                            )
-                        else:
-                            user_text = (
-                                f"✅ Your airtime request for ₦{amount} has been accepted.\n"
-                                f"Phone: {phone}\n"
-                                f"Ref: {ref or 'N/A'}\n\n"
-                                "It is being delivered now."
-                            )
-
-                        await bot.send_message(
-                            chat_id=tg_id,
-                            text=user_text,
-                            reply_markup=_post_airtime_keyboard(),
-                        )
-                    except Exception:
-                        logger.exception(
-                            "⚠️ Failed to notify user success | tg_id=%s | payout_id=%s",
-                            tg_id,
-                            payout_id,
-                        )
-
-                    if ADMIN_USER_ID:
-                        try:
-                            await bot.send_message(
-                                chat_id=ADMIN_USER_ID,
-                                text=(
-                                    f"✅ Airtime processed ({new_status}): ₦{amount} → {phone}\n"
-                                    f"user: {tg_id}\n"
-                                    f"payout_id: {payout_id}\n"
-                                    f"provider: {provider}\n"
-                                    f"ref: {ref or 'N/A'}\n"
-                                    f"msg: {getattr(res, 'message', '') or ''}"
-                                ),
-                            )
-                        except Exception:
-                            logger.exception(
-                                "⚠️ Failed to notify admin success | payout_id=%s",
-                                payout_id,
-                            )
-
-                else:
-                    notify_user = (
-                        attempt_no % NOTIFY_USER_ON_FAILURE_EVERY_N_ATTEMPTS == 1
-                    )
-
-                    if notify_user:
-                        user_msg = (
-                            "⚠️ Airtime delivery failed.\n"
-                            "We’ll retry automatically if possible. If it persists, contact support.\n\n"
-                            "Send or click on /contact to report."
-                        )
-
-                        if new_status == "failed_needs_funding":
-                            user_msg = (
-                                "⚠️ Airtime is delayed due to a temporary service issue.\n"
-                                "Your reward is safe and will be processed shortly.\n\n"
-                                "If after ten minutes you do not get it, contact support via /contact."
-                            )
-
-                        if new_status == "failed_permanent":
-                            user_msg = (
-                                "⚠️ Airtime delivery could not be completed at the moment.\n"
-                                "Please contact support so we can resolve it quickly.\n\n"
-                                "Send or click on /contact to report."
-                            )
-
-                        try:
-                            await bot.send_message(
-                                chat_id=tg_id,
-                                text=user_msg,
-                                parse_mode=ParseMode.HTML,
-                                reply_markup=_post_airtime_keyboard(),
-                            )
-                        except Exception:
-                            logger.exception(
-                                "⚠️ Failed to notify user failure | tg_id=%s | payout_id=%s",
-                                tg_id,
-                                payout_id,
-                            )
-
-                    notify_admin = (
-                        new_status == "failed_needs_funding"
-                        or (attempt_no % NOTIFY_ADMIN_ON_FAILURE_EVERY_N_ATTEMPTS == 0)
-                    )
-
-                    if ADMIN_USER_ID and notify_admin:
-                        try:
-                            await bot.send_message(
-                                chat_id=ADMIN_USER_ID,
-                                text=(
-                                    f"❌ Airtime FAILED ({new_status}): ₦{amount} → {phone}\n"
-                                    f"user: {tg_id}\n"
-                                    f"payout_id: {payout_id}\n"
-                                    f"attempt: {attempt_no}/{MAX_AIRTIME_RETRIES}\n"
-                                    f"msg: {getattr(res, 'message', '') or ''}\n"
-                                    f"raw: {raw}"
-                                ),
-                            )
-                        except Exception:
-                            logger.exception(
-                                "⚠️ Failed to notify admin failure | payout_id=%s",
-                                payout_id,
-                            )
-
-            except Exception as e:
-                logger.exception(
-                    "❌ Exception during airtime sending | payout_id=%s | error=%s",
-                    payout_id,
-                    e,
-                )
-                await session.rollback()
-
-                fallback_status = "failed_retryable"
-                if attempt_no >= MAX_AIRTIME_RETRIES:
-                    fallback_status = "failed_permanent"
-
-                try:
-                    await session.execute(
-                        text("""
-                            UPDATE airtime_payouts
-                            SET status = :status
-                            WHERE id = :pid
-                        """),
-                        {
-                            "pid": payout_id,
-                            "status": fallback_status,
-                        },
-                    )
-                    await session.commit()
-                except Exception:
-                    logger.exception(
-                        "❌ Failed to mark payout fallback status | payout_id=%s",
-                        payout_id,
-                    )
-                    await session.rollback()
+    notify_admin = (
+        new_status == "failed_needs_funding"
+        or (attempt_no % NOTIFY_ADMIN_ON_FAILURE_EVERY_N_ATTEMPTS == 0)
+    )
+
+    if ADMIN_USER_ID and notify_admin:
+        try:
+            await bot.send_message(
+                chat_id=ADMIN_USER_ID,
+                text=(
+                    f"❌ Airtime FAILED ({new_status}): ₦{amount} → {phone}\n"
+                    f"user: {tg_id}\n"
+                    f"payout_id: {payout_id}\n"
+                    f"attempt: {attempt_no}/{MAX_AIRTIME_RETRIES}\n"
+                    f"msg: {outcome.message or ''}\n"
+                    f"raw: {raw}"
+                ),
+            )
+        except Exception:
+            logger.exception(
+                "⚠️ Failed to notify admin failure | payout_id=%s",
+                payout_id,
+            )
+
+
+_engine: PayoutEngine | None = None
+
+
+def get_payout_engine() -> PayoutEngine:
+    global _engine
+
+    if _engine is None:
+        _engine = PayoutEngine(
+            send=send_airtime,
+            on_result=_notify_payout_result,
+            max_retries=MAX_AIRTIME_RETRIES,
+            cooldown_minutes=AIRTIME_RETRY_COOLDOWN_MINUTES,
+        )
+    return _engine
+
+
+async def process_pending_airtime() -> int:
+    """One pass: claim a batch, send it through the worker pool, write it back."""
+    return await get_payout_engine().run_once()
 
 
 async def retry_failed_notifications():
@@ -476,13 +238,25 @@ async def notifier_loop():
     logger.info("🚀 Notifier started (Airtime payouts)...")
     while True:
         try:
-            await process_pending_airtime()
+            # Payout alerts go ahead of chat animations in the send queue
+            with send_priority(PRIORITY_HIGH):
+                await get_payout_engine().run()
+        except asyncio.CancelledError:
+            raise
         except Exception as e:
             logger.exception("Notifier loop error: %s", e)
         await asyncio.sleep(AIRTIME_LOOP_SECONDS)
 
 
+async def _run_standalone():
+    # Inside the app the HTTP pools are closed by the FastAPI shutdown hook
+    try:
+        await notifier_loop()
+    finally:
+        await get_http_clients().close()
+
+
 if __name__ == "__main__":
-    asyncio.run(notifier_loop())
+    asyncio.run(_run_standalone())
 
 
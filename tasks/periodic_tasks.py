@@ -8,11 +8,13 @@ Periodic background task manager for:
 - Sweeper for pending payments
 - Notification retries
 - DB cleanup
+- Wallet aggregate reconciliation
+- Bank directory refresh
 """
 import asyncio
 from logger import logger
 
-from . import sweeper, notifier, cleanup, battle_notifier
+from . import sweeper, notifier, cleanup, battle_notifier, wallet_reconciliation, bank_directory
 from bot_instance import bot
 
 
@@ -29,6 +31,8 @@ async def start_all_tasks(loop: asyncio.AbstractEventLoop = None) -> list[asynci
         loop.create_task(notifier.retry_failed_notifications_loop(), name="RetryFailedNotificationsLoop"),
         loop.create_task(battle_notifier.battle_notifier_loop(bot), name="BattleNotifierLoop"),
         loop.create_task(cleanup.cleanup_loop(), name="CleanupLoop"),
+        loop.create_task(wallet_reconciliation.wallet_reconciliation_loop(), name="WalletReconciliationLoop"),
+        loop.create_task(bank_directory.bank_directory_loop(), name="BankDirectoryLoop"),
     ]
 
     logger.info("🚀 All periodic background tasks are now running")
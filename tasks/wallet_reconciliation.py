@@ -0,0 +1,49 @@
+# =======================================================
+# tasks/wallet_reconciliation.py
+# =======================================================
+"""
+Wallet reconciliation task: checks the referral wallets' running
+aggregates against the ledger (default: every 6h).
+
+Drift is logged; set WALLET_RECONCILE_REPAIR=true to also overwrite
+the drifted aggregates with the ledger values.
+"""
+
+import asyncio
+import os
+
+from db import get_async_session
+from logger import logger
+from services.finance.wallet_reconciliation import reconcile_wallet_aggregates
+
+CHECK_INTERVAL_SECONDS = int(os.getenv("WALLET_RECONCILE_INTERVAL_SECONDS", str(60 * 60 * 6)))
+REPAIR = os.getenv("WALLET_RECONCILE_REPAIR", "false").strip().lower() in {"1", "true", "yes"}
+
+
+async def wallet_reconciliation_loop():
+    """Loop that reconciles wallet aggregates every CHECK_INTERVAL_SECONDS."""
+    while True:
+        try:
+            await reconcile_wallets()
+        except Exception as e:
+            logger.exception("Wallet reconciliation task error: %s", e)
+
+        await asyncio.sleep(CHECK_INTERVAL_SECONDS)
+
+
+async def reconcile_wallets():
+    async with get_async_session() as session:
+        drifts = await reconcile_wallet_aggregates(session, repair=REPAIR)
+
+        if REPAIR and drifts:
+            await session.commit()
+
+    if drifts:
+        logger.warning(
+            "Wallet reconciliation found %s drifted aggregates on %s wallets (repair=%s).",
+            len(drifts),
+            len({drift.wallet_id for drift in drifts}),
+            REPAIR,
+        )
+    else:
+        logger.debug("Wallet aggregates match the ledger.")
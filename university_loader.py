@@ -2,10 +2,11 @@
 # university_loader.py
 # =========================================================
 
-import json
 import random
 from pathlib import Path
 
+from content_store import get_content_store
+
 
 # =========================================================
 # ROOT
@@ -23,11 +24,8 @@ def prettify_name(name: str) -> str:
 
 
 def safe_load_json(path: Path):
-    if not path.exists():
-        return None
-
-    with open(path, "r", encoding="utf-8") as f:
-        return json.load(f)
+    # Shared content store: parsed once, re-parsed when the file changes.
+    return get_content_store().load_json(path, missing_ok=True)
 
 
 # =========================================================
@@ -37,15 +35,11 @@ def safe_load_json(path: Path):
 def get_university_categories():
     categories = []
 
-    if not BASE_DIR.exists():
-        return categories
-
-    for folder in BASE_DIR.iterdir():
-        if folder.is_dir():
-            categories.append({
-                "code": folder.name,
-                "name": prettify_name(folder.name),
-            })
+    for folder_name in get_content_store().list_dirs(BASE_DIR):
+        categories.append({
+            "code": folder_name,
+            "name": prettify_name(folder_name),
+        })
 
     categories.sort(key=lambda x: x["name"])
 
@@ -71,16 +65,12 @@ def get_university_subjects_by_category(category_code: str):
 
     subjects = []
 
-    if not category_path.exists():
-        return subjects
-
-    for folder in category_path.iterdir():
-        if folder.is_dir():
-            subjects.append({
-                "code": folder.name,
-                "name": prettify_name(folder.name),
-                "category_code": category_code,
-            })
+    for folder_name in get_content_store().list_dirs(category_path):
+        subjects.append({
+            "code": folder_name,
+            "name": prettify_name(folder_name),
+            "category_code": category_code,
+        })
 
     subjects.sort(key=lambda x: x["name"])
 
@@ -242,12 +232,72 @@ def load_university_topic_questions(
         return []
 
     return [
-        question
+        dict(question)
         for question in questions
         if question.get("active", True)
     ]
 
 
+# =========================================================
+# SUBJECT QUESTION INDEX
+# All active questions of a course across modules/topics,
+# rebuilt only when one of the underlying files changes.
+# =========================================================
+
+def _university_subject_question_index(category_code: str, subject_code: str):
+    def build():
+        all_questions = []
+
+        for module in get_university_modules(category_code, subject_code):
+            module_topics = get_university_module_topics(
+                category_code,
+                subject_code,
+                module["id"],
+            )
+
+            for topic in module_topics:
+                all_questions.extend(
+                    load_university_topic_questions(
+                        category_code=category_code,
+                        subject_code=subject_code,
+                        module_id=module["id"],
+                        topic_id=topic["id"],
+                    )
+                )
+
+        by_id = {}
+        for question in all_questions:
+            by_id.setdefault(str(question.get("id")), question)
+
+        return {"questions": all_questions, "by_id": by_id}
+
+    return get_content_store().memo(
+        ("university", "subject_questions", category_code, subject_code),
+        build,
+    )
+
+
+def get_university_subject_question_map(category_code: str, subject_code: str):
+    """
+    Shared question id -> question map of a course (read-only: the
+    dicts are the cached ones, do not mutate them).
+    """
+    return _university_subject_question_index(category_code, subject_code)["by_id"]
+
+
+def get_university_question_by_id(
+    category_code: str,
+    subject_code: str,
+    question_id: str,
+):
+    question = _university_subject_question_index(
+        category_code,
+        subject_code,
+    )["by_id"].get(str(question_id))
+
+    return dict(question) if question else None
+
+
 # =========================================================
 # TOPIC PRACTICE BATCH
 # =========================================================
@@ -309,29 +359,13 @@ def prepare_university_course_mock_batch(
 ):
     seen_question_ids = seen_question_ids or []
 
-    modules = get_university_modules(
-        category_code,
-        subject_code,
-    )
-
-    all_questions = []
-
-    for module in modules:
-        module_topics = get_university_module_topics(
+    all_questions = [
+        dict(q)
+        for q in _university_subject_question_index(
             category_code,
             subject_code,
-            module["id"],
-        )
-
-        for topic in module_topics:
-            topic_questions = load_university_topic_questions(
-                category_code=category_code,
-                subject_code=subject_code,
-                module_id=module["id"],
-                topic_id=topic["id"],
-            )
-
-            all_questions.extend(topic_questions)
+        )["questions"]
+    ]
 
     unseen_questions = [
         q
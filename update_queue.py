@@ -0,0 +1,278 @@
+# ====================================================================
+# update_queue.py
+# Inbound Telegram update queue behind the webhook endpoint.
+#
+# The webhook used to run application.process_update() inline, keeping
+# Telegram's HTTP request open through DB work and multi-second spin
+# animations; slow answers make Telegram retry and redeliver. Now the
+# endpoint only parses the update, submit()s it here and returns 200.
+#
+# - per-chat order: updates are grouped by chat (user for chat-less
+#   updates such as inline queries); a chat is handled by at most one
+#   consumer at a time, in arrival order. Different chats run in
+#   parallel on TG_UPDATE_WORKERS consumers, and a busy chat goes to the
+#   back of the line after each update so it cannot starve the rest.
+# - bounded: at most TG_UPDATE_QUEUE_MAX updates wait. When full,
+#   submit() waits up to TG_UPDATE_ENQUEUE_WAIT_SECONDS for room and
+#   then returns "full"; the endpoint answers 503 and Telegram delivers
+#   the update again later (backpressure instead of unbounded memory).
+# - dedupe: update_ids seen in the last TG_UPDATE_DEDUPE_KEEP submits
+#   are dropped (the webhook's rate_limit_store check covers other
+#   workers / instances).
+# - stop() stops intake and drains for up to TG_UPDATE_DRAIN_SECONDS.
+# - depth / lag metrics via stats() (exposed on /health). Lag is the
+#   time an update waited between submit() and its consumer picking it
+#   up.
+# ====================================================================
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Deque, Dict, Hashable, List, Optional, Set
+
+logger = logging.getLogger("update_queue")
+
+TG_UPDATE_WORKERS = int(os.getenv("TG_UPDATE_WORKERS", "32"))
+TG_UPDATE_QUEUE_MAX = int(os.getenv("TG_UPDATE_QUEUE_MAX", "5000"))
+TG_UPDATE_ENQUEUE_WAIT_SECONDS = float(os.getenv("TG_UPDATE_ENQUEUE_WAIT_SECONDS", "2"))
+TG_UPDATE_DRAIN_SECONDS = float(os.getenv("TG_UPDATE_DRAIN_SECONDS", "10"))
+TG_UPDATE_DEDUPE_KEEP = int(os.getenv("TG_UPDATE_DEDUPE_KEEP", "20000"))
+
+SUBMIT_QUEUED = "queued"
+SUBMIT_DUPLICATE = "duplicate"
+SUBMIT_FULL = "full"
+SUBMIT_STOPPED = "stopped"
+
+_LAG_SAMPLES = 512
+
+
+@dataclass(slots=True)
+class _QueuedUpdate:
+    update: Any
+    update_id: Optional[int]
+    enqueued_at: float
+
+
+def ordering_key(update: Any) -> Hashable:
+    """Chat id, else user id, else the update itself (no ordering needed)."""
+    chat = getattr(update, "effective_chat", None)
+    if chat is not None:
+        return ("chat", chat.id)
+    user = getattr(update, "effective_user", None)
+    if user is not None:
+        return ("user", user.id)
+    return ("update", getattr(update, "update_id", id(update)))
+
+
+class UpdateIngestQueue:
+    def __init__(
+        self,
+        *,
+        workers: int = TG_UPDATE_WORKERS,
+        max_size: int = TG_UPDATE_QUEUE_MAX,
+        enqueue_wait_seconds: float = TG_UPDATE_ENQUEUE_WAIT_SECONDS,
+        dedupe_keep: int = TG_UPDATE_DEDUPE_KEEP,
+    ):
+        self.workers = max(1, workers)
+        self.max_size = max(1, max_size)
+        self.enqueue_wait_seconds = enqueue_wait_seconds
+        self.dedupe_keep = dedupe_keep
+
+        self._process: Optional[Callable[[Any], Awaitable[None]]] = None
+        self._chats: Dict[Hashable, Deque[_QueuedUpdate]] = {}
+        self._ready: Optional[asyncio.Queue] = None
+        self._active: Set[Hashable] = set()
+        self._size = 0
+        self._space: Optional[asyncio.Event] = None
+        self._idle: Optional[asyncio.Event] = None
+        self._recent: "OrderedDict[int, None]" = OrderedDict()
+        self._tasks: List[asyncio.Task] = []
+        self._accepting = False
+
+        self.enqueued = 0
+        self.processed = 0
+        self.failed = 0
+        self.duplicates = 0
+        self.rejected = 0
+        self.peak_depth = 0
+        self.max_lag = 0.0
+        self._lags: Deque[float] = deque(maxlen=_LAG_SAMPLES)
+        self._run_times: Deque[float] = deque(maxlen=_LAG_SAMPLES)
+
+    # --------------------------------------------------------
+    # Lifecycle
+    # --------------------------------------------------------
+    def start(self, process: Callable[[Any], Awaitable[None]]) -> None:
+        """Start the consumers; `process` is application.process_update."""
+        if self._tasks:
+            return
+        self._process = process
+        self._ready = asyncio.Queue()
+        self._space = asyncio.Event()
+        self._space.set()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._accepting = True
+        loop = asyncio.get_running_loop()
+        self._tasks = [
+            loop.create_task(self._consume(), name=f"UpdateConsumer:{i}")
+            for i in range(self.workers)
+        ]
+        logger.info("📥 Update queue started | workers=%s | max=%s", self.workers, self.max_size)
+
+    async def stop(self, *, drain_seconds: float = TG_UPDATE_DRAIN_SECONDS) -> None:
+        """Refuse new updates, let queued ones finish, then stop the consumers."""
+        self._accepting = False
+        if self._idle is not None and (self._size or self._active):
+            try:
+                await asyncio.wait_for(self._idle.wait(), timeout=drain_seconds)
+            except asyncio.TimeoutError:
+                logger.warning(
+                    "⚠️ Update queue not drained at shutdown | queued=%s | in_progress=%s",
+                    self._size,
+                    len(self._active),
+                )
+
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    # --------------------------------------------------------
+    # Intake
+    # --------------------------------------------------------
+    async def submit(self, update: Any, *, update_id: Optional[int] = None) -> str:
+        """
+        Queue one update. Returns SUBMIT_QUEUED, SUBMIT_DUPLICATE,
+        SUBMIT_FULL (no room after waiting) or SUBMIT_STOPPED.
+        """
+        if not self._accepting or self._ready is None:
+            return SUBMIT_STOPPED
+
+        if update_id is not None:
+            if update_id in self._recent:
+                self.duplicates += 1
+                return SUBMIT_DUPLICATE
+            self._recent[update_id] = None
+            while len(self._recent) > self.dedupe_keep:
+                self._recent.popitem(last=False)
+
+        if self._size >= self.max_size:
+            deadline = time.monotonic() + self.enqueue_wait_seconds
+            while self._size >= self.max_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._accepting:
+                    self.rejected += 1
+                    if update_id is not None:
+                        # Telegram will redeliver it; accept it then
+                        self._recent.pop(update_id, None)
+                    return SUBMIT_FULL
+                self._space.clear()
+                try:
+                    await asyncio.wait_for(self._space.wait(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    pass
+
+        key = ordering_key(update)
+        item = _QueuedUpdate(update, update_id, time.monotonic())
+        pending = self._chats.get(key)
+        if pending is None:
+            self._chats[key] = deque([item])
+            self._ready.put_nowait(key)
+        else:
+            # Already waiting in _ready or being processed: it is picked
+            # up again when its current update finishes.
+            pending.append(item)
+
+        self._size += 1
+        self.enqueued += 1
+        self._idle.clear()
+        if self._size > self.peak_depth:
+            self.peak_depth = self._size
+        return SUBMIT_QUEUED
+
+    # --------------------------------------------------------
+    # Consumers
+    # --------------------------------------------------------
+    async def _consume(self) -> None:
+        while True:
+            key = await self._ready.get()
+            pending = self._chats.get(key)
+            if not pending:
+                self._chats.pop(key, None)
+                continue
+
+            item = pending.popleft()
+            self._size -= 1
+            if self._size < self.max_size:
+                self._space.set()
+            self._active.add(key)
+
+            started = time.monotonic()
+            lag = started - item.enqueued_at
+            self._lags.append(lag)
+            if lag > self.max_lag:
+                self.max_lag = lag
+
+            try:
+                await self._process(item.update)
+                self.processed += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self.failed += 1
+                logger.exception("❌ Update processing failed | update_id=%s", item.update_id)
+            finally:
+                self._run_times.append(time.monotonic() - started)
+                self._active.discard(key)
+                if pending:
+                    self._ready.put_nowait(key)
+                else:
+                    self._chats.pop(key, None)
+                if not self._size and not self._active:
+                    self._idle.set()
+
+    # --------------------------------------------------------
+    # Metrics
+    # --------------------------------------------------------
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        oldest = min(
+            (pending[0].enqueued_at for pending in self._chats.values() if pending),
+            default=None,
+        )
+        lags = sorted(self._lags)
+        runs = self._run_times
+        return {
+            "accepting": self._accepting,
+            "workers": len(self._tasks),
+            "depth": self._size,
+            "max_depth": self.max_size,
+            "peak_depth": self.peak_depth,
+            "chats_waiting": len(self._chats),
+            "in_progress": len(self._active),
+            "oldest_wait_ms": round((now - oldest) * 1000) if oldest is not None else 0,
+            "lag_p50_ms": round(lags[len(lags) // 2] * 1000) if lags else None,
+            "lag_p95_ms": round(lags[int(len(lags) * 0.95)] * 1000) if lags else None,
+            "lag_max_ms": round(self.max_lag * 1000),
+            "process_avg_ms": round(sum(runs) / len(runs) * 1000) if runs else None,
+            "enqueued": self.enqueued,
+            "processed": self.processed,
+            "failed": self.failed,
+            "duplicates": self.duplicates,
+            "rejected": self.rejected,
+        }
+
+
+_queue: Optional[UpdateIngestQueue] = None
+
+
+def get_update_queue() -> UpdateIngestQueue:
+    global _queue
+    if _queue is None:
+        _queue = UpdateIngestQueue()
+    return _queue
@@ -0,0 +1,273 @@
+# ====================================================================
+# update_router.py
+# Cheaper handler selection for incoming updates.
+#
+# python-telegram-bot picks, per handler group, the first handler whose
+# check_update() accepts the update, trying them in registration order.
+# With ~180 CallbackQueryHandlers that means up to ~150 regex matches
+# for one button tap, and every plain text message ran the catch-all
+# text handlers (airtime phone claim, admin routers, core fallback)
+# just for them to return early.
+#
+# compile_update_routes(application), called once after every handler
+# is registered:
+#   - replaces each run of CallbackQueryHandlers in a group with one
+#     CallbackPrefixRouter. It indexes the handlers by the literal
+#     prefix of their ^pattern in a character trie, so a tap only
+#     tries the handlers whose prefix matches callback_data (plus the
+#     few without a literal prefix), still in registration order. The
+#     selected handler runs exactly as before.
+#   - binds StateGatedHandler wrappers to application.user_data, the
+#     per-user state index: a gated text handler is only selected when
+#     its gate(update, user_data) says the user is in the state that
+#     handler serves. Gates run before python-telegram-bot's own
+#     persistence refresh, so process_with_fresh_state() wraps
+#     process_update and refreshes the sender's user_data first (when
+#     persistence is on): after a restart, or on another worker, a gate
+#     sees the same state the handler will.
+#
+# A run of CallbackQueryHandlers may span CommandHandlers /
+# MessageHandlers (they never accept a callback query) but stops at a
+# ConversationHandler or any other handler type, so the order between
+# a callback handler and anything that could also take the tap is kept.
+# ====================================================================
+from __future__ import annotations
+
+import logging
+import re
+from typing import Any, Awaitable, Callable, Dict, List, Mapping, Optional, Sequence, Tuple
+
+from telegram import Update
+from telegram.ext import BaseHandler, CallbackQueryHandler, CommandHandler, MessageHandler
+
+try:
+    from re import _parser as _sre_parse  # Python 3.11+
+except ImportError:  # pragma: no cover
+    import sre_parse as _sre_parse  # type: ignore[no-redef]
+
+logger = logging.getLogger("update_router")
+
+StateGate = Callable[[Update, Mapping[str, Any]], bool]
+
+_EMPTY_STATE: Mapping[str, Any] = {}
+
+
+def literal_prefix(pattern: Any) -> Optional[str]:
+    """
+    The literal text every match of an anchored (^...) callback pattern
+    starts with, e.g. "^jp_ans::(\\d+)$" -> "jp_ans::". None when the
+    pattern is not a plain anchored regex (callables, types, IGNORECASE,
+    no ^), meaning the handler has to be tried for every tap.
+    """
+    if isinstance(pattern, re.Pattern):
+        if pattern.flags & re.IGNORECASE:
+            return None
+        pattern = pattern.pattern
+    if not isinstance(pattern, str):
+        return None
+
+    try:
+        parsed = list(_sre_parse.parse(pattern))
+    except re.error:
+        return None
+
+    if not parsed or parsed[0] != (_sre_parse.AT, _sre_parse.AT_BEGINNING):
+        return None
+
+    chars: List[str] = []
+    for op, arg in parsed[1:]:
+        if op != _sre_parse.LITERAL:
+            break
+        chars.append(chr(arg))
+    return "".join(chars)
+
+
+class _TrieNode:
+    __slots__ = ("children", "handlers")
+
+    def __init__(self) -> None:
+        self.children: Dict[str, "_TrieNode"] = {}
+        self.handlers: List[int] = []
+
+
+class CallbackPrefixRouter(BaseHandler[Update, Any, Any]):
+    """
+    Stands in for an ordered run of CallbackQueryHandlers. check_update
+    returns (handler, its check result) for the first handler that
+    accepts the tap; handle_update runs that handler.
+    """
+
+    def __init__(self, handlers: Sequence[CallbackQueryHandler]):
+        super().__init__(self._unused_callback, block=handlers[0].block)
+        self.handlers: Tuple[CallbackQueryHandler, ...] = tuple(handlers)
+        self._root = _TrieNode()
+        self._unprefixed: List[int] = []
+
+        for index, handler in enumerate(self.handlers):
+            prefix = literal_prefix(handler.pattern) if handler.pattern is not None else None
+            if not prefix:
+                self._unprefixed.append(index)
+                continue
+            node = self._root
+            for ch in prefix:
+                node = node.children.setdefault(ch, _TrieNode())
+            node.handlers.append(index)
+
+    @staticmethod
+    async def _unused_callback(update: Any, context: Any) -> None:  # pragma: no cover
+        return None
+
+    def candidates(self, data: str) -> List[int]:
+        """Indexes of the handlers whose prefix matches `data`, in order."""
+        found = list(self._unprefixed)
+        node = self._root
+        for ch in data:
+            node = node.children.get(ch)
+            if node is None:
+                break
+            found.extend(node.handlers)
+        if len(found) > 1:
+            found.sort()
+        return found
+
+    def check_update(self, update: object) -> Optional[Tuple[CallbackQueryHandler, Any]]:
+        if not isinstance(update, Update) or update.callback_query is None:
+            return None
+
+        data = update.callback_query.data
+        if isinstance(data, str):
+            order = self.candidates(data)
+        else:
+            # game queries / arbitrary callback_data objects
+            order = range(len(self.handlers))
+
+        for index in order:
+            handler = self.handlers[index]
+            check = handler.check_update(update)
+            if check is not None and check is not False:
+                return handler, check
+        return None
+
+    async def handle_update(self, update: Any, application: Any, check_result: Any, context: Any) -> Any:
+        handler, check = check_result
+        return await handler.handle_update(update, application, check, context)
+
+
+class StateGatedHandler(BaseHandler[Update, Any, Any]):
+    """
+    Wraps a (text) handler so it is only selected when
+    gate(update, user_data) is true. Unbound (before
+    compile_update_routes) it behaves exactly like the wrapped handler.
+    """
+
+    def __init__(self, handler: BaseHandler, gate: StateGate):
+        super().__init__(handler.callback, block=handler.block)
+        self.handler = handler
+        self.gate = gate
+        self.application: Any = None
+
+    def check_update(self, update: object) -> Any:
+        check = self.handler.check_update(update)
+        if check is None or check is False:
+            return check
+        if self.application is None or not isinstance(update, Update):
+            return check
+
+        user = update.effective_user
+        user_data = self.application.user_data.get(user.id) if user is not None else None
+        if not self.gate(update, user_data or _EMPTY_STATE):
+            return None
+        return check
+
+    async def handle_update(self, update: Any, application: Any, check_result: Any, context: Any) -> Any:
+        return await self.handler.handle_update(update, application, check_result, context)
+
+
+def process_with_fresh_state(application: Any) -> Callable[[Any], Awaitable[None]]:
+    """
+    application.process_update, preceded by a persistence refresh of the
+    sender's user_data for updates a StateGatedHandler may gate (anything
+    but callback queries). PTB's own refresh that follows is then served
+    from the persistence cache.
+    """
+
+    async def process(update: Any) -> None:
+        persistence = application.persistence
+        if (
+            persistence is not None
+            and isinstance(update, Update)
+            and update.callback_query is None
+            and update.effective_user is not None
+        ):
+            user_id = update.effective_user.id
+            try:
+                await persistence.refresh_user_data(user_id, application.user_data[user_id])
+            except Exception:
+                logger.warning("⚠️ Could not refresh user_data before gating | user_id=%s", user_id, exc_info=True)
+        await application.process_update(update)
+
+    return process
+
+
+def _passes_callback_queries(handler: BaseHandler) -> bool:
+    """True for handler types that can never accept a callback query."""
+    if isinstance(handler, StateGatedHandler):
+        handler = handler.handler
+    return isinstance(handler, (CommandHandler, MessageHandler))
+
+
+def compile_update_routes(application: Any) -> Dict[str, int]:
+    """
+    Rewrite application.handlers in place (see module header). Call
+    once, after all add_handler() calls. Returns counts for the log.
+    """
+    routers = 0
+    routed = 0
+    gated = 0
+
+    for group, handlers in application.handlers.items():
+        compiled: List[BaseHandler] = []
+        run: List[CallbackQueryHandler] = []
+        run_at: Optional[int] = None
+
+        def close_run() -> None:
+            nonlocal run, run_at, routers, routed
+            if run:
+                if len(run) == 1:
+                    compiled.insert(run_at, run[0])
+                else:
+                    compiled.insert(run_at, CallbackPrefixRouter(run))
+                    routers += 1
+                    routed += len(run)
+            run, run_at = [], None
+
+        for handler in handlers:
+            if isinstance(handler, StateGatedHandler):
+                handler.application = application
+                gated += 1
+
+            if isinstance(handler, CallbackQueryHandler) and (not run or handler.block == run[0].block):
+                if run_at is None:
+                    run_at = len(compiled)
+                run.append(handler)
+                continue
+
+            if not _passes_callback_queries(handler):
+                close_run()
+                if isinstance(handler, CallbackQueryHandler):
+                    run_at = len(compiled)
+                    run.append(handler)
+                    continue
+            compiled.append(handler)
+
+        close_run()
+        handlers[:] = compiled
+
+    stats = {"routers": routers, "callback_handlers": routed, "gated_handlers": gated}
+    logger.info(
+        "🧭 Update routes compiled | routers=%s | callback_handlers=%s | gated_handlers=%s",
+        routers,
+        routed,
+        gated,
+    )
+    return stats
@@ -3,15 +3,15 @@
 # Shared-history version for Paid Trivia (questions.json)
 # No repeat per user per category until JSON bank is exhausted
 # ===========================================================
+import hashlib
 import json
 import os
-from typing import Any, Dict, List, Optional
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Set, Tuple
 
 from db import get_async_session
-from services.question_history_service import (
-    get_seen_question_keys,
-    make_json_question_key,
-)
+from services.question_history_service import make_json_question_key
+from services.seen_bitmap_service import load_seen_bitmap, mark_question_seen
 
 # -----------------------------------------------------------
 # FILE PATHS
@@ -34,27 +34,24 @@ CATEGORY_MAP = {
 
 VALID_CATEGORY_KEYS = set(CATEGORY_MAP.values())
 
+# user_question_history.source_type for paid trivia
+PAID_TRIVIA_SOURCE = "json_paid"
+
 # -----------------------------------------------------------
 # GLOBAL CACHE
 # -----------------------------------------------------------
-_ALL_QUESTIONS: Optional[List[Dict[str, Any]]] = None
-_CATEGORY_CACHE: Dict[str, List[Dict[str, Any]]] = {}
+_QUESTION_BANK: Optional["QuestionBank"] = None
 
 
 # ===========================================================
-# LOAD QUESTIONS (cached)
+# LOAD QUESTIONS (raw JSON)
 # ===========================================================
 def _load_questions() -> List[Dict[str, Any]]:
-    global _ALL_QUESTIONS
-
-    if _ALL_QUESTIONS is None:
-        if not os.path.exists(QUESTIONS_PATH):
-            raise RuntimeError(f"questions.json not found at {QUESTIONS_PATH}")
+    if not os.path.exists(QUESTIONS_PATH):
+        raise RuntimeError(f"questions.json not found at {QUESTIONS_PATH}")
 
-        with open(QUESTIONS_PATH, "r", encoding="utf-8") as f:
-            _ALL_QUESTIONS = json.load(f)
-
-    return _ALL_QUESTIONS
+    with open(QUESTIONS_PATH, "r", encoding="utf-8") as f:
+        return json.load(f)
 
 
 # ===========================================================
@@ -120,44 +117,208 @@ def _normalize_question(category_key: str, q: Dict[str, Any]) -> Dict[str, Any]:
 
 
 # ===========================================================
-# GET CATEGORY QUESTIONS (sorted + cached)
+# QUESTION RECORD
+# Compact, immutable form of one normalized question
 # ===========================================================
-def _get_category_questions_sorted(category_key: str) -> List[Dict[str, Any]]:
+_RECORD_FIELDS = ("id", "category", "question", "options", "answer", "difficulty")
+
+
+@dataclass(slots=True, frozen=True)
+class QuestionRecord:
+    id: str
+    category: str
+    question: str
+    options: Tuple[str, str, str, str]
+    answer: Any
+    difficulty: Optional[str] = None
+    extra: Tuple[Tuple[str, Any], ...] = ()
+
+    @classmethod
+    def from_normalized(cls, q: Dict[str, Any]) -> "QuestionRecord":
+        opts = q["options"]
+        return cls(
+            id=q["id"],
+            category=q.get("category"),
+            question=q.get("question"),
+            options=(opts["A"], opts["B"], opts["C"], opts["D"]),
+            answer=q.get("answer"),
+            difficulty=q.get("difficulty"),
+            extra=tuple((k, v) for k, v in q.items() if k not in _RECORD_FIELDS),
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Returns a fresh dict in the same shape _normalize_question produces,
+        so callers may mutate it without touching the shared bank.
+        """
+        d: Dict[str, Any] = dict(self.extra)
+        d["id"] = self.id
+        d["category"] = self.category
+        d["question"] = self.question
+        d["options"] = {
+            "A": self.options[0],
+            "B": self.options[1],
+            "C": self.options[2],
+            "D": self.options[3],
+        }
+        d["answer"] = self.answer
+        if self.difficulty is not None:
+            d["difficulty"] = self.difficulty
+        return d
+
+
+def _record_sort_key(record: QuestionRecord):
     """
-    Returns normalized questions for a category.
-    Sorted deterministically:
+    Deterministic category order:
     - by numeric id if possible
     - otherwise by question text
-    Cached after first call.
     """
-    if category_key in _CATEGORY_CACHE:
-        return _CATEGORY_CACHE[category_key]
+    if record.id.isdigit():
+        return (0, int(record.id))
+    return (1, str(record.question or "").lower())
+
+
+# ===========================================================
+# QUESTION BANK
+# Built once per process. Holds:
+# - _by_id: question id -> record (first occurrence wins)
+# - _by_category: category key -> records in deterministic order
+# - _category_ids: category key -> id array in the same order
+# - _category_ordinals: category key -> {id: position in that array}
+# - _category_versions: category key -> fingerprint of that order
+#   (seen-bitmaps built against another order are rebuilt)
+# ===========================================================
+class QuestionBank:
+    __slots__ = (
+        "_by_id",
+        "_by_category",
+        "_category_ids",
+        "_category_ordinals",
+        "_category_versions",
+    )
+
+    def __init__(self, raw_questions: List[Dict[str, Any]]):
+        by_id: Dict[str, QuestionRecord] = {}
+        grouped: Dict[str, List[QuestionRecord]] = {}
+
+        for raw in raw_questions:
+            category_key = str(raw.get("category") or "").strip()
+            record = QuestionRecord.from_normalized(_normalize_question(category_key, raw))
+
+            by_id.setdefault(record.id, record)
+            grouped.setdefault(category_key, []).append(record)
+
+        self._by_id = by_id
+        self._by_category: Dict[str, Tuple[QuestionRecord, ...]] = {}
+        self._category_ids: Dict[str, Tuple[str, ...]] = {}
+        self._category_ordinals: Dict[str, Dict[str, int]] = {}
+        self._category_versions: Dict[str, str] = {}
+
+        for category_key, items in grouped.items():
+            # One slot per id (first occurrence wins) so ordinals stay dense
+            # and a repeated id cannot be served as "fresh" twice.
+            records = []
+            seen_ids: Set[str] = set()
+            for record in sorted(items, key=_record_sort_key):
+                if record.id not in seen_ids:
+                    seen_ids.add(record.id)
+                    records.append(record)
+
+            ids = tuple(r.id for r in records)
+
+            self._by_category[category_key] = tuple(records)
+            self._category_ids[category_key] = ids
+            self._category_ordinals[category_key] = {qid: idx for idx, qid in enumerate(ids)}
+            self._category_versions[category_key] = hashlib.sha1(
+                "\n".join(ids).encode("utf-8")
+            ).hexdigest()[:16]
+
+    @classmethod
+    def from_file(cls) -> "QuestionBank":
+        return cls(_load_questions())
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def categories(self) -> List[str]:
+        return list(self._by_category.keys())
+
+    def get_record(self, question_id: int | str) -> Optional[QuestionRecord]:
+        return self._by_id.get(str(question_id))
+
+    def get(self, question_id: int | str) -> Optional[Dict[str, Any]]:
+        record = self._by_id.get(str(question_id))
+        return record.to_dict() if record else None
+
+    def category_records(self, category_key: str) -> Tuple[QuestionRecord, ...]:
+        return self._by_category.get(category_key, ())
+
+    def category_ids(self, category_key: str) -> Tuple[str, ...]:
+        return self._category_ids.get(category_key, ())
+
+    def category_size(self, category_key: str) -> int:
+        return len(self._category_ids.get(category_key, ()))
 
-    all_q = _load_questions()
-    cat_q = [
-        _normalize_question(category_key, q)
-        for q in all_q
-        if str(q.get("category") or "").strip() == category_key
-    ]
+    def ordinal(self, category_key: str, question_id: int | str) -> Optional[int]:
+        return self._category_ordinals.get(category_key, {}).get(str(question_id))
 
-    def _sort_key(q: Dict[str, Any]):
-        qid = str(q.get("id") or "")
-        if qid.isdigit():
-            return (0, int(qid))
-        return (1, str(q.get("question") or "").lower())
+    def category_ordinals(self, category_key: str) -> Dict[str, int]:
+        return self._category_ordinals.get(category_key, {})
 
-    cat_q.sort(key=_sort_key)
-    _CATEGORY_CACHE[category_key] = cat_q
-    return cat_q
+    def category_version(self, category_key: str) -> str:
+        return self._category_versions.get(category_key, "")
+
+
+def get_question_bank() -> QuestionBank:
+    """
+    Process-wide QuestionBank, built on first use.
+    Call load_question_bank() at startup to pay the build cost up front.
+    """
+    global _QUESTION_BANK
+
+    if _QUESTION_BANK is None:
+        _QUESTION_BANK = QuestionBank.from_file()
+
+    return _QUESTION_BANK
+
+
+def load_question_bank(force_reload: bool = False) -> QuestionBank:
+    global _QUESTION_BANK
+
+    if force_reload:
+        _QUESTION_BANK = None
+
+    return get_question_bank()
+
+
+# ===========================================================
+# CATEGORY SIZE (no dict materialization)
+# ===========================================================
+def get_category_question_count(category: str) -> int:
+    return get_question_bank().category_size(_normalize_category_key(category))
 
 
 # ===========================================================
-# GET CATEGORY QUESTIONS FOR ANY MODE
-# Used by Challenge / Battle / other flows
+# PICK QUESTION IDS FOR A GROUP (Battle / Challenge)
+# Fresh ids first in deterministic order; if the bank cannot fill
+# `count` fresh ids, restart the cycle from the beginning.
 # ===========================================================
-def get_questions_for_category(category: str) -> List[Dict[str, Any]]:
+def pick_fresh_question_ids(
+    category: str,
+    excluded_keys: Set[str],
+    count: int,
+) -> List[str]:
     category_key = _normalize_category_key(category)
-    return list(_get_category_questions_sorted(category_key))
+    ids = get_question_bank().category_ids(category_key)
+
+    selected: List[str] = []
+    for qid in ids:
+        if qid not in excluded_keys:
+            selected.append(qid)
+            if len(selected) >= count:
+                return selected
+
+    return list(ids[:count])
 
 
 # ===========================================================
@@ -165,16 +326,7 @@ def get_questions_for_category(category: str) -> List[Dict[str, Any]]:
 # Used by Challenge / Battle when question ids are stored in DB
 # ===========================================================
 def get_question_by_id(question_id: int | str) -> Optional[Dict[str, Any]]:
-    qid = str(question_id)
-
-    all_q = _load_questions()
-    for raw in all_q:
-        category_key = str(raw.get("category") or "").strip()
-        normalized = _normalize_question(category_key, raw)
-        if str(normalized.get("id")) == qid:
-            return normalized
-
-    return None
+    return get_question_bank().get(question_id)
 
 
 # ===========================================================
@@ -189,28 +341,59 @@ async def get_next_question_for_user(tg_id: int, category: str) -> Dict[str, Any
     2) Exclude questions this user has already seen in source_type='json_paid'
     3) Return the first fresh question in deterministic order
     4) If category is exhausted, restart from beginning
+
+    "Seen" comes from the user's seen-bitmap (one small row, LRU-cached),
+    so this is a find-first-zero-bit instead of a history scan.
     """
     category_key = _normalize_category_key(category)
 
-    questions = _get_category_questions_sorted(category_key)
-    if not questions:
+    bank = get_question_bank()
+    records = bank.category_records(category_key)
+    if not records:
         raise ValueError(f"No questions found for category {category_key}")
 
     async with get_async_session() as session:
-        seen_keys = await get_seen_question_keys(
-            session,
-            tg_id=int(tg_id),
-            source_type="json_paid",
-            category=category_key,
-        )
+        async with session.begin():
+            bitmap = await load_seen_bitmap(
+                session,
+                tg_id=int(tg_id),
+                source_type=PAID_TRIVIA_SOURCE,
+                category=category_key,
+                version=bank.category_version(category_key),
+                ordinals=bank.category_ordinals(category_key),
+            )
+
+    ordinal = bitmap.first_unseen()
+    if ordinal is not None:
+        return records[ordinal].to_dict()
 
-    fresh_questions = [q for q in questions if str(q["id"]) not in seen_keys]
+    # Category exhausted → restart cycle from beginning
+    return records[0].to_dict()
 
-    if fresh_questions:
-        return fresh_questions[0]
 
-    # Category exhausted → restart cycle from beginning
-    return questions[0]
+# ===========================================================
+# RECORD SERVED QUESTION IN THE SEEN-BITMAP
+# Call inside the same transaction as record_question_history
+# ===========================================================
+async def record_paid_question_seen(
+    session,
+    *,
+    tg_id: int,
+    category: str,
+    question_id: int | str,
+) -> None:
+    category_key = _normalize_category_key(category)
+    bank = get_question_bank()
+
+    await mark_question_seen(
+        session,
+        tg_id=int(tg_id),
+        source_type=PAID_TRIVIA_SOURCE,
+        category=category_key,
+        version=bank.category_version(category_key),
+        ordinals=bank.category_ordinals(category_key),
+        question_key=str(question_id),
+    )
 
 
 # ===========================================================
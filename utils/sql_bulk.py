@@ -0,0 +1,85 @@
+# ====================================================================
+# utils/sql_bulk.py
+# Multi-row VALUES helper for raw-SQL bulk inserts.
+#
+# One INSERT ... VALUES (...), (...), ... per chunk instead of one
+# statement per row. Every value is still a bound parameter, so column
+# types are inferred exactly as they are for the single-row statement
+# and ON CONFLICT clauses keep their meaning.
+# ====================================================================
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Postgres allows 32767 bind parameters per statement; stay well below it.
+BULK_INSERT_CHUNK_ROWS = 500
+
+
+def build_values_clause(
+    columns: Sequence[str],
+    rows: Sequence[Mapping[str, Any]],
+    *,
+    literals: Optional[Mapping[str, str]] = None,
+    prefix: str = "r",
+) -> Tuple[str, Dict[str, Any]]:
+    """
+    "(:r0_a, :r0_b, now()), (:r1_a, :r1_b, now())" plus its params.
+
+    `columns` is the full column order of the INSERT. Columns listed in
+    `literals` are written verbatim into every row (e.g. "now()", "null");
+    the rest are bound from each row mapping.
+    """
+    literals = literals or {}
+    params: Dict[str, Any] = {}
+    tuples: List[str] = []
+
+    for i, row in enumerate(rows):
+        parts: List[str] = []
+        for col in columns:
+            if col in literals:
+                parts.append(literals[col])
+                continue
+            name = f"{prefix}{i}_{col}"
+            params[name] = row[col]
+            parts.append(f":{name}")
+        tuples.append("(" + ", ".join(parts) + ")")
+
+    return ",\n".join(tuples), params
+
+
+def _chunks(rows: Sequence[Mapping[str, Any]], size: int) -> Iterator[Sequence[Mapping[str, Any]]]:
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+async def bulk_insert(
+    session: AsyncSession,
+    *,
+    table: str,
+    columns: Sequence[str],
+    rows: Sequence[Mapping[str, Any]],
+    literals: Optional[Mapping[str, str]] = None,
+    on_conflict: str = "",
+    chunk_rows: int = BULK_INSERT_CHUNK_ROWS,
+) -> int:
+    """
+    Insert `rows` into `table` with one statement per `chunk_rows` rows.
+    `on_conflict` is appended as-is (e.g. "on conflict (a, b) do nothing").
+    Returns the number of statements executed.
+    """
+    statements = 0
+
+    for chunk in _chunks(list(rows), max(1, int(chunk_rows))):
+        values_sql, params = build_values_clause(columns, chunk, literals=literals)
+        await session.execute(
+            text(
+                f"insert into {table} ({', '.join(columns)})\n"
+                f"values\n{values_sql}\n"
+                f"{on_conflict}"
+            ),
+            params,
+        )
+        statements += 1
+
+    return statements
@@ -2,11 +2,11 @@
 # waec_loader.py
 # ====================================================================
 
-import json
 import random
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 
+from content_store import get_content_store
 
 BASE_DIR = Path(__file__).resolve().parent
 WAEC_DATA_DIR = BASE_DIR / "data" / "waec"
@@ -44,12 +44,12 @@ ENG_EXACT_BLUEPRINT = [
 def load_json_file(file_path: Path) -> Any:
     """
     Load and return JSON content from a file.
-    """
-    if not file_path.exists():
-        raise FileNotFoundError(f"JSON file not found: {file_path}")
 
-    with file_path.open("r", encoding="utf-8") as f:
-        return json.load(f)
+    Served from the shared content store: parsed once per process and
+    re-parsed only when the file changes on disk. Treat the result as
+    read-only; question dicts handed to callers are copied below.
+    """
+    return get_content_store().load_json(file_path)
 
 
 # ====================================================================
@@ -65,16 +65,22 @@ def get_waec_subjects() -> List[Dict[str, Any]]:
     return [subject for subject in subjects if subject.get("active") is True]
 
 
+def _subjects_by_code() -> Dict[str, Dict[str, Any]]:
+    def build() -> Dict[str, Dict[str, Any]]:
+        index: Dict[str, Dict[str, Any]] = {}
+        for subject in get_waec_subjects():
+            index.setdefault(subject.get("code"), subject)
+        return index
+
+    return get_content_store().memo(("waec", "subjects_by_code"), build)
+
+
 def get_subject_by_code(subject_code: str) -> Optional[Dict[str, Any]]:
     """
     Return a single active subject by code.
     Example: 'chem'
     """
-    subjects = get_waec_subjects()
-    for subject in subjects:
-        if subject.get("code") == subject_code:
-            return subject
-    return None
+    return _subjects_by_code().get(subject_code)
 
 
 def get_subject_folder(subject_code: str) -> Path:
@@ -201,16 +207,30 @@ def validate_course_subject_map() -> List[str]:
 # ====================================================================
 # TOPICS
 # ====================================================================
+def _active_topics(subject_code: str) -> Dict[str, Any]:
+    def build() -> Dict[str, Any]:
+        subject_folder = get_subject_folder(subject_code)
+        topics_data = load_json_file(subject_folder / "topics.json")
+
+        topics = [
+            topic for topic in topics_data.get("topics", [])
+            if topic.get("active") is True
+        ]
+
+        by_id: Dict[str, Dict[str, Any]] = {}
+        for topic in topics:
+            by_id.setdefault(topic.get("id"), topic)
+
+        return {"topics": topics, "by_id": by_id}
+
+    return get_content_store().memo(("waec", "topics", subject_code), build)
+
+
 def get_subject_topics(subject_code: str) -> List[Dict[str, Any]]:
     """
     Load all active topics for a subject.
     """
-    subject_folder = get_subject_folder(subject_code)
-    topics_file = subject_folder / "topics.json"
-    topics_data = load_json_file(topics_file)
-
-    topics = topics_data.get("topics", [])
-    return [topic for topic in topics if topic.get("active") is True]
+    return list(_active_topics(subject_code)["topics"])
 
 
 def get_topic_by_id(subject_code: str, topic_id: str) -> Optional[Dict[str, Any]]:
@@ -218,36 +238,38 @@ def get_topic_by_id(subject_code: str, topic_id: str) -> Optional[Dict[str, Any]
     Return a single topic by ID.
     Example: chem_01
     """
-    topics = get_subject_topics(subject_code)
-    for topic in topics:
-        if topic.get("id") == topic_id:
-            return topic
-    return None
+    return _active_topics(subject_code)["by_id"].get(topic_id)
 
 
 # ====================================================================
 # QUESTIONS
 # ====================================================================
 
-def get_questions_for_topic(subject_code: str, topic_id: str) -> List[Dict[str, Any]]:
-    """
-    Load all active questions for a given subject/topic.
-    """
-    subject_folder = get_subject_folder(subject_code)
-    topic = get_topic_by_id(subject_code, topic_id)
+def _topic_questions(subject_code: str, topic_id: str) -> List[Dict[str, Any]]:
+    def build() -> List[Dict[str, Any]]:
+        subject_folder = get_subject_folder(subject_code)
+        topic = get_topic_by_id(subject_code, topic_id)
+
+        if not topic:
+            raise ValueError(f"Topic not found: {topic_id}")
 
-    if not topic:
-        raise ValueError(f"Topic not found: {topic_id}")
+        relative_file = topic.get("file")
+        if not relative_file:
+            raise ValueError(f"Topic file is missing for topic: {topic_id}")
 
-    relative_file = topic.get("file")
-    if not relative_file:
-        raise ValueError(f"Topic file is missing for topic: {topic_id}")
+        question_file = subject_folder / relative_file
+        questions = load_json_file(question_file)
 
-    question_file = subject_folder / relative_file
-    questions = load_json_file(question_file)
+        return [q for q in questions if q.get("active") is True]
 
-    active_questions = [q for q in questions if q.get("active") is True]
-    return active_questions
+    return get_content_store().memo(("waec", "topic_questions", subject_code, topic_id), build)
+
+
+def get_questions_for_topic(subject_code: str, topic_id: str) -> List[Dict[str, Any]]:
+    """
+    Load all active questions for a given subject/topic.
+    """
+    return [dict(q) for q in _topic_questions(subject_code, topic_id)]
 
 
 def get_questions_for_topic_ids(
@@ -304,6 +326,42 @@ def group_questions_by_passage_id(
     return grouped
 
 
+def _subject_question_index(subject_code: str) -> Dict[str, Any]:
+    """
+    Subject-wide index, rebuilt only when one of its files changes:
+    - questions:  all active questions in topic order
+    - by_id:      question id -> question
+    - by_passage: passage_id -> questions sharing that passage
+    """
+    def build() -> Dict[str, Any]:
+        all_questions: List[Dict[str, Any]] = []
+
+        for topic in get_subject_topics(subject_code):
+            topic_id = topic.get("id")
+            if not topic_id:
+                continue
+
+            try:
+                all_questions.extend(_topic_questions(subject_code, topic_id))
+            except Exception:
+                # Skip broken topic files without crashing the whole subject loader
+                continue
+
+        by_id: Dict[str, Dict[str, Any]] = {}
+        for question in all_questions:
+            qid = question.get("id")
+            if qid is not None:
+                by_id.setdefault(str(qid), question)
+
+        return {
+            "questions": all_questions,
+            "by_id": by_id,
+            "by_passage": group_questions_by_passage_id(all_questions),
+        }
+
+    return get_content_store().memo(("waec", "subject_questions", subject_code), build)
+
+
 def get_all_questions_for_subject(subject_code: str) -> List[Dict[str, Any]]:
     """
     Load all active questions across all active topics for a subject.
@@ -311,22 +369,31 @@ def get_all_questions_for_subject(subject_code: str) -> List[Dict[str, Any]]:
     Example:
     - biology -> loads questions from all active Biology topic files
     """
-    topics = get_subject_topics(subject_code)
-    all_questions: List[Dict[str, Any]] = []
+    return [dict(q) for q in _subject_question_index(subject_code)["questions"]]
 
-    for topic in topics:
-        topic_id = topic.get("id")
-        if not topic_id:
-            continue
 
-        try:
-            topic_questions = get_questions_for_topic(subject_code, topic_id)
-            all_questions.extend(topic_questions)
-        except Exception:
-            # Skip broken topic files without crashing the whole subject loader
-            continue
+def get_subject_question_map(subject_code: str) -> Dict[str, Dict[str, Any]]:
+    """
+    Shared question id -> question map of a subject (read-only: the
+    dicts are the cached ones, do not mutate them).
+    """
+    return _subject_question_index(subject_code)["by_id"]
 
-    return all_questions
+
+def get_question_by_id(subject_code: str, question_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Return one active question of a subject by its id, or None.
+    """
+    question = _subject_question_index(subject_code)["by_id"].get(str(question_id))
+    return dict(question) if question else None
+
+
+def get_questions_by_passage_id(subject_code: str, passage_id: str) -> List[Dict[str, Any]]:
+    """
+    Return all active questions of a subject that share `passage_id`.
+    """
+    questions = _subject_question_index(subject_code)["by_passage"].get(str(passage_id), [])
+    return [dict(q) for q in questions]
 
 
 def get_available_subject_questions_excluding_seen(
@@ -521,7 +588,8 @@ def select_rotating_balanced_subject_questions(
             continue
 
         try:
-            all_topic_questions = get_questions_for_topic(subject_code, topic_id)
+            # Shared (read-only) lists; only the picked questions are copied below
+            all_topic_questions = _topic_questions(subject_code, topic_id)
         except Exception:
             continue
 
@@ -596,7 +664,7 @@ def select_rotating_balanced_subject_questions(
                 selected_ids.add(qid)
 
     # Final shuffle so the paper does not appear topic-grouped
-    selected_questions = shuffle_questions(selected_questions)
+    selected_questions = shuffle_questions([dict(q) for q in selected_questions])
 
     # Compute next topic pointer for future attempts
     if represented_topic_ids:
@@ -680,7 +748,7 @@ def prepare_subject_question_batch(
     Prepare a subject-wide batch of questions across all active topics,
     ensuring rotating topic representation as much as possible.
     """
-    all_questions = get_all_questions_for_subject(subject_code)
+    all_questions = _subject_question_index(subject_code)["questions"]
     all_question_ids = extract_question_ids(all_questions)
 
     unseen_questions = [